@@ -0,0 +1,95 @@
+# Python-side cost of a yearly PV query result (run with: pytest -m benchmark -s)
+# Old path: annotated CSV -> FluxCsvParser tables/records (every column typed) -> clean_record
+# New path: plain CSV rows (query_csv) -> RecordDecoder, only the needed columns are converted
+# The assertions count cell conversions (deterministic); the timing is only reported
+import codecs
+import csv
+import io
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from influxdb_client.client.flux_csv_parser import FluxCsvParser, FluxSerializationMode
+
+from bridges.db_bridge import PV_FIELDS
+from bridges.flux_queries import RecordDecoder, to_float, to_local_time
+
+pytestmark = pytest.mark.benchmark
+
+RESULT_TZ = ZoneInfo("Europe/Vienna")
+ROUNDS = 3
+COLUMNS = ["result", "table", "_start", "_stop", "_time", "_measurement", *PV_FIELDS]
+
+
+# One year of 15 min means after pivot(), as Influx sends it for PV_HISTORY
+def _yearly_csv(annotated):
+    rnd = random.Random(42)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\r\n")
+    if annotated:
+        writer.writerow(["#datatype", "string", "long", "dateTime:RFC3339", "dateTime:RFC3339", "dateTime:RFC3339",
+                         "string", *["double"] * len(PV_FIELDS)])
+        writer.writerow(["#group", "false", "false", "true", "true", "false", "true", *["false"] * len(PV_FIELDS)])
+        writer.writerow(["#default", "_result", "", "", "", "", "", *[""] * len(PV_FIELDS)])
+    writer.writerow(["", *COLUMNS])
+    for i in range(365 * 96):
+        time = (start + timedelta(minutes=15 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        writer.writerow(["", "" if annotated else "_result", "0", "2025-01-01T00:00:00Z", "2025-12-31T23:59:59Z",
+                         time, "pv_measurements", *[f"{rnd.uniform(0, 8000):.3f}" for _ in PV_FIELDS]])
+    return out.getvalue().encode("utf-8")
+
+
+# Previous DB_Bridge.clean_record
+def _clean_record(record):
+    record["_time"] = record["_time"].astimezone(RESULT_TZ)
+    keep = ["_time", *PV_FIELDS, "boiler_temp", "price"]
+    return {k: record[k] for k in keep if k in record}
+
+
+def _old_path(body):
+    parser = FluxCsvParser(response=io.BytesIO(body), serialization_mode=FluxSerializationMode.tables)
+    list(parser.generator())
+    return [_clean_record(r.values) for t in parser.table_list() for r in t.records]
+
+
+def _new_path(body, decoder):
+    rows = csv.reader(codecs.iterdecode(io.BytesIO(body), "utf-8"))
+    return decoder.records(rows)
+
+# Converter wrapper that counts the converted cells
+class _Counting:
+    def __init__(self, convert):
+        self.convert = convert
+        self.cells = 0
+
+    def __call__(self, cell):
+        self.cells += 1
+        return self.convert(cell)
+
+# Tests that the column decoder returns the same records as the old parser path and converts only the
+# needed cells (time + fields), not every column of every row like FluxCsvParser
+def test_yearly_result_decoding():
+    annotated, plain = _yearly_csv(True), _yearly_csv(False)
+    local_time = to_local_time(RESULT_TZ)
+    decoder = RecordDecoder({"_time": local_time, **{f: to_float for f in PV_FIELDS}})
+
+    old = _old_path(annotated)
+    new = _new_path(plain, decoder)
+    assert new == old
+
+    counting = {"_time": _Counting(local_time), **{f: _Counting(to_float) for f in PV_FIELDS}}
+    _new_path(plain, RecordDecoder(counting))
+    converted = sum(c.cells for c in counting.values())
+    assert converted == len(new) * (1 + len(PV_FIELDS))
+    assert converted < len(new) * len(COLUMNS)
+
+    old_s = min(timeit.repeat(lambda: _old_path(annotated), number=1, repeat=ROUNDS))
+    new_s = min(timeit.repeat(lambda: _new_path(plain, decoder), number=1, repeat=ROUNDS))
+
+    print(f"\nyearly PV result ({len(new)} records)")
+    print(f"  FluxCsvParser + clean_record: {old_s * 1000:7.1f} ms  {len(annotated) / 1e6:5.2f} MB")
+    print(f"  query_csv + RecordDecoder:    {new_s * 1000:7.1f} ms  {len(plain) / 1e6:5.2f} MB")
+    print(f"  cells converted: {converted} of {len(new) * len(COLUMNS)}")
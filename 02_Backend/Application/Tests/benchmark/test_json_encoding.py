@@ -0,0 +1,70 @@
+# Encode time and size of a realistic /api/pv/yearly response (run with: pytest -m benchmark -s)
+# Old path: clean_record pre-stringifies _time, Flask's default provider (stdlib json, sorted keys)
+# New path: datetimes stay datetimes, FastJSONProvider (orjson, stdlib fallback)
+import random
+import timeit
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+import pytz
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import services.json_provider as json_provider
+from services.json_provider import FastJSONProvider
+
+pytestmark = pytest.mark.benchmark
+
+VIENNA = pytz.timezone("Europe/Vienna")
+RESULT_TZ = ZoneInfo("Europe/Vienna")
+FIELDS = ("pv_power", "grid_power", "load_power", "battery_power", "soc", "e_day", "e_year", "e_total",
+          "rel_autonomy", "rel_selfconsumption")
+ROUNDS = 3
+
+
+# One year of 15 min means (aggregateWindow every: 15m), as returned by DB_Bridge.get_yearly_pv_data
+def _yearly_records():
+    rnd = random.Random(42)
+    start = VIENNA.localize(datetime(2025, 1, 1))
+    return [
+        {"_time": (start + timedelta(minutes=15 * i)).astimezone(RESULT_TZ),
+         **{field: rnd.uniform(0, 8000) for field in FIELDS}}
+        for i in range(365 * 96)
+    ]
+
+
+def _encode(app, payload):
+    with app.app_context():
+        return app.json.response(payload).get_data()
+
+
+def _measure(app, payload):
+    seconds = min(timeit.repeat(lambda: _encode(app, payload), number=1, repeat=ROUNDS))
+    return seconds, len(_encode(app, payload))
+
+# Tests that the fast provider encodes the yearly response faster than the stdlib path and not larger
+def test_yearly_response_encoding(monkeypatch):
+    records = _yearly_records()
+    stringified = [{**r, "_time": r["_time"].isoformat()} for r in records]
+
+    old_app = Flask(__name__)
+    old_app.json = DefaultJSONProvider(old_app)
+    fast_app = Flask(__name__)
+    fast_app.json = FastJSONProvider(fast_app)
+
+    have_orjson = json_provider.orjson is not None
+    old_s, old_size = _measure(old_app, stringified)
+    fast_s, fast_size = _measure(fast_app, records)
+    monkeypatch.setattr(json_provider, "orjson", None)
+    fallback_s, fallback_size = _measure(fast_app, records)
+
+    print(f"\nyearly response ({len(records)} records)")
+    print(f"  stdlib (pre-stringified): {old_s * 1000:7.1f} ms  {old_size / 1e6:5.2f} MB")
+    print(f"  orjson provider:          {fast_s * 1000:7.1f} ms  {fast_size / 1e6:5.2f} MB")
+    print(f"  stdlib fallback provider: {fallback_s * 1000:7.1f} ms  {fallback_size / 1e6:5.2f} MB")
+
+    assert fast_size <= old_size
+    assert fallback_size == fast_size
+    if have_orjson:
+        assert fast_s * 3 < old_s
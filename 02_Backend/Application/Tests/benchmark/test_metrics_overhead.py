@@ -0,0 +1,58 @@
+# Cost of one metrics observation on the hot path (run with: pytest -m benchmark -s)
+# The assertions count the calls made per observation (deterministic); the timing is only reported,
+# wall-clock budgets fail randomly on a loaded machine
+import sys
+import timeit
+
+import pytest
+
+from services.metrics_registry import MetricsRegistry
+
+pytestmark = pytest.mark.benchmark
+
+ROUNDS = 200_000
+# Other series in the same families: the cost of an observation must not depend on them
+OTHER_SERIES = 1_000
+
+
+# Best of several runs in µs per call, minus the cost of the empty loop
+def _per_call_us(stmt, **names):
+    best = min(timeit.repeat(stmt, globals=names, number=ROUNDS, repeat=5))
+    baseline = min(timeit.repeat("pass", number=ROUNDS, repeat=5))
+    return (best - baseline) / ROUNDS * 1e6
+
+
+# Python functions and builtins called by fn(*args) (names, in call order)
+def _calls(fn, *args):
+    calls = []
+
+    def profile(frame, event, arg):
+        if event == "call":
+            calls.append(frame.f_code.co_qualname)
+        elif event == "c_call" and arg is not sys.setprofile:
+            calls.append(arg.__qualname__)
+
+    sys.setprofile(profile)
+    try:
+        fn(*args)
+    finally:
+        sys.setprofile(None)
+    return calls
+
+# Tests that a counter increment / histogram observation on a labelled child is one method call plus the lock
+# (and a bisect for the bucket), independent of how many series are registered
+def test_observation_overhead():
+    registry = MetricsRegistry()
+    counters = registry.counter("bench_total", "Bench", ("route",))
+    histograms = registry.histogram("bench_seconds", "Bench", ("route",))
+    for i in range(OTHER_SERIES):
+        counters.labels(f"/other/{i}").inc()
+        histograms.labels(f"/other/{i}").observe(0.1)
+    counter = counters.labels("/api/mode")
+    histogram = histograms.labels("/api/mode")
+
+    assert _calls(counter.inc) == ["_CounterChild.inc", "lock.__exit__"]
+    assert _calls(histogram.observe, 0.0123) == ["_HistogramChild.observe", "bisect_left", "lock.__exit__"]
+
+    print(f"\ncounter.inc():       {_per_call_us('counter.inc()', counter=counter):.3f} µs")
+    print(f"histogram.observe(): {_per_call_us('histogram.observe(0.0123)', histogram=histogram):.3f} µs")
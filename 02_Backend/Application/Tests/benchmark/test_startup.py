@@ -0,0 +1,97 @@
+# Startup cost of the backend (run with: pytest -m benchmark -s)
+# Measured in fresh subprocesses, so imports are not already cached by the test run.
+# The assertions check what startup does (deferred imports, no Influx traffic before the first answer); the times are
+# reported, and only checked against STARTUP_IMPORT_BUDGET_S / STARTUP_READY_BUDGET_S when those are set
+# (wall-clock budgets fail randomly on a loaded machine)
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from dotenv import find_dotenv
+
+pytestmark = pytest.mark.benchmark
+
+APP_DIR = Path(__file__).resolve().parents[2]
+IMPORT_BUDGET_S = os.getenv("STARTUP_IMPORT_BUDGET_S")
+READY_BUDGET_S = os.getenv("STARTUP_READY_BUDGET_S")
+
+# Imports that must not happen at startup (loaded on first use)
+DEFERRED_MODULES = ("influxdb_client", "flask_swagger_ui")
+
+# Counts the Influx clients requested by the main thread (startup + first request); background threads may connect
+READY_PROBE = """
+import threading
+import time
+started = time.perf_counter()
+from bridges.influx_client import INFLUX_CLIENTS
+requested = []
+shared_client = INFLUX_CLIENTS.client
+def client(*args, **kwargs):
+    if threading.current_thread() is threading.main_thread():
+        requested.append(args)
+    return shared_client(*args, **kwargs)
+INFLUX_CLIENTS.client = client
+from managers.service_manager import ServiceManager
+sm = ServiceManager()
+resp = sm.get_app().test_client().get("/api/mode")
+assert resp.status_code == 200, resp.status_code
+print(f"READY_S={time.perf_counter() - started}", flush=True)
+print(f"INFLUX_CLIENTS={len(requested)}", flush=True)
+"""
+
+
+def _run(args, env=None):
+    return subprocess.run([sys.executable, *args], cwd=APP_DIR, env=env, capture_output=True, text=True, timeout=60)
+
+
+# Parses "python -X importtime" output -> {module: cumulative seconds}
+def _import_times(stderr):
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative) / 1e6
+        except ValueError:
+            continue
+    return times
+
+
+# "NAME=value" outputs of the probe -> {NAME: value}
+# One write per value: output of background threads may end up on the same line, but never inside a value
+def _probe_values(stdout):
+    return {name: float(value) for name, value in re.findall(r"\b([A-Z_]+)=([0-9.e+-]+)", stdout)}
+
+# Tests that heavy clients are not imported eagerly (import time reported, budget only if configured)
+def test_import_time_budget():
+    result = _run(["-X", "importtime", "-c", "import managers.service_manager"])
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    times = _import_times(result.stderr)
+    for module in DEFERRED_MODULES:
+        assert module not in times, f"{module} is imported at startup"
+    print(f"\nimport managers.service_manager: {times['managers.service_manager'] * 1000:.0f} ms")
+    if IMPORT_BUDGET_S:
+        assert times["managers.service_manager"] < float(IMPORT_BUDGET_S)
+
+# Tests that a fresh process serves /api/mode without waiting for Influx (unreachable here): neither the startup nor
+# the request asks for an Influx client
+def test_ready_with_influx_down():
+    if not find_dotenv(usecwd=True) and not (APP_DIR / ".env").exists():
+        pytest.skip("no .env (ADMIN_PW, InfluxDB settings) available")
+
+    env = {**os.environ, "INFLUX_URL": "http://127.0.0.1:9", "SCHEDULER_WALLBOX_INTERVAL_S": "0"}
+    env.pop("SCHEDULER_LEADER_LOCK", None)
+    result = _run(["-c", READY_PROBE], env=env)
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    values = _probe_values(result.stdout)
+    assert values["INFLUX_CLIENTS"] == 0
+
+    print(f"\nready with Influx down: {values['READY_S'] * 1000:.0f} ms")
+    if READY_BUDGET_S:
+        assert values["READY_S"] < float(READY_BUDGET_S)
@@ -0,0 +1,17 @@
+# Integration tests for the aggregated dashboard endpoint
+
+def test_dashboard_sections(client):
+    client.post("/api/mode", json={"mode": "MANUAL"})
+
+    resp = client.get("/api/dashboard?sections=mode,boiler")
+    assert resp.status_code == 200
+    sections = resp.json["sections"]
+    assert set(sections) == {"mode", "boiler"}
+    assert sections["mode"]["data"] == {"mode": "MANUAL"}
+    assert sections["boiler"]["data"]["heating"] is False
+    assert sections["boiler"]["fresh"] is True
+
+def test_dashboard_unknown_section(client):
+    resp = client.get("/api/dashboard?sections=pv,weather")
+    assert resp.status_code == 400
+    assert "weather" in resp.json["error"]
@@ -0,0 +1,45 @@
+# Integration tests for the admin bulk export endpoint
+import os
+
+import pytest
+
+HEADER = ["", "result", "table", "_time", "boiler_temp"]
+
+
+@pytest.fixture
+def export(client):
+    manager = client.application.view_functions["export"].__self__
+    manager.db_bridge.export_csv_rows.return_value = iter([HEADER, ["", "_result", "0", "2025-01-01T00:00:00Z", "55.5"]])
+    return {"X-Admin-Password": os.environ["ADMIN_PW"]}, manager
+
+
+def test_export_requires_admin_password(client):
+    assert client.get("/api/export?measurement=pv&start=2025-01-01").status_code == 401
+
+def test_export_csv(client, export):
+    headers, manager = export
+    resp = client.get("/api/export?measurement=boiler&start=2025-01-01&stop=2025-01-02", headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert resp.headers["Content-Disposition"] == 'attachment; filename="boiler_measurements_20250101-20250102.csv"'
+    assert resp.get_data(as_text=True) == "time,boiler_temp\n2025-01-01T00:00:00Z,55.5\n"
+    resp.close()
+    assert manager.exports.running == 0
+
+def test_export_errors(client, export):
+    headers, manager = export
+    assert client.get("/api/export?measurement=wallbox&start=2025-01-01", headers=headers).status_code == 400
+
+    # All slots taken
+    manager.exports.acquire()
+    manager.exports.acquire()
+    resp = client.get("/api/export?measurement=pv&start=2025-01-01", headers=headers)
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "30"
+    manager.exports.release()
+    manager.exports.release()
+
+    manager.db_bridge.export_csv_rows.side_effect = ConnectionError("Influx down")
+    resp = client.get("/api/export?measurement=pv&start=2025-01-01", headers=headers)
+    assert resp.status_code == 502
+    assert manager.exports.running == 0
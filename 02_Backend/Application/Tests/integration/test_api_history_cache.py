@@ -0,0 +1,97 @@
+# Integration tests for compression and conditional GET of the history endpoints
+import gzip
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+RECORDS = [{"_time": f"2025-01-01T{h:02d}:{m:02d}:00+01:00", "pv_power": 1000.0 + h, "soc": 50}
+           for h in range(24) for m in (0, 15, 30, 45)]
+
+
+@pytest.fixture
+def manager(client):
+    manager = client.application.view_functions["pv_daily"].__self__
+    manager.db_bridge.get_daily_pv_data.return_value = RECORDS
+    return manager
+
+
+def test_closed_day_is_cached_and_revalidated_without_influx(client, manager):
+    resp = client.get("/api/pv/daily?date=2025-01-01", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert resp.headers["Cache-Control"] == "public, max-age=86400"
+    assert json.loads(gzip.decompress(resp.data)) == RECORDS
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+    assert etag.startswith('W/"pv-daily-2025-01-01')
+
+    # Conditional GET -> 304, Influx not asked again
+    resp = client.get("/api/pv/daily?date=2025-01-01", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == etag
+
+    resp = client.get("/api/pv/daily?date=2025-01-01", headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+
+    # Cached body, also for clients without compression
+    resp = client.get("/api/pv/daily?date=2025-01-01")
+    assert "Content-Encoding" not in resp.headers
+    assert resp.get_json() == RECORDS
+    assert manager.db_bridge.get_daily_pv_data.call_count == 1
+
+def test_closed_day_etag_follows_content(client, manager):
+    etag = client.get("/api/pv/daily?date=2025-01-01").headers["ETag"]
+
+    manager.history_cache = type(manager.history_cache)()
+    manager.db_bridge.get_daily_pv_data.return_value = RECORDS[:-1]
+    resp = client.get("/api/pv/daily?date=2025-01-01", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.get_json() == RECORDS[:-1]
+
+    # Another worker with the same data answers the client's ETag with 304
+    manager.history_cache = type(manager.history_cache)()
+    resp = client.get("/api/pv/daily?date=2025-01-01", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+
+def test_partial_closed_day_is_not_cached(client, manager):
+    from bridges.db_bridge import PartialHistory
+
+    manager.db_bridge.get_daily_pv_data.return_value = PartialHistory(RECORDS[:10])
+    resp = client.get("/api/pv/daily?date=2025-01-01")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
+    assert resp.headers["X-History-Partial"] == "1"
+    assert not resp.headers["ETag"].startswith('W/"pv-daily')
+    assert manager.history_cache.stats()["entries"] == 0
+
+    manager.db_bridge.get_daily_pv_data.return_value = RECORDS
+    resp = client.get("/api/pv/daily?date=2025-01-01")
+    assert resp.headers["Cache-Control"] == "public, max-age=86400"
+    assert resp.get_json() == RECORDS
+
+def test_open_day_uses_content_etag(client, manager):
+    today = datetime.now(ZoneInfo("Europe/Vienna")).strftime("%Y-%m-%d")
+    resp = client.get(f"/api/pv/daily?date={today}")
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+    resp = client.get(f"/api/pv/daily?date={today}", headers={"If-None-Match": resp.headers["ETag"]})
+    assert resp.status_code == 304
+    assert manager.db_bridge.get_daily_pv_data.call_count == 2
+
+def test_history_errors_are_not_cached(client, manager):
+    assert client.get("/api/pv/daily?date=01.01.2025").status_code == 400
+    assert client.get("/api/pv/yearly?year=abc").status_code == 400
+
+    manager.db_bridge.get_monthly_pv_data.return_value = []
+    assert client.get("/api/pv/monthly?month=2025-01").status_code == 404
+    assert manager.history_cache.stats()["entries"] == 0
+
+def test_small_responses_stay_uncompressed(client):
+    resp = client.get("/api/mode", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert "Content-Encoding" not in resp.headers
+    assert "Accept-Encoding" in resp.headers["Vary"]
@@ -0,0 +1,14 @@
+# Integration tests for the Prometheus /metrics endpoint
+
+def test_metrics_endpoint(client):
+    client.get("/api/mode")
+    client.get("/api/does-not-exist")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+
+    text = resp.get_data(as_text=True)
+    assert 'pvbackend_http_request_duration_seconds_count{method="GET",route="/api/mode",status="200"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert "# TYPE pvbackend_log_queue_depth gauge" in text
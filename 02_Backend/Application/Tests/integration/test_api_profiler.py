@@ -0,0 +1,71 @@
+# Integration tests for the admin profiler endpoints
+import os
+
+import pytest
+
+
+@pytest.fixture
+def admin(client, tmp_path):
+    # ServiceManager behind the test client; profiles go to a temporary directory
+    manager = client.application.view_functions["profiler"].__self__
+    manager.profiler.directory = tmp_path
+    return {"X-Admin-Password": os.environ["ADMIN_PW"]}, manager
+
+
+def test_profiler_requires_admin_password(client):
+    assert client.get("/api/profiler").status_code == 401
+    resp = client.post("/api/profiler", json={"target": "/api/mode", "password": "wrong"})
+    assert resp.status_code == 401
+
+def test_profile_route(client, admin):
+    headers, manager = admin
+    resp = client.post("/api/profiler", json={"target": "/api/mode", "count": 1}, headers=headers)
+    assert resp.status_code == 201
+    session_id = resp.json["id"]
+
+    # Not captured yet
+    assert client.get(f"/api/profiler/{session_id}", headers=headers).status_code == 409
+
+    assert client.get("/api/mode").status_code == 200
+
+    resp = client.get(f"/api/profiler/{session_id}", headers=headers)
+    assert resp.status_code == 200
+    assert "attachment" in resp.headers["Content-Disposition"]
+
+    report = client.get(f"/api/profiler/{session_id}?format=text", headers=headers)
+    assert "mode_endpoint" in report.get_data(as_text=True)
+
+    # Session done -> original view function is back
+    assert not hasattr(client.application.view_functions["mode"], "__wrapped__")
+    sessions = client.get("/api/profiler", headers=headers).json["sessions"]
+    assert sessions[0]["status"] == "done"
+
+def test_profile_invalid_targets(client, admin):
+    headers, _ = admin
+    assert client.post("/api/profiler", json={"target": "/api/unknown"}, headers=headers).status_code == 400
+    assert client.post("/api/profiler", json={"target": "/api/stream"}, headers=headers).status_code == 400
+    assert client.post("/api/profiler", json={"target": "tick:main", "count": 500}, headers=headers).status_code == 400
+
+    assert client.post("/api/profiler", json={"target": "/api/mode", "count": 3}, headers=headers).status_code == 201
+    assert client.post("/api/profiler", json={"target": "/api/mode"}, headers=headers).status_code == 409
+
+def test_profile_scheduler_tick(client, admin):
+    headers, manager = admin
+    resp = client.post("/api/profiler", json={"target": "tick:main", "mode": "sample", "interval_ms": 1}, headers=headers)
+    assert resp.status_code == 201
+    session_id = resp.json["id"]
+
+    manager.scheduler.run_step("main", manager.scheduler.tick)
+
+    resp = client.get(f"/api/profiler/{session_id}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+
+def test_cancel_profile(client, admin):
+    headers, _ = admin
+    session_id = client.post("/api/profiler", json={"target": "tick:wallbox", "count": 5}, headers=headers).json["id"]
+
+    resp = client.delete(f"/api/profiler/{session_id}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json["status"] == "cancelled"
+    assert client.delete("/api/profiler/doesnotexist", headers=headers).status_code == 404
@@ -1,5 +1,21 @@
 # Integration tests for the schedule API endpoint
 # These tests will check if the API correctly handles requests to get and update the schedule
+import shutil
+
+import pytest
+
+# The store writes to a copy in tmp_path: PUT requests must not change the tracked data/schedule.json
+@pytest.fixture(autouse=True)
+def schedule_file(tmp_path, mocker):
+    from stores.json_file import flush_all
+    from stores.schedule_store import ScheduleStore
+
+    path = tmp_path / "schedule.json"
+    shutil.copy("data/schedule.json", path)
+    mocker.patch("managers.service_manager.ScheduleStore", lambda: ScheduleStore(path))
+    yield path
+    # Pending (debounced) write goes to the copy now, not at interpreter exit
+    flush_all()
 
 def test_get_schedule(client):
     resp = client.get("/api/schedule")
@@ -22,3 +38,46 @@ def test_put_schedule(client):
     # Verify that the schedule was updated correctly
     resp2 = client.get("/api/schedule")
     assert resp2.json["boiler"]["winter"]["start"] == "08:00"
+
+def test_put_schedule_windows_and_exceptions(client, schedule_file):
+    import json
+    from stores.json_file import flush_all
+
+    payload = {
+        "wallbox": {
+            "summer": {"windows": [{"start": "22:00", "end": "06:00", "days": ["weekdays"]}]},
+            "exceptions": [{"from": "2026-12-24", "to": "2026-12-26", "windows": []}]
+        }
+    }
+
+    resp = client.put("/api/schedule", json=payload)
+    assert resp.status_code == 200
+
+    resp2 = client.get("/api/schedule")
+    assert resp2.json["wallbox"]["exceptions"][0]["from"] == "2026-12-24"
+    assert resp2.json["wallbox"]["summer"]["windows"][0]["days"] == ["weekdays"]
+
+    flush_all()
+    assert json.loads(schedule_file.read_text(encoding="utf-8"))["wallbox"]["exceptions"][0]["to"] == "2026-12-26"
+
+# Tests that a classic start/end PUT replaces windows set before (the app only sends start/end)
+def test_put_start_end_replaces_windows(client):
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    from services.clock import VirtualClock
+
+    manager = client.application.view_functions["schedule"].__self__.schedule_manager
+    manager.clock = VirtualClock(datetime(2026, 1, 14, 10, 0, tzinfo=ZoneInfo("Europe/Vienna")))
+
+    windows = {"windows": [{"start": "20:00", "end": "22:00", "days": ["daily"]}]}
+    assert client.put("/api/schedule", json={"wallbox": {"winter": windows}}).status_code == 200
+    assert not manager.is_active("wallbox")
+
+    assert client.put("/api/schedule", json={"wallbox": {"winter": {"start": "09:00", "end": "11:00"}}}).status_code == 200
+    assert manager.is_active("wallbox")
+    assert "windows" not in client.get("/api/schedule").json["wallbox"]["winter"]
+
+def test_put_schedule_invalid_time(client):
+    resp = client.put("/api/schedule", json={"boiler": {"winter": {"start": "8 Uhr", "end": "16:00"}}})
+    assert resp.status_code == 400
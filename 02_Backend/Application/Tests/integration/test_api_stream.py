@@ -0,0 +1,15 @@
+# Integration tests for the live data stream endpoint (Server-Sent Events)
+
+def test_stream_headers_and_first_events(client):
+    client.post("/api/mode", json={"mode": "MANUAL"})
+
+    resp = client.get("/api/stream", buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+    chunks = iter(resp.response)
+    assert next(chunks).decode().startswith("retry:")
+    # Mode change of the API is part of the state -> sent as snapshot on connect
+    assert next(chunks).decode() == 'event: mode\ndata: {"mode":"MANUAL"}\n\n'
+    resp.close()
@@ -16,3 +16,10 @@ def test_boiler_control_invalid_action(client):
 
     # Bad Request (400)
     assert response.status_code == 400
+
+def test_plan_not_available(client):
+    # Check that the plan endpoint reports a missing plan instead of an empty object
+    response = client.get("/api/plan")
+
+    # Not Found (404)
+    assert response.status_code == 404
@@ -0,0 +1,86 @@
+# Integration tests for the multi-worker deployment (gunicorn -w N)
+# Two ServiceManagers in one process behave like two workers: flock locks are per open file, so only one becomes leader
+import os
+
+import pytest
+
+
+@pytest.fixture
+def workers(mocker, monkeypatch, tmp_path):
+    from managers.service_manager import ServiceManager
+
+    monkeypatch.setenv("SCHEDULER_LEADER_LOCK", str(tmp_path / "scheduler.lock"))
+    monkeypatch.setenv("CONTROL_AUTHKEY", "test")
+
+    fake_boiler = mocker.Mock()
+    fake_boiler.get_state.return_value = False
+    fake_boiler.relay = None
+    fake_boiler.control.return_value = {"action": "on", "result": True}
+    mocker.patch("managers.service_manager.BoilerController", return_value=fake_boiler)
+    mocker.patch("managers.service_manager.DB_Bridge")
+    mocker.patch("managers.service_manager.WallboxController")
+    mocker.patch("managers.service_manager.LoggingBridge")
+
+    leader = ServiceManager()
+    follower = ServiceManager()
+    yield leader, follower, fake_boiler
+
+    for sm in (leader, follower):
+        sm.store_sync.stop()
+        if sm.control_server:
+            sm.control_server.stop()
+        if sm.scheduler:
+            sm.scheduler.stop()
+        sm.leader.release()
+
+# Tests that only the leader runs the scheduler and the follower reads the boiler through it
+def test_follower_uses_leader(workers):
+    leader, follower, fake_boiler = workers
+    assert leader.scheduler is not None
+    assert follower.scheduler is None
+
+    client = follower.get_app().test_client()
+    resp = client.get("/api/boiler/state")
+    assert resp.status_code == 200
+    assert resp.json == {"heating": False, "simulated": True}
+
+    assert follower.boiler_bridge.control("on") == {"action": "on", "result": True}
+    fake_boiler.control.assert_called_with("on")
+
+    resp = client.get("/api/scheduler/metrics")
+    assert resp.status_code == 200
+    assert resp.json["leader"] == {"pid": os.getpid(), "worker_pid": os.getpid(), "is_leader": False}
+
+# Tests that the follower answers 503 while no leader is reachable and takes over the control loop
+def test_follower_takes_over(workers):
+    leader, follower, _ = workers
+    leader.control_server.stop()
+    leader.scheduler.stop()
+    leader.leader.release()
+
+    client = follower.get_app().test_client()
+    assert client.get("/api/scheduler/metrics").status_code == 503
+
+    assert follower.leader.try_acquire()
+    follower._take_over()
+    assert follower.scheduler is not None
+    assert client.get("/api/scheduler/metrics").json["leader"]["is_leader"] is True
+
+# Tests that dashboard sections load on the leader (locally) and on the follower (over the control socket)
+def test_dashboard_sections_on_leader_and_follower(workers):
+    leader, follower, _ = workers
+    leader.db_bridge.get_latest_boiler_data.return_value = {"boiler_temp": 51.5}
+
+    for sm in (leader, follower):
+        assert sm.dashboard.load("mode") == {"mode": leader.mode_store.get().value}
+        boiler = sm.dashboard.load("boiler")
+        assert boiler["boiler_temp"] == 51.5
+        assert boiler["heating"] is False
+
+    # The follower's sections were answered by the leader
+    assert leader.control_server.calls >= 2
+    assert leader.control_server.errors == 0
+
+    resp = follower.get_app().test_client().get("/api/dashboard")
+    assert resp.status_code == 200
+    assert resp.json["sections"]["mode"]["data"] == {"mode": leader.mode_store.get().value}
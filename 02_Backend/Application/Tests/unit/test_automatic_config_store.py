@@ -0,0 +1,51 @@
+import shutil
+
+import pytest
+
+from services.scheduler_service import SchedulerService
+from stores.automatic_config_store import AutomaticConfigStore
+
+class FakeLogger:
+    def system_event(self, *a, **k): pass
+
+@pytest.fixture
+def store(tmp_path):
+    default = tmp_path / "automatic_config_default.json"
+    shutil.copy("data/automatic_config_default.json", default)
+    return AutomaticConfigStore(path=tmp_path / "automatic_config.json", default_path=default)
+
+# Tests that snapshots are shared without copying and can't be modified
+def test_snapshot_is_immutable_and_copy_free(store):
+    snapshot = store.snapshot()
+
+    assert store.snapshot() is snapshot
+    with pytest.raises(TypeError):
+        snapshot["boiler"]["winter"]["target_temp_c"] = 99
+    # get() still returns a private, mutable copy
+    copy = store.get()
+    copy["boiler"]["winter"]["target_temp_c"] = 99
+    assert store.snapshot()["boiler"]["winter"]["target_temp_c"] != 99
+
+# Tests that every change bumps the version and informs the subscribers with the new snapshot
+def test_update_notifies_subscribers(store):
+    seen = []
+    store.subscribe(lambda snapshot, version: seen.append((snapshot["boiler"]["winter"]["target_temp_c"], version)))
+    version = store.version
+
+    store.update({"boiler": {"winter": {"target_temp_c": 55}}})
+    store.reset_to_default()
+
+    assert [v for _, v in seen] == [version + 1, version + 2]
+    assert seen[0][0] == 55
+    assert store.snapshot()["boiler"]["winter"]["target_temp_c"] == store.get()["boiler"]["winter"]["target_temp_c"]
+
+# Tests that the scheduler works on the shared store: an API update is seen by the next decision
+def test_scheduler_shares_store_with_api(store):
+    scheduler = SchedulerService(None, None, None, None, None, FakeLogger(), automatic_config=store)
+    topics = []
+    scheduler.notify = topics.append
+
+    store.update({"optimizer": {"enabled": True}})
+
+    assert scheduler.automatic_config.snapshot()["optimizer"]["enabled"] is True
+    assert topics == ["config"]
@@ -1,3 +1,5 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from services.scheduler_service import SchedulerService
 
 # FAKES
@@ -87,6 +89,9 @@ class FakeConfig:
     def get(self):
         return self.cfg
 
+    def snapshot(self):
+        return self.cfg
+
 # HELPER
 def make_scheduler(boiler, wallbox, pv, forecast, config):
     s = SchedulerService(
@@ -283,4 +288,257 @@ def test_automatic_wallbox_uses_night_grid():
     )
 
     scheduler.automatic_wallbox(scheduler.pv_forecast.get_forecast(), scheduler.pv_service.get_pv_state())
-    assert wallbox.get_allow_state() in (True, False)
\ No newline at end of file
+    assert wallbox.get_allow_state() in (True, False)
+
+def test_automatic_boiler_follows_optimizer_plan():
+    """Optimizer aktiv: Plan-Slot überstimmt das Warten auf die PV-Prognose."""
+    boiler = FakeBoiler()
+    target_time = (datetime.now(ZoneInfo("Europe/Vienna")) + timedelta(hours=3)).strftime("%H:%M")
+
+    scheduler = make_scheduler(
+        boiler=boiler,
+        wallbox=None,
+        pv=FakePVSurplus(0.0, temp=40, soc=50.0),
+        forecast=FakeForecast(today=True),
+        config=FakeConfig({
+            "boiler": {
+                "winter": {
+                    "target_time": target_time,
+                    "target_temp_c": 55,
+                    "min_runtime_min": 60
+                }
+            },
+            "optimizer": {"enabled": True}
+        })
+    )
+
+    scheduler.update_plan(scheduler.pv_service.get_pv_state())
+    scheduler.automatic_boiler(scheduler.pv_forecast.get_forecast(), scheduler.pv_service.get_pv_state())
+    assert boiler.get_state() is True
+    assert scheduler.boiler_last_reason == "plan_scheduled"
+
+
+def test_slow_wallbox_does_not_block_boiler():
+    """Eigene Wallbox-Schleife: hängender Wallbox-Abruf verzögert die Boiler-Entscheidung nicht."""
+    import threading
+    from stores.system_mode_store import SystemMode
+
+    class SlowWallbox(FakeWallbox):
+        def __init__(self):
+            super().__init__()
+            self.release = threading.Event()
+            self.entered = threading.Event()
+
+        def fetch_data(self):
+            self.entered.set()
+            self.release.wait(5)
+            return self.data
+
+    class FakeModeStore:
+        def get(self):
+            return SystemMode.AUTOMATIC
+
+    boiler = FakeBoiler()
+    wallbox = SlowWallbox()
+    scheduler = make_scheduler(
+        boiler=boiler,
+        wallbox=wallbox,
+        pv=FakePVSurplus(2.0, temp=40, soc=50.0),
+        forecast=FakeForecast(),
+        config=FakeConfig({
+            "boiler": {"winter": {"target_time": "23:59", "target_temp_c": 55, "min_runtime_min": 60}},
+            "wallbox": {"winter": {"target_time": "23:59", "energy_kwh": 5, "allow_night_grid": False}}
+        })
+    )
+    scheduler.mode_store = FakeModeStore()
+
+    # Wallbox loop hangs in its device read
+    scheduler._wallbox_loop = threading.Thread(target=scheduler.wallbox_tick, daemon=True)
+    scheduler._wallbox_loop.start()
+    assert wallbox.entered.wait(2)
+
+    scheduler.tick()
+    assert boiler.get_state() is True
+
+    wallbox.release.set()
+    scheduler._wallbox_loop.join(2)
+
+
+def test_wallbox_loop_decides_under_wallbox_lock():
+    """Eigene Wallbox-Schleife: Gerät wird ohne Lock gelesen, die Entscheidung wartet auf den Wallbox-Lock."""
+    import threading
+    from stores.system_mode_store import SystemMode
+
+    class ReadingWallbox(FakeWallbox):
+        def __init__(self):
+            super().__init__()
+            self.entered = threading.Event()
+
+        def fetch_data(self):
+            self.entered.set()
+            return self.data
+
+    class FakeModeStore:
+        def get(self):
+            return SystemMode.AUTOMATIC
+
+    wallbox = ReadingWallbox()
+    scheduler = make_scheduler(
+        boiler=FakeBoiler(),
+        wallbox=wallbox,
+        pv=FakePVSurplus(2.0, soc=50.0),
+        forecast=FakeForecast(),
+        config=FakeConfig({"wallbox": {"winter": {"energy_kwh": 5, "target_time": "23:59", "allow_night_grid": False}}})
+    )
+    scheduler.mode_store = FakeModeStore()
+
+    with scheduler._wallbox_lock:
+        loop = threading.Thread(target=scheduler.wallbox_tick, daemon=True)
+        loop.start()
+        assert wallbox.entered.wait(2)
+        loop.join(0.2)
+        # API reset still holds the wallbox state: no wallbox decision yet
+        assert loop.is_alive()
+        assert wallbox.get_allow_state() is False
+
+    loop.join(2)
+    assert wallbox.get_allow_state() is True
+
+
+class BlockingWallbox(FakeWallbox):
+    """Ladefreigabe hängt (z.B. Timeout + Retry der Wallbox-API), bis release gesetzt wird."""
+    def __init__(self):
+        super().__init__()
+        import threading
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def set_allow_charging(self, allow):
+        self.entered.set()
+        self.release.wait(5)
+        super().set_allow_charging(allow)
+
+
+def test_blocking_wallbox_command_does_not_block_boiler():
+    """Hängender Wallbox-Befehl: der Boiler-Schritt läuft parallel trotzdem durch."""
+    import threading
+
+    boiler = FakeBoiler()
+    wallbox = BlockingWallbox()
+    scheduler = make_scheduler(
+        boiler=boiler,
+        wallbox=wallbox,
+        pv=FakePVSurplus(2.0, temp=40, soc=50.0),
+        forecast=FakeForecast(),
+        config=FakeConfig({
+            "boiler": {"winter": {"target_time": "23:59", "target_temp_c": 55, "min_runtime_min": 60}},
+            "wallbox": {"winter": {"target_time": "23:59", "energy_kwh": 5, "allow_night_grid": False}}
+        })
+    )
+
+    wallbox_step = threading.Thread(target=scheduler.run_automatic_wallbox, daemon=True)
+    wallbox_step.start()
+    assert wallbox.entered.wait(2)
+
+    boiler_step = threading.Thread(target=scheduler.run_automatic_boiler, daemon=True)
+    boiler_step.start()
+    boiler_step.join(2)
+    assert not boiler_step.is_alive()
+    assert boiler.get_state() is True
+    assert wallbox_step.is_alive()
+
+    wallbox.release.set()
+    wallbox_step.join(2)
+    assert wallbox.get_allow_state() is True
+
+
+def test_event_core_boiler_policy_runs_while_wallbox_command_hangs():
+    """Event-Core: hängt ein Wallbox-Befehl im Executor, reagiert die Boiler-Policy trotzdem auf Änderungen."""
+    import time
+    from stores.system_mode_store import SystemMode
+
+    class FakeModeStore:
+        def get(self):
+            return SystemMode.AUTOMATIC
+
+    boiler = FakeBoiler()
+    wallbox = BlockingWallbox()
+    pv = FakePVSurplus(2.0, temp=60, soc=50.0)
+    scheduler = make_scheduler(
+        boiler=boiler,
+        wallbox=wallbox,
+        pv=pv,
+        forecast=FakeForecast(),
+        config=FakeConfig({
+            "boiler": {"winter": {"target_time": "23:59", "target_temp_c": 55, "min_runtime_min": 60}},
+            "wallbox": {"winter": {"target_time": "23:59", "energy_kwh": 5, "allow_night_grid": False}}
+        })
+    )
+    scheduler.mode_store = FakeModeStore()
+
+    core = scheduler.start_event_core(debounce_s=0.01)
+    try:
+        assert wallbox.entered.wait(5)
+        boiler_policy = next(p for p in core.policies if p.name == "boiler")
+        evaluations = boiler_policy.evaluations
+
+        # Boiler kühlt ab -> Boiler-Policy muss einschalten, obwohl die Wallbox-Policy noch im Befehl hängt
+        pv.db_bridge.temp = 40
+        scheduler.notify("config")
+        deadline = time.monotonic() + 3
+        while boiler.get_state() is not True and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert boiler.get_state() is True
+        assert boiler_policy.evaluations > evaluations
+        assert not wallbox.release.is_set()
+    finally:
+        wallbox.release.set()
+        scheduler.stop()
+
+
+def test_wallbox_loop_records_its_own_phases():
+    """Eigene Wallbox-Schleife: EPEX- und Logging-Zeiten landen in den Wallbox-Metriken, nicht im Haupt-Tick."""
+    class FakeEpex:
+        def get_price_statistics(self):
+            return {"is_emergency_cheap": False}
+
+    scheduler = make_scheduler(
+        boiler=FakeBoiler(),
+        wallbox=FakeWallbox(),
+        pv=FakePVSurplus(0.0, soc=50.0),
+        forecast=FakeForecast(),
+        config=FakeConfig({"wallbox": {"winter": {"energy_kwh": 5, "target_time": "23:59", "allow_night_grid": False}}})
+    )
+    scheduler.epex_service = FakeEpex()
+
+    scheduler.run_automatic_wallbox()
+
+    wallbox_phases = scheduler.wallbox_metrics.snapshot()["phases"]
+    assert {"wallbox", "epex"} <= set(wallbox_phases)
+    assert "epex" not in scheduler.metrics.snapshot()["phases"]
+    assert "logging" not in scheduler.metrics.snapshot()["phases"]
+
+
+def test_new_plan_is_published():
+    """Optimizer: ein neu berechneter Plan wird als Topic 'plan' gemeldet (Event-Core reagiert sofort)."""
+    target_time = (datetime.now(ZoneInfo("Europe/Vienna")) + timedelta(hours=3)).strftime("%H:%M")
+    scheduler = make_scheduler(
+        boiler=FakeBoiler(),
+        wallbox=None,
+        pv=FakePVSurplus(0.0, temp=40, soc=50.0),
+        forecast=FakeForecast(today=True),
+        config=FakeConfig({
+            "boiler": {"winter": {"target_time": target_time, "target_temp_c": 55, "min_runtime_min": 60}},
+            "optimizer": {"enabled": True}
+        })
+    )
+    topics = []
+    scheduler.notify = topics.append
+
+    scheduler.update_plan(scheduler.pv_service.get_pv_state())
+    assert topics == ["plan"]
+
+    # Unchanged targets within the replan interval: no new plan, nothing published
+    scheduler.update_plan(scheduler.pv_service.get_pv_state())
+    assert topics == ["plan"]
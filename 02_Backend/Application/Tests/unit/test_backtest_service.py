@@ -0,0 +1,84 @@
+import math
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services.backtest_service import BacktestData, HistorySeries, run_backtest
+from services.clock import VirtualClock
+
+TZ = ZoneInfo("Europe/Vienna")
+START = datetime(2026, 1, 5, tzinfo=TZ)
+
+CONFIG = {
+    "boiler": {"winter": {"target_time": "16:00", "target_temp_c": 60, "min_runtime_min": 90}},
+    "wallbox": {"winter": {"target_time": "07:00", "energy_kwh": 10.0, "allow_night_grid": True, "phase_mode": 1}},
+}
+
+# Synthetic history in 15 min steps: sunny days (4 kW peak), 0.4 kW house load,
+# boiler cooling by 0.2 K per step, cheap night prices 02:00-05:00
+def make_data(days):
+    times = [START + timedelta(minutes=15 * i) for i in range(days * 96)]
+    pv, load, soc, temp = [], [], [], []
+    for t in times:
+        hour = t.hour + t.minute / 60
+        pv.append(max(0.0, 4000 * math.sin(math.pi * (hour - 8) / 8)) if 8 <= hour <= 16 else 0.0)
+        load.append(-400.0)
+        soc.append(50.0)
+        temp.append(60 - 0.2 * (t.hour * 4 + t.minute // 15))
+
+    price_times = [START - timedelta(days=14) + timedelta(hours=h) for h in range((days + 16) * 24)]
+    prices = [8.0 if 2 <= t.hour < 5 else 20.0 for t in price_times]
+
+    return BacktestData(
+        pv_power=HistorySeries(times, pv),
+        load_power=HistorySeries(times, load),
+        soc=HistorySeries(times, soc),
+        boiler_temp=HistorySeries(times, temp, max_age=timedelta(hours=3)),
+        prices=HistorySeries(price_times, prices, max_age=timedelta(hours=24)),
+    )
+
+# Tests that a replay produces the full report and the boiler reaches its daily target with PV
+def test_backtest_report():
+    data = make_data(7)
+    report = run_backtest(data, START, START + timedelta(days=7), CONFIG, car=("18:00", "07:00"))
+
+    assert report["steps"] == 7 * 96
+    assert report["missing_steps"] == 0
+    assert report["boiler"]["deadline_checks"] == 7
+    assert report["boiler"]["deadline_misses"] == 0
+    assert report["boiler"]["switches"] > 0
+    assert report["wallbox"]["energy_kwh"] > 0
+    assert 0 < report["self_consumption"] <= 1
+    assert report["grid_kwh"] > 0 and report["cost_eur"] > 0
+
+# Tests that changed thresholds change the outcome: without PV start the boiler heats from the grid
+def test_backtest_params_change_result():
+    data = make_data(7)
+    end = START + timedelta(days=7)
+
+    default = run_backtest(data, START, end, CONFIG)
+    no_pv = run_backtest(data, START, end, CONFIG, params={"boiler_pv_min_kw": 100})
+
+    assert no_pv["grid_kwh"] > default["grid_kwh"]
+    assert no_pv["self_consumption"] < default["self_consumption"]
+
+def test_backtest_unknown_param_raises_value_error():
+    data = make_data(1)
+    with pytest.raises(ValueError):
+        run_backtest(data, START, START + timedelta(days=1), CONFIG, params={"unknown": 1})
+
+# Tests the replay speed: two months in 15 min steps must run in a few seconds
+def test_backtest_is_much_faster_than_real_time():
+    data = make_data(60)
+    report = run_backtest(data, START, START + timedelta(days=60), CONFIG, car=("18:00", "07:00"))
+
+    assert report["steps"] == 60 * 96
+    assert report["runtime_s"] < 10
+
+# Tests that the virtual clock advances in absolute time across the DST switch
+def test_virtual_clock_dst():
+    clock = VirtualClock(datetime(2026, 3, 29, 1, 45, tzinfo=TZ))
+    clock.advance(timedelta(minutes=30))
+
+    assert clock.now().strftime("%H:%M") == "03:15"
@@ -0,0 +1,93 @@
+import pytest
+import requests
+from controllers.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN, get_breaker
+from controllers.wallbox_controller import WallboxController
+
+# Manually advanced clock, so backoff windows can be tested without sleeping
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_breaker(clock):
+    return CircuitBreaker("test", failure_threshold=2, base_delay_s=10.0, max_delay_s=40.0, jitter=0.0, clock=clock)
+
+# Tests that the breaker opens after the configured number of consecutive failures and rejects requests while open
+def test_breaker_opens_after_threshold():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+
+    breaker.record_failure("down")
+    assert breaker.allow_request() is True
+
+    breaker.record_failure("down")
+    assert breaker.snapshot()["state"] == OPEN
+    assert breaker.allow_request() is False
+    assert breaker.is_open() is True
+
+# Tests that after the backoff only one probe is let through and a successful probe closes the breaker again
+def test_breaker_half_open_probe_closes_on_success():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock.now += 10.0
+    assert breaker.allow_request() is True
+    assert breaker.snapshot()["state"] == HALF_OPEN
+    # Second caller while the probe is running is rejected
+    assert breaker.allow_request() is False
+
+    breaker.record_success()
+    assert breaker.snapshot()["state"] == CLOSED
+    assert breaker.allow_request() is True
+
+# Tests that a failed probe re-opens the breaker with exponentially growing (capped) backoff
+def test_breaker_backoff_doubles_and_is_capped():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.retry_in_s() == pytest.approx(10.0)
+
+    for expected in (20.0, 40.0, 40.0):
+        clock.now += 1000.0
+        assert breaker.allow_request() is True
+        breaker.record_failure()
+        assert breaker.retry_in_s() == pytest.approx(expected)
+
+# Tests that an offline wallbox fails fast with the last known state once the breaker is open
+def test_wallbox_open_breaker_serves_last_known_state(mocker):
+    get_breaker("wallbox").reset()
+
+    ok_response = mocker.Mock()
+    ok_response.json.return_value = {"amp": 10, "car": 2, "alw": 1, "eto": 500}
+    ok_response.raise_for_status.return_value = None
+    mock_get = mocker.patch("requests.get", return_value=ok_response)
+
+    wb = WallboxController()
+    first = wb.fetch_data()
+    assert "stale" not in first
+
+    # Wallbox goes offline: two failing (uncached) reads trip the breaker
+    mock_get.side_effect = requests.exceptions.ConnectionError("offline")
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            wb.fetch_data(max_age_s=0)
+
+    calls_before = mock_get.call_count
+    data = wb.fetch_data()
+
+    # No further HTTP traffic, last known state is returned and marked stale
+    assert mock_get.call_count == calls_before
+    assert data["stale"] is True
+    assert data["amp"] == 10
+    assert wb.is_online() is False
+
+    # Commands fail immediately as well
+    with pytest.raises(CircuitOpenError):
+        wb.set_allow_charging(True)
+
+    get_breaker("wallbox").reset()
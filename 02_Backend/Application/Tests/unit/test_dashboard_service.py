@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from services.clock import VirtualClock
+from services.dashboard_service import DashboardService
+
+NOW = datetime(2026, 1, 14, 10, 0, tzinfo=ZoneInfo("Europe/Vienna"))
+
+
+class SlowLoader:
+    def __init__(self, value, delay_s):
+        self.value = value
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay_s)
+        return self.value
+
+
+# Tests that the sections load concurrently: total latency ~ slowest section, not the sum
+def test_sections_load_concurrently():
+    loaders = {name: SlowLoader({"name": name}, 0.2) for name in ("pv", "boiler", "epex", "forecast")}
+    dashboard = DashboardService({name: (loader, 5) for name, loader in loaders.items()})
+
+    started = time.perf_counter()
+    result = dashboard.collect()
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.6
+    assert {name: section["data"] for name, section in result["sections"].items()} == {
+        name: {"name": name} for name in loaders
+    }
+    assert all(section["fresh"] for section in result["sections"].values())
+    dashboard.shutdown()
+
+# Tests that requests within the TTL are served from the cache and concurrent requests share one load
+def test_cache_is_shared_within_ttl():
+    clock = VirtualClock(NOW)
+    pv = SlowLoader({"pv_power": 1000}, 0.05)
+    dashboard = DashboardService({"pv": (pv, 5)}, clock=clock)
+
+    threads = [threading.Thread(target=dashboard.collect) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pv.calls == 1
+
+    clock.advance(3)
+    section = dashboard.collect(["pv"])["sections"]["pv"]
+    assert pv.calls == 1
+    assert section["age_s"] == 3.0
+    assert section["updated"] == NOW.isoformat()
+
+    clock.advance(3)
+    dashboard.load("pv")
+    assert pv.calls == 2
+    dashboard.shutdown()
+
+# Tests that a failing section returns its last value with fresh=False and doesn't affect the others
+def test_failing_section_serves_last_value():
+    clock = VirtualClock(NOW)
+    state = {"fail": False}
+
+    def epex():
+        if state["fail"]:
+            raise ConnectionError("influx down")
+        return {"price": 9.5}
+
+    dashboard = DashboardService({"epex": (epex, 60), "mode": (lambda: {"mode": "MANUAL"}, 0)}, clock=clock)
+    dashboard.collect()
+
+    state["fail"] = True
+    clock.advance(120)
+    result = dashboard.collect()["sections"]
+
+    assert result["epex"] == {
+        "data": {"price": 9.5},
+        "updated": NOW.isoformat(),
+        "age_s": 120.0,
+        "ttl_s": 60,
+        "fresh": False,
+        "error": "influx down",
+    }
+    assert result["mode"]["fresh"] is True
+    dashboard.shutdown()
+
+# Tests that a hanging section is cut off after the timeout
+def test_slow_section_times_out():
+    forecast = SlowLoader({"today": []}, 0.5)
+    dashboard = DashboardService({"forecast": (forecast, 300), "mode": (lambda: {"mode": "AUTOMATIC"}, 0)}, timeout_s=0.1)
+
+    result = dashboard.collect()["sections"]
+
+    assert result["forecast"]["error"] == "timeout"
+    assert result["forecast"]["data"] is None
+    assert result["mode"]["data"] == {"mode": "AUTOMATIC"}
+    dashboard.shutdown()
@@ -6,19 +6,14 @@ from bridges.db_bridge import DB_Bridge
 def test_get_latest_pv_data_mocked(mocker):
     fake_time = datetime(2026, 1, 1, 12, 0)
 
-    fake_record = {
-        "_time": fake_time,
-        "pv_power": 3000
-    }
-
-    fake_record_obj = mocker.Mock()
-    fake_record_obj.values = fake_record
-
-    fake_table = mocker.Mock()
-    fake_table.records = [fake_record_obj]
+    # CSV rows as returned by query_csv (header row, then one row per record)
+    fake_rows = [
+        ["", "result", "table", "_time", "pv_power"],
+        ["", "_result", "0", fake_time.isoformat() + "Z", "3000"],
+    ]
 
     fake_query_api = mocker.Mock()
-    fake_query_api.query.return_value = [fake_table]
+    fake_query_api.query_csv.return_value = iter(fake_rows)
 
     fake_client = mocker.Mock()
     fake_client.query_api.return_value = fake_query_api
@@ -38,7 +33,7 @@ def test_get_latest_pv_data_mocked(mocker):
 def test_get_latest_pv_data_handles_influx_error(mocker):
   
     fake_query_api = mocker.Mock()
-    fake_query_api.query.side_effect = Exception("InfluxDB not reachable")
+    fake_query_api.query_csv.side_effect = Exception("InfluxDB not reachable")
 
     fake_client = mocker.Mock()
     fake_client.query_api.return_value = fake_query_api
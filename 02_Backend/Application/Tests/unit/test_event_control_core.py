@@ -0,0 +1,230 @@
+import asyncio
+import selectors
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services.event_control_core import EventControlCore
+from stores.system_mode_store import SystemMode
+
+START = datetime(2026, 1, 14, 12, 0, 30, tzinfo=ZoneInfo("Europe/Vienna"))
+
+
+# Selector that never blocks: a select() timeout advances the loop's virtual time instead of sleeping
+class _VirtualSelector(selectors.DefaultSelector):
+    def __init__(self):
+        super().__init__()
+        self.loop = None
+
+    def select(self, timeout=None):
+        if timeout:
+            self.loop.virtual_time += timeout
+        return super().select(0)
+
+
+# Event loop with a virtual clock: hours of timers run in milliseconds
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        selector = _VirtualSelector()
+        super().__init__(selector)
+        selector.loop = self
+        self.virtual_time = 0.0
+
+    def time(self):
+        return self.virtual_time
+
+
+# Wall clock of the scheduler, coupled to the virtual loop time
+class LoopClock:
+    def __init__(self, loop):
+        self.loop = loop
+
+    def now(self):
+        return START + timedelta(seconds=self.loop.time())
+
+    def monotonic(self):
+        return self.loop.time()
+
+
+class FakeInputs:
+    def __init__(self):
+        self.pv = {"surplus_kw": 2.0, "soc": 50.0}
+        self.epex = {"current": 20.0, "is_cheap": False, "is_emergency_cheap": False}
+
+    def pv_state(self):
+        return dict(self.pv)
+
+    def forecast(self):
+        return {"pv_today": True, "pv_tomorrow": False}
+
+    def epex_stats(self, max_age_s=None):
+        return dict(self.epex)
+
+
+class FakeModeStore:
+    def __init__(self, mode):
+        self.mode = mode
+
+    def get(self):
+        return self.mode
+
+
+class FakeDevice:
+    def __init__(self):
+        self.on = False
+
+    def get_state(self):
+        return self.on
+
+    def fetch_data(self):
+        return {"car_connected": True, "alw": False, "amp": 6, "eto": 1000}
+
+
+class FakeMetrics:
+    def record_tick(self, seconds):
+        pass
+
+
+class FakeDB:
+    def get_latest_boiler_data(self):
+        return {"boiler_temp": 50.0}
+
+
+# Records when the policies ran (virtual seconds since start)
+class FakeScheduler:
+    def __init__(self, loop, mode=SystemMode.AUTOMATIC):
+        self.clock = LoopClock(loop)
+        self.inputs = FakeInputs()
+        self.mode_store = FakeModeStore(mode)
+        self.boiler = FakeDevice()
+        self.wallbox = FakeDevice()
+        self.db_bridge = FakeDB()
+        self.metrics = FakeMetrics()
+        self.wallbox_metrics = FakeMetrics()
+        self.logger = None
+        self.loop = loop
+        self.calls = {"boiler": [], "wallbox": [], "time_controlled": []}
+
+    def run_step(self, loop, step):
+        return step()
+
+    def run_automatic_boiler(self):
+        self.calls["boiler"].append(self.loop.time())
+
+    def run_automatic_wallbox(self):
+        self.calls["wallbox"].append(self.loop.time())
+
+    def time_controlled_tick(self):
+        self.calls["time_controlled"].append(self.loop.time())
+
+    # Next switching time in 10 min
+    def seconds_until_time_controlled(self):
+        return 600.0
+
+
+@pytest.fixture
+def loop():
+    loop = VirtualTimeEventLoop()
+    yield loop
+    loop.close()
+
+
+def start_core(loop, scheduler, **kwargs):
+    core = EventControlCore(scheduler, run_blocking=lambda fn: fn(), **kwargs)
+    task = loop.create_task(core.run())
+    return core, task
+
+
+def run_for(loop, seconds):
+    loop.run_until_complete(asyncio.sleep(seconds))
+
+
+def stop_core(loop, core, task):
+    core.stop()
+    loop.run_until_complete(task)
+
+
+# Tests that unchanged inputs don't trigger evaluations: one hour idle = start + heartbeats only
+def test_idle_inputs_only_heartbeat(loop):
+    scheduler = FakeScheduler(loop)
+    core, task = start_core(loop, scheduler)
+
+    run_for(loop, 3600)
+    stop_core(loop, core, task)
+
+    # Threaded scheduler: 60 evaluations per hour; event core: 1 at start + one heartbeat every ~300 s
+    assert len(scheduler.calls["boiler"]) == 12
+    assert core.snapshot()["policies"]["boiler"]["heartbeats"] == 11
+    # PV polled at the default interval (30 s), not every 10 s
+    assert core.snapshot()["sources"]["pv"]["polls"] == 121
+    assert core.snapshot()["sources"]["pv"]["changes"] == 1
+
+# Tests that a mode change reaches the policies in under a second
+def test_mode_change_reacts_sub_second(loop):
+    scheduler = FakeScheduler(loop, mode=SystemMode.MANUAL)
+    core, task = start_core(loop, scheduler)
+    run_for(loop, 100)
+    assert scheduler.calls["boiler"] == []
+
+    scheduler.mode_store.mode = SystemMode.AUTOMATIC
+    changed_at = loop.time()
+    core.notify("mode")
+    run_for(loop, 5)
+    stop_core(loop, core, task)
+
+    assert scheduler.calls["boiler"][0] - changed_at < 1.0
+    assert scheduler.calls["wallbox"][0] - changed_at < 1.0
+
+# Tests that a new price at the quarter hour is picked up right after the boundary
+def test_new_epex_price_reacts_at_quarter_hour(loop):
+    scheduler = FakeScheduler(loop)
+    core, task = start_core(loop, scheduler)
+
+    # 12:00:30 + 870 s = 12:15:00 → neuer Preis gilt
+    run_for(loop, 869)
+    scheduler.inputs.epex = {"current": 8.0, "is_cheap": True, "is_emergency_cheap": False}
+    boiler_runs = len(scheduler.calls["boiler"])
+    run_for(loop, 5)
+    stop_core(loop, core, task)
+
+    assert len(scheduler.calls["boiler"]) == boiler_runs + 1
+    assert 870 < scheduler.calls["boiler"][-1] < 872
+    assert core.snapshot()["events"]["epex"] == 2
+
+# Tests that PV noise below the fingerprint resolution is ignored and a real change is throttled
+def test_pv_changes_trigger_throttled_evaluation(loop):
+    scheduler = FakeScheduler(loop)
+    core, task = start_core(loop, scheduler, pv_interval_s=10.0)
+    run_for(loop, 45)
+
+    scheduler.inputs.pv = {"surplus_kw": 2.05, "soc": 50.2}
+    run_for(loop, 20)
+    assert len(scheduler.calls["boiler"]) == 1
+
+    # Mehrere echte Änderungen hintereinander → Wallbox max. alle 10 s, Boiler max. alle 30 s
+    for surplus in (3.0, 3.5, 4.0):
+        scheduler.inputs.pv = {"surplus_kw": surplus, "soc": 50.0}
+        run_for(loop, 10)
+    stop_core(loop, core, task)
+
+    assert len(scheduler.calls["wallbox"]) == 4
+    assert len(scheduler.calls["boiler"]) == 2
+
+# Tests that the time-controlled policy only runs in TIME_CONTROLLED mode and reacts to schedule changes
+def test_time_controlled_policy(loop):
+    scheduler = FakeScheduler(loop, mode=SystemMode.TIME_CONTROLLED)
+    core, task = start_core(loop, scheduler)
+    run_for(loop, 30)
+    core.notify("schedule")
+    run_for(loop, 1)
+    assert len(scheduler.calls["time_controlled"]) == 2
+
+    # Kein Minuten-Polling: nächster Lauf erst zur Schaltzeit
+    run_for(loop, 598)
+    assert len(scheduler.calls["time_controlled"]) == 2
+    run_for(loop, 2)
+    stop_core(loop, core, task)
+
+    assert len(scheduler.calls["time_controlled"]) == 3
+    assert scheduler.calls["boiler"] == []
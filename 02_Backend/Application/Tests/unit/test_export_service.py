@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import services.export_service as export_service
+from bridges.db_bridge import DB_Bridge
+from services.export_service import ExportBusyError, ExportRequest, ExportService, ExportUnavailableError
+
+HEADER = ["", "result", "table", "_time", "pv_power", "soc"]
+
+
+def csv_rows(n):
+    yield HEADER
+    for i in range(n):
+        yield ["", "_result", "0", f"2025-01-01T00:{i % 60:02d}:00Z", str(1000 + i), "50"]
+    # Influx starts a new table with an empty line and a repeated header
+    yield []
+    yield HEADER
+
+
+class FakeBridge:
+    def __init__(self, rows=None, records=None):
+        self.rows = rows
+        self.records = records
+        self.calls = []
+
+    def export_csv_rows(self, measurement, start, stop, every=None):
+        self.calls.append((measurement, start, stop, every))
+        return self.rows
+
+    def export_records(self, measurement, start, stop, every=None):
+        self.calls.append((measurement, start, stop, every))
+        return iter(self.records)
+
+# Tests parameter validation and the conversion of local dates to the UTC range for Flux
+def test_export_request():
+    export = ExportRequest("pv", "2025-01-01", "2025-07-01", "csv", "15m")
+    assert export.measurement == "pv_measurements"
+    assert export.start == "2024-12-31T23:00:00Z"
+    assert export.stop == "2025-06-30T22:00:00Z"
+    assert export.filename == "pv_measurements_20250101-20250701.csv"
+
+    for args in (("wallbox", "2025-01-01", None), ("pv", "2025-02-01", "2025-01-01"), ("pv", None, None),
+                 ("pv", "01.01.2025", None)):
+        with pytest.raises(ValueError):
+            ExportRequest(*args)
+    with pytest.raises(ValueError):
+        ExportRequest("pv", "2025-01-01", None, "xlsx")
+    with pytest.raises(ValueError):
+        ExportRequest("pv", "2025-01-01", None, "csv", "15m) |> drop(")
+
+# Tests that the Influx CSV is rewritten without annotation columns and repeated headers, in chunks
+def test_csv_chunks(monkeypatch):
+    monkeypatch.setattr(export_service, "CSV_CHUNK_BYTES", 256)
+    bridge = FakeBridge(rows=csv_rows(50))
+    service = ExportService(bridge)
+
+    chunks = list(service.open(ExportRequest("pv", "2025-01-01", "2025-01-02")))
+    lines = b"".join(chunks).decode().splitlines()
+
+    assert len(chunks) > 1
+    assert lines[0] == "time,pv_power,soc"
+    assert lines[1] == "2025-01-01T00:00:00Z,1000,50"
+    assert len(lines) == 51
+    assert bridge.calls == [("pv_measurements", "2024-12-31T23:00:00Z", "2025-01-01T23:00:00Z", None)]
+    assert service.completed == 1
+
+# Tests that exports beyond the limit are rejected instead of queued
+def test_concurrency_limit():
+    service = ExportService(FakeBridge(), max_concurrent=1)
+    service.acquire()
+    with pytest.raises(ExportBusyError):
+        service.acquire()
+    service.release()
+    service.acquire()
+    assert service.running == 1
+
+# Tests that Parquet is written in row groups of the configured size
+def test_parquet_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+
+    records = [{"_time": datetime(2025, 1, 1, 0, i, tzinfo=timezone.utc), "result": "_result", "table": 0,
+                "price": 10.0 + i, "source": "epex"} for i in range(5)]
+    service = ExportService(FakeBridge(records=records), row_group_rows=2)
+
+    data = b"".join(service.open(ExportRequest("epex", "2025-01-01", "2025-01-02", "parquet")))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == ["time", "price", "source"]
+    assert table.column("price").to_pylist() == [10.0, 11.0, 12.0, 13.0, 14.0]
+
+# Tests that the Parquet schema comes from the declared fields: ints, None-only row groups and late fields
+def test_parquet_schema_is_declared():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+
+    records = [{"_time": datetime(2025, 1, 1, 0, i, tzinfo=timezone.utc), "pv_power": 1000 + i, "soc": None}
+               for i in range(2)]
+    records += [{"_time": datetime(2025, 1, 1, 0, i, tzinfo=timezone.utc), "pv_power": 1000.5, "soc": 50.5,
+                 "e_day": 12.0} for i in range(2, 4)]
+    service = ExportService(FakeBridge(records=records), row_group_rows=2)
+
+    data = b"".join(service.open(ExportRequest("pv", "2025-01-01", "2025-01-02", "parquet")))
+    table = pq.ParquetFile(io.BytesIO(data)).read()
+
+    assert table.column_names == ["time", *export_service.PV_FIELDS]
+    assert str(table.schema.field("soc").type) == "double"
+    assert table.column("pv_power").to_pylist() == [1000.0, 1001.0, 1000.5, 1000.5]
+    assert table.column("soc").to_pylist() == [None, None, 50.5, 50.5]
+    assert table.column("e_day").to_pylist() == [None, None, 12.0, 12.0]
+    assert service.completed == 1
+
+# Tests the clear error when pyarrow is missing
+def test_parquet_without_pyarrow(monkeypatch):
+    def missing():
+        raise ExportUnavailableError("Parquet export needs pyarrow")
+    monkeypatch.setattr(export_service, "_pyarrow", missing)
+    service = ExportService(FakeBridge(records=[]))
+    with pytest.raises(ExportUnavailableError):
+        service.open(ExportRequest("epex", "2025-01-01", "2025-01-02", "parquet"))
+
+# Tests that DB_Bridge streams the export through its own client with a long timeout
+def test_db_bridge_export_client(mocker):
+    fake_client = mocker.Mock()
+    fake_client.query_api.return_value.query_csv.return_value = iter([HEADER])
+    client_class = mocker.patch("bridges.db_bridge.InfluxDBClient", return_value=fake_client)
+
+    db = DB_Bridge()
+    rows = list(db.export_csv_rows("boiler_measurements", "2025-01-01T00:00:00Z", "2025-01-02T00:00:00Z", "1h"))
+
+    assert rows == [HEADER]
+    assert client_class.call_args.kwargs["timeout"] == 10 * 60 * 1000
+    call = fake_client.query_api.return_value.query_csv.call_args
+    assert "aggregateWindow(every: _every" in call.args[0]
+    params = call.kwargs["params"]
+    assert params["_measurement"] == "boiler_measurements"
+    assert params["_start"] == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert params["_stop"] == datetime(2025, 1, 2, tzinfo=timezone.utc)
+    assert params["_every"] == timedelta(hours=1)
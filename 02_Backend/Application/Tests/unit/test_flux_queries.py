@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from bridges import db_bridge
+from bridges.db_bridge import DB_Bridge
+from bridges.flux_queries import (ColumnDecoder, FluxQuery, FluxQueryError, RecordDecoder, parse_duration, to_float,
+                                  to_local_time, to_time)
+
+HEADER = ["", "result", "table", "_time", "pv_power", "soc", "_measurement"]
+
+
+def fake_bridge(mocker, rows):
+    fake_client = mocker.Mock()
+    fake_client.query_api.return_value.query_csv.return_value = iter(rows)
+    mocker.patch("bridges.db_bridge.InfluxDBClient", return_value=fake_client)
+    return DB_Bridge(), fake_client.query_api.return_value.query_csv
+
+# Tests that values are bound as _name parameters and the text stays untouched
+def test_bind_prefixes_parameters():
+    query = FluxQuery("q", '''
+        from(bucket: _bucket)
+          |> range(start: _start)
+    ''', params=("bucket", "start"))
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    assert query.text.startswith("from(bucket: _bucket)\n  |> range")
+    assert query.bind(bucket='pv" or true', start=start) == {"_bucket": 'pv" or true', "_start": start}
+
+# Tests that missing, unknown and unsendable parameters are rejected before a query is sent
+def test_bind_rejects_invalid_parameters():
+    query = FluxQuery("q", "from(bucket: _bucket)", params=("bucket",))
+    with pytest.raises(TypeError):
+        query.bind()
+    with pytest.raises(TypeError):
+        query.bind(bucket="pv", extra=1)
+    with pytest.raises(TypeError):
+        query.bind(bucket=None)
+    with pytest.raises(ValueError):
+        FluxQuery("q", "from(bucket: \"pv\")", params=("bucket",))
+
+# Tests the duration parser used for aggregation windows
+def test_parse_duration():
+    assert parse_duration("15m") == timedelta(minutes=15)
+    assert parse_duration("1d") == timedelta(days=1)
+    assert parse_duration(timedelta(hours=2)) == timedelta(hours=2)
+    with pytest.raises(ValueError):
+        parse_duration("15m) |> drop(columns: [\"_value\"]")
+
+# Tests that only the requested columns are converted and nulls become None
+def test_record_decoder_selects_columns():
+    decoder = RecordDecoder({"_time": to_time, "pv_power": to_float, "missing": to_float})
+    rows = [
+        HEADER,
+        ["", "_result", "0", "2025-06-01T10:00:00Z", "1500.5", "80", "pv_measurements"],
+        ["", "_result", "0", "2025-06-01T10:15:00Z", "", "81", "pv_measurements"],
+    ]
+
+    records = decoder.records(rows)
+
+    assert records == [
+        {"_time": datetime(2025, 6, 1, 10, tzinfo=timezone.utc), "pv_power": 1500.5},
+        {"_time": datetime(2025, 6, 1, 10, 15, tzinfo=timezone.utc), "pv_power": None},
+    ]
+
+# Tests that every table's header is used for its own rows (column order may differ between tables)
+def test_record_decoder_handles_multiple_tables():
+    decoder = RecordDecoder({"soc": to_float})
+    rows = [
+        HEADER,
+        ["", "_result", "0", "2025-06-01T10:00:00Z", "1", "80", "pv"],
+        [],
+        ["", "result", "table", "soc", "_time"],
+        ["", "_result", "1", "90", "2025-06-01T10:00:00Z"],
+    ]
+
+    assert decoder.records(rows) == [{"soc": 80.0}, {"soc": 90.0}]
+
+# Tests that an error table in the stream raises instead of returning partial data
+def test_record_decoder_raises_on_error_table():
+    rows = [["", "error", "reference"], ["", "query timeout", "897"]]
+    with pytest.raises(FluxQueryError, match="query timeout"):
+        RecordDecoder({"_time": to_time}).records(rows)
+
+# Tests the column arrays for backtests (local time, missing fields stay None)
+def test_column_decoder():
+    vienna = ZoneInfo("Europe/Vienna")
+    decoder = ColumnDecoder(["pv_power", "load_power"], time=to_local_time(vienna))
+    rows = [HEADER, ["", "_result", "0", "2025-06-01T10:00:00Z", "1500", "80", "pv"]]
+
+    columns = decoder.columns(rows)
+
+    assert columns["time"] == [datetime(2025, 6, 1, 12, tzinfo=vienna)]
+    assert columns["time"][0].tzinfo is vienna
+    assert columns["pv_power"] == [1500.0]
+    assert columns["load_power"] == [None]
+
+# Tests that DB_Bridge sends the template text and passes user input only as parameters
+def test_db_bridge_uses_parameters(mocker):
+    db, query_csv = fake_bridge(mocker, [HEADER])
+    start = datetime(2025, 6, 1, tzinfo=ZoneInfo("Europe/Vienna"))
+
+    db.query_history('pv_measurements" or true', ["pv_power"], start, start + timedelta(days=1), "1h")
+
+    query, params = query_csv.call_args.args[0], query_csv.call_args.kwargs["params"]
+    assert query == db_bridge.HISTORY.text
+    assert params["_measurement"] == 'pv_measurements" or true'
+    assert params["_fields"] == ["pv_power"]
+    assert params["_every"] == timedelta(hours=1)
+    assert params["_bucket"] == db.bucket
+
+# Tests the EPEX series decoding: (local time, price) sorted by time, null prices skipped
+def test_epex_price_series(mocker):
+    rows = [
+        ["", "result", "table", "_start", "_stop", "_time", "_value", "_field", "_measurement"],
+        ["", "_result", "0", "", "", "2025-06-01T11:00:00Z", "9.5", "price", "epex_prices"],
+        ["", "_result", "0", "", "", "2025-06-01T10:00:00Z", "8.25", "price", "epex_prices"],
+        ["", "_result", "0", "", "", "2025-06-01T12:00:00Z", "", "price", "epex_prices"],
+    ]
+    db, _ = fake_bridge(mocker, rows)
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+    series = db.get_epex_price_series(start, start + timedelta(days=1))
+
+    assert [price for _, price in series] == [8.25, 9.5]
+    assert series[0][0] == datetime(2025, 6, 1, 10, tzinfo=timezone.utc)
+    assert series[0][0].utcoffset() == timedelta(hours=2)
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import stores.history_replica as history_replica
+from bridges.db_bridge import DB_Bridge, PartialHistory
+from bridges.influx_client import ConnectionHealth
+from stores.history_replica import HistoryReplica
+
+UTC = timezone.utc
+VIENNA = ZoneInfo("Europe/Vienna")
+NOW = datetime(2026, 3, 10, 12, 7, tzinfo=UTC)
+
+
+# Influx stand-in: 15 min pv/boiler means and hourly EPEX prices from Jan 1 2025 until 'until'
+class FakeBridge:
+    def __init__(self, until=NOW, fail_after=None):
+        self.until = until
+        self.fail_after = fail_after
+        self.calls = []
+
+    def replica_rows(self, measurement, fields, start, stop, every=None):
+        self.calls.append((measurement, start, stop, every))
+        if self.fail_after is not None and len(self.calls) > self.fail_after:
+            raise ConnectionError("Influx unreachable")
+        step = timedelta(hours=1) if measurement == "epex_prices" else timedelta(minutes=15)
+        limit = self.until + (timedelta(days=1) if measurement == "epex_prices" else timedelta(0))
+        columns = {"time": [], **{f: [] for f in fields}}
+        t = datetime(2025, 1, 1, tzinfo=UTC)
+        if start > t:
+            t += (start - t) // step * step
+            t = t if t >= start else t + step
+        while t < min(stop, limit):
+            columns["time"].append(t)
+            for f in fields:
+                columns[f].append(float(t.hour) if f in ("pv_power", "price", "boiler_temp") else None)
+            t += step
+        return columns
+
+
+# Backfill from Jan 1 of the current year only (keeps the tests fast)
+@pytest.fixture(autouse=True)
+def short_backfill(monkeypatch):
+    monkeypatch.setattr(history_replica, "REPLICA_BACKFILL_YEARS", 0)
+
+
+@pytest.fixture
+def replica(tmp_path):
+    replica = HistoryReplica(tmp_path / "replica.sqlite3", FakeBridge())
+    replica.influx_health = ConnectionHealth()
+    return replica
+
+# Tests the first sync: backfill from Jan 1 in bounded chunks, EPEX including tomorrow
+def test_initial_sync_backfills(replica):
+    since = datetime(2026, 1, 1, tzinfo=VIENNA)
+    written = replica.sync_once(now=NOW)
+
+    assert written["pv_measurements"] == int((NOW - since) / timedelta(minutes=15)) + 1
+    assert written["epex_prices"] == int((NOW + timedelta(days=1) - since) / timedelta(hours=1)) + 1
+    first = replica.db_bridge.calls[0]
+    assert first[1] == since
+    assert max(stop - start for _, start, stop, _ in replica.db_bridge.calls) <= timedelta(days=31)
+
+# Tests that the next sync only fetches from the high-water mark (last windows again), not the whole history
+def test_incremental_sync_uses_high_water_mark(replica):
+    replica.sync_once(now=NOW)
+    replica.db_bridge.calls.clear()
+    replica.db_bridge.until = NOW + timedelta(minutes=30)
+
+    written = replica.sync_once(now=NOW + timedelta(minutes=30))
+
+    pv_calls = [call for call in replica.db_bridge.calls if call[0] == "pv_measurements"]
+    assert len(pv_calls) == 1
+    assert pv_calls[0][1] == datetime(2026, 3, 10, 11, 45, tzinfo=UTC)
+    assert pv_calls[0][3] == "15m"
+    assert written["pv_measurements"] == 4
+
+# Tests that a failed chunk keeps the state of the last complete one and the next sync continues there
+def test_failed_sync_resumes(tmp_path):
+    replica = HistoryReplica(tmp_path / "replica.sqlite3", FakeBridge(fail_after=1))
+    with pytest.raises(ConnectionError):
+        replica.sync_once(now=NOW)
+    state = replica._state("pv_measurements")
+    assert state["synced_until"] == int(datetime(2026, 2, 1, tzinfo=VIENNA).timestamp())
+
+    replica.db_bridge.fail_after = None
+    replica.db_bridge.calls.clear()
+    replica.sync_once(now=NOW)
+    assert replica.db_bridge.calls[0][1] > datetime(2026, 1, 31, tzinfo=UTC)
+
+# Tests the reads: local times, half-open range, averaging to larger windows
+def test_records_and_columns(replica):
+    replica.sync_once(now=NOW)
+    start = datetime(2026, 3, 9, tzinfo=VIENNA)
+
+    records = replica.records("pv_measurements", start, start + timedelta(hours=1))
+    assert len(records) == 4
+    assert records[0]["_time"] == start and records[0]["_time"].tzinfo is VIENNA
+    assert records[0]["pv_power"] == 23.0
+    assert records[0]["soc"] is None
+
+    columns = replica.columns("pv_measurements", ["pv_power", "other"], start, start + timedelta(hours=2), timedelta(hours=1))
+    assert columns["time"] == [start, start + timedelta(hours=1)]
+    assert columns["pv_power"] == [23.0, 0.0]
+    assert columns["other"] == [None, None]
+
+# Tests when the replica answers by itself: closed ranges always, open ranges only while fresh
+def test_serves(replica):
+    replica.sync_once(now=NOW)
+    past = datetime(2026, 3, 1, tzinfo=VIENNA)
+    today = datetime(2026, 3, 10, tzinfo=VIENNA)
+
+    assert replica.serves("pv_measurements", past, past + timedelta(days=1))
+    assert replica.serves("pv_measurements", today, today + timedelta(days=1))
+    assert not replica.serves("pv_measurements", datetime(2024, 6, 1, tzinfo=UTC), past)
+    assert not replica.serves("pv_measurements", past, past + timedelta(days=1), every=timedelta(minutes=5))
+    assert replica.serves("epex_prices", past, past + timedelta(days=1), every=timedelta(minutes=5))
+
+    replica.max_age_s = -1
+    assert replica.serves("pv_measurements", past, past + timedelta(days=1))
+    assert not replica.serves("pv_measurements", today, today + timedelta(days=1))
+    for _ in range(replica.influx_health.unhealthy_after):
+        replica.influx_health.failure("timeout")
+    assert not replica.serves("pv_measurements", today, today + timedelta(days=1))
+    assert replica.complete("pv_measurements", NOW)
+    assert not replica.complete("pv_measurements", today + timedelta(days=1))
+
+# Tests that DB_Bridge reads history from a fresh replica and falls back to it when Influx fails
+def test_db_bridge_reads_from_replica(mocker, replica):
+    fake_client = mocker.Mock()
+    fake_client.query_api.return_value.query_csv.side_effect = ConnectionError("Influx unreachable")
+    mocker.patch("bridges.db_bridge.InfluxDBClient", return_value=fake_client)
+    db = DB_Bridge()
+    replica.sync_once(now=NOW)
+    db.replica = replica
+
+    series = db.get_epex_price_series(datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 3, 1, 3, tzinfo=UTC))
+    assert [price for _, price in series] == [0.0, 1.0, 2.0]
+    assert not fake_client.query_api.return_value.query_csv.called
+
+    # Open range of a stale replica -> Influx first, replica after the failure
+    replica.max_age_s = -1
+    data = db.get_daily_pv_data("2026-03-10")
+    assert fake_client.query_api.return_value.query_csv.called
+    assert data[0]["_time"] == datetime(2026, 3, 10, tzinfo=VIENNA)
+    assert len(data) == int((NOW - datetime(2026, 3, 9, 23, tzinfo=UTC)) / timedelta(minutes=15)) + 1
+    assert isinstance(data, PartialHistory)
+    assert not isinstance(db.get_daily_pv_data("2026-03-01"), PartialHistory)
+
+    # Influx known to be down -> no request, the replica's rows (still marked partial)
+    fake_client.query_api.return_value.query_csv.reset_mock()
+    for _ in range(replica.influx_health.unhealthy_after):
+        replica.influx_health.failure("timeout")
+    assert isinstance(db.get_daily_pv_data("2026-03-10"), PartialHistory)
+    assert not fake_client.query_api.return_value.query_csv.called
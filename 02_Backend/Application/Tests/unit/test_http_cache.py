@@ -0,0 +1,69 @@
+import gzip
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.http_cache as http_cache
+from services.http_cache import TIMEZONE, HistoryPeriod, ResponseCache, negotiate
+
+NOW = datetime(2026, 3, 15, 10, 0, tzinfo=TIMEZONE)
+
+
+# Tests the Accept-Encoding negotiation incl. q-values and the optional brotli
+def test_negotiate(monkeypatch):
+    monkeypatch.setattr(http_cache, "brotli", None)
+    assert negotiate(None) is None
+    assert negotiate("gzip, deflate, br") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("identity") is None
+    assert negotiate("*") == "gzip"
+
+    monkeypatch.setattr(http_cache, "brotli", object())
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+
+# Tests the period bounds and that only ended periods count as closed
+def test_history_period():
+    day = HistoryPeriod.parse("daily", "2026-03-14", NOW)
+    assert day.key == "2026-03-14"
+    assert day.is_closed(NOW)
+    assert not HistoryPeriod.parse("daily", None, NOW).is_closed(NOW)
+
+    month = HistoryPeriod.parse("monthly", "2026-02", NOW)
+    assert month.end == datetime(2026, 3, 1, tzinfo=TIMEZONE)
+    assert month.is_closed(NOW)
+    assert not HistoryPeriod.parse("monthly", None, NOW).is_closed(NOW)
+
+    year = HistoryPeriod.parse("yearly", "2025", NOW)
+    assert year.etag(b"[]").startswith(f"pv-yearly-2025-v{http_cache.HISTORY_FORMAT_VERSION}-")
+    assert year.etag(b"[]") != year.etag(b"[1]")
+    assert year.is_closed(NOW)
+
+    for kind, value in (("daily", "14.03.2026"), ("monthly", "2026-13"), ("yearly", "20x5")):
+        with pytest.raises(ValueError):
+            HistoryPeriod.parse(kind, value, NOW)
+
+# Tests that a period stays open until its last 15 min window and late points are written
+def test_history_period_grace():
+    day = HistoryPeriod.parse("daily", "2026-03-14", NOW)
+    assert not day.is_closed(day.end)
+    assert not day.is_closed(day.end + timedelta(minutes=15))
+    assert day.is_closed(day.end + http_cache.CLOSED_GRACE)
+    assert http_cache.CLOSED_GRACE > http_cache.AGGREGATION_WINDOW
+
+# Tests that the cache stores gzip bodies, serves identity on demand and evicts by size (LRU)
+def test_response_cache_lru():
+    body = b'{"pv_power": 1234.5}' * 200
+    cache = ResponseCache(max_bytes=2 * len(gzip.compress(body, mtime=0)) + 10)
+
+    first = cache.put(("daily", "2026-03-01"), "a", NOW, body)
+    assert first.body(None) == body
+    assert gzip.decompress(first.body("gzip")) == body
+
+    cache.put(("daily", "2026-03-02"), "b", NOW, body)
+    assert cache.get(("daily", "2026-03-01")) is first
+    cache.put(("daily", "2026-03-03"), "c", NOW, body)
+
+    assert cache.get(("daily", "2026-03-02")) is None
+    assert cache.get(("daily", "2026-03-01")) is first
+    assert cache.stats()["entries"] == 2
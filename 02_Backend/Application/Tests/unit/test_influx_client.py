@@ -0,0 +1,102 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import bridges.db_bridge as db_bridge
+import bridges.influx_client as influx_client
+import bridges.logging_bridge as logging_bridge
+from bridges.influx_client import ConnectionHealth, InfluxClientFactory
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"name": "influxdb", "status": "pass", "message": "ready for queries and writes"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def influx_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HealthHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    factory = InfluxClientFactory()
+    monkeypatch.setattr(db_bridge, "INFLUX_CLIENTS", factory)
+    monkeypatch.setattr(logging_bridge, "INFLUX_CLIENTS", factory)
+    yield factory
+    factory.close()
+
+
+def use_url(monkeypatch, url):
+    settings = {**influx_client.influx_settings(), "url": url}
+    monkeypatch.setattr(influx_client, "_settings", settings)
+
+# Tests that DB_Bridge and LoggingBridge use one client (one pool) and the export gets its own
+def test_bridges_share_one_client(factory):
+    db = db_bridge.DB_Bridge()
+    logger = logging_bridge.LoggingBridge()
+    logger._ensure_client()
+
+    assert db.client is logger._client
+    assert db.export_client is not db.client
+    assert db.export_client is factory.client("export")
+
+# Tests that the profile's pool size and timeouts are passed to the client
+def test_profile_settings(factory):
+    client = factory.client("default")
+    assert client.conf.connection_pool_maxsize == influx_client.CLIENT_PROFILES["default"]["pool_size"]
+    assert client.conf.timeout == influx_client.CLIENT_PROFILES["default"]["timeout"]
+    with pytest.raises(ValueError):
+        factory.client("unknown")
+
+# Tests that pooled connections are reused (counted once) and successful requests mark Influx as healthy
+def test_connections_are_counted_and_reused(monkeypatch, factory, influx_server):
+    use_url(monkeypatch, influx_server)
+    opened = []
+    factory.add_connection_listener(lambda profile, host: opened.append((profile, host)))
+
+    client = factory.client("default")
+    for _ in range(3):
+        assert client.health().status == "pass"
+
+    assert opened == [("default", "127.0.0.1")]
+    assert factory.stats()["connections"] == {"default": 1}
+    assert factory.health.snapshot()["requests"] == 3
+    assert factory.health.healthy
+
+# Tests that connection errors are tracked until the server counts as unreachable
+def test_failed_requests_mark_unhealthy(monkeypatch, factory):
+    use_url(monkeypatch, "http://127.0.0.1:9")
+    client = factory.client("default")
+
+    for _ in range(influx_client.UNHEALTHY_AFTER_FAILURES):
+        assert client.health().status == "fail"
+
+    assert not factory.health.healthy
+    assert factory.health.snapshot()["last_error"]
+
+# Tests the health tracker on its own: one success resets the failure streak
+def test_connection_health():
+    health = ConnectionHealth(unhealthy_after=2)
+    health.failure("timeout")
+    health.failure("timeout")
+    assert not health.healthy
+    health.success()
+    assert health.healthy
+    assert health.snapshot()["failures"] == 2
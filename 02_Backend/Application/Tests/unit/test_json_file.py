@@ -0,0 +1,56 @@
+import json
+import threading
+
+from stores.json_file import JsonFile, flush_all
+
+# Tests that a write replaces the file atomically and leaves no temp files behind
+def test_atomic_write(tmp_path):
+    path = tmp_path / "config.json"
+    store = JsonFile(path)
+
+    store.write({"a": 1})
+    store.write({"a": 2})
+
+    assert json.loads(path.read_text()) == {"a": 2}
+    assert [p.name for p in tmp_path.iterdir()] == ["config.json"]
+
+# Tests that unchanged content is not written again (SD card)
+def test_unchanged_content_is_skipped(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"a": 1}, indent=2))
+    store = JsonFile(path)
+
+    assert store.read() == {"a": 1}
+    store.write({"a": 1})
+    assert store.writes == 0
+
+# Tests that rapid updates are coalesced into one write of the latest state
+def test_debounced_writes_are_coalesced(tmp_path):
+    path = tmp_path / "schedule.json"
+    store = JsonFile(path, debounce_s=60)
+
+    for i in range(20):
+        store.write({"value": i})
+    assert not path.exists()
+
+    flush_all()
+    assert store.writes == 1
+    assert json.loads(path.read_text()) == {"value": 19}
+
+# Tests that concurrent writers on the same file never produce a torn file
+def test_concurrent_writers(tmp_path):
+    path = tmp_path / "devices.json"
+    writers = [JsonFile(path) for _ in range(4)]
+
+    def run(store, n):
+        for i in range(50):
+            store.write({"writer": n, "i": i, "payload": "x" * 1000})
+
+    threads = [threading.Thread(target=run, args=(store, n)) for n, store in enumerate(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert json.loads(path.read_text())["i"] == 49
+    assert list(tmp_path.glob("*.tmp")) == [] and list(tmp_path.glob(".*.tmp")) == []
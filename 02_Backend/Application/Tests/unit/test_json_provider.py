@@ -0,0 +1,60 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+import pytz
+from flask import Flask, jsonify
+
+import services.json_provider as json_provider
+from services.json_provider import FastJSONProvider
+from stores.system_mode_store import SystemMode
+
+VIENNA = pytz.timezone("Europe/Vienna")
+RECORD = {
+    "_time": VIENNA.localize(datetime(2026, 6, 1, 12, 15)),
+    "day": date(2026, 6, 1),
+    "price": Decimal("12.5"),
+    "mode": SystemMode.AUTOMATIC,
+    "pv_power": 3120.5,
+    "label": "Überschuss",
+}
+EXPECTED = {
+    "_time": "2026-06-01T12:15:00+02:00",
+    "day": "2026-06-01",
+    "price": 12.5,
+    "mode": SystemMode.AUTOMATIC.value,
+    "pv_power": 3120.5,
+    "label": "Überschuss",
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def app(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson not installed")
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    return app
+
+# Tests that jsonify encodes datetimes as ISO 8601, Decimals as numbers and enums by value, with and without orjson
+def test_jsonify_types(app):
+    with app.app_context():
+        resp = jsonify([RECORD])
+    assert resp.mimetype == "application/json"
+    assert resp.get_json() == [EXPECTED]
+
+# Tests that both encoders produce the same compact bytes
+def test_encoders_match(monkeypatch):
+    if json_provider.orjson is None:
+        pytest.skip("orjson not installed")
+    fast = json_provider.dumps_bytes(RECORD)
+    monkeypatch.setattr(json_provider, "orjson", None)
+    assert json_provider.dumps_bytes(RECORD) == fast
+
+# Tests that request bodies are parsed by the provider and unknown types still fail loudly
+def test_loads_and_unknown_types(app):
+    assert app.json.loads(b'{"mode": "MANUAL"}') == {"mode": "MANUAL"}
+    with pytest.raises(TypeError):
+        app.json.dumps({"obj": object()})
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+from services.control_channel import (ControlCallError, ControlClient, ControlServer, ControlUnavailableError, RemoteBoiler,
+                                      control_address)
+from services.leader_election import LeaderElection
+from services.store_sync import StoreSync
+from stores.json_file import atomic_write_text
+from stores.schedule_store import ScheduleStore
+from stores.system_mode_store import SystemMode, SystemModeStore
+
+# Tests that only one holder of the lock file is leader and a standby takes over after the leader is gone
+def test_only_one_leader_and_takeover(tmp_path):
+    path = tmp_path / "scheduler.lock"
+    first = LeaderElection(path, retry_s=0.01)
+    second = LeaderElection(path, retry_s=0.01)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+    assert second.leader_pid() == first.leader_pid()
+
+    elected = threading.Event()
+    second.wait_for_leadership(elected.set)
+    first.release()
+
+    assert elected.wait(2)
+    assert second.is_leader
+    second.release()
+
+# Tests a call round trip over the control socket, including errors of the handler
+def test_control_call_round_trip(tmp_path):
+    address = tmp_path / "control.sock"
+    state = {"heating": False}
+
+    def control(action):
+        state["heating"] = action == "on"
+        return {"action": action, "result": state["heating"]}
+
+    server = ControlServer(address, {
+        "boiler_state": lambda: {"heating": state["heating"], "simulated": False},
+        "boiler_control": control,
+        "fail": lambda: 1 / 0,
+    }, authkey=b"secret")
+    server.start()
+    client = ControlClient(address, authkey=b"secret")
+    try:
+        boiler = RemoteBoiler(client)
+        assert boiler.get_state() is False
+        assert boiler.relay is not None
+        assert boiler.control("on") == {"action": "on", "result": True}
+        assert boiler.get_state() is True
+
+        with pytest.raises(ControlCallError, match="ZeroDivisionError"):
+            client.call("fail")
+        with pytest.raises(ControlCallError, match="unknown"):
+            client.call("nope")
+    finally:
+        server.stop()
+
+    with pytest.raises(ControlUnavailableError):
+        client.call("boiler_state")
+
+# Tests that a connection with the wrong key is rejected
+def test_control_rejects_wrong_authkey(tmp_path):
+    address = tmp_path / "control.sock"
+    server = ControlServer(address, {"ping": lambda: "pong"}, authkey=b"secret")
+    server.start()
+    try:
+        with pytest.raises(Exception):
+            ControlClient(address, authkey=b"wrong", timeout_s=1).call("ping")
+        assert ControlClient(address, authkey=b"secret").call("ping") == "pong"
+    finally:
+        server.stop()
+
+# Tests that the socket lives in a directory only the owner can enter (set up before the listener accepts)
+def test_control_socket_is_private(tmp_path):
+    import stat
+
+    address = control_address(tmp_path / "scheduler.lock")
+    assert address == tmp_path / "scheduler.control" / "control.sock"
+
+    server = ControlServer(address, {"ping": lambda: "pong"}, authkey=b"secret")
+    server.start()
+    try:
+        assert stat.S_IMODE(address.parent.stat().st_mode) == 0o700
+        assert stat.S_IMODE(address.stat().st_mode) == 0o600
+        assert ControlClient(address, authkey=b"secret").call("ping") == "pong"
+    finally:
+        server.stop()
+
+# Tests that stores pick up files written by another worker process and notify the listeners
+def test_store_sync_reloads_changed_files(tmp_path):
+    mode_store = SystemModeStore(tmp_path / "system_mode.json")
+    mode_store.set(SystemMode.MANUAL)
+    default = tmp_path / "schedule_default.json"
+    default.write_text('{"boiler": {"winter": {"start": "06:00", "end": "08:00"}}}')
+    schedule_store = ScheduleStore(tmp_path / "schedule.json", default)
+
+    changes = []
+    sync = StoreSync()
+    sync.watch("mode", mode_store.reload_if_changed, changes.append)
+    sync.watch("schedule", schedule_store.reload_if_changed, changes.append)
+    assert sync.check_once() == []
+
+    # Other worker: writes the files directly
+    atomic_write_text(tmp_path / "system_mode.json", '{"mode": "AUTOMATIC"}')
+    atomic_write_text(tmp_path / "schedule.json", '{"boiler": {"winter": {"start": "07:00"}}}')
+    version = schedule_store.version
+
+    assert sync.check_once() == ["mode", "schedule"]
+    assert changes == ["mode", "schedule"]
+    assert mode_store.get() == SystemMode.AUTOMATIC
+    assert schedule_store.get_effective()["boiler"]["winter"] == {"start": "07:00", "end": "08:00"}
+    assert schedule_store.version == version + 1
+
+    # Own writes are not reported as changes
+    mode_store.set(SystemMode.MANUAL)
+    assert sync.check_once() == []
+
+# Tests that failures of the sync thread go to the system event log, a repeated failure only once
+def test_store_sync_logs_failures_once():
+    class RecordingLogger:
+        def __init__(self):
+            self.events = []
+            self.logged = threading.Event()
+
+        def system_event(self, **kwargs):
+            self.events.append(kwargs)
+            self.logged.set()
+
+    def broken(name):
+        raise RuntimeError("kaputt")
+
+    logger = RecordingLogger()
+    sync = StoreSync(interval_s=0.01, logger=logger)
+    sync.watch("mode", lambda: True, broken)
+    sync.start()
+    try:
+        assert logger.logged.wait(2)
+        time.sleep(0.1)
+    finally:
+        sync.stop()
+
+    assert len(logger.events) == 1
+    assert logger.events[0]["level"] == "error"
+    assert "kaputt" in logger.events[0]["message"]
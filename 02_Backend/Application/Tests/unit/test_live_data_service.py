@@ -0,0 +1,154 @@
+import json
+
+from services.live_data_service import LiveDataService, LiveLoggerTap, LiveSource, SUBSCRIBER_QUEUE_SIZE
+
+
+class FakeMonotonic:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingLoader:
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+
+class FakeLogger:
+    def __init__(self):
+        self.calls = []
+
+    def device_state_change(self, device, old_state, new_state, reason="unbekannt"):
+        self.calls.append(("device_state_change", device))
+
+    def system_event(self, level, source, message):
+        self.calls.append(("system_event", source))
+
+    def query_logs(self, **kwargs):
+        return ["log"]
+
+
+def drain(sub):
+    events = []
+    while True:
+        event = sub.get(0)
+        if event is None:
+            return events
+        events.append(event)
+
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+# Tests that one poll serves all clients: the loader runs once per interval, no matter how many are connected
+def test_fan_out_polls_once_for_all_clients():
+    clock = FakeMonotonic()
+    pv = CountingLoader({"pv_power": 1000})
+    live = LiveDataService([LiveSource("pv", pv, 5)], monotonic=clock, autostart=False)
+    subs = [live.subscribe() for _ in range(10)]
+
+    live.poll_once()
+    live.poll_once()
+    clock.now = 4.9
+    live.poll_once()
+
+    assert pv.calls == 1
+    for sub in subs:
+        assert drain(sub) == [(1, "pv", {"pv_power": 1000})]
+
+# Tests that only changed fields are sent and unchanged values send nothing
+def test_deltas_contain_changed_fields_only():
+    clock = FakeMonotonic()
+    boiler = CountingLoader(
+        {"temp": 55.0, "heating": False, "simulated": True},
+        {"temp": 55.0, "heating": False, "simulated": True},
+        {"temp": 56.5, "heating": True},
+    )
+    live = LiveDataService([LiveSource("boiler", boiler, 10)], monotonic=clock, autostart=False)
+    sub = live.subscribe()
+
+    for now in (0, 10, 20):
+        clock.now = now
+        live.poll_once()
+
+    events = drain(sub)
+    assert [data for _, _, data in events] == [
+        {"temp": 55.0, "heating": False, "simulated": True},
+        {"temp": 56.5, "heating": True, "simulated": None},
+    ]
+    assert live.current()["boiler"] == {"temp": 56.5, "heating": True}
+
+# Tests that a new client starts with the full state and then receives deltas in order
+def test_stream_sends_snapshot_then_deltas():
+    live = LiveDataService([], autostart=False)
+    live.update("pv", {"pv_power": 1000, "load_power": 300})
+    live.update("mode", {"mode": "MANUAL"})
+
+    sub = live.subscribe()
+    live.update("pv", {"pv_power": 1200, "load_power": 300})
+    stream = live.stream(sub, keepalive_s=0)
+
+    assert next(stream).startswith("retry:")
+    assert parse(next(stream)) == ("pv", {"pv_power": 1000, "load_power": 300})
+    assert parse(next(stream)) == ("mode", {"mode": "MANUAL"})
+    assert parse(next(stream)) == ("pv", {"pv_power": 1200})
+    assert next(stream) == ": keepalive\n\n"
+
+    stream.close()
+    assert live.subscriber_count() == 0
+
+# Tests that a client that falls behind doesn't block the others and gets the full state again
+def test_slow_client_gets_fresh_snapshot():
+    live = LiveDataService([], autostart=False)
+    slow = live.subscribe()
+    stream = live.stream(slow, keepalive_s=0)
+    next(stream)
+
+    for value in range(SUBSCRIBER_QUEUE_SIZE + 5):
+        live.update("pv", {"pv_power": value})
+    assert slow.overflowed
+
+    fast = live.subscribe()
+    live.update("pv", {"pv_power": -1})
+    assert drain(fast) == [(SUBSCRIBER_QUEUE_SIZE + 6, "pv", {"pv_power": -1})]
+
+    assert parse(next(stream)) == ("pv", {"pv_power": -1})
+    assert not slow.overflowed
+    stream.close()
+
+# Tests that a failing source is counted and doesn't stop the other sources
+def test_failing_source_is_skipped():
+    def broken():
+        raise ConnectionError("influx down")
+
+    source = LiveSource("epex", broken, 60)
+    live = LiveDataService([source, LiveSource("mode", lambda: {"mode": "AUTOMATIC"}, 5)], autostart=False)
+    sub = live.subscribe()
+    live.poll_once()
+
+    assert source.errors == 1
+    assert drain(sub) == [(1, "mode", {"mode": "AUTOMATIC"})]
+
+# Tests that the logger tap forwards all calls and pushes decisions into the stream
+def test_logger_tap_publishes_decisions():
+    live = LiveDataService([], autostart=False)
+    logger = FakeLogger()
+    tap = LiveLoggerTap(logger, live)
+    sub = live.subscribe()
+
+    tap.device_state_change(device="boiler", old_state=False, new_state=True, reason="PV-Überschuss")
+    tap.device_state_change(device="boiler", old_state=True, new_state=True)
+    tap.system_event(level="info", source="modus", message="Systemmodus geändert")
+
+    assert tap.query_logs() == ["log"]
+    assert len(logger.calls) == 3
+    assert [(topic, data.get("device")) for _, topic, data in drain(sub)] == [("decision", "boiler"), ("system_event", None)]
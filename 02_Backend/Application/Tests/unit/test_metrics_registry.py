@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from services.metrics_registry import MetricsRegistry
+from services.single_flight import SingleFlight
+from services.tick_metrics import TickMetrics
+from services.metrics_registry import REGISTRY
+
+# Tests the text exposition format of counters, gauges and cumulative histogram buckets
+def test_render_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests_total", "Requests", ("route",))
+    queue = registry.gauge("app_queue_depth", "Queue")
+    latency = registry.histogram("app_latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+
+    requests.labels("/api/mode").inc()
+    requests.labels("/api/mode").inc(2)
+    queue.set(4)
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.labels('/a"b').observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE app_requests_total counter" in lines
+    assert 'app_requests_total{route="/api/mode"} 3' in lines
+    assert "app_queue_depth 4" in lines
+    assert 'app_latency_seconds_bucket{route="/a\\"b",le="0.1"} 2' in lines
+    assert 'app_latency_seconds_bucket{route="/a\\"b",le="1"} 3' in lines
+    assert 'app_latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4' in lines
+    assert 'app_latency_seconds_count{route="/a\\"b"} 4' in lines
+    assert 'app_latency_seconds_sum{route="/a\\"b"} 3.65' in lines
+
+# Tests that the same name returns the same metric and a conflicting definition is rejected
+def test_get_or_create():
+    registry = MetricsRegistry()
+    first = registry.counter("app_total", "Total", ("kind",))
+    assert registry.counter("app_total", "Total", ("kind",)) is first
+    with pytest.raises(ValueError):
+        registry.gauge("app_total", "Total")
+    with pytest.raises(ValueError):
+        first.labels("a", "b")
+
+# Tests that no increment is lost with concurrent writers
+def test_concurrent_increments():
+    registry = MetricsRegistry()
+    counter = registry.counter("app_total", "Total").labels()
+
+    def work():
+        for _ in range(10000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value == 40000
+
+# Tests that scrape-time callbacks (cache counters) and scheduler phases show up in the global registry
+def test_cache_and_scheduler_metrics():
+    cache = SingleFlight(lambda: 1, ttl_s=60, name="test_cache")
+    cache.get()
+    cache.get()
+    TickMetrics(loop="test_loop").observe("boiler", 0.02)
+
+    text = REGISTRY.render()
+    assert 'pvbackend_cache_requests_total{cache="test_cache",result="hit"} 1' in text
+    assert 'pvbackend_cache_requests_total{cache="test_cache",result="miss"} 1' in text
+    assert 'pvbackend_scheduler_phase_duration_seconds_count{loop="test_loop",phase="boiler"} 1' in text
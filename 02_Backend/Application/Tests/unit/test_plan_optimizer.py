@@ -0,0 +1,116 @@
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from services.plan_optimizer import PlanOptimizer, solve_schedule
+
+TZ = ZoneInfo("Europe/Vienna")
+NOW = datetime(2026, 1, 14, 10, 3, tzinfo=TZ)
+
+class FakeDB:
+    def __init__(self, prices):
+        self.prices = prices
+
+    def get_epex_price_series(self, start_time, end_time):
+        return self.prices
+
+class FakeForecast:
+    def __init__(self, irradiance=None):
+        self.irradiance = irradiance or []
+
+    def get_hourly_irradiance(self):
+        return self.irradiance
+
+def hourly_prices(values, start=datetime(2026, 1, 14, 0, 0, tzinfo=TZ)):
+    return [(start + timedelta(hours=i), p) for i, p in enumerate(values)]
+
+# Tests that the solver picks the cheapest slots before the deadline and ignores cheaper slots after it
+def test_solver_picks_cheapest_slots_before_deadline():
+    prices = [30, 10, 25, 5, 20, 1, 1]
+    surplus = [0.0] * len(prices)
+
+    actions, cost, boiler_missing, _ = solve_schedule(
+        prices, surplus, 1.0, boiler_power_kw=2.0, boiler_slots=2, boiler_deadline=5
+    )
+
+    assert [ub for ub, _ in actions] == [0, 1, 0, 1, 0, 0, 0]
+    assert boiler_missing == 0
+    assert cost == (10 + 5) * 2.0
+
+# Tests that PV surplus makes a slot free and that both devices are planned independently
+def test_solver_uses_pv_surplus_for_both_devices():
+    prices = [20, 20, 20, 20]
+    surplus = [0.0, 6.0, 0.0, 0.0]
+
+    actions, cost, boiler_missing, wallbox_missing = solve_schedule(
+        prices, surplus, 1.0,
+        boiler_power_kw=2.0, boiler_slots=1, boiler_deadline=4,
+        wallbox_power_kw=3.68, wallbox_slots=1, wallbox_deadline=4
+    )
+
+    assert actions[1] == (1, 1)
+    assert cost == 0.0
+    assert boiler_missing == 0 and wallbox_missing == 0
+
+# Tests that an unreachable target still yields a plan which runs as much as possible
+def test_solver_reports_infeasible_target():
+    actions, _, boiler_missing, _ = solve_schedule(
+        [10, 10, 10], [0.0] * 3, 1.0, boiler_power_kw=2.0, boiler_slots=5, boiler_deadline=2
+    )
+
+    assert [ub for ub, _ in actions] == [1, 1, 0]
+    assert boiler_missing == 3
+
+# Tests the runtime limit: 48 h in 15 min slots with both devices must solve well under a second
+def test_solver_48h_quarter_hour_under_one_second():
+    n = 48 * 4
+    prices = [10 + (i * 7919 % 23) for i in range(n)]
+    surplus = [max(0.0, 5 - abs(i % 96 - 52) * 0.25) for i in range(n)]
+
+    started = time.perf_counter()
+    _, _, boiler_missing, wallbox_missing = solve_schedule(
+        prices, surplus, 0.25,
+        boiler_power_kw=2.0, boiler_slots=12, boiler_deadline=n - 40,
+        wallbox_power_kw=11.04, wallbox_slots=16, wallbox_deadline=n
+    )
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert boiler_missing == 0 and wallbox_missing == 0
+
+# Tests the full plan: boiler energy from the temperature difference, hours chosen by price, plan cached for the tick
+def test_build_plan_schedules_boiler_in_cheapest_hours():
+    prices = hourly_prices([20] * 10 + [30, 8, 25, 6, 7, 40] + [20] * 32)
+    optimizer = PlanOptimizer(FakeDB(prices), FakeForecast(), clock=lambda: NOW)
+
+    plan = optimizer.build_plan(
+        {"slot_minutes": 60},
+        boiler={"current_temp": 40, "target_temp": 60, "target_time": "16:00"}
+    )
+
+    # 20 K × 200 l × 1.163 Wh = 4.65 kWh -> 3 hours at 2 kW
+    assert plan["boiler"]["slots"] == 3
+    assert plan["boiler"]["feasible"] is True
+    on_hours = [s["start"][11:16] for s in plan["slots"] if s["boiler"]]
+    assert on_hours == ["11:00", "13:00", "14:00"]
+
+    # Horizon ends tomorrow at midnight
+    assert plan["slots"][0]["start"].startswith("2026-01-14T10:00")
+    assert plan["slots"][-1]["end"].startswith("2026-01-16T00:00")
+
+    assert optimizer.get_plan() is plan
+    assert optimizer.current_slot(NOW)["start"].startswith("2026-01-14T10:00")
+    assert optimizer.current_slot(NOW + timedelta(hours=1))["boiler"] is True
+
+# Tests that the cached plan is kept until it is outdated or the targets change
+def test_needs_replan_on_age_and_target_change():
+    optimizer = PlanOptimizer(FakeDB([]), FakeForecast(), clock=lambda: NOW)
+    cfg = {"replan_interval_min": 15}
+    targets = {"boiler": [60, "16:00"]}
+
+    assert optimizer.needs_replan(NOW, cfg, targets) is True
+    optimizer.build_plan(cfg, targets=targets)
+
+    assert optimizer.needs_replan(NOW + timedelta(minutes=5), cfg, targets) is False
+    assert optimizer.needs_replan(NOW + timedelta(minutes=5), cfg, {"boiler": [65, "16:00"]}) is True
+    assert optimizer.needs_replan(NOW + timedelta(minutes=15), cfg, targets) is True
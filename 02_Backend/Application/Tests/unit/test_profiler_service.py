@@ -0,0 +1,100 @@
+import pstats
+import time
+
+import pytest
+
+from services.profiler_service import ProfilerBusyError, ProfilerService
+
+
+def slow_function(delay_s=0.0):
+    time.sleep(delay_s)
+    return "ok"
+
+
+# Tests that only the next N calls are profiled and the aggregated result is written as .pstats
+def test_cprofile_next_calls(tmp_path):
+    profiler = ProfilerService(tmp_path)
+    session = profiler.arm("/api/pv/yearly", count=2)
+    done = []
+    session.on_done = done.append
+
+    for _ in range(3):
+        assert profiler.call("/api/pv/yearly", slow_function) == "ok"
+
+    assert session.status == "done"
+    assert session.captured == 2
+    assert done == [session]
+    assert not profiler.is_armed("/api/pv/yearly")
+
+    stats = pstats.Stats(str(profiler.result_path(session.id)))
+    calls = {func[2]: stat[1] for func, stat in stats.stats.items()}
+    assert calls["slow_function"] == 2
+    assert "slow_function" in profiler.report(session.id)
+
+# Tests the sampling collector: collapsed stacks start at the profiled function
+def test_sampling_collapsed_stacks(tmp_path):
+    profiler = ProfilerService(tmp_path)
+    session = profiler.arm("tick:main", count=1, mode="sample", interval_s=0.001)
+
+    profiler.call("tick:main", slow_function, 0.05)
+
+    lines = profiler.result_path(session.id).read_text().splitlines()
+    assert lines
+    stack, samples = lines[0].rsplit(" ", 1)
+    assert stack.startswith("slow_function (")
+    assert int(samples) > 0
+    assert profiler.report(session.id) is None
+
+# Tests argument validation and that a target can only be armed once
+def test_arm_validation(tmp_path):
+    profiler = ProfilerService(tmp_path)
+    with pytest.raises(ValueError):
+        profiler.arm("tick:main", count=0)
+    with pytest.raises(ValueError):
+        profiler.arm("tick:main", mode="perf")
+
+    profiler.arm("tick:main")
+    with pytest.raises(ProfilerBusyError):
+        profiler.arm("tick:main")
+
+# Tests that cancelling keeps the calls profiled so far
+def test_cancel_writes_partial_result(tmp_path):
+    profiler = ProfilerService(tmp_path)
+    session = profiler.arm("tick:wallbox", count=5)
+    profiler.call("tick:wallbox", slow_function)
+
+    profiler.cancel(session.id)
+    profiler.call("tick:wallbox", slow_function)
+
+    assert session.status == "cancelled"
+    assert session.captured == 1
+    assert profiler.stored(session.id)["status"] == "cancelled"
+    assert profiler.result_path(session.id).suffix == ".pstats"
+
+# Tests that only the newest profiles are kept on disk
+def test_prune_old_profiles(tmp_path):
+    profiler = ProfilerService(tmp_path, keep=2)
+    ids = []
+    for _ in range(3):
+        ids.append(profiler.arm("tick:main").id)
+        profiler.call("tick:main", slow_function)
+        time.sleep(0.01)
+
+    assert profiler.result_path(ids[0]) is None
+    assert all(profiler.result_path(i) for i in ids[1:])
+
+# Tests that finished sessions are evicted from memory beyond 'keep' and don't hold on to their profile data
+def test_finished_sessions_are_evicted(tmp_path):
+    profiler = ProfilerService(tmp_path, keep=2)
+    sessions = []
+    for _ in range(4):
+        sessions.append(profiler.arm("tick:main"))
+        profiler.call("tick:main", slow_function)
+    armed = profiler.arm("tick:wallbox")
+
+    listed = {s["id"] for s in profiler.sessions()}
+    assert listed == {armed.id, sessions[3].id, sessions[2].id}
+    assert all(s.stats is None for s in sessions)
+    assert {s["scope"] for s in profiler.sessions()} <= {"process", "thread"}
+    # Evicted from memory, still downloadable from disk
+    assert profiler.stored(sessions[2].id)["status"] == "done"
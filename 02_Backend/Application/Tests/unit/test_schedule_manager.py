@@ -42,3 +42,125 @@ def test_over_midnight():
 
     # Depending on the current time, this could be True or False, but it should not raise an error
     assert isinstance(sm.is_active("wallbox"), bool)
+
+# Fake store with version counter, counts how often the schedule is read
+class VersionedScheduleStore(FakeScheduleStore):
+    def __init__(self, data):
+        super().__init__(data)
+        self.version = 1
+        self.reads = 0
+
+    def get_effective(self):
+        self.reads += 1
+        return self._data
+
+def make_manager(data, at):
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from services.clock import VirtualClock
+
+    clock = VirtualClock(datetime(2026, 1, 14, *at, tzinfo=ZoneInfo("Europe/Vienna")))
+    store = VersionedScheduleStore(data)
+    return ScheduleManager(store, clock=clock), store, clock
+
+# Tests the window boundaries: active from start (inclusive) to end (exclusive) in minute resolution
+def test_window_boundaries():
+    sm, _, clock = make_manager({"boiler": {"winter": {"start": "08:00", "end": "16:00"}}}, (7, 59))
+    assert sm.is_active("boiler") is False
+    clock.advance(60)
+    assert sm.is_active("boiler") is True
+    clock.advance(479 * 60)  # 15:59
+    assert sm.is_active("boiler") is True
+    clock.advance(60)
+    assert sm.is_active("boiler") is False
+
+# Tests the next switching time within the day, on the next day and for windows over midnight
+def test_next_transition():
+    sm, _, clock = make_manager({
+        "boiler": {"winter": {"start": "08:00", "end": "16:00"}},
+        "wallbox": {"winter": {"start": "22:00", "end": "06:00"}},
+    }, (10, 30))
+
+    assert sm.next_transition("boiler").strftime("%d %H:%M") == "14 16:00"
+    assert sm.next_transition("wallbox").strftime("%d %H:%M") == "14 22:00"
+
+    clock.advance(13 * 3600)  # 23:30
+    assert sm.next_transition("boiler").strftime("%d %H:%M") == "15 08:00"
+    assert sm.is_active("wallbox") is True
+    assert sm.next_transition("wallbox").strftime("%d %H:%M") == "15 06:00"
+    assert sm.next_transition("unknown") is None
+
+# Tests that the schedule is compiled once per store version instead of being read on every check
+def test_index_compiled_once_per_version():
+    sm, store, _ = make_manager({"boiler": {"winter": {"start": "08:00", "end": "16:00"}}}, (12, 0))
+    force_winter(sm)
+
+    for _ in range(100):
+        assert sm.is_active("boiler") is True
+    assert store.reads == 1
+
+    store._data = {"boiler": {"winter": {"start": "13:00", "end": "16:00"}}}
+    store.version += 1
+    assert sm.is_active("boiler") is False
+    assert store.reads == 2
+
+# 2026-01-16 is a Friday
+WEEK = {
+    "boiler": {
+        "winter": {"windows": [
+            {"start": "06:00", "end": "07:00", "days": ["weekdays"]},
+            {"start": "12:00", "end": "14:00"},
+            {"start": "23:00", "end": "02:00", "days": ["fri"]},
+        ]},
+        "exceptions": [{"from": "2026-01-19", "to": "2026-01-20", "windows": [{"start": "10:00", "end": "11:00"}]}],
+    }
+}
+
+# Tests several windows per day with weekday/weekend differences and a window over midnight
+def test_multi_window_weekdays():
+    from datetime import date
+
+    sm, _, _ = make_manager(WEEK, (12, 0))
+    force_winter(sm)
+
+    assert sm.intervals("boiler", date(2026, 1, 15)) == ((360, 420), (720, 840))
+    assert sm.intervals("boiler", date(2026, 1, 16)) == ((360, 420), (720, 840), (1380, 1440))
+    # Samstag: kein Morgenfenster, aber der Rest vom Freitagsfenster bis 02:00
+    assert sm.intervals("boiler", date(2026, 1, 17)) == ((0, 120), (720, 840))
+    assert sm.intervals("boiler", date(2026, 1, 18)) == ((720, 840),)
+
+# Tests that date exceptions replace the weekly windows (e.g. holidays)
+def test_exception_days():
+    from datetime import date
+
+    sm, _, _ = make_manager(WEEK, (12, 0))
+    force_winter(sm)
+
+    assert sm.intervals("boiler", date(2026, 1, 19)) == ((600, 660),)
+    assert sm.intervals("boiler", date(2026, 1, 20)) == ((600, 660),)
+    assert sm.intervals("boiler", date(2026, 1, 21)) == ((360, 420), (720, 840))
+
+# Tests next_transition across the weekend and over midnight
+def test_next_transition_weekly():
+    sm, _, clock = make_manager(WEEK, (23, 30))  # Mittwoch
+    force_winter(sm)
+    assert sm.next_transition("boiler").strftime("%a %H:%M") == "Thu 06:00"
+
+    clock.advance(2 * 86400)  # Freitag 23:30, Fenster bis Samstag 02:00
+    assert sm.is_active("boiler") is True
+    assert sm.next_transition("boiler").strftime("%a %H:%M") == "Sat 02:00"
+
+    clock.advance(3 * 3600)  # Samstag 02:30
+    assert sm.next_transition("boiler").strftime("%a %H:%M") == "Sat 12:00"
+
+# Tests the validation of the extended schedule format
+def test_validate_schedule():
+    from managers.schedule_manager import validate_schedule
+
+    assert validate_schedule(WEEK) is None
+    assert validate_schedule({"boiler": {"winter": {"start": "08:00", "end": "16:00"}}}) is None
+    assert validate_schedule({"boiler": {"winter": {"start": "25:00", "end": "16:00"}}}) is not None
+    assert validate_schedule({"boiler": {"winter": {"windows": [{"start": "08:00", "end": "09:00", "days": ["xyz"]}]}}}) is not None
+    assert validate_schedule({"boiler": {"winter": {"windows": [{"start": "08:00", "end": "09:00", "days": [["mon"]]}]}}}) is not None
+    assert validate_schedule({"boiler": {"winter": {"windows": [{"start": "08:00", "end": "09:00", "days": [1]}]}}}) is not None
+    assert validate_schedule({"boiler": {"exceptions": [{"from": "2026-01-20", "to": "2026-01-19", "windows": []}]}}) is not None
@@ -73,3 +73,145 @@ def test_scheduler_controls_devices():
 
     assert boiler.state is True
     assert wallbox.allow is True
+
+# Virtual monotonic time for the scheduler loop: ticks take 'tick_s', waiting advances the time
+class FakeLoopTime:
+    def __init__(self, scheduler, tick_durations):
+        self.now = 0.0
+        self.tick_starts = []
+        self.durations = list(tick_durations)
+        self.scheduler = scheduler
+
+    def monotonic(self):
+        return self.now
+
+    def tick(self):
+        self.tick_starts.append(self.now)
+        self.now += self.durations.pop(0)
+        if not self.durations:
+            self.scheduler.stop()
+
+    def wait(self, seconds):
+        self.now += seconds
+        return self.scheduler._stop_event.is_set()
+
+def make_loop_scheduler(tick_durations):
+    scheduler = SchedulerService(
+        mode_store=None,
+        schedule_manager=None,
+        boiler=None,
+        wallbox=None,
+        db_bridge=FakeDB(),
+        logger=FakeLogger(),
+        interval=60
+    )
+    fake = FakeLoopTime(scheduler, tick_durations)
+    scheduler._monotonic = fake.monotonic
+    scheduler.tick = fake.tick
+    scheduler._stop_event.wait = fake.wait
+    return scheduler, fake
+
+# Tests that the tick duration doesn't shift the period: ticks start on fixed 60 s deadlines
+def test_scheduler_loop_is_drift_free():
+    scheduler, fake = make_loop_scheduler([20, 5, 59, 1])
+    scheduler.run()
+
+    assert fake.tick_starts == [0, 60, 120, 180]
+    assert scheduler.metrics.overruns == 0
+
+# Tests that an overrunning tick is counted and missed deadlines are skipped instead of stacked
+def test_scheduler_loop_skips_missed_deadlines():
+    scheduler, fake = make_loop_scheduler([130, 1, 1])
+    scheduler.run()
+
+    assert fake.tick_starts == [0, 180, 240]
+    snapshot = scheduler.metrics.snapshot()
+    assert snapshot["overruns"] == 1
+    assert snapshot["skipped_ticks"] == 2
+
+# Tests that a tick records its total duration and the automatic phases
+def test_scheduler_records_phase_timing():
+    class FakeForecast:
+        def get_forecast(self):
+            return {"pv_today": False, "pv_tomorrow": False}
+
+    class FakeConfig:
+        def get(self):
+            return {}
+
+        def snapshot(self):
+            return {}
+
+    class FakeModeStore:
+        def get(self):
+            return SystemMode.AUTOMATIC
+
+    sm = ScheduleManager(FakeScheduleStore())
+    sm.determine_season = lambda: "winter"
+
+    scheduler = SchedulerService(
+        mode_store=FakeModeStore(),
+        schedule_manager=sm,
+        boiler=FakeBoiler(),
+        wallbox=None,
+        db_bridge=FakeDB(),
+        logger=FakeLogger()
+    )
+    scheduler.pv_forecast = FakeForecast()
+    scheduler.automatic_config = FakeConfig()
+
+    scheduler.tick()
+
+    snapshot = scheduler.metrics.snapshot()
+    assert snapshot["tick"]["count"] == 1
+    assert {"forecast", "pv_state", "plan", "boiler", "wallbox"} <= set(snapshot["phases"])
+    assert snapshot["tick"]["buckets"]["le_inf"] == 1
+
+# Tests that TIME_CONTROLLED only talks to the devices at switching times (and after a schedule change)
+def test_time_controlled_runs_only_at_transitions():
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from services.clock import VirtualClock
+
+    class CountingWallbox(FakeWallbox):
+        def __init__(self):
+            super().__init__()
+            self.reads = 0
+
+        def get_allow_state(self):
+            self.reads += 1
+            return self.allow
+
+    class WindowStore:
+        version = 1
+
+        def get_effective(self):
+            return {
+                "boiler": {"winter": {"start": "12:10", "end": "16:00"}},
+                "wallbox": {"winter": {"start": "12:10", "end": "16:00"}},
+            }
+
+    clock = VirtualClock(datetime(2026, 1, 14, 12, 0, tzinfo=ZoneInfo("Europe/Vienna")))
+    boiler, wallbox = FakeBoiler(), CountingWallbox()
+    scheduler = SchedulerService(
+        mode_store=None,
+        schedule_manager=ScheduleManager(WindowStore(), clock=clock),
+        boiler=boiler,
+        wallbox=wallbox,
+        db_bridge=FakeDB(),
+        logger=FakeLogger(),
+        clock=clock
+    )
+
+    for _ in range(15):
+        scheduler.time_controlled_tick()
+        clock.advance(60)
+
+    # 12:00 (start) + 12:10 (switch on) only
+    assert wallbox.reads == 2
+    assert boiler.state is True and wallbox.allow is True
+    assert scheduler.time_controlled_due.strftime("%H:%M") == "12:25"
+
+    scheduler.notify("schedule")
+    scheduler.time_controlled_tick()
+    assert wallbox.reads == 3
@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from services.clock import VirtualClock
+from services.scheduler_service import SchedulerService
+from stores.scheduler_state_store import SchedulerStateStore
+
+TZ = ZoneInfo("Europe/Vienna")
+NOW = datetime(2026, 1, 14, 14, 0, tzinfo=TZ)
+
+class FakeLogger:
+    def system_event(self, *a, **k): pass
+    def control_decision(self, *a, **k): pass
+    def device_state_change(self, *a, **k): pass
+
+def make_scheduler(store, now=NOW):
+    return SchedulerService(
+        mode_store=None,
+        schedule_manager=None,
+        boiler=None,
+        wallbox=None,
+        db_bridge=None,
+        logger=FakeLogger(),
+        clock=VirtualClock(now),
+        state_store=store
+    )
+
+# Tests that a restarted scheduler continues the session (kWh baseline, failsafe, daily flags)
+def test_state_survives_restart(tmp_path):
+    store = SchedulerStateStore(tmp_path / "scheduler_state.json")
+    scheduler = make_scheduler(store)
+    scheduler.wallbox_eto_start = 12345.0
+    scheduler.boiler_failsafe_until = NOW + timedelta(hours=1)
+    scheduler.boiler_session_logged_date = NOW.date()
+    scheduler.persist_state()
+
+    restarted = make_scheduler(SchedulerStateStore(tmp_path / "scheduler_state.json"), NOW + timedelta(minutes=5))
+
+    assert restarted.wallbox_eto_start == 12345.0
+    assert restarted.boiler_failsafe_until == NOW + timedelta(hours=1)
+    assert restarted.boiler_session_logged_date == NOW.date()
+
+# Tests that the file is only written when a field actually changed
+def test_save_only_on_change(tmp_path):
+    store = SchedulerStateStore(tmp_path / "scheduler_state.json")
+    scheduler = make_scheduler(store)
+
+    scheduler.persist_state()
+    scheduler.persist_state()
+    assert store.writes == 1
+
+    scheduler.wallbox_finished = True
+    scheduler.persist_state()
+    scheduler.persist_state()
+    assert store.writes == 2
+    assert list(tmp_path.glob("*.tmp")) == []
+
+# Tests that expired failsafes and a stale wallbox session are dropped at load time
+def test_stale_entries_are_dropped(tmp_path):
+    path = tmp_path / "scheduler_state.json"
+    store = SchedulerStateStore(path)
+    store.save({
+        "wallbox_eto_start": 500.0,
+        "boiler_failsafe_until": NOW + timedelta(hours=2),
+        "boiler_last_turned_on": NOW,
+    }, NOW)
+
+    state = SchedulerStateStore(path).load(NOW + timedelta(hours=3))
+    assert state["boiler_failsafe_until"] is None
+    assert state["boiler_failsafe_done_today"] is True
+    assert state["wallbox_eto_start"] == 500.0
+
+    state = SchedulerStateStore(path).load(NOW + timedelta(hours=13))
+    assert "wallbox_eto_start" not in state
+
+# Tests that a long, steady charging session (no field changes) is kept alive by the heartbeat across a restart
+def test_steady_session_survives_restart(tmp_path):
+    path = tmp_path / "scheduler_state.json"
+    store = SchedulerStateStore(path)
+    state = {"wallbox_eto_start": 500.0, "wallbox_last_set_allow": True}
+    assert store.save(state, NOW)
+
+    # Same state every tick: only the heartbeat rewrites the file
+    assert not store.save(state, NOW + timedelta(minutes=10))
+    for hours in range(1, 14):
+        store.save(state, NOW + timedelta(hours=hours))
+    assert store.writes == 14
+
+    restored = SchedulerStateStore(path).load(NOW + timedelta(hours=13, minutes=5))
+    assert restored["wallbox_eto_start"] == 500.0
+    assert restored["wallbox_last_set_allow"] is True
+
+# Tests that a corrupt file or invalid values don't break the startup
+def test_invalid_file_is_ignored(tmp_path):
+    path = tmp_path / "scheduler_state.json"
+    path.write_text("{ kaputt")
+    assert SchedulerStateStore(path).load(NOW) == {}
+
+    path.write_text(json.dumps({
+        "version": 1,
+        "saved_at": NOW.isoformat(),
+        "state": {"wallbox_eto_start": "abc", "wallbox_phases_set": 3, "unknown": 1}
+    }))
+    assert SchedulerStateStore(path).load(NOW) == {"wallbox_phases_set": 3}
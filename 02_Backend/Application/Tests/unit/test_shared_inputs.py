@@ -0,0 +1,62 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from services.clock import VirtualClock
+from services.shared_inputs import SharedInputs
+
+def make_inputs(pv_values):
+    calls = {"pv": 0, "forecast": 0}
+
+    def load_pv():
+        calls["pv"] += 1
+        value = pv_values[min(calls["pv"] - 1, len(pv_values) - 1)]
+        if value is None:
+            raise RuntimeError("PV data unavailable")
+        return {"surplus_kw": value, "soc": 50.0}
+
+    def load_forecast():
+        calls["forecast"] += 1
+        return {"pv_today": True, "pv_tomorrow": False}
+
+    clock = VirtualClock(datetime(2026, 1, 14, 12, 0, tzinfo=ZoneInfo("Europe/Vienna")))
+    inputs = SharedInputs(load_pv, load_forecast, lambda: {}, clock, pv_ttl_s=5.0, forecast_ttl_s=300.0)
+    return inputs, clock, calls
+
+# Tests that loops asking within the TTL share one query per source
+def test_snapshots_within_ttl_share_one_query():
+    inputs, clock, calls = make_inputs([2.0, 3.0])
+
+    first = inputs.snapshot()
+    clock.advance(2)
+    second = inputs.snapshot()
+
+    assert calls == {"pv": 1, "forecast": 1}
+    assert second.pv_state is first.pv_state
+
+    clock.advance(5)
+    third = inputs.snapshot()
+    assert calls == {"pv": 2, "forecast": 1}
+    assert third.pv_state["surplus_kw"] == 3.0
+
+# Tests that snapshots can't be modified by one loop behind the other loop's back
+def test_snapshot_is_immutable():
+    inputs, _, _ = make_inputs([2.0])
+    snapshot = inputs.snapshot()
+
+    with pytest.raises(TypeError):
+        snapshot.pv_state["surplus_kw"] = 10.0
+    with pytest.raises(AttributeError):
+        snapshot.pv_state = None
+
+    # Deriving a changed copy still works
+    assert {**snapshot.pv_state, "surplus_kw": 0.0}["surplus_kw"] == 0.0
+
+# Tests that a failing PV query yields None and is retried on the next call (not cached)
+def test_pv_failure_is_not_cached():
+    inputs, _, calls = make_inputs([None, 1.5])
+
+    assert inputs.snapshot().pv_state is None
+    assert inputs.snapshot().pv_state["surplus_kw"] == 1.5
+    assert calls["pv"] == 2
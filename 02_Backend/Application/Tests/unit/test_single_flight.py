@@ -0,0 +1,33 @@
+import threading
+
+from services.single_flight import SingleFlight
+
+# Tests that callers arriving after invalidate() start a new load instead of joining the stale in-flight one
+def test_invalidate_detaches_running_load():
+    release = threading.Event()
+    started = threading.Event()
+    values = iter(["old", "new"])
+
+    def loader():
+        value = next(values)
+        if value == "old":
+            started.set()
+            release.wait(5)
+        return value
+
+    cache = SingleFlight(loader, ttl_s=60)
+    results = {}
+    stale = threading.Thread(target=lambda: results.setdefault("stale", cache.get()))
+    stale.start()
+    assert started.wait(5)
+
+    cache.invalidate()
+    # Loader is still blocked: a new caller must not wait for (and receive) the old result
+    assert cache.get() == "new"
+
+    release.set()
+    stale.join(5)
+    assert results["stale"] == "old"
+    # The old load finished after the invalidation and must not replace the newer value
+    assert cache.get() == "new"
+    assert cache.misses == 2
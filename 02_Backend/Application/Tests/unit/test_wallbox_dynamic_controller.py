@@ -0,0 +1,59 @@
+import pytest
+from services.wallbox_dynamic_controller import WallboxDynamicController, setting_power_kw
+
+def make_controller(phase_mode=1):
+    return WallboxDynamicController(hysteresis_kw=0.3, battery_protection_soc=20, phase_mode=phase_mode)
+
+# Tests that every integer ampere between 6 and 16 can be selected, not only the old 6/10/12/14/16 steps
+def test_single_phase_uses_every_integer_ampere():
+    wdc = make_controller()
+
+    # 2.0 kW surplus - 0.3 kW hysteresis = 1.7 kW -> 7 A (1.61 kW) fits, 8 A (1.84 kW) does not
+    assert wdc.calculate_optimal_ampere(2.0, 0.0, 50) == 7
+
+    wdc.reset()
+    assert wdc.calculate_optimal_ampere(3.2, 0.0, 50) == 12
+
+# Tests the hysteresis: the current setting is held inside the band and only changed outside of it
+def test_hysteresis_holds_current_setting():
+    wdc = make_controller()
+
+    # Currently 10 A (2.3 kW): 2.4 kW is not enough for 11 A + hysteresis (2.83 kW), but covers 10 A
+    assert wdc.calculate_optimal_ampere(2.4, 0.0, 50, current_ampere=10) == 10
+
+    # 2.1 kW: below 10 A, but inside the band (2.3 - 0.3 = 2.0 kW) -> hold
+    assert wdc.calculate_optimal_ampere(2.1, 0.0, 50, current_ampere=10) == 10
+
+    # 1.9 kW: below the band, downshift to what fits with hysteresis bonus (2.2 kW -> 9 A)
+    assert wdc.calculate_optimal_ampere(1.9, 0.0, 50, current_ampere=10) == 9
+
+    # 6 A (1.38 kW) is held down to 1.08 kW, below that -> stop
+    assert wdc.calculate_optimal_ampere(1.1, 0.0, 50, current_ampere=6) == 6
+    assert wdc.calculate_optimal_ampere(1.0, 0.0, 50, current_ampere=6) == 0
+
+# Tests automatic phase switching: large surplus selects three phases, a phase switch needs an extra margin
+def test_auto_phase_switching():
+    wdc = make_controller(phase_mode="auto")
+
+    # 6 kW - 0.3 = 5.7 kW -> 3 phases, 8 A (5.52 kW)
+    assert wdc.calculate_optimal_setting(6.0, 0.0, 50) == (8, 3)
+
+    # Charging 16 A single phase: 4.7 kW would allow 3x6 A (4.14 kW) but not with the phase switch margin
+    assert wdc.calculate_optimal_setting(4.7, 0.0, 50, current_ampere=16, current_phases=1) == (16, 1)
+    assert wdc.calculate_optimal_setting(5.0, 0.0, 50, current_ampere=16, current_phases=1) == (6, 3)
+
+    # Surplus drops while on 3 phases -> back to the best single phase setting
+    assert wdc.calculate_optimal_setting(3.5, 0.0, 50, current_ampere=6, current_phases=3) == (16, 1)
+
+# Tests that the lookup table matches P = 230 V × I × phases for every setting
+def test_power_table_matches_formula():
+    wdc = make_controller(phase_mode="auto")
+
+    assert len(wdc._settings) == 22
+    assert wdc._powers == sorted(wdc._powers)
+    for kw, (amp, phases) in zip(wdc._powers, wdc._settings):
+        assert kw == setting_power_kw(amp, phases)
+
+def test_invalid_phase_mode_raises_value_error():
+    with pytest.raises(ValueError):
+        make_controller(phase_mode=2)
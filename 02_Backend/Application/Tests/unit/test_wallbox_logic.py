@@ -1,3 +1,5 @@
+import threading
+import time
 from datetime import datetime
 import pytest
 from controllers.wallbox_controller import WallboxController
@@ -66,7 +68,7 @@ def test_set_charging_ampere_invalid_value():
     wb = WallboxController()
 
     with pytest.raises(ValueError) as exc_info:
-        wb.set_charging_ampere(9)
+        wb.set_charging_ampere(17)
 
     assert "Invalid amp value" in str(exc_info.value)
 
@@ -80,4 +82,50 @@ def test_set_charging_ampere_http_error(mocker):
     wb = WallboxController()
 
     with pytest.raises(Exception):
-        wb.set_charging_ampere(10)
\ No newline at end of file
+        wb.set_charging_ampere(10)
+
+# Tests that concurrent readers share one in-flight fetch instead of each sending their own requests to the charger
+def test_fetch_data_coalesces_concurrent_callers(mocker):
+    fake_response = mocker.Mock()
+    fake_response.json.return_value = {"amp": 10, "car": 2, "alw": 1, "eto": 100}
+    fake_response.raise_for_status.return_value = None
+
+    def slow_get(*a, **k):
+        time.sleep(0.05)
+        return fake_response
+
+    mock_get = mocker.patch("requests.get", side_effect=slow_get)
+
+    wb = WallboxController()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(wb.fetch_data())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # One fetch = status + api request, shared by all 8 callers
+    assert mock_get.call_count == 2
+    assert len(results) == 8
+    assert all(r["amp"] == 10 for r in results)
+
+    # Repeat within the freshness window is served from memory
+    wb.fetch_data()
+    assert mock_get.call_count == 2
+
+# Tests that a command invalidates the cached state so the next read reflects the change
+def test_command_invalidates_cached_state(mocker):
+    fake_response = mocker.Mock()
+    fake_response.json.return_value = {"amp": 10, "car": 1, "alw": 0, "eto": 100}
+    fake_response.raise_for_status.return_value = None
+    mock_get = mocker.patch("requests.get", return_value=fake_response)
+
+    wb = WallboxController()
+    wb.fetch_data()
+    calls = mock_get.call_count
+
+    wb.set_charging_ampere(16)
+    fake_response.json.return_value = {"amp": 16, "car": 1, "alw": 0, "eto": 100}
+
+    assert wb.fetch_data()["amp"] == 16
+    assert mock_get.call_count > calls + 1
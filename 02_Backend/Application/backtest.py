@@ -0,0 +1,55 @@
+import argparse
+import json
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from bridges.db_bridge import DB_Bridge
+from services.backtest_service import BACKTEST_PARAMS, BacktestData, run_backtest
+from stores.automatic_config_store import AutomaticConfigStore
+
+# Replays stored measurements through the AUTOMATIC logic to compare threshold settings
+# Example:
+#   python backtest.py --start 2025-01-01 --end 2026-01-01 --param boiler_pv_min_kw=1.2 --car 18:00-07:00
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest of the AUTOMATIC mode on stored measurements")
+    parser.add_argument("--start", required=True, help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--end", required=True, help="End date, exclusive (YYYY-MM-DD)")
+    parser.add_argument("--step", type=int, default=15, help="Step in minutes (default 15)")
+    parser.add_argument("--param", action="append", default=[],
+                        help=f"Override NAME=VALUE, allowed: {', '.join(sorted(BACKTEST_PARAMS))}")
+    parser.add_argument("--car", help="Car plugged in ARRIVE-DEPART, e.g. 18:00-07:00 (default: no car)")
+    parser.add_argument("--optimizer", action="store_true", help="Enable the plan optimizer")
+    parser.add_argument("--feed-in-price", type=float, default=0.0, help="Feed-in tariff in ct/kWh")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    tz = ZoneInfo("Europe/Vienna")
+    start = datetime.fromisoformat(args.start).replace(tzinfo=tz)
+    end = datetime.fromisoformat(args.end).replace(tzinfo=tz)
+
+    params = {}
+    for item in args.param:
+        name, _, value = item.partition("=")
+        params[name.strip()] = value.strip()
+
+    config = AutomaticConfigStore().get()
+    if args.optimizer:
+        config.setdefault("optimizer", {})["enabled"] = True
+
+    print(f"Lade Messdaten {args.start} – {args.end} ...")
+    data = BacktestData.from_db(DB_Bridge(), start, end, every=f"{args.step}m")
+    print(f"PV: {len(data.pv_power)} Werte | Boiler: {len(data.boiler_temp)} Werte | EPEX: {len(data.prices)} Preise")
+
+    report = run_backtest(
+        data, start, end, config,
+        params=params,
+        step_min=args.step,
+        car=tuple(args.car.split("-")) if args.car else None,
+        feed_in_price=args.feed_in_price
+    )
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
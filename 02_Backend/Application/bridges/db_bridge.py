@@ -1,53 +1,234 @@
-import os
+import time
 import pytz
-from dotenv import load_dotenv, find_dotenv
-from influxdb_client import InfluxDBClient
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from bridges.flux_queries import (CSV_DIALECT, ColumnDecoder, FluxQuery, RecordDecoder, parse_duration, to_float,
+                                  to_local_time)
+from bridges.influx_client import INFLUX_CLIENTS, influx_settings
+from services.metrics_registry import REGISTRY
+
+QUERY_SECONDS = REGISTRY.histogram("pvbackend_influx_query_duration_seconds", "InfluxDB query duration by method", ("method",))
+QUERY_ERRORS = REGISTRY.counter("pvbackend_influx_query_errors_total", "Failed InfluxDB queries by method", ("method",))
+
+# influxdb_client takes about half of the backend's import time -> imported on the first query
+InfluxDBClient = None
+
+# Fields of pv_measurements returned by the PV queries
+PV_FIELDS = ("pv_power", "grid_power", "load_power", "battery_power", "soc", "e_day", "e_year", "e_total",
+             "rel_autonomy", "rel_selfconsumption")
+
+# Flux queries: defined once, all values are passed as parameters (see flux_queries.FluxQuery)
+LATEST_PV = FluxQuery("latest_pv", '''
+    from(bucket: _bucket)
+      |> range(start: -1h)
+      |> filter(fn: (r) => r["_measurement"] == "pv_measurements")
+      |> filter(fn: (r) =>
+          r["_field"] == "battery_power" or
+          r["_field"] == "e_total" or
+          r["_field"] == "grid_power" or
+          r["_field"] == "load_power" or
+          r["_field"] == "pv_power" or
+          r["_field"] == "rel_autonomy" or
+          r["_field"] == "rel_selfconsumption" or
+          r["_field"] == "soc"
+      )
+      |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
+      |> sort(columns: ["_time"], desc: true)
+      |> limit(n: 1)
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+''', params=("bucket",))
+
+# Daily, monthly and yearly history: 15 min means in [start, stop]
+PV_HISTORY = FluxQuery("pv_history", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r._measurement == "pv_measurements")
+      |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+''', params=("bucket", "start", "stop"))
+
+LATEST_BOILER = FluxQuery("latest_boiler", '''
+    from(bucket: _bucket)
+      |> range(start: -1h)
+      |> filter(fn: (r) => r["_measurement"] == "boiler_measurements")
+      |> filter(fn: (r) => r["_field"] == "boiler_temp")
+      |> sort(columns: ["_time"], desc: true)
+      |> limit(n: 1)
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+''', params=("bucket",))
+
+LATEST_EPEX = FluxQuery("latest_epex", '''
+    from(bucket: _bucket)
+      |> range(start: -24h)
+      |> filter(fn: (r) => r["_measurement"] == "epex_prices")
+      |> filter(fn: (r) => r["_field"] == "price")
+      |> sort(columns: ["_time"], desc: true)
+      |> limit(n: 1)
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+''', params=("bucket",))
+
+EPEX_PRICES = FluxQuery("epex_prices", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r["_measurement"] == "epex_prices")
+      |> filter(fn: (r) => r["_field"] == "price")
+      |> sort(columns: ["_time"], desc: false)
+''', params=("bucket", "start", "stop"))
+
+# Bulk history for backtests; group() before sort -> one table, sorted over all rows
+HISTORY = FluxQuery("history", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r["_measurement"] == _measurement)
+      |> filter(fn: (r) => contains(value: r["_field"], set: _fields))
+      |> aggregateWindow(every: _every, fn: mean, createEmpty: false, timeSrc: "_start")
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+      |> group()
+      |> sort(columns: ["_time"], desc: false)
+''', params=("bucket", "measurement", "fields", "start", "stop", "every"))
+
+# Raw points of the given fields (local history replica: EPEX prices)
+HISTORY_RAW = FluxQuery("history_raw", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r["_measurement"] == _measurement)
+      |> filter(fn: (r) => contains(value: r["_field"], set: _fields))
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+      |> group()
+      |> sort(columns: ["_time"], desc: false)
+''', params=("bucket", "measurement", "fields", "start", "stop"))
+
+EXPORT_RAW = FluxQuery("export_raw", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r["_measurement"] == _measurement)
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+      |> drop(columns: ["_start", "_stop", "_measurement"])
+      |> group()
+      |> sort(columns: ["_time"], desc: false)
+''', params=("bucket", "measurement", "start", "stop"))
+
+EXPORT_AGGREGATED = FluxQuery("export_aggregated", '''
+    from(bucket: _bucket)
+      |> range(start: _start, stop: _stop)
+      |> filter(fn: (r) => r["_measurement"] == _measurement)
+      |> aggregateWindow(every: _every, fn: mean, createEmpty: false, timeSrc: "_start")
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+      |> drop(columns: ["_start", "_stop", "_measurement"])
+      |> group()
+      |> sort(columns: ["_time"], desc: false)
+''', params=("bucket", "measurement", "start", "stop", "every"))
+
+
+# Export bounds come as RFC 3339 strings ("2025-01-01T00:00:00Z") or datetimes
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+# History rows from the local replica that may end early: Influx was unreachable and the replica is only
+# complete up to its last sync (the API must not cache them as a closed period)
+class PartialHistory(list):
+    pass
+
+
+def _influx_client_class():
+    global InfluxDBClient
+    if InfluxDBClient is None:
+        from influxdb_client import InfluxDBClient as client_class
+        InfluxDBClient = client_class
+    return InfluxDBClient
+
 
 class DB_Bridge:
     def __init__(self):
-        env_path = find_dotenv()
-        if not env_path:
-            raise FileNotFoundError("No .env file found - please create one")
-        load_dotenv(env_path)
-
-        self.url = os.getenv("INFLUX_URL")
-        self.token = os.getenv("INFLUX_TOKEN")
-        self.org = os.getenv("INFLUX_ORG")
-        self.bucket = os.getenv("INFLUX_BUCKET")
+        settings = influx_settings()
+        self.url = settings["url"]
+        self.token = settings["token"]
+        self.org = settings["org"]
+        self.bucket = settings["bucket"]
 
         if not all([self.url, self.token, self.org, self.bucket]):
             raise ValueError("Missing InfluxDB environment variables")
 
-        self.client = InfluxDBClient(
-            url=self.url,
-            token=self.token,
-            org=self.org,
-            bucket=self.bucket
-        )
-        self.query_api = self.client.query_api()
+        # Clients come from the process-wide factory (shared with LoggingBridge) and are created on first use:
+        # the app starts (and serves /api/mode etc.) even while Influx is down
+        self._query_api = None
         self.timezone = pytz.timezone("Europe/Vienna")
+        # Result timestamps use zoneinfo: orjson encodes them natively, pytz zones call back into Python per value
+        self.result_timezone = ZoneInfo("Europe/Vienna")
+
+        # Result decoders: only the listed columns are read from the CSV rows and converted
+        self._local_time = to_local_time(self.result_timezone)
+        self._pv_record = RecordDecoder({"_time": self._local_time, **{f: to_float for f in PV_FIELDS}})
+        self._boiler_record = RecordDecoder({"_time": self._local_time, "boiler_temp": to_float})
+        self._epex_record = RecordDecoder({"_time": self._local_time, "price": to_float})
+        self._epex_value = RecordDecoder({"_time": self._local_time, "_value": to_float})
+        self._dialect = None
+
+        # Local copy of the history measurements (stores.history_replica), attached by the ServiceManager
+        self.replica = None
+
+    @property
+    def client(self):
+        return INFLUX_CLIENTS.client("default", _influx_client_class())
+
+    @property
+    def query_api(self):
+        if self._query_api is None:
+            self._query_api = self.client.query_api()
+        return self._query_api
+
+    # Client of the export profile: own connection pool and a long timeout
+    @property
+    def export_client(self):
+        return INFLUX_CLIENTS.client("export", _influx_client_class())
+
+    # Runs a template query and decodes its CSV rows (header rows + data rows, see flux_queries)
+    def _decoded(self, template: FluxQuery, decode, params: dict):
+        if self._dialect is None:
+            from influxdb_client import Dialect
+            self._dialect = Dialect(**CSV_DIALECT)
+        rows = self.query_api.query_csv(template.text, org=self.org, dialect=self._dialect,
+                                        params=template.bind(**params))
+        return decode(rows)
+
+    # Template query -> list of dicts; timed until the last row is decoded
+    def _records(self, method: str, template: FluxQuery, decoder: RecordDecoder, **params) -> list:
+        return self._timed(method, self._decoded, template, decoder.records, params)
+
+    # Calls fn, timed per calling method for /metrics (errors are counted and re-raised)
+    @staticmethod
+    def _timed(method: str, fn, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            QUERY_ERRORS.labels(method).inc()
+            raise
+        finally:
+            QUERY_SECONDS.labels(method).observe(time.perf_counter() - started)
+
+    # History read: from the replica if it serves the range, else from Influx (and from the replica if Influx fails
+    # or is known to be down; rows past the last sync are missing then -> PartialHistory)
+    def _history(self, measurement, start, stop, from_replica, from_influx, every=None):
+        replica = self.replica
+        if replica is not None and replica.serves(measurement, start, stop, every):
+            return from_replica(replica)
+        if replica is None or not replica.has(measurement, start, every):
+            return from_influx()
+        if replica.influx_health.healthy:
+            try:
+                return from_influx()
+            except Exception as e:
+                print(f"[replica] InfluxDB-Abfrage fehlgeschlagen ({e}), {measurement} aus lokaler Kopie")
+        rows = from_replica(replica)
+        if isinstance(rows, list) and not replica.complete(measurement, stop):
+            return PartialHistory(rows)
+        return rows
 
-    # Helper: clean record and convert _time
-    def clean_record(self, record, keep_fields=None):
-        if not record:
-            return {}
-        
-        # Convert _time to ISO format in local timezone
-        if "_time" in record and hasattr(record["_time"], "astimezone"):
-            record["_time"] = record["_time"].astimezone(self.timezone).isoformat()
-
-        # Only keep specified fields (default: all relevant PV fields + boiler_temp + price)
-        default_keep = ["_time", "pv_power", "grid_power", "load_power",
-                        "battery_power", "soc", "e_day", "e_year", "e_total",
-                        "rel_autonomy", "rel_selfconsumption",
-                        "boiler_temp", "price"]
-        keep_fields = keep_fields or default_keep
-
-        # Create a new dict with only the desired fields
-        cleaned = {k: record[k] for k in keep_fields if k in record}
-        return cleaned
-    
     # Check connection
     def check_connection(self):
         health = self.client.health()
@@ -56,31 +237,10 @@ class DB_Bridge:
 
     # Get the latest PV data point (last 1 hour)
     def get_latest_pv_data(self):
-        query = f'''
-        from(bucket: "{self.bucket}")
-        |> range(start: -1h)
-        |> filter(fn: (r) => r["_measurement"] == "pv_measurements")
-        |> filter(fn: (r) =>
-            r["_field"] == "battery_power" or
-            r["_field"] == "e_total" or
-            r["_field"] == "grid_power" or
-            r["_field"] == "load_power" or
-            r["_field"] == "pv_power" or
-            r["_field"] == "rel_autonomy" or
-            r["_field"] == "rel_selfconsumption" or
-            r["_field"] == "soc"
-        )
-        |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
-        |> sort(columns: ["_time"], desc: true)
-        |> limit(n:1)
-        |> pivot(rowKey:["_time"], columnKey:["_field"], valueColumn:"_value")
-        '''
         try:
-            # Convert to list of dicts and clean the record
-            tables = self.query_api.query(query, org=self.org)
-            if tables and len(tables[0].records) > 0:
-                record = tables[0].records[0].values
-                cleaned = self.clean_record(record)
+            records = self._records("get_latest_pv_data", LATEST_PV, self._pv_record, bucket=self.bucket)
+            if records:
+                cleaned = records[0]
 
                 # Rename InfluxDB field names to application-level keys
                 # PVSurplusService expects: pv_power_kw, house_load_kw, battery_power_kw
@@ -118,24 +278,12 @@ class DB_Bridge:
             is_dst=None
         )
 
-        query = f'''
-        from(bucket: "{self.bucket}")
-        |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
-        |> filter(fn: (r) => r._measurement == "pv_measurements")
-        |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
-        |> pivot(
-            rowKey: ["_time"],
-            columnKey: ["_field"],
-            valueColumn: "_value"
+        return self._history(
+            "pv_measurements", start_time, end_time,
+            lambda replica: replica.records("pv_measurements", start_time, end_time),
+            lambda: self._records("get_daily_pv_data", PV_HISTORY, self._pv_record,
+                                  bucket=self.bucket, start=start_time, stop=end_time),
         )
-        '''
-        # Convert to list of dicts and clean the records
-        tables = self.query_api.query(query, org=self.org)
-        return [
-            self.clean_record(r.values)
-            for t in tables
-            for r in t.records
-        ]
         
     # Get monthly PV data for a specific month or current month
     def get_monthly_pv_data(self, month: str | None = None):
@@ -164,25 +312,12 @@ class DB_Bridge:
             is_dst=None
         ) - timedelta(seconds=1)
 
-        query = f'''
-        from(bucket: "{self.bucket}")
-        |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
-        |> filter(fn: (r) => r._measurement == "pv_measurements")
-        |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
-        |> pivot(
-            rowKey: ["_time"],
-            columnKey: ["_field"],
-            valueColumn: "_value"
+        return self._history(
+            "pv_measurements", start_time, end_time,
+            lambda replica: replica.records("pv_measurements", start_time, end_time),
+            lambda: self._records("get_monthly_pv_data", PV_HISTORY, self._pv_record,
+                                  bucket=self.bucket, start=start_time, stop=end_time),
         )
-        '''
-
-        # Convert to list of dicts and clean the records
-        tables = self.query_api.query(query, org=self.org)
-        return [
-            self.clean_record(r.values)
-            for t in tables
-            for r in t.records
-        ]
         
     # Get yearly PV data for a specific year or current year
     def get_yearly_pv_data(self, year: int | None = None):
@@ -202,66 +337,31 @@ class DB_Bridge:
             is_dst=None
             )
 
-        query = f'''
-        from(bucket: "{self.bucket}")
-        |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
-        |> filter(fn: (r) => r._measurement == "pv_measurements")
-        |> aggregateWindow(every: 15m, fn: mean, createEmpty: false, timeSrc: "_start")
-        |> pivot( rowKey: ["_time"],columnKey: ["_field"],valueColumn: "_value"
-        )
-        '''
         try:
-            # Convert to list of dicts and clean the records
-            tables = self.query_api.query(query, org=self.org)
-            return [
-                self.clean_record(r.values)
-                for t in tables
-                for r in t.records
-            ]
+            return self._history(
+                "pv_measurements", start_time, end_time,
+                lambda replica: replica.records("pv_measurements", start_time, end_time),
+                lambda: self._records("get_yearly_pv_data", PV_HISTORY, self._pv_record,
+                                      bucket=self.bucket, start=start_time, stop=end_time),
+            )
         except Exception as e:
             print(f"Error querying yearly PV data (2h aggregated): {e}")
             return []
 
     # Get the latest boiler data point (last 1 hour)
     def get_latest_boiler_data(self):
-        query = f'''
-        from(bucket: "{self.bucket}")
-          |> range(start: -1h)
-          |> filter(fn: (r) => r["_measurement"] == "boiler_measurements")
-          |> filter(fn: (r) => r["_field"] == "boiler_temp")
-          |> sort(columns: ["_time"], desc: true)
-          |> limit(n:1)
-          |> pivot(rowKey:["_time"], columnKey:["_field"], valueColumn:"_value")
-        '''
         try:
-            # Convert to list of dicts and clean the record
-            tables = self.query_api.query(query, org=self.org)
-            if tables and len(tables[0].records) > 0:
-                record = tables[0].records[0].values
-                return self.clean_record(record, keep_fields=["_time", "boiler_temp"])
-            return None
+            records = self._records("get_latest_boiler_data", LATEST_BOILER, self._boiler_record, bucket=self.bucket)
+            return records[0] if records else None
         except Exception as e:
             print(f"Error querying latest Boiler data: {e}")
             return None
 
     # Get the latest EPEX price data point (last 24 hours)
     def get_latest_epex_data(self):
-        query = f'''
-        from(bucket: "{self.bucket}")
-          |> range(start: -24h)
-          |> filter(fn: (r) => r["_measurement"] == "epex_prices")
-          |> filter(fn: (r) => r["_field"] == "price")
-          |> sort(columns: ["_time"], desc: true)
-          |> limit(n:1)
-          |> pivot(rowKey:["_time"], columnKey:["_field"], valueColumn:"_value")
-        '''
         try:
-            # Convert to list of dicts and clean the record
-            tables = self.query_api.query(query, org=self.org)
-            if tables and len(tables[0].records) > 0:
-                record = tables[0].records[0].values
-                return self.clean_record(record, keep_fields=["_time", "price"])
-            return None
+            records = self._records("get_latest_epex_data", LATEST_EPEX, self._epex_record, bucket=self.bucket)
+            return records[0] if records else None
         except Exception as e:
             print(f"Error querying latest EPEX data: {e}")
             return None
@@ -270,7 +370,7 @@ class DB_Bridge:
     def get_current_epex_price(self):
         try:
             data = self.get_latest_epex_data()
-            if data and "price" in data:
+            if data and data.get("price") is not None:
                 return float(data["price"])
             return None
         except Exception as e:
@@ -279,26 +379,107 @@ class DB_Bridge:
         
     # Get EPEX prices for a specific time range
     def query_epex_prices(self, start_time, end_time):
-        query = f'''
-        from(bucket: "{self.bucket}")
-        |> range(start: {start_time.isoformat()}, stop: {end_time.isoformat()})
-        |> filter(fn: (r) => r["_measurement"] == "epex_prices")
-        |> filter(fn: (r) => r["_field"] == "price")
-        |> sort(columns: ["_time"], desc: false)
-        '''
-        
         try:
-            # Convert to list of dicts and clean the records, then extract prices
-            tables = self.query_api.query(query, org=self.org)
-            prices = []
-            for table in tables:
-                for record in table.records:
-                    price = record.get_value()
-                    if price is not None:
-                        prices.append(float(price))
-            
-            return prices
-            
+            series = self._history(
+                "epex_prices", start_time, end_time,
+                lambda replica: self._replica_prices(replica, start_time, end_time),
+                lambda: self._price_series("query_epex_prices", start_time, end_time),
+            )
+            return [price for _, price in series]
+
         except Exception as e:
             print(f"Error querying EPEX prices: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    # Get EPEX prices with timestamps for a specific time range (also future day-ahead prices)
+    # Returns [(datetime, price), ...] sorted by time
+    def get_epex_price_series(self, start_time, end_time):
+        try:
+            series = self._history(
+                "epex_prices", start_time, end_time,
+                lambda replica: self._replica_prices(replica, start_time, end_time),
+                lambda: self._price_series("get_epex_price_series", start_time, end_time),
+            )
+            series.sort(key=lambda item: item[0])
+            return series
+
+        except Exception as e:
+            print(f"Error querying EPEX price series: {e}")
+            return []
+
+    # EPEX prices from Influx as [(datetime, price), ...] (null prices skipped)
+    def _price_series(self, method, start_time, end_time):
+        records = self._records(method, EPEX_PRICES, self._epex_value,
+                                bucket=self.bucket, start=start_time, stop=end_time)
+        return [(r["_time"], r["_value"]) for r in records if r.get("_value") is not None]
+
+    @staticmethod
+    def _replica_prices(replica, start_time, end_time):
+        records = replica.records("epex_prices", start_time, end_time)
+        return [(r["_time"], r["price"]) for r in records if r.get("price") is not None]
+
+    # Bulk history for replay/backtests: one query per measurement, aggregated to 'every'
+    # Returns column arrays {"time": [datetime, ...], field: [value or None, ...]} sorted by time
+    def query_history(self, measurement, fields, start_time, end_time, every="15m"):
+        decoder = ColumnDecoder(fields, time=self._local_time)
+        try:
+            window = parse_duration(every)
+            params = {"bucket": self.bucket, "measurement": measurement, "fields": list(fields),
+                      "start": start_time, "stop": end_time, "every": window}
+            return self._history(
+                measurement, start_time, end_time,
+                lambda replica: replica.columns(measurement, fields, start_time, end_time, window),
+                lambda: self._timed("query_history", self._decoded, HISTORY, decoder.columns, params),
+                every=window,
+            )
+
+        except Exception as e:
+            print(f"Error querying {measurement} history: {e}")
+            return {"time": [], **{f: [] for f in fields}}
+
+    # Rows for the local history replica, always from Influx: column arrays in UTC, aggregated if 'every' is given
+    # Errors are raised (the replica must not advance its high-water mark past a failed query)
+    def replica_rows(self, measurement, fields, start_time, end_time, every=None):
+        decoder = ColumnDecoder(fields)
+        params = {"bucket": self.bucket, "measurement": measurement, "fields": list(fields),
+                  "start": start_time, "stop": end_time}
+        if every:
+            params["every"] = parse_duration(every)
+            return self._timed("replica_sync", self._decoded, HISTORY, decoder.columns, params)
+        return self._timed("replica_sync", self._decoded, HISTORY_RAW, decoder.columns, params)
+
+    # Template + parameters of a bulk export: one row per timestamp (fields as columns), optionally aggregated
+    def _export_query(self, measurement, start, stop, every=None):
+        params = {"bucket": self.bucket, "measurement": measurement,
+                  "start": _as_datetime(start), "stop": _as_datetime(stop)}
+        if every:
+            return EXPORT_AGGREGATED, EXPORT_AGGREGATED.bind(every=parse_duration(every), **params)
+        return EXPORT_RAW, EXPORT_RAW.bind(**params)
+
+    # Streams an export as CSV rows straight from Influx (first row = header); nothing is buffered
+    def export_csv_rows(self, measurement, start, stop, every=None):
+        from influxdb_client import Dialect
+
+        template, params = self._export_query(measurement, start, stop, every)
+        rows = self.export_client.query_api().query_csv(
+            template.text, org=self.org, dialect=Dialect(**CSV_DIALECT), params=params
+        )
+        return self._timed_stream("export_csv", rows)
+
+    # Streams an export as records ({"_time": datetime, field: value, ...})
+    def export_records(self, measurement, start, stop, every=None):
+        template, params = self._export_query(measurement, start, stop, every)
+        records = self.export_client.query_api().query_stream(template.text, org=self.org, params=params)
+        return self._timed_stream("export_records", (record.values for record in records))
+
+    # Duration of a streamed query = until the last row was consumed
+    @staticmethod
+    def _timed_stream(method, rows):
+        started = time.perf_counter()
+        try:
+            yield from rows
+        except Exception:
+            QUERY_ERRORS.labels(method).inc()
+            raise
+        finally:
+            QUERY_SECONDS.labels(method).observe(time.perf_counter() - started)
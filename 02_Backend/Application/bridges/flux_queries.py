@@ -0,0 +1,117 @@
+import re
+import textwrap
+from datetime import datetime, timedelta
+
+# Result format of all template queries: plain CSV with one header row per table, no annotation rows
+# (the decoders below convert the cells themselves, only for the columns they need)
+CSV_DIALECT = {"header": True, "annotations": [], "date_time_format": "RFC3339"}
+
+_DURATION = re.compile(r"^([1-9][0-9]{0,3})(s|m|h|d|w)$")
+_DURATION_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+_PARAM_TYPES = (datetime, timedelta, str, int, float, bool, tuple, list)
+
+
+class FluxQueryError(RuntimeError):
+    pass
+
+
+# "15m", "1h", "1d" -> timedelta (Flux durations are passed as parameters, never formatted into the query)
+def parse_duration(value) -> timedelta:
+    if isinstance(value, timedelta):
+        return value
+    match = _DURATION.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid duration '{value}'. Use e.g. 15m, 1h or 1d")
+    return timedelta(**{_DURATION_UNITS[match.group(2)]: int(match.group(1))})
+
+
+# Cell converters: CSV cell (str) -> Python value, empty cell (null) -> None
+def to_float(cell):
+    return float(cell) if cell else None
+
+
+def to_time(cell):
+    # RFC 3339 in UTC ("...Z"), understood by fromisoformat since Python 3.11
+    return datetime.fromisoformat(cell) if cell else None
+
+
+def to_str(cell):
+    return cell or None
+
+
+# Converter for _time that also moves the timestamp into the result time zone
+def to_local_time(timezone):
+    def convert(cell):
+        return datetime.fromisoformat(cell).astimezone(timezone) if cell else None
+    return convert
+
+
+# A Flux query defined once: the text is fixed, values come in as query parameters (params=)
+# - Every parameter 'name' is referenced as '_name' in the text; Influx binds it as an option, so no value
+#   is ever formatted into the query (no quoting, no injection)
+# - bind() checks that exactly the declared parameters are given and have a type the client can send
+class FluxQuery:
+    def __init__(self, name, text, params=()):
+        self.name = name
+        self.text = textwrap.dedent(text).strip()
+        self.params = tuple(params)
+        for param in self.params:
+            if f"_{param}" not in self.text:
+                raise ValueError(f"Flux query {name}: parameter _{param} is not used")
+
+    def bind(self, **values) -> dict:
+        if set(values) != set(self.params):
+            raise TypeError(f"Flux query {self.name} expects parameters {self.params}, got {tuple(values)}")
+        bound = {}
+        for param, value in values.items():
+            # None would be dropped by the client -> undefined identifier in Flux
+            if value is None or not isinstance(value, _PARAM_TYPES):
+                raise TypeError(f"Flux query {self.name}: invalid value for {param}: {value!r}")
+            bound[f"_{param}"] = value
+        return bound
+
+
+# Decodes the CSV rows of a template query into dicts, converting only the given columns
+# columns: {column name: converter}; columns missing in a table are left out of its records
+class RecordDecoder:
+    def __init__(self, columns: dict):
+        self.columns = dict(columns)
+
+    def decode(self, rows):
+        selected = None
+        error = False
+        for row in rows:
+            if len(row) < 3:
+                continue
+            # Header row: first cells are "", "result", "table" (or "", "error", "reference" for a failed query)
+            if row[1] == "result":
+                selected = [(name, row.index(name), convert)
+                            for name, convert in self.columns.items() if name in row]
+                error = False
+                continue
+            if row[1] == "error":
+                error = True
+                continue
+            if error:
+                raise FluxQueryError(row[1] or "Flux query failed")
+            if selected is None:
+                continue
+            yield {name: convert(row[i]) for name, i, convert in selected}
+
+    def records(self, rows) -> list:
+        return list(self.decode(rows))
+
+
+# Decodes the rows into column arrays {"time": [...], field: [...]} (fields missing in the result stay None)
+class ColumnDecoder:
+    def __init__(self, fields, convert=to_float, time=to_time):
+        self.fields = tuple(fields)
+        self._records = RecordDecoder({"_time": time, **{field: convert for field in self.fields}})
+
+    def columns(self, rows) -> dict:
+        columns = {"time": [], **{field: [] for field in self.fields}}
+        for record in self._records.decode(rows):
+            columns["time"].append(record["_time"])
+            for field in self.fields:
+                columns[field].append(record.get(field))
+        return columns
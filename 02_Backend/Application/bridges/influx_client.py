@@ -0,0 +1,227 @@
+import os
+import socket
+import threading
+import time
+
+from dotenv import find_dotenv, load_dotenv
+
+from services.metrics_registry import REGISTRY
+
+# HTTP timeout of the export client: a year of raw data takes minutes to stream
+EXPORT_TIMEOUT_MS = 10 * 60 * 1000
+
+# One pooled client per profile and process, shared by all bridges (query and write API use the same pool)
+# timeout: ms, total or (connect, read); pool_size: connections kept open for reuse
+CLIENT_PROFILES = {
+    # API requests (gthread workers: 8 threads), scheduler tick and log writer
+    "default": {"timeout": (3_000, 30_000), "pool_size": 10},
+    # Bulk exports: own pool, so a running export never takes the connections of the control loop's queries
+    "export": {"timeout": EXPORT_TIMEOUT_MS, "pool_size": 2},
+}
+
+# TCP keep-alive on pooled connections: the Influx server is remote (VPN), idle flows are dropped otherwise
+KEEPALIVE_IDLE_S = 60
+KEEPALIVE_INTERVAL_S = 20
+KEEPALIVE_COUNT = 3
+# Failed requests in a row after which Influx counts as unreachable
+UNHEALTHY_AFTER_FAILURES = 3
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+# Influx settings from .env, loaded once per process (DB_Bridge and LoggingBridge read the same file)
+def influx_settings() -> dict:
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                env_path = find_dotenv()
+                if not env_path:
+                    raise FileNotFoundError("No .env file found - please create one")
+                load_dotenv(env_path)
+                _settings = {
+                    "url": os.getenv("INFLUX_URL"),
+                    "token": os.getenv("INFLUX_TOKEN"),
+                    "org": os.getenv("INFLUX_ORG"),
+                    "bucket": os.getenv("INFLUX_BUCKET"),
+                    "bucket_logging": os.getenv("INFLUX_BUCKET_LOGGING"),
+                }
+    return dict(_settings)
+
+
+def _keepalive_options():
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # Linux names; other platforms keep the system defaults
+    for name, value in (("TCP_KEEPIDLE", KEEPALIVE_IDLE_S), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL_S),
+                        ("TCP_KEEPCNT", KEEPALIVE_COUNT)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+# Reachability of the Influx server, tracked from the results of all requests (no extra health calls)
+class ConnectionHealth:
+    def __init__(self, unhealthy_after=UNHEALTHY_AFTER_FAILURES):
+        self.unhealthy_after = unhealthy_after
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success = None
+        self.last_failure = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def success(self):
+        with self._lock:
+            self.requests += 1
+            self.consecutive_failures = 0
+            self.last_success = time.time()
+
+    def failure(self, error):
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_failure = time.time()
+            self.last_error = str(error)
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < self.unhealthy_after
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "healthy": self.healthy,
+                "requests": self.requests,
+                "failures": self.failures,
+                "consecutive_failures": self.consecutive_failures,
+                "last_success": self.last_success,
+                "last_failure": self.last_failure,
+                "last_error": self.last_error,
+            }
+
+
+# urllib3 connection class that reports every new TCP (and TLS) connection
+def _counting_connection(base, on_connect):
+    class CountingConnection(base):
+        def connect(self):
+            super().connect()
+            on_connect(self.host)
+    return CountingConnection
+
+
+# urllib3 pool class: counted connections, keep-alive, request results go to the health tracker
+def _instrumented_pool(base, on_connect, health):
+    class InstrumentedPool(base):
+        ConnectionCls = _counting_connection(base.ConnectionCls, on_connect)
+
+        def urlopen(self, method, url, *args, **kwargs):
+            try:
+                response = super().urlopen(method, url, *args, **kwargs)
+            except Exception as e:
+                health.failure(e)
+                raise
+            if response.status >= 500:
+                health.failure(f"HTTP {response.status}")
+            else:
+                health.success()
+            return response
+    return InstrumentedPool
+
+
+# Process-wide factory for InfluxDBClient instances
+# - client(profile) returns the same client for every caller: one connection pool per profile, not per bridge
+# - New connections are reported to the connection listeners (default: pvbackend_influx_connections_total)
+# - After a fork the child creates its own clients (pooled sockets must not be shared between processes)
+class InfluxClientFactory:
+    def __init__(self, profiles=None):
+        self.profiles = profiles or CLIENT_PROFILES
+        self.health = ConnectionHealth()
+        self.connections = {}
+        self._clients = {}
+        self._listeners = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    # fn(profile, host) is called for every new connection (from the requesting thread, keep it cheap)
+    def add_connection_listener(self, fn):
+        self._listeners.append(fn)
+
+    # Shared client of a profile; client_class defaults to influxdb_client.InfluxDBClient (callers pass their own
+    # reference so that it can be patched in tests)
+    def client(self, profile="default", client_class=None):
+        if profile not in self.profiles:
+            raise ValueError(f"Unknown Influx client profile '{profile}'")
+        if client_class is None:
+            from influxdb_client import InfluxDBClient as client_class
+
+        key = (profile, client_class)
+        client = self._clients.get(key) if self._pid == os.getpid() else None
+        if client is None:
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._clients = {}
+                    self._pid = os.getpid()
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._create(profile, client_class)
+        return client
+
+    def _create(self, profile, client_class):
+        settings = influx_settings()
+        options = self.profiles[profile]
+        client = client_class(
+            url=settings["url"],
+            token=settings["token"],
+            org=settings["org"],
+            timeout=options["timeout"],
+            connection_pool_maxsize=options["pool_size"],
+        )
+        self._instrument(client, profile)
+        return client
+
+    def _instrument(self, client, profile):
+        import urllib3
+
+        pool_manager = getattr(getattr(getattr(client, "api_client", None), "rest_client", None), "pool_manager", None)
+        if not isinstance(pool_manager, urllib3.PoolManager):
+            return
+
+        def on_connect(host):
+            with self._lock:
+                self.connections[profile] = self.connections.get(profile, 0) + 1
+            for listener in list(self._listeners):
+                listener(profile, host)
+
+        # Only affects pools created from now on: the client has not sent a request yet
+        pool_manager.pool_classes_by_scheme = {
+            scheme: _instrumented_pool(pool_class, on_connect, self.health)
+            for scheme, pool_class in pool_manager.pool_classes_by_scheme.items()
+        }
+        pool_manager.connection_pool_kw["socket_options"] = (
+            list(urllib3.connection.HTTPConnection.default_socket_options) + _keepalive_options()
+        )
+
+    # Closes all clients of this process (tests, shutdown)
+    def close(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                client.close()
+            except Exception as e:
+                print(f"[influx] Client konnte nicht geschlossen werden: {e}")
+
+    def stats(self) -> dict:
+        return {"connections": dict(self.connections), **self.health.snapshot()}
+
+
+INFLUX_CLIENTS = InfluxClientFactory()
+
+INFLUX_CONNECTIONS = REGISTRY.counter("pvbackend_influx_connections_total",
+                                      "New TCP/TLS connections to InfluxDB by client profile", ("profile",))
+INFLUX_CLIENTS.add_connection_listener(lambda profile, host: INFLUX_CONNECTIONS.labels(profile).inc())
+REGISTRY.callback("gauge", "pvbackend_influx_up", "1 while the last InfluxDB requests succeeded", (),
+                  lambda: [((), 1 if INFLUX_CLIENTS.health.healthy else 0)])
@@ -1,56 +1,137 @@
-import os
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
-from dotenv import find_dotenv, load_dotenv
+import atexit
+import queue
+import threading
+import time
+import weakref
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
+from bridges.influx_client import INFLUX_CLIENTS, influx_settings
+from services.metrics_registry import REGISTRY
+
+# Log entries waiting for the writer thread; when Influx is down for long, new entries are dropped beyond this
+LOG_QUEUE_SIZE = 1000
+# Max. time the process waits at exit for queued entries (seconds)
+LOG_FLUSH_TIMEOUT_S = 5.0
+
+_bridges = weakref.WeakSet()
+
+LOG_WRITES = REGISTRY.counter("pvbackend_log_writes_total", "Log entries by result (written, failed, dropped)", ("result",))
+QUERY_SECONDS = REGISTRY.histogram("pvbackend_influx_query_duration_seconds", "InfluxDB query duration by method", ("method",))
+REGISTRY.callback("gauge", "pvbackend_log_queue_depth", "Log entries waiting for the Influx writer", (),
+                  lambda: [((), sum(bridge._queue.qsize() for bridge in list(_bridges)))])
+
+
 class LoggingBridge:
     def __init__(self):
-        env_path = find_dotenv()
-        if not env_path:
-            raise FileNotFoundError("No .env file found - please create one")
-        load_dotenv()
-
-        self.url = os.getenv("INFLUX_URL")
-        self.token = os.getenv("INFLUX_TOKEN")
-        self.org = os.getenv("INFLUX_ORG")
-        self.bucket = os.getenv("INFLUX_BUCKET_LOGGING")
+        settings = influx_settings()
+        self.url = settings["url"]
+        self.token = settings["token"]
+        self.org = settings["org"]
+        self.bucket = settings["bucket_logging"]
 
         if not all([self.url, self.token, self.org, self.bucket]):
             raise ValueError("Missing InfluxDB logging configuration")
 
-        self.client = InfluxDBClient(url=self.url, token=self.token, org=self.org)
-        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
-        self.query_api = self.client.query_api()
+        # Shared client of the process (same pool as DB_Bridge's queries), created on first use
+        self._client = None
+        self._write_api = None
+        self._query_api = None
+        self._client_lock = threading.Lock()
+
+        # Writes go through a queue: logging never blocks a request or the scheduler tick, even if Influx hangs
+        self._queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._writer = None
+        self.dropped = 0
+        self.failed = 0
+        _bridges.add(self)
+
+    def _ensure_client(self):
+        with self._client_lock:
+            if self._client is None:
+                from influxdb_client.client.write_api import SYNCHRONOUS
+
+                client = INFLUX_CLIENTS.client("default")
+                self._write_api = client.write_api(write_options=SYNCHRONOUS)
+                self._query_api = client.query_api()
+                self._client = client
+
+    @property
+    def query_api(self):
+        self._ensure_client()
+        return self._query_api
+
+    # Queues one entry (measurement, tags, fields) with the current time for the writer thread
+    def _write(self, measurement: str, tags: dict, fields: dict):
+        record = {
+            "measurement": measurement,
+            "tags": tags,
+            "fields": fields,
+            "time": datetime.now(timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_WRITES.labels("dropped").inc()
+            return
+        self._start_writer()
 
-    def _write(self, point: Point):
-        self.write_api.write(bucket=self.bucket, org=self.org, record=point)
+    def _start_writer(self):
+        if self._writer is not None:
+            return
+        with self._client_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="influx-log", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                self._ensure_client()
+                from influxdb_client import WritePrecision
+                self._write_api.write(bucket=self.bucket, org=self.org, record=record, write_precision=WritePrecision.NS)
+                LOG_WRITES.labels("written").inc()
+            except Exception as e:
+                self.failed += 1
+                LOG_WRITES.labels("failed").inc()
+                print(f"[logging] Log-Eintrag konnte nicht geschrieben werden: {e}")
+            finally:
+                self._queue.task_done()
+
+    # Waits until all queued entries are written (or the timeout passed); returns True if the queue is empty
+    def flush(self, timeout_s: float = LOG_FLUSH_TIMEOUT_S) -> bool:
+        done = threading.Event()
+
+        def wait():
+            self._queue.join()
+            done.set()
+
+        threading.Thread(target=wait, daemon=True).start()
+        return done.wait(timeout_s)
 
     # 1) SYSTEM EVENT
     #    Für: Start/Stop, Modus-Wechsel, Zeitplan-Updates,
     #         EPEX-Analysen, Sitzungs-Start, Prognose-Overrides, Scheduler-Fehler
     def system_event(self, level: str, source: str, message: str):
-        point = (
-            Point("system_event")
-            .tag("level", level)     # info / warning / error
-            .tag("source", source)   # backend / modus / zeitplan / boiler_automatik / wallbox_automatik / ...
-            .field("message", message)
-            .time(datetime.now(timezone.utc), WritePrecision.NS)
+        self._write(
+            "system_event",
+            {
+                "level": level,     # info / warning / error
+                "source": source,   # backend / modus / zeitplan / boiler_automatik / wallbox_automatik / ...
+            },
+            {"message": message}
         )
-        self._write(point)
 
     # 2) API ERROR
     #    Für: Verbindungsfehler zu Wallbox, InfluxDB, Forecast-Service
     def api_error(self, device: str, endpoint: str, error):
-        point = (
-            Point("api_error")
-            .tag("device", device)
-            .tag("endpoint", endpoint)
-            .field("message", f"{device} Fehler bei {endpoint}: {error}")
-            .time(datetime.now(timezone.utc), WritePrecision.NS)
+        self._write(
+            "api_error",
+            {"device": device, "endpoint": endpoint},
+            {"message": f"{device} Fehler bei {endpoint}: {error}"}
         )
-        self._write(point)
 
     # 3) DEVICE STATE CHANGE
     #    Für: Alle Zustandsänderungen von Boiler und Wallbox,
@@ -73,16 +154,13 @@ class LoggingBridge:
         elif device == "wallbox_ampere":
             description = f"Wallbox Ladestrom: {old_state}A → {new_state}A | {reason}"
 
+        elif device == "wallbox_phases":
+            description = f"Wallbox Phasen: {old_state}-phasig → {new_state}-phasig | {reason}"
+
         else:
             description = f"{device}: {old_state} → {new_state} | {reason}"
 
-        point = (
-            Point("device_state_change")
-            .tag("device", device)
-            .field("description", description)
-            .time(datetime.now(timezone.utc), WritePrecision.NS)
-        )
-        self._write(point)
+        self._write("device_state_change", {"device": device}, {"description": description})
 
     # QUERY
     def query_logs(self, log_type: str, limit: int = 50, days: int = 30):
@@ -104,7 +182,11 @@ class LoggingBridge:
         |> limit(n: {limit})
         '''
 
-        tables = self.query_api.query(query, org=self.org)
+        started = time.perf_counter()
+        try:
+            tables = self.query_api.query(query, org=self.org)
+        finally:
+            QUERY_SECONDS.labels("query_logs").observe(time.perf_counter() - started)
         results = []
 
         for table in tables:
@@ -121,4 +203,13 @@ class LoggingBridge:
 
                 results.append({"time": ts, "message": msg})
 
-        return results
\ No newline at end of file
+        return results
+
+
+# Writes the queued log entries of all bridges at exit (bounded, Influx may be unreachable)
+def _flush_all():
+    for bridge in list(_bridges):
+        bridge.flush()
+
+
+atexit.register(_flush_all)
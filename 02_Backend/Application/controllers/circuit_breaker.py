@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+
+import requests
+
+# Breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# Raised instead of a network call while a device breaker is open.
+# Subclass of ConnectionError so existing "device offline" handlers keep working unchanged.
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    def __init__(self, name: str, retry_in_s: float):
+        super().__init__(f"{name}: Gerät nicht erreichbar (Circuit offen, nächster Versuch in {retry_in_s:.0f}s)")
+        self.name = name
+        self.retry_in_s = retry_in_s
+
+
+# Per-device circuit breaker with exponential backoff and jitter
+# CLOSED    -> requests pass through, consecutive failures are counted
+# OPEN      -> requests fail immediately until the backoff window expires
+# HALF_OPEN -> exactly one probe request is let through; success closes, failure re-opens with doubled backoff
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 2, base_delay_s: float = 5.0,
+                 max_delay_s: float = 300.0, jitter: float = 0.2, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay_s = base_delay_s
+        self.max_delay_s = max_delay_s
+        self.jitter = jitter
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = CLOSED
+        self._failures = 0        # consecutive failures in CLOSED state
+        self._trips = 0           # consecutive openings without a success in between (drives the backoff)
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._last_error = None
+        self._opened_total = 0
+
+    # Backoff for the current trip: base * 2^(trips-1), capped, with +/- jitter so several devices don't probe in lockstep
+    def _backoff_s(self) -> float:
+        delay = min(self.max_delay_s, self.base_delay_s * (2 ** max(self._trips - 1, 0)))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _open(self, now: float):
+        self._trips += 1
+        self._opened_total += 1
+        self._state = OPEN
+        self._open_until = now + self._backoff_s()
+        self._probe_in_flight = False
+
+    # Returns True if a request may be sent now. Called before every device request (lock + clock read only)
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if self._clock() < self._open_until:
+                    return False
+                self._state = HALF_OPEN
+            # HALF_OPEN: only a single probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    # True while requests are rejected (no state transition, safe for monitoring and online checks)
+    def is_open(self) -> bool:
+        with self._lock:
+            if self._state == OPEN:
+                return self._clock() < self._open_until
+            return self._state == HALF_OPEN and self._probe_in_flight
+
+    def retry_in_s(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(self._open_until - self._clock(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trips = 0
+            self._probe_in_flight = False
+            self._last_error = None
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._last_error = str(error) if error is not None else None
+            if self._state == HALF_OPEN:
+                self._open(self._clock())
+                return
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._failures = 0
+                self._open(self._clock())
+
+    # Manually close the breaker (e.g. after the device config changed)
+    def reset(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trips = 0
+            self._open_until = 0.0
+            self._probe_in_flight = False
+            self._last_error = None
+
+    # Monitoring snapshot for /api/state
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_in = max(self._open_until - self._clock(), 0.0) if self._state == OPEN else 0.0
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "opened_total": self._opened_total,
+                "retry_in_s": round(retry_in, 1),
+                "last_error": self._last_error,
+            }
+
+
+# Process-wide registry: one breaker per device, shared by all controller instances
+_breakers: dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _breakers[name] = breaker
+        return breaker
+
+
+def all_breakers() -> dict[str, CircuitBreaker]:
+    with _registry_lock:
+        return dict(_breakers)
@@ -1,42 +1,81 @@
 import os
 import json
+import threading
 import time
 import requests
 from decimal import Decimal
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from controllers.circuit_breaker import CircuitBreaker, CircuitOpenError, get_breaker
+from services.metrics_registry import observe_http
+from services.single_flight import SingleFlight
+
 # CAR STATUS ENUM (laut go-eCharger API v2 Doku):
 CAR_CONNECTED_STATES = {2, 3, 4}
 
+# Einstellbarer Ladestrom der go-eCharger (A), jeder ganzzahlige Wert dazwischen
+MIN_AMPERE = 6
+MAX_AMPERE = 16
+
 # Retry-Konfiguration für go-eCharger V3
 # Die Hardware bricht gelegentlich HTTP-Verbindungen bei aktivem Laden ab (Firmware-Bug).
-# 2 Versuche mit 1s Pause fangen ~95% der transienten Fehler ab, ohne den Scheduler nennenswert zu verzögern.
+# Ein sofortiger zweiter Versuch fängt die transienten Abbrüche ab – ohne sleep() auf dem aufrufenden Thread.
+# Ist die Wallbox wirklich offline, öffnet der Circuit Breaker und weitere Aufrufe scheitern sofort (Backoff mit Jitter).
 _RETRY_ATTEMPTS = 2
-_RETRY_DELAY_S  = 1.0
 
+# Freshness window for wallbox reads: API clients and the scheduler polling at the same time share one
+# pair of HTTP requests instead of each hitting the charger's embedded web server
+_FRESHNESS_S = 2.0
+
+
+def _get_with_retry(url: str, timeout: int = 5, params: dict = None, breaker: CircuitBreaker = None) -> requests.Response:
+    if breaker is not None and not breaker.allow_request():
+        raise CircuitOpenError(breaker.name, breaker.retry_in_s())
 
-def _get_with_retry(url: str, timeout: int = 5, params: dict = None) -> requests.Response:
     last_exc = None
-    for attempt in range(_RETRY_ATTEMPTS):
+    for _ in range(_RETRY_ATTEMPTS):
+        started = time.perf_counter()
         try:
             resp = requests.get(url, params=params, timeout=timeout)
-            resp.raise_for_status()
-            return resp
-        except (requests.exceptions.ConnectTimeout,
-                requests.exceptions.ConnectionError) as e:
+        except requests.exceptions.ConnectionError as e:
+            observe_http("wallbox", "connection_error", started)
             last_exc = e
-            if attempt < _RETRY_ATTEMPTS - 1:
-                time.sleep(_RETRY_DELAY_S)
-        except requests.exceptions.HTTPError:
+            continue
+        except Exception as e:
+            observe_http("wallbox", "error", started)
+            # Read timeouts etc. are not retried, but still count against the breaker
+            if breaker is not None:
+                breaker.record_failure(e)
             raise
+
+        # Device answered -> reachable, even if the status code is an error
+        observe_http("wallbox", str(resp.status_code), started)
+        if breaker is not None:
+            breaker.record_success()
+        resp.raise_for_status()
+        return resp
+
+    if breaker is not None:
+        breaker.record_failure(last_exc)
     raise last_exc
 
 
 class WallboxController:
-    def __init__(self, config_path: str = "config/devices.json"):
+    def __init__(self, config_path: str = "config/devices.json", freshness_s: float = _FRESHNESS_S):
         # Load device configuration from JSON configuration file
         self.config_path = os.path.abspath(config_path)
+
+        # Shared per-device breaker: an offline wallbox costs one lock + clock read per call instead of HTTP timeouts
+        self.breaker = get_breaker("wallbox")
+        self._last_data = None
+
+        # Guards the _intended_* fields and _last_data (API threads and the scheduler thread use the same controller)
+        self._state_lock = threading.RLock()
+
+        # Concurrent reads share one in-flight fetch, repeats within freshness_s are served from memory
+        self._reader = SingleFlight(self._fetch_uncached, ttl_s=freshness_s, name="wallbox")
+
         self.load_config()
         
     def load_config(self):
@@ -55,17 +94,23 @@ class WallboxController:
         base_url = wallbox_config.get("baseUrl")
         endpoints = wallbox_config.get("endpoints", {})
 
-        self.status_url, self.api_status_url, self.mqtt_url = (
-            f"{base_url}{endpoints.get('status', '/status')}",
-            f"{base_url}{endpoints.get('api', '/api/status')}",
-            f"{base_url}{endpoints.get('mqtt', '/mqtt')}"
-        )
+        with self._state_lock:
+            self.status_url, self.api_status_url, self.mqtt_url = (
+                f"{base_url}{endpoints.get('status', '/status')}",
+                f"{base_url}{endpoints.get('api', '/api/status')}",
+                f"{base_url}{endpoints.get('mqtt', '/mqtt')}"
+            )
+
+            # Prevents log spam when the wallbox resets alw=1 on its own
+            self._intended_allow = None
+            # Tracks expected car state until hardware catches up
+            self._intended_car = None
+            self._intended_car_until = None
 
-        # Prevents log spam when the wallbox resets alw=1 on its own
-        self._intended_allow = None
-        # Tracks expected car state until hardware catches up
-        self._intended_car = None
-        self._intended_car_until = None
+            # New address -> give the device a fresh chance and forget the old device's state
+            self.breaker.reset()
+            self._last_data = None
+            self._reader.invalidate()
 
     # Safely convert a value to Decimal (avoids None or invalid numbers)
     def safe_decimal(self, value):
@@ -75,12 +120,23 @@ class WallboxController:
             return Decimal(0)
 
     # Fetch and combine data from both Wallbox endpoints
-    def fetch_data(self):
+    # While the breaker is open the last known state is returned immediately (marked as stale)
+    # max_age_s=0 forces a fresh read (still shared with a fetch that is already in flight)
+    def fetch_data(self, max_age_s: float | None = None):
+        last = self._last_data
+        if last is not None and self.breaker.is_open():
+            return {**last, "stale": True}
+
+        # Callers get their own copy, the cached dict stays untouched
+        return dict(self._reader.get(max_age_s))
+
+    # Performs the actual HTTP requests, only ever called through the single-flight reader
+    def _fetch_uncached(self):
         try:
-            status_resp = _get_with_retry(self.status_url)
+            status_resp = _get_with_retry(self.status_url, breaker=self.breaker)
             status_data = status_resp.json()
 
-            api_resp = _get_with_retry(self.api_status_url)
+            api_resp = _get_with_retry(self.api_status_url, breaker=self.breaker)
             api_data = api_resp.json()
 
             # Extract phase info (normalize to 3 phases)
@@ -93,21 +149,22 @@ class WallboxController:
 
             # If hardware hasn't caught up yet, use intended state
             now_dt = datetime.now(ZoneInfo("Europe/Vienna"))
-            if self._intended_car is not None:
-                if self._intended_car_until and now_dt > self._intended_car_until:
-                    # Timeout expired -> trust hardware
-                    self._intended_car = None
-                    self._intended_car_until = None
-                elif car_raw == 1:
-                    # Hardware reports no car -> override immediately, never fake car_connected
-                    self._intended_car = None
-                    self._intended_car_until = None
-                elif car_raw == self._intended_car or car_raw in CAR_CONNECTED_STATES:
-                    # Hardware has caught up, reset
-                    self._intended_car = None
-                    self._intended_car_until = None
-                else:
-                    car_raw = self._intended_car
+            with self._state_lock:
+                if self._intended_car is not None:
+                    if self._intended_car_until and now_dt > self._intended_car_until:
+                        # Timeout expired -> trust hardware
+                        self._intended_car = None
+                        self._intended_car_until = None
+                    elif car_raw == 1:
+                        # Hardware reports no car -> override immediately, never fake car_connected
+                        self._intended_car = None
+                        self._intended_car_until = None
+                    elif car_raw == self._intended_car or car_raw in CAR_CONNECTED_STATES:
+                        # Hardware has caught up, reset
+                        self._intended_car = None
+                        self._intended_car_until = None
+                    else:
+                        car_raw = self._intended_car
 
             data = {
                 "_time": datetime.now(ZoneInfo("Europe/Vienna")).isoformat(),
@@ -132,8 +189,12 @@ class WallboxController:
                 1 if data["car_connected"] == 1 and data["alw"] == 1 and data["amp"] > 0 else 0
             )
 
+            with self._state_lock:
+                self._last_data = data
             return data
 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Error fetching Wallbox data: {e}")
             raise
@@ -144,11 +205,16 @@ class WallboxController:
 
         _get_with_retry(
             self.mqtt_url,
-            params={"payload": f"alw={alw_value}"}
+            params={"payload": f"alw={alw_value}"},
+            breaker=self.breaker
         )
 
         # Update intended states immediately after successful command
-        self._intended_allow = allow
+        with self._state_lock:
+            self._intended_allow = allow
+
+        # Cached reads are outdated now
+        self._reader.invalidate()
 
         # Only set _intended_car if a car is actually connected (car in {2,3,4})
         # Bridges the 1-2s hardware latency after the command
@@ -157,12 +223,16 @@ class WallboxController:
             current_car = int(self.fetch_data().get("car", 0))
         except Exception:
             current_car = 0
-        if current_car in CAR_CONNECTED_STATES:
-            self._intended_car = 2 if allow else 3  # 2=Charging, 3=WaitCar
-            self._intended_car_until = datetime.now(ZoneInfo("Europe/Vienna")) + timedelta(seconds=10)
-        else:
-            self._intended_car = None
-            self._intended_car_until = None
+        with self._state_lock:
+            if current_car in CAR_CONNECTED_STATES:
+                self._intended_car = 2 if allow else 3  # 2=Charging, 3=WaitCar
+                self._intended_car_until = datetime.now(ZoneInfo("Europe/Vienna")) + timedelta(seconds=10)
+            else:
+                self._intended_car = None
+                self._intended_car_until = None
+
+        # Next read applies the intended car state
+        self._reader.invalidate()
 
         return {
             "alw": alw_value,
@@ -174,22 +244,25 @@ class WallboxController:
             data = self.fetch_data()
             hw_allow = bool(data.get("alw"))
 
-            # If hardware reports a different value than last set, return intended state to prevent the scheduler from acting
-            if self._intended_allow is not None and hw_allow != self._intended_allow:
-                return self._intended_allow
+            with self._state_lock:
+                # If hardware reports a different value than last set, return intended state to prevent the scheduler from acting
+                if self._intended_allow is not None and hw_allow != self._intended_allow:
+                    return self._intended_allow
 
-            # Hardware matches intended (or no intended set yet) -> trust hardware
-            self._intended_allow = hw_allow
-            return hw_allow
+                # Hardware matches intended (or no intended set yet) -> trust hardware
+                self._intended_allow = hw_allow
+                return hw_allow
 
         except Exception:
             # On error: return last known intended state
             return self._intended_allow
 
     def is_online(self) -> bool:
+        # Open breaker -> known offline, no network round trip
+        if self.breaker.is_open():
+            return False
         try:
-            self.fetch_data()
-            return True
+            return not self.fetch_data().get("stale", False)
         except Exception:
             return False
 
@@ -201,21 +274,39 @@ class WallboxController:
         except Exception:
             return 0
 
-    # Set charging current (Ampere)
+    # Set charging current (Ampere), every integer value between 6 and 16 A
     def set_charging_ampere(self, amp: int):
-        allowed_values = [6, 10, 12, 14, 16]
-
-        if amp not in allowed_values:
+        if isinstance(amp, bool) or not isinstance(amp, int) or not (MIN_AMPERE <= amp <= MAX_AMPERE):
             raise ValueError(
-                f"Invalid amp value. Allowed values: {allowed_values}"
+                f"Invalid amp value. Allowed values: {MIN_AMPERE}-{MAX_AMPERE}"
             )
 
         _get_with_retry(
             self.mqtt_url,
-            params={"payload": f"amx={amp}"}
+            params={"payload": f"amx={amp}"},
+            breaker=self.breaker
         )
+        self._reader.invalidate()
 
         return {
             "amp": amp,
             "message": "Charging ampere updated"
-        }
\ No newline at end of file
+        }
+
+    # Switch between single and three phase charging (go-e phase switch mode: psm=1 -> 1 phase, psm=2 -> 3 phases)
+    def set_phase_count(self, phases: int):
+        if phases not in (1, 3):
+            raise ValueError("Invalid phase count. Allowed values: 1, 3")
+
+        psm = 1 if phases == 1 else 2
+        _get_with_retry(
+            self.mqtt_url,
+            params={"payload": f"psm={psm}"},
+            breaker=self.breaker
+        )
+        self._reader.invalidate()
+
+        return {
+            "phases": phases,
+            "message": "Phase mode updated"
+        }
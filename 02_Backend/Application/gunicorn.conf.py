@@ -0,0 +1,21 @@
+import os
+import secrets
+
+# Production server: gunicorn -c gunicorn.conf.py app:app
+# Several workers serve the API; the worker holding data/scheduler.lock runs the scheduler and owns the boiler relay,
+# the others forward relay commands, plan and metrics to it over data/scheduler.control/control.sock
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5050")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "gthread"
+# SSE clients (/api/stream) keep a thread busy for the whole connection
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Every worker builds its own ServiceManager after the fork (threads, sockets and GPIO must not be shared)
+preload_app = False
+
+# Set in the master -> inherited by all workers
+os.environ.setdefault("SCHEDULER_LEADER_LOCK", "data/scheduler.lock")
+os.environ.setdefault("CONTROL_AUTHKEY", secrets.token_hex(16))
+# Local replica of the history measurements, synced by the leader, read by all workers
+os.environ.setdefault("HISTORY_REPLICA_PATH", "data/history_replica.sqlite3")
@@ -1,5 +1,4 @@
 import managers.service_manager as sm
-import bridges.db_bridge as ddb
 
 # This is the main entry point for the DIPL_Ertragssteuerung_PV Backend application - DURING DEVELOPMENT.
 
@@ -13,9 +12,12 @@ import bridges.db_bridge as ddb
 def main():
     print("Starting PV Backend Service...")
     service_manager = sm.ServiceManager()
-    dbbridge = ddb.DB_Bridge()
-    
-    dbbridge.check_connection()
+
+    # Influx down is not fatal: mode, schedule and device control keep working, data endpoints report errors
+    try:
+        service_manager.db_bridge.check_connection()
+    except Exception as e:
+        print(f"InfluxDB nicht erreichbar: {e}")
     service_manager.start_server()
 
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 import os
-import json
 from flask import request, jsonify
 
+from stores.json_file import JsonFile
+
 class DeviceManager:
     def __init__(self, config_path: str = "config/devices.json", default_path: str = "config/devices-default.json"):
         self.config_path = config_path
@@ -16,22 +17,20 @@ class DeviceManager:
             raise FileNotFoundError(f"Config file not found: {self.config_path}")
 
         self._config = None
+        # Written immediately (no debounce): reload callbacks read the file right after a save
+        self._file = JsonFile(self.config_path, indent=2)
         self.load()
 
     # BASE FILE MANIP. OPERATIONS
     def load(self):
-        with open(self.config_path, "r") as f:
-            self._config = json.load(f)
+        self._config = self._file.read()
 
     def save(self):
-        with open(self.config_path, "w") as f:
-            json.dump(self._config, f, indent=2)
+        self._file.write(self._config)
 
     def reset_devices(self):
-        with open(self.default_path, "r") as orig:
-            self._config = json.load(orig)
-        with open(self.config_path, "w") as f:
-            json.dump(self._config, f, indent=2)
+        self._config = JsonFile(self.default_path).read()
+        self.save()
 
     # Reset-Devices Endpoint
     def reset_devices_endpoint(self):
@@ -47,6 +46,15 @@ class DeviceManager:
                 "error": str(e)
             }), 500
         
+    # Re-reads the config if another worker process changed it and runs all reload callbacks; returns True if reloaded
+    def reload_if_changed(self) -> bool:
+        if not self._file.changed_on_disk():
+            return False
+        self.load()
+        for device_id in list(self._reload_callbacks):
+            self.run_reload_callback(device_id)
+        return True
+
     def register_reload_callback(self, device_id: str, callback: callable):
         self._reload_callbacks[device_id] = callback
 
@@ -1,55 +1,268 @@
-from datetime import datetime, time
-from zoneinfo import ZoneInfo
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+
+from services.clock import SystemClock
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+DAY_GROUPS = {"daily": WEEKDAYS, "weekdays": WEEKDAYS[:5], "weekend": WEEKDAYS[5:]}
+# next_transition looks at most this many days ahead (one week + exception days)
+LOOKAHEAD_DAYS = 8
+
+
+# Compiled schedule of one calendar day
+# intervals: sorted, non-overlapping [start, end) minute ranges
+# bitmap: one byte per minute of the day (1 = active) -> is_active in O(1)
+# changes: sorted minutes where the state flips within the day -> next change via bisect in O(log n)
+class DayIndex:
+    __slots__ = ("intervals", "bitmap", "changes")
+
+    def __init__(self, ranges):
+        bitmap = bytearray(MINUTES_PER_DAY)
+        for start, end in ranges:
+            bitmap[start:end] = b"\x01" * (end - start)
+        self.bitmap = bytes(bitmap)
+        self.changes = tuple(m for m in range(1, MINUTES_PER_DAY) if bitmap[m] != bitmap[m - 1])
+
+        bounds = ((0,) if bitmap[0] else ()) + self.changes + ((MINUTES_PER_DAY,) if bitmap[-1] else ())
+        self.intervals = tuple(zip(bounds[::2], bounds[1::2]))
+
+    def is_active(self, minute: int) -> bool:
+        return self.bitmap[minute] == 1
+
+    # First minute >= minute whose state differs from 'state', or None if there is none left today
+    def next_change(self, minute: int, state: bool):
+        if self.is_active(minute) != state:
+            return minute
+        i = bisect_right(self.changes, minute)
+        return self.changes[i] if i < len(self.changes) else None
+
+
+# Parses a time string in "HH:MM" format into minutes of the day, None if empty or invalid
+def parse_minutes(value) -> int | None:
+    if not isinstance(value, str) or ":" not in value:
+        return None
+    try:
+        h, m = map(int, value.split(":"))
+        return time(hour=h, minute=m).hour * 60 + m
+    except ValueError:
+        return None
+
+
+# Weekday numbers (0 = Monday) of a "days" list, e.g. ["mon", "fri"] or ["weekend"]; None if invalid
+def parse_days(days) -> frozenset | None:
+    if days is None:
+        return frozenset(range(7))
+    if not isinstance(days, list):
+        return None
+    result = set()
+    for day in days:
+        # Nested lists, numbers, ... are invalid like unknown names (and not hashable for the lookup)
+        if not isinstance(day, str):
+            return None
+        names = DAY_GROUPS.get(day, (day,))
+        if not all(name in WEEKDAYS for name in names):
+            return None
+        result.update(WEEKDAYS.index(name) for name in names)
+    return frozenset(result)
+
+
+# Validates a schedule update (PUT /api/schedule); returns an error message or None
+# Accepted per device/season: the classic {"start", "end"} or "windows": [{"start", "end", "days"?}] (replaces start/end),
+# per device: "exceptions": [{"from", "to"?, "windows"}] for date ranges (holidays) with their own windows
+def validate_schedule(payload) -> str | None:
+    if not isinstance(payload, dict):
+        return "Schedule must be an object"
+    for device, sections in payload.items():
+        if not isinstance(sections, dict):
+            return f"{device}: must be an object"
+        for key, entry in sections.items():
+            if key == "exceptions":
+                error = _validate_exceptions(entry)
+            elif isinstance(entry, dict):
+                error = _validate_entry(entry)
+            else:
+                error = "must be an object"
+            if error:
+                return f"{device}.{key}: {error}"
+    return None
+
+
+def _validate_time(entry, field):
+    value = entry.get(field)
+    if value not in (None, "") and parse_minutes(value) is None:
+        return f"invalid {field} '{value}' (HH:MM)"
+    return None
+
+
+def _validate_entry(entry, with_days=True):
+    for field in ("start", "end"):
+        error = _validate_time(entry, field)
+        if error:
+            return error
+    windows = entry.get("windows")
+    if windows is None:
+        return None
+    if not isinstance(windows, list):
+        return "windows must be a list"
+    for window in windows:
+        if not isinstance(window, dict) or parse_minutes(window.get("start")) is None or parse_minutes(window.get("end")) is None:
+            return "every window needs start and end (HH:MM)"
+        if with_days and parse_days(window.get("days")) is None:
+            return f"invalid days {window.get('days')} (mon..sun, weekdays, weekend, daily)"
+    return None
+
+
+def _validate_exceptions(exceptions):
+    if not isinstance(exceptions, list):
+        return "must be a list"
+    for exception in exceptions:
+        if not isinstance(exception, dict):
+            return "every exception must be an object"
+        try:
+            first = date.fromisoformat(exception.get("from", ""))
+            last = date.fromisoformat(exception.get("to") or exception["from"])
+        except (TypeError, ValueError):
+            return "exception needs from/to dates (YYYY-MM-DD)"
+        if last < first:
+            return "exception 'to' is before 'from'"
+        error = _validate_entry({"windows": exception.get("windows", [])}, with_days=False)
+        if error:
+            return error
+    return None
+
 
 class ScheduleManager:
-    def __init__(self, store):
+    def __init__(self, store, clock=None):
         self.store = store
+        self.clock = clock or SystemClock()
+        # Compiled tables, rebuilt when the store version changes
+        self._index_version = None
+        self._weekly = {}      # (device, season) -> 7 tuples of (start, end) windows starting on that weekday
+        self._exceptions = {}  # device -> (sorted from-ordinals, [(from, to, windows)])
+        self._days = {}        # (own windows, previous day's windows) -> DayIndex
+        self._config = {}
 
     def determine_season(self) -> str:
-        month = datetime.now(ZoneInfo("Europe/Vienna")).month
+        month = self.clock.now().month
         return "summer" if 4 <= month <= 9 else "winter"
 
-    # Parses a time string in "HH:MM" format, returns a time object or None if invalid
-    # Handles empty, None, or malformed inputs gracefully
-    def _parse(self, value: str | None) -> time | None:
-        if not value or ":" not in value:
-            return None
-        try:
-            h, m = map(int, value.split(":"))
-            return time(hour=h, minute=m)
-        except ValueError:
-            return None
+    # Season of any day; the current month uses determine_season()
+    def _season_of(self, day: date) -> str:
+        if day.month == self.clock.now().month:
+            return self.determine_season()
+        return "summer" if 4 <= day.month <= 9 else "winter"
 
-    # Checks if the device should be active based on the current time and schedule configuration
-    def is_active(self, device: str) -> bool:
+    # Recompiles after a store change (stores without a version counter are compiled on every call)
+    def _refresh(self):
+        version = getattr(self.store, "version", None)
+        if version is not None and version == self._index_version:
+            return
+        self._config = self.store.get_effective()
+        self._weekly = {}
+        self._exceptions = {}
+        self._days = {}
+        self._index_version = version
+
+    # Windows of one schedule entry per weekday; start == end or invalid times are skipped
+    @staticmethod
+    def _compile_windows(entry, weekdays=True):
+        week = [[] for _ in range(7)]
+        if not isinstance(entry, dict):
+            return tuple(tuple(day) for day in week)
+
+        # Klassisches Format: ein Fenster {start, end} für jeden Tag
+        windows = entry.get("windows")
+        if windows is None:
+            windows = [entry] if "start" in entry or "end" in entry else []
 
-        # Get the effective schedule configuration for the device and current season
-        config = self.store.get_effective()
+        for window in windows:
+            if not isinstance(window, dict):
+                continue
+            start, end = parse_minutes(window.get("start")), parse_minutes(window.get("end"))
+            days = parse_days(window.get("days")) if weekdays else frozenset(range(7))
+            if start is None or end is None or start == end or days is None:
+                continue
+            for weekday in days:
+                week[weekday].append((start, end))
+        return tuple(tuple(sorted(day)) for day in week)
 
-        # Determine the current season (summer/winter) based on the month
-        season = self.determine_season()
+    def _weekly_windows(self, device, season):
+        key = (device, season)
+        if key not in self._weekly:
+            self._weekly[key] = self._compile_windows(self._config.get(device, {}).get(season))
+        return self._weekly[key]
 
-        # Get the schedule entry for the device and season
-        # If no entry exists or if start/end times are invalid, consider the device inactive
-        entry = config.get(device, {}).get(season)
-        if not entry:
-            return False
+    def _exception_table(self, device):
+        if device not in self._exceptions:
+            rows = []
+            for exception in self._config.get(device, {}).get("exceptions") or []:
+                try:
+                    first = date.fromisoformat(exception["from"]).toordinal()
+                    last = date.fromisoformat(exception.get("to") or exception["from"]).toordinal()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                windows = self._compile_windows({"windows": exception.get("windows") or []}, weekdays=False)[0]
+                rows.append((first, last, windows))
+            rows.sort()
+            self._exceptions[device] = ([row[0] for row in rows], rows)
+        return self._exceptions[device]
 
-        start = self._parse(entry.get("start"))
-        end = self._parse(entry.get("end"))
+    # Windows starting on the given day: a matching exception wins over the weekly schedule
+    def _windows_on(self, device, day: date):
+        starts, rows = self._exception_table(device)
+        i = bisect_right(starts, day.toordinal()) - 1
+        # Überlappende Ausnahmen: die zuletzt beginnende, die den Tag noch abdeckt
+        while i >= 0:
+            first, last, windows = rows[i]
+            if last >= day.toordinal():
+                return windows
+            i -= 1
+        return self._weekly_windows(device, self._season_of(day))[day.weekday()]
 
-        if not start or not end:
-            return False
+    # Active minutes of a day: its own windows plus the part after midnight of the previous day's windows
+    def _day_index(self, device: str, day: date) -> DayIndex:
+        own = self._windows_on(device, day)
+        previous = self._windows_on(device, day - timedelta(days=1))
+        key = (own, previous)
+        index = self._days.get(key)
+        if index is None:
+            ranges = [(0, end) for start, end in previous if start > end]
+            for start, end in own:
+                ranges.append((start, end) if start < end else (start, MINUTES_PER_DAY))
+            index = self._days[key] = DayIndex(ranges)
+        return index
+
+    # Sorted, non-overlapping active intervals [start, end) of a day in minutes
+    def intervals(self, device: str, day: date | None = None):
+        self._refresh()
+        return self._day_index(device, day or self.clock.now().date()).intervals
+
+    # Checks if the device should be active based on the current time and schedule configuration
+    def is_active(self, device: str) -> bool:
+        self._refresh()
+        now = self.clock.now()
+        return self._day_index(device, now.date()).is_active(now.hour * 60 + now.minute)
 
-        now = datetime.now(ZoneInfo("Europe/Vienna")).time()
+    # Next time the device switches on or off (start of that minute), None if nothing changes within a week
+    def next_transition(self, device: str, now: datetime | None = None) -> datetime | None:
+        self._refresh()
+        now = now or self.clock.now()
+        minute = now.hour * 60 + now.minute
+        today = self._day_index(device, now.date())
+        state = today.is_active(minute)
 
-        # Edge case: if start and end are the same, consider the device to be inactive (no time window)
-        if start == end:
-            return False
+        change = today.next_change(minute, state)
+        if change is not None:
+            return self._at(now, 0, change)
 
-        # Normal case: start < end -> active if now is between start and end
-        if start < end:
-            return start <= now <= end
+        for days in range(1, LOOKAHEAD_DAYS + 1):
+            change = self._day_index(device, now.date() + timedelta(days=days)).next_change(0, state)
+            if change is not None:
+                return self._at(now, days, change)
+        return None
 
-        # Over midnight case
-        return now >= start or now <= end
+    @staticmethod
+    def _at(now: datetime, days: int, minute: int) -> datetime:
+        day = now.date() + timedelta(days=days)
+        return datetime.combine(day, time(minute // 60, minute % 60), tzinfo=now.tzinfo)
@@ -1,34 +1,57 @@
 import os
 import platform
-from datetime import datetime, timedelta
+import time
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 from dotenv import load_dotenv, find_dotenv
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
-from flask_swagger_ui import get_swaggerui_blueprint
+from werkzeug.http import is_resource_modified
 
 from managers.device_manager import DeviceManager
-from managers.schedule_manager import ScheduleManager
+from managers.schedule_manager import ScheduleManager, validate_schedule
 
-from bridges.db_bridge import DB_Bridge
+from bridges.db_bridge import DB_Bridge, PartialHistory
 from bridges.logging_bridge import LoggingBridge
 
 from controllers.wallbox_controller import WallboxController
 from controllers.boiler_controller import BoilerController
+from controllers.circuit_breaker import CircuitOpenError, all_breakers
 
 from stores.system_mode_store import SystemMode, SystemModeStore
 from stores.schedule_store import ScheduleStore
 from stores.automatic_config_store import AutomaticConfigStore
+from stores.scheduler_state_store import SchedulerStateStore
+from stores.history_replica import HistoryReplica
 
 from services.scheduler_service import SchedulerService
 from services.pv_forecast_service import PVForecastService
+from services.dashboard_service import DashboardService
+from services.event_control_core import PV_POLL_INTERVAL_S
+from services.control_channel import ControlClient, ControlServer, ControlUnavailableError, RemoteBoiler, control_address
+from services.leader_election import LeaderElection
+from services.store_sync import StoreSync
+from services.live_data_service import LiveDataService, LiveLoggerTap, LiveSource
+from services.metrics_registry import REGISTRY
+from services.profiler_service import TICK_TARGETS, ProfilerBusyError, ProfilerService
+from services.json_provider import FastJSONProvider
+from services.export_service import ExportBusyError, ExportRequest, ExportService, ExportUnavailableError
+from services.http_cache import COMPRESS_MIN_BYTES, COMPRESSIBLE_MIMETYPES, HistoryPeriod, ResponseCache, body_etag, compress, negotiate
+
+REQUEST_SECONDS = REGISTRY.histogram("pvbackend_http_request_duration_seconds",
+                                     "API request duration by method, route and status", ("method", "route", "status"))
+REGISTRY.callback("gauge", "pvbackend_circuit_open", "1 while the circuit breaker of a device is open", ("device",),
+                  lambda: [((name,), int(breaker.snapshot()["state"] == "open")) for name, breaker in all_breakers().items()])
 
 SWAGGER_URL = '/swagger'
 API_URL = '/static/swagger.json'  
 
-swaggerui_blueprint = get_swaggerui_blueprint(
-    SWAGGER_URL, API_URL, config={'app_name': "PV_Backend_Service"}
-)
+
+# Swagger UI blueprint (flask_swagger_ui is only imported when the app is built)
+def _swaggerui_blueprint():
+    from flask_swagger_ui import get_swaggerui_blueprint
+    return get_swaggerui_blueprint(SWAGGER_URL, API_URL, config={'app_name': "PV_Backend_Service"})
 
 class ServiceManager:
     def __init__(self, server_port=5050, host_ip='0.0.0.0'):
@@ -42,22 +65,50 @@ class ServiceManager:
         self.server_port = server_port
         self.host_ip = host_ip
         self.app = Flask(  __name__,  static_folder=os.path.join(BASE_DIR, "static"), static_url_path="/static")
+        # orjson-backed jsonify (stdlib fallback); datetimes and Decimals are encoded by the provider
+        self.app.json = FastJSONProvider(self.app)
         CORS(self.app, resources={r"/*": {"origins": "*"}})
 
         # Register Swagger UI
-        self.app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+        self.app.register_blueprint(_swaggerui_blueprint(), url_prefix=SWAGGER_URL)
+
+        # Multi-worker deployment (gunicorn.conf.py sets SCHEDULER_LEADER_LOCK): only the worker holding the lock
+        # runs the control loop and owns the relay, the others serve the API and ask the leader via the control socket
+        lock_path = os.getenv("SCHEDULER_LEADER_LOCK")
+        self.leader = LeaderElection(lock_path) if lock_path else None
+        self.control_client = ControlClient(control_address(lock_path)) if lock_path else None
+        self.control_server = None
+        is_leader = self.leader is None or self.leader.try_acquire()
 
         # Initialize database connection
         self.db_bridge = DB_Bridge()
 
+        # Local SQLite copy of the history measurements (HISTORY_REPLICA_PATH, set by gunicorn.conf.py): history charts
+        # and EPEX statistics are read from it while it is fresh or Influx is unreachable; the leader keeps it in sync
+        replica_path = os.getenv("HISTORY_REPLICA_PATH")
+        self.history_replica = HistoryReplica(replica_path, self.db_bridge) if replica_path else None
+        self.db_bridge.replica = self.history_replica
+
         # Initialize wallbox bridge (live GETs)
         self.wallbox_controller = WallboxController()
 
-        # Initialize boiler bridge (GPIO control)
-        self.boiler_bridge = BoilerController()
+        # Initialize boiler bridge (GPIO control) – only in the leader, a second process must not drive the relay
+        self.boiler_bridge = BoilerController() if is_leader else RemoteBoiler(self.control_client)
+
+        # Bulk CSV/Parquet exports (admin, GET /api/export), streamed from Influx over their own client
+        self.exports = ExportService(self.db_bridge)
+
+        # Compressed history responses of closed periods (day/month/year that has ended)
+        self.history_cache = ResponseCache()
+
+        # Short-TTL caches of the home screen sections (GET /api/dashboard), shared with the live stream
+        self.dashboard = DashboardService(self._dashboard_sections())
 
-        # Initialize logging bridge
-        self.logger = LoggingBridge()
+        # Live stream for the dashboard (GET /api/stream), polls only while clients are connected
+        self.live_data = LiveDataService(self._live_sources())
+
+        # Initialize logging bridge (decisions and system events are mirrored into the live stream)
+        self.logger = LiveLoggerTap(LoggingBridge(), self.live_data)
 
         # Initialize system mode
         self.mode_store = SystemModeStore()
@@ -72,16 +123,15 @@ class ServiceManager:
         # Initialize forecast service
         self.pv_forecast_service = PVForecastService()
 
-        # Initialize and START the scheduler service
-        self.scheduler = SchedulerService(
-            mode_store=self.mode_store,
-            schedule_manager=self.schedule_manager,
-            boiler=self.boiler_bridge,
-            wallbox=self.wallbox_controller,
-            db_bridge=self.db_bridge,
-            logger=self.logger
-        )
-        self.scheduler.start()
+        # On-demand profiling of routes and scheduler ticks (admin, /api/profiler)
+        self.profiler = ProfilerService()
+
+        # Initialize and START the scheduler service (standby workers take over if the leader dies)
+        self.scheduler = None
+        if is_leader:
+            self._start_control_loop()
+        else:
+            self.leader.wait_for_leadership(self._take_over)
 
         # SYSTEM EVENT LOG: Service Startup
         self.logger.system_event(
@@ -96,8 +146,19 @@ class ServiceManager:
         # Register reload callbacks
         self.device_manager.register_reload_callback("wallbox", self.wallbox_controller.load_config)
 
+        # Multi-worker: pick up store changes written by the other workers
+        if self.leader is not None:
+            self.store_sync = StoreSync(logger=self.logger)
+            self.store_sync.watch("mode", self.mode_store.reload_if_changed, self._apply_change)
+            self.store_sync.watch("schedule", self.schedule_store.reload_if_changed, self._apply_change)
+            self.store_sync.watch("config", self.automatic_config_store.reload_if_changed)
+            self.store_sync.watch("devices", self.device_manager.reload_if_changed)
+            self.store_sync.start()
+
         # Simple startup logs: platform + boiler control availability
         print(f"[{datetime.now().isoformat()}] Service starting on platform: {platform.system()}")
+        if not is_leader:
+            print(f"[{datetime.now().isoformat()}] Worker {os.getpid()}: API only, control loop runs in worker {self.leader.leader_pid()}")
         if self.boiler_bridge and hasattr(self.boiler_bridge, "get_state"):
             hw = "GPIO available" if getattr(self.boiler_bridge, "relay", None) else "GPIO not available (simulated)"
             print(f"[{datetime.now().isoformat()}] BoilerController initialized: {hw}")
@@ -106,6 +167,92 @@ class ServiceManager:
 
         # Configure all routes
         self.configure_routes()
+        self._install_request_metrics()
+        self._install_compression()
+        self.app.register_error_handler(ControlUnavailableError, self._control_unavailable)
+
+    # Builds and starts the scheduler (and the control socket for the other workers) in the leader process
+    def _start_control_loop(self):
+        self.scheduler = SchedulerService(
+            mode_store=self.mode_store,
+            schedule_manager=self.schedule_manager,
+            boiler=self.boiler_bridge,
+            wallbox=self.wallbox_controller,
+            db_bridge=self.db_bridge,
+            logger=self.logger,
+            # Opt-in: wallbox PV tracking in its own loop (seconds, e.g. 10), default 0 = wallbox runs in the 60 s main tick
+            wallbox_interval=float(os.getenv("SCHEDULER_WALLBOX_INTERVAL_S", "0")) or None,
+            # Session state survives restarts (kWh baseline, failsafes)
+            state_store=SchedulerStateStore(),
+            # Same store as the API -> config changes reach the control loop immediately
+            automatic_config=self.automatic_config_store,
+            profiler=self.profiler
+        )
+        # SCHEDULER_CORE=event: asyncio core reacting to input changes instead of the 60 s polling thread
+        if os.getenv("SCHEDULER_CORE", "thread").lower() == "event":
+            self.scheduler.start_event_core(
+                pv_interval_s=float(os.getenv("SCHEDULER_PV_POLL_S", str(PV_POLL_INTERVAL_S)))
+            )
+        else:
+            self.scheduler.start()
+
+        if self.history_replica is not None:
+            self.history_replica.start()
+
+        if self.control_client is not None:
+            self.control_server = ControlServer(self.control_client.address, self._control_handlers())
+            self.control_server.start()
+
+    # Standby worker became leader (previous leader died): take over the relay and the control loop
+    def _take_over(self):
+        self.boiler_bridge = BoilerController()
+        self.dashboard.invalidate("boiler")
+        self._start_control_loop()
+        self.logger.system_event(
+            level="warning",
+            source="backend",
+            message=f"Steuerung von Worker {os.getpid()} übernommen"
+        )
+
+    # Calls the other workers may make on the leader
+    def _control_handlers(self):
+        return {
+            "boiler_state": lambda: {
+                "heating": self.boiler_bridge.get_state(),
+                "simulated": getattr(self.boiler_bridge, "relay", None) is None
+            },
+            "boiler_control": self._leader_boiler_control,
+            "section": self.dashboard.load,
+            "scheduler_metrics": self._scheduler_metrics,
+            "plan": lambda: self.scheduler.plan_optimizer.get_plan(),
+            "update_plan": lambda: self.scheduler.update_plan(force=True),
+            "profile_arm": self._arm_profile,
+            "profile_sessions": self.profiler.sessions,
+            "profile_cancel": self._cancel_profile,
+        }
+
+    # Runs local() if the control loop is in this process, otherwise the same call on the leader
+    def _leader_call(self, name, local, *args):
+        if self._is_leader():
+            return local(*args)
+        return self.control_client.call(name, *args)
+
+    def _leader_boiler_control(self, action):
+        result = self.boiler_bridge.control(action)
+        self.dashboard.invalidate("boiler")
+        return result
+
+    # True if this process is the leader (single process: always)
+    def _is_leader(self):
+        return self.leader is None or self.leader.is_leader
+
+    # Mode/schedule changes of the API (or of another worker, via StoreSync) reach the scheduler
+    def _apply_change(self, topic):
+        if self.scheduler is None:
+            return
+        if topic == "mode":
+            self.scheduler.reset_automatic_state()
+        self.scheduler.notify(topic)
 
     # Start the Flask server 
     def start_server(self):
@@ -124,6 +271,7 @@ class ServiceManager:
         self.app.add_url_rule('/api/pv/daily', 'pv_daily', self.get_daily, methods=['GET'])
         self.app.add_url_rule('/api/pv/monthly', 'pv_monthly', self.get_monthly, methods=['GET'])
         self.app.add_url_rule('/api/pv/yearly', 'pv_yearly', self.get_yearly, methods=['GET'])
+        self.app.add_url_rule('/api/export', 'export', self.export_endpoint, methods=['GET'])
 
         # Wallbox endpoints
         self.app.add_url_rule('/api/wallbox/latest', 'wallbox_latest', self.get_wallbox_latest, methods=['GET'])
@@ -141,6 +289,10 @@ class ServiceManager:
 
         # Monitoring-/State Enpoint
         self.app.add_url_rule('/api/state', 'state', self.get_state, methods=['GET'])
+        self.app.add_url_rule('/api/scheduler/metrics', 'scheduler_metrics', self.get_scheduler_metrics, methods=['GET'])
+        self.app.add_url_rule('/metrics', 'metrics', self.metrics_endpoint, methods=['GET'])
+        self.app.add_url_rule('/api/profiler', 'profiler', self.profiler_endpoint, methods=['GET', 'POST'])
+        self.app.add_url_rule('/api/profiler/<session_id>', 'profiler_session', self.profiler_session_endpoint, methods=['GET', 'DELETE'])
 
         # Logging endpoints
         self.app.add_url_rule('/api/logging', 'logging', self.get_logging, methods=['GET'])
@@ -163,6 +315,13 @@ class ServiceManager:
         # Forecast service endpoint
         self.app.add_url_rule( "/api/forecast", "forecast", self.get_forecast, methods=["GET"])
 
+        # Optimizer plan endpoint
+        self.app.add_url_rule("/api/plan", "plan", self.plan_endpoint, methods=["GET", "POST"])
+
+        # Aggregated home screen data + live stream (Server-Sent Events)
+        self.app.add_url_rule("/api/dashboard", "dashboard", self.dashboard_endpoint, methods=["GET"])
+        self.app.add_url_rule("/api/stream", "stream", self.stream_endpoint, methods=["GET"])
+
 
     ################################
     #### System State Endpoints ####
@@ -192,13 +351,21 @@ class ServiceManager:
                 message=f"InfluxDB Verbindung fehlgeschlagen: {e}"
             )
 
-        # Wallbox
+        # Wallbox (open breaker -> last known state is served, device counts as offline)
         try:
             data = self.wallbox_controller.fetch_data()
-            status["wallbox"] = "ok" if data else "no_data"
+            if not data:
+                status["wallbox"] = "no_data"
+            else:
+                status["wallbox"] = "offline" if data.get("stale") else "ok"
+        except CircuitOpenError:
+            status["wallbox"] = "offline"
         except Exception:
             status["wallbox"] = "timeout"
 
+        # Circuit breaker state per device
+        status["breakers"] = {name: breaker.snapshot() for name, breaker in all_breakers().items()}
+
         # Boiler
         try:
             if not hasattr(self.boiler_bridge, "get_state"):
@@ -216,7 +383,9 @@ class ServiceManager:
             if not epex_data or "_time" not in epex_data:
                 status["epex"] = "no_data"
             else:
-                epex_ts = datetime.fromisoformat(epex_data["_time"])
+                epex_ts = epex_data["_time"]
+                if isinstance(epex_ts, str):
+                    epex_ts = datetime.fromisoformat(epex_ts)
                 now = datetime.now(ZoneInfo("Europe/Vienna"))
 
                 if now - epex_ts > timedelta(hours=2):
@@ -250,6 +419,33 @@ class ServiceManager:
             )
 
         return jsonify(status), 200
+
+    # GET /api/scheduler/metrics - Tick durations per phase (histograms) and loop overruns
+    def get_scheduler_metrics(self):
+        if self._is_leader():
+            payload = self._scheduler_metrics()
+        else:
+            payload = self.control_client.call("scheduler_metrics")
+        if self.leader is not None:
+            payload["leader"] = {"pid": self.leader.leader_pid(), "worker_pid": os.getpid(), "is_leader": self.leader.is_leader}
+        return self._json(payload)
+
+    def _scheduler_metrics(self):
+        event_core = self.scheduler.event_core
+        payload = {
+            "core": "event" if event_core else "thread",
+            "running": self.scheduler.is_alive() or event_core is not None,
+            "interval_s": self.scheduler.interval,
+            **self.scheduler.metrics.snapshot(),
+            "wallbox_loop": {
+                "running": self.scheduler.wallbox_loop_active(),
+                "interval_s": self.scheduler.wallbox_interval,
+                **self.scheduler.wallbox_metrics.snapshot()
+            }
+        }
+        if event_core:
+            payload["event_core"] = event_core.snapshot()
+        return payload
     
     # Logging endpoint: Returns filtered log entries from InfluxDB logging bucket
     def get_logging(self):
@@ -284,10 +480,155 @@ class ServiceManager:
                 500
             )
 
+    # Request duration per route for /metrics (route template, not the raw path -> bounded label values)
+    def _install_request_metrics(self):
+        def observe(status):
+            started = g.pop("metrics_started", None)
+            if started is None:
+                return
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_SECONDS.labels(request.method, route, status).observe(time.perf_counter() - started)
+
+        @self.app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @self.app.after_request
+        def record(response):
+            observe(str(response.status_code))
+            return response
+
+        # Unhandled exceptions skip after_request
+        @self.app.teardown_request
+        def record_error(exc):
+            if exc is not None:
+                observe("500")
+
+    # GET /metrics - Prometheus text format (requests, Influx queries, HTTP calls, scheduler phases, caches, log queue)
+    def metrics_endpoint(self):
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+    ##########################
+    #### Profiler (admin) ####
+    ##########################
+
+    # Admin password from the X-Admin-Password header or the JSON body; returns an error response or None
+    def _admin_error(self):
+        password = request.headers.get("X-Admin-Password") or (request.get_json(silent=True) or {}).get("password")
+        if not password:
+            return self._json({"error": "Missing admin password (X-Admin-Password header or 'password')"}, 401)
+        if not self.device_manager.check_password(password):
+            return self._json({"success": False, "message": "Invalid admin password"}, 401)
+        return None
+
+    # GET /api/profiler - profiling sessions (armed, done, cancelled)
+    # POST /api/profiler - profile the next N requests of a route or the next N scheduler ticks
+    #   {"target": "/api/pv/yearly" | "tick:main" | "tick:wallbox", "count": 5, "mode": "cprofile" | "sample", "interval_ms": 5}
+    def profiler_endpoint(self):
+        error = self._admin_error()
+        if error:
+            return error
+
+        if request.method == "GET":
+            return self._json({"sessions": self._profile_sessions()})
+
+        data = request.get_json(silent=True) or {}
+        target = data.get("target")
+        interval_ms = data.get("interval_ms", 5)
+        if not isinstance(target, str) or not target:
+            return self._json({"error": "Missing 'target' (route, tick:main or tick:wallbox)"}, 400)
+        if not isinstance(interval_ms, (int, float)) or isinstance(interval_ms, bool):
+            return self._json({"error": "interval_ms must be a number"}, 400)
+
+        args = (target, data.get("count", 1), data.get("mode", "cprofile"), interval_ms / 1000)
+        # Ticks only run in the leader process
+        if target in TICK_TARGETS:
+            payload, status = self._leader_call("profile_arm", self._arm_profile, *args)
+        else:
+            payload, status = self._arm_profile(*args)
+        return self._json(payload, status)
+
+    # Arms a session in this process; returns (payload, status) so that it also works as a control call
+    def _arm_profile(self, target, count, mode, interval_s):
+        try:
+            if target in TICK_TARGETS:
+                session = self.profiler.arm(target, count, mode, interval_s)
+            else:
+                session = self._arm_route(target, count, mode, interval_s)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except ProfilerBusyError as e:
+            return {"error": str(e)}, 409
+        return session.snapshot(), 201
+
+    # Wraps the view function of the route while the session is armed -> no cost for routes nobody profiles
+    def _arm_route(self, rule, count, mode, interval_s):
+        match = next((r for r in self.app.url_map.iter_rules() if r.rule == rule), None)
+        if match is None or rule.startswith(("/api/profiler", "/api/stream", "/static", SWAGGER_URL)):
+            raise ValueError(f"Unknown or unsupported target '{rule}'")
+
+        endpoint = match.endpoint
+        view = self.app.view_functions[endpoint]
+        session = self.profiler.arm(rule, count, mode, interval_s,
+                                    on_done=lambda _: self.app.view_functions.__setitem__(endpoint, view))
+        self.app.view_functions[endpoint] = self.profiler.wrap(rule, view)
+        return session
+
+    # Sessions of this worker plus those of the leader (tick profiles)
+    def _profile_sessions(self):
+        sessions = self.profiler.sessions()
+        if not self._is_leader():
+            try:
+                known = {s["id"] for s in sessions}
+                sessions += [s for s in self.control_client.call("profile_sessions") if s["id"] not in known]
+            except ControlUnavailableError:
+                pass
+        return sessions
+
+    def _cancel_profile(self, session_id):
+        session = self.profiler.cancel(session_id)
+        return session.snapshot() if session else None
+
+    # GET /api/profiler/<id> - download the result (.pstats or collapsed stacks .folded), ?format=text: pstats report
+    # DELETE /api/profiler/<id> - stop an armed session, calls profiled so far are kept
+    def profiler_session_endpoint(self, session_id):
+        error = self._admin_error()
+        if error:
+            return error
+
+        if request.method == "DELETE":
+            session = self._cancel_profile(session_id)
+            if session is None and not self._is_leader():
+                session = self.control_client.call("profile_cancel", session_id)
+            if session is None:
+                return self._json({"error": f"Unknown profiling session '{session_id}'"}, 404)
+            return self._json(session)
+
+        # Results are files in the shared data directory -> any worker can serve them
+        path = self.profiler.result_path(session_id)
+        if path is None:
+            session = next((s for s in self._profile_sessions() if s["id"] == session_id), None)
+            if session is None:
+                return self._json({"error": f"Unknown profiling session '{session_id}'"}, 404)
+            return self._json({"error": "Profile not finished yet", **session}, 409)
+
+        if request.args.get("format") == "text":
+            report = self.profiler.report(session_id)
+            if report is None:
+                return self._json({"error": "Text report is only available for cprofile sessions"}, 400)
+            return Response(report, mimetype="text/plain")
+
+        mimetype = "text/plain" if path.suffix == ".folded" else "application/octet-stream"
+        return send_file(path.resolve(), mimetype=mimetype, as_attachment=True, download_name=f"profile-{path.name}")
+
     # Route Handlers
     def _json(self, payload, status=200):
         return jsonify(payload), status
 
+    # Leader process not reachable (restart/takeover in progress)
+    def _control_unavailable(self, error):
+        return self._json({"error": "Control process unavailable", "detail": str(error)}, 503)
+
     # GET /connection - Check DB connection and basic API responsiveness
     def check_connection(self):
         try:
@@ -311,65 +652,165 @@ class ServiceManager:
         data = self.db_bridge.get_latest_pv_data()
         if not data:
             return jsonify({"message": "No PV data found"}), 404
+        return jsonify(self._pv_frontend(data)), 200
 
+    # PV snapshot in the frontend format (kW -> W, empty values dropped)
+    @staticmethod
+    def _pv_frontend(data):
         frontend_data = {**data}
         frontend_data["pv_power"]  = (frontend_data.pop("pv_power_kw", 0) or 0) * 1000
         frontend_data["load_power"]  = (frontend_data.pop("house_load_kw", 0) or 0) * 1000
         frontend_data["battery_power"] = (frontend_data.pop("battery_power_kw", 0) or 0) * 1000
-        frontend_data = {k: v for k, v in frontend_data.items() if v is not None}
-        return jsonify(frontend_data), 200
+        return {k: v for k, v in frontend_data.items() if v is not None}
 
     # GET /api/pv/daily?date=YYYY-MM-DD - Get daily aggregated PV data
     def get_daily(self):
-        date = request.args.get("date") 
+        return self._history_response(
+            "daily", request.args.get("date"), self.db_bridge.get_daily_pv_data,
+            "No data collected for the selected day"
+        )
+
+    # GET /api/pv/monthly?month=YYYY-MM - Get monthly aggregated PV data
+    def get_monthly(self):
+        return self._history_response(
+            "monthly", request.args.get("month"), self.db_bridge.get_monthly_pv_data,
+            "No data collected for the selected month"
+        )
+
+    # GET /api/pv/yearly?year=YYYY - Get yearly aggregated PV data
+    def get_yearly(self):
+        return self._history_response(
+            "yearly", request.args.get("year"), lambda year: self.db_bridge.get_yearly_pv_data(int(year) if year else None),
+            "No data collected for the selected year"
+        )
+
+    # Shared by the history endpoints: validators and compressed bodies
+    # - Closed period (past day/month/year, after CLOSED_GRACE): the gzip body is cached with an ETag of its content
+    #   and the time it was read; later requests and If-None-Match / If-Modified-Since are answered without Influx
+    # - Open period (today, this month, this year): ETag is the hash of the body, a 304 still saves the download
+    # - Partial data (replica fallback while Influx is down): treated like an open period, never cached, and marked
+    #   with X-History-Partial
+    def _history_response(self, kind, value, load, not_found):
         try:
-            data = self.db_bridge.get_daily_pv_data(date)
+            period = HistoryPeriod.parse(kind, value)
         except ValueError as e:
-            # Invalid date format
             return self._json({"error": str(e)}, 400)
-        if not data:
-            return self._json(
-                {"message": "No data collected for the selected day"},
-                404
-            )
 
-        return self._json(data, 200)
+        closed = period.is_closed()
+        if closed:
+            cached = self.history_cache.get((kind, period.key))
+            if cached is not None:
+                if not is_resource_modified(request.environ, etag=cached.etag, last_modified=cached.last_modified):
+                    return self._not_modified(cached.etag, cached.last_modified, True)
+                return self._cached_response(cached)
 
-    # GET /api/pv/monthly?month=YYYY-MM - Get monthly aggregated PV data
-    def get_monthly(self):
-        month = request.args.get("month")
         try:
-            data = self.db_bridge.get_monthly_pv_data(month)
+            data = load(value)
         except ValueError as e:
-            # Invalid month format
             return self._json({"error": str(e)}, 400)
         if not data:
-            return self._json(
-                {"message": "No data collected for the selected month"},
-                404
-            )
+            return self._json({"message": not_found}, 404)
+
+        body = self.app.json.response(data).get_data()
+        partial = isinstance(data, PartialHistory)
+        if closed and not partial:
+            cached = self.history_cache.put((kind, period.key), period.etag(body),
+                                            datetime.now(timezone.utc).replace(microsecond=0), body)
+            if not is_resource_modified(request.environ, etag=cached.etag):
+                return self._not_modified(cached.etag, cached.last_modified, True)
+            return self._cached_response(cached)
+
+        etag = body_etag(body)
+        if not is_resource_modified(request.environ, etag=etag):
+            return self._not_modified(etag, None, False)
+        response = self.app.response_class(body, mimetype="application/json")
+        self._set_validators(response, etag, None, False)
+        if partial:
+            response.headers["X-History-Partial"] = "1"
+        return response
+
+    # Cached history body in the negotiated encoding
+    def _cached_response(self, cached):
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        response = self.app.response_class(cached.body(encoding), mimetype="application/json")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            # A brotli copy may have been added
+            self.history_cache.trim()
+        response.vary.add("Accept-Encoding")
+        self._set_validators(response, cached.etag, cached.last_modified, True)
+        return response
+
+    def _not_modified(self, etag, last_modified, closed):
+        response = self.app.response_class(status=304)
+        response.vary.add("Accept-Encoding")
+        self._set_validators(response, etag, last_modified, closed)
+        return response
+
+    # Weak ETags: the same data is sent gzip-, brotli- or un-encoded
+    # Closed periods may be cached by clients for a day, open ones have to be revalidated
+    @staticmethod
+    def _set_validators(response, etag, last_modified, closed):
+        response.set_etag(etag, weak=True)
+        if last_modified is not None:
+            response.last_modified = last_modified
+        response.headers["Cache-Control"] = "public, max-age=86400" if closed else "no-cache"
+
+    # gzip/brotli for all other compressible responses above COMPRESS_MIN_BYTES (streams and files are left alone)
+    def _install_compression(self):
+        @self.app.after_request
+        def compress_response(response):
+            if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                    or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+                return response
+            response.vary.add("Accept-Encoding")
+            encoding = negotiate(request.headers.get("Accept-Encoding"))
+            if encoding is None or (response.content_length or 0) < COMPRESS_MIN_BYTES:
+                return response
+            response.set_data(compress(response.get_data(), encoding))
+            response.headers["Content-Encoding"] = encoding
+            return response
+
+    # GET /api/export?measurement=pv|boiler|epex&start=YYYY-MM-DD&stop=YYYY-MM-DD&format=csv|parquet&every=15m (admin)
+    # Streams the rows from Influx into the response; the slot is released when the response is closed
+    def export_endpoint(self):
+        error = self._admin_error()
+        if error:
+            return error
+
+        args = request.args
+        try:
+            export = ExportRequest(args.get("measurement"), args.get("start"), args.get("stop"),
+                                   args.get("format", "csv"), args.get("every"))
+        except ValueError as e:
+            return self._json({"error": str(e)}, 400)
 
-        return self._json(data, 200)
+        try:
+            self.exports.acquire()
+        except ExportBusyError as e:
+            response, status = self._json({"error": str(e)}, 429)
+            response.headers["Retry-After"] = "30"
+            return response, status
 
-    # GET /api/pv/yearly?year=YYYY - Get yearly aggregated PV data
-    def get_yearly(self):
-        year = request.args.get("year") 
         try:
-            year = int(year) if year else None
-            data = self.db_bridge.get_yearly_pv_data(year)
-        except ValueError:
-            # Invalid year format
-            return self._json(
-                {"error": "Invalid year format. Use YYYY"},
-                400
-            )
-        if not data:
-            return self._json(
-                {"message": "No data collected for the selected year"},
-                404
+            chunks = self.exports.open(export)
+        except ExportUnavailableError as e:
+            self.exports.release()
+            return self._json({"error": str(e)}, 501)
+        except Exception as e:
+            self.exports.release()
+            self.logger.system_event(
+                level="error",
+                source="export",
+                message=f"Export {export.measurement} fehlgeschlagen: {e}"
             )
+            return self._json({"error": "InfluxDB export failed"}, 502)
 
-        return self._json(data, 200)
+        response = Response(chunks, mimetype=export.mimetype)
+        response.headers["Content-Disposition"] = f'attachment; filename="{export.filename}"'
+        response.headers["X-Accel-Buffering"] = "no"
+        response.call_on_close(self.exports.release)
+        return response
 
     #########################
     ### Wallbox Endpoints ###
@@ -417,6 +858,7 @@ class ServiceManager:
                     new_state=new_state,
                     reason="Manuell über API"
                 )
+            self.dashboard.invalidate("wallbox")
 
             return self._json(result, 200)
 
@@ -425,12 +867,12 @@ class ServiceManager:
             return self._json({"error": str(e)}, 502)
       
     
-    # POST JSON: { "amp": 6 | 10 | 12 | 14 | 16 }
+    # POST JSON: { "amp": 6..16, "phases": 1 | 3 (optional) }
     def set_wallbox_current(self):
         if self.mode_store.get() in (SystemMode.TIME_CONTROLLED, SystemMode.AUTOMATIC):
             return self._json({"error": "Manual wallbox control disabled in AUTOMATIC and TIME_CONTROLLED mode"}, 403)
 
-        # API expects JSON body: { "amp": 6 | 10 | 12 | 14 | 16 }
+        # API expects JSON body: { "amp": 6..16, "phases": 1 | 3 (optional) }
         payload = request.get_json(silent=True)
         # VALIDATION: Check if payload is present and contains 'amp' field
         if not payload or "amp" not in payload:
@@ -438,11 +880,17 @@ class ServiceManager:
 
         try:
             amp = int(payload["amp"])
+            phases = int(payload["phases"]) if payload.get("phases") is not None else None
 
             old_data = self.wallbox_controller.fetch_data()
             old_amp = old_data.get("amp")
 
+            if phases is not None and phases not in (1, 3):
+                raise ValueError("Invalid phase count. Allowed values: 1, 3")
+
             result = self.wallbox_controller.set_charging_ampere(amp)
+            if phases is not None:
+                result = {**result, **self.wallbox_controller.set_phase_count(phases)}
 
             new_data = self.wallbox_controller.fetch_data()
             new_amp = new_data.get("amp")
@@ -454,6 +902,7 @@ class ServiceManager:
                     new_state=new_amp,
                     reason="Manuell über API gesetzt"
                 )
+            self.dashboard.invalidate("wallbox")
 
             return self._json(result, 200)
 
@@ -541,6 +990,7 @@ class ServiceManager:
 
         self.boiler_bridge.control(action)
         new_state = self.boiler_bridge.get_state()
+        self.dashboard.invalidate("boiler")
 
         if old_state != new_state:
             # DEVICE STATE CHANGE LOG
@@ -601,8 +1051,9 @@ class ServiceManager:
         try:
             mode = SystemMode(payload["mode"])
             self.mode_store.set(mode)
-            self.scheduler.reset_automatic_state()
-            
+            self._apply_change("mode")
+            self.live_data.update("mode", {"mode": mode.value})
+
             # SYSTEM EVENT LOG
             self.logger.system_event(level="info", source="modus", message=f"Systemmodus geändert auf: {mode.value}")
             return self._json({"mode": mode.value})
@@ -619,7 +1070,12 @@ class ServiceManager:
             payload = request.get_json(force=True)
             if not payload:
                 return self._json({"error": "Missing JSON body"}, 400)
+            # VALIDATION: times HH:MM, windows/days and exception dates
+            error = validate_schedule(payload)
+            if error:
+                return self._json({"error": error}, 400)
             self.schedule_store.update(payload)
+            self._apply_change("schedule")
             # SYSTEM EVENT LOG
             self.logger.system_event(level="info", source="zeitplan", message="Zeitplan aktualisiert")
             return self._json({"status": "ok"})
@@ -627,6 +1083,7 @@ class ServiceManager:
         # POST /api/schedule/reset - Reset schedule to default configuration
         if request.method == "POST":
             self.schedule_store.reset_to_default()
+            self._apply_change("schedule")
             # SYSTEM EVENT LOG
             self.logger.system_event(level="info", source="zeitplan", message="Zeitplan auf Standard zurückgesetzt")
             return self._json({"status": "ok", "message": "Schedule reset to default"})
@@ -634,6 +1091,7 @@ class ServiceManager:
     # POST /api/schedule/reset - Reset schedule to default configuration
     def schedule_reset_endpoint(self):
         self.schedule_store.reset_to_default()
+        self._apply_change("schedule")
         # SYSTEM EVENT LOG
         self.logger.system_event(level="info", source="zeitplan", message="Zeitplan auf Standard zurückgesetzt")
         return self._json({"status": "ok", "message": "Schedule reset to default"})
@@ -675,4 +1133,99 @@ class ServiceManager:
             return self._json(
                 {"error": "Forecast service unavailable"},
                 502
-            )
\ No newline at end of file
+            )
+
+    # GET /api/plan - Get the cached optimizer plan (slots for the rest of today + tomorrow)
+    def plan_endpoint(self):
+        if request.method == "GET":
+            plan = self._leader_call("plan", lambda: self.scheduler.plan_optimizer.get_plan())
+            if plan is None:
+                return self._json({"error": "No plan available"}, 404)
+            return self._json(plan)
+
+        # POST /api/plan - Recalculate the plan now (also works as preview while the optimizer is disabled)
+        try:
+            plan = self._leader_call("update_plan", lambda: self.scheduler.update_plan(force=True))
+            return self._json(plan)
+        except Exception as e:
+            # API ERROR LOG
+            self.logger.api_error(
+                device="optimizer",
+                endpoint="/api/plan",
+                error=e
+            )
+            return self._json({"error": "Plan calculation failed"}, 500)
+
+    ###############################
+    #### Dashboard & Live Data ####
+    ###############################
+
+    # Home screen sections: loader and cache TTL (seconds)
+    # Same data as the single GET endpoints; dashboard requests and the live stream share these caches
+    # Workers without the control loop read the sections from the leader's caches (one device/Influx query for all workers)
+    def _dashboard_sections(self):
+        sections = {
+            "pv": (self._load_pv, 5),
+            "boiler": (self._load_boiler, 5),
+            "wallbox": (lambda: self.wallbox_controller.fetch_data() or None, 5),
+            "epex": (self._load_epex, 60),
+            "forecast": (lambda: self.pv_forecast_service.get_forecast(), 300),
+            "mode": (lambda: {"mode": self.mode_store.get().value}, 0),
+        }
+        if self.leader is None:
+            return sections
+        return {
+            # Leader: runs the loader itself; follower: sends only the section name, the leader loads it
+            name: (lambda name=name, loader=loader: self._leader_call("section", lambda _name: loader(), name), ttl_s)
+            for name, (loader, ttl_s) in sections.items()
+        }
+
+    # Sources of the live stream and their poll intervals (seconds)
+    def _live_sources(self):
+        intervals = {"pv": 5, "boiler": 10, "wallbox": 5, "epex": 60, "forecast": 900, "mode": 5}
+        return [
+            LiveSource(name, lambda name=name: self.dashboard.load(name), interval_s)
+            for name, interval_s in intervals.items()
+        ]
+
+    def _load_pv(self):
+        data = self.db_bridge.get_latest_pv_data()
+        return self._pv_frontend(data) if data else None
+
+    def _load_boiler(self):
+        data = dict(self.db_bridge.get_latest_boiler_data() or {})
+        data["heating"] = self.boiler_bridge.get_state()
+        data["simulated"] = getattr(self.boiler_bridge, "relay", None) is None
+        return data
+
+    def _load_epex(self):
+        data = self.db_bridge.get_latest_epex_data()
+        if not data or "price" not in data:
+            return None
+        price_offset = self.device_manager.get_epex_price_offset()
+        return {**data, "price_raw": data["price"], "price": data["price"] + price_offset, "price_offset": price_offset}
+
+    # GET /api/dashboard?sections=pv,epex - All home screen data in one request, loaded concurrently
+    # Every section carries its own timestamp/age and fresh=False (+ error) if only the last known value could be served
+    def dashboard_endpoint(self):
+        requested = request.args.get("sections")
+        names = None
+        if requested:
+            names = [name.strip() for name in requested.split(",") if name.strip()]
+            unknown = sorted(set(names) - set(self.dashboard.sections))
+            if unknown:
+                return self._json({"error": f"Unknown sections: {', '.join(unknown)}", "sections": self.dashboard.sections}, 400)
+        return self._json(self.dashboard.collect(names))
+
+    # GET /api/stream - Server-Sent Events: full state on connect, then typed deltas
+    # Events: pv, boiler, wallbox, epex, forecast, mode (changed fields only), decision, system_event
+    def stream_endpoint(self):
+        subscription = self.live_data.subscribe()
+        response = Response(
+            stream_with_context(self.live_data.stream(subscription)),
+            mimetype="text/event-stream"
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        # nginx: don't buffer the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
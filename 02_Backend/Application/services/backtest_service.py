@@ -0,0 +1,409 @@
+import bisect
+import time
+from datetime import datetime, timedelta
+
+from managers.schedule_manager import ScheduleManager
+from services.clock import VirtualClock
+from services.plan_optimizer import DEFAULT_OPTIMIZER_CONFIG, WATER_KWH_PER_L_K
+from services.scheduler_service import SchedulerService
+from services.wallbox_dynamic_controller import setting_power_kw
+
+# Tunable parameters of the automatic logic -> where they live in the scheduler
+BACKTEST_PARAMS = {
+    "boiler_pv_min_kw": lambda s, v: setattr(s, "boiler_pv_min_kw", float(v)),
+    "boiler_soc_start": lambda s, v: setattr(s, "boiler_soc_start", float(v)),
+    "boiler_soc_stop": lambda s, v: setattr(s, "boiler_soc_stop", float(v)),
+    "hysteresis": lambda s, v: setattr(s, "hysteresis", float(v)),
+    "wallbox_hysteresis_kw": lambda s, v: setattr(s.wallbox_dynamic, "hysteresis", float(v)),
+    "epex_threshold_factor": lambda s, v: setattr(s.epex_service, "threshold_factor", float(v)),
+    "epex_emergency_factor": lambda s, v: setattr(s.epex_service, "emergency_factor", float(v)),
+}
+
+
+# Time series as column arrays with O(log n) lookups (loaded once, no per-tick queries)
+class HistorySeries:
+    def __init__(self, times, values, max_age=timedelta(hours=1)):
+        pairs = sorted((t, v) for t, v in zip(times, values) if v is not None)
+        self.times = [t for t, _ in pairs]
+        self.values = [v for _, v in pairs]
+        self.max_age = max_age
+
+    def __len__(self):
+        return len(self.times)
+
+    # Latest value at or before t (None if there is none or it is older than max_age)
+    def at(self, t):
+        i = bisect.bisect_right(self.times, t) - 1
+        if i < 0 or t - self.times[i] > self.max_age:
+            return None
+        return self.values[i]
+
+    # [(time, value), ...] with start <= time < end
+    def items(self, start, end):
+        i = bisect.bisect_left(self.times, start)
+        j = bisect.bisect_left(self.times, end)
+        return list(zip(self.times[i:j], self.values[i:j]))
+
+    def values_between(self, start, end):
+        i = bisect.bisect_left(self.times, start)
+        j = bisect.bisect_left(self.times, end)
+        return self.values[i:j]
+
+
+# Stored measurements for the replay: pv_measurements (W), boiler_measurements (°C), epex_prices (ct/kWh)
+class BacktestData:
+    def __init__(self, pv_power, load_power, soc, boiler_temp, prices):
+        self.pv_power = pv_power
+        self.load_power = load_power
+        self.soc = soc
+        self.boiler_temp = boiler_temp
+        self.prices = prices
+
+    # Loads everything with one bulk query per measurement
+    # EPEX prices start 14 days earlier (price statistics) and end 2 days later (day-ahead for the optimizer)
+    @classmethod
+    def from_db(cls, db_bridge, start, end, every="15m"):
+        pv = db_bridge.query_history("pv_measurements", ["pv_power", "load_power", "soc"], start, end, every)
+        boiler = db_bridge.query_history("boiler_measurements", ["boiler_temp"], start, end, every)
+        epex = db_bridge.query_history("epex_prices", ["price"], start - timedelta(days=14), end + timedelta(days=2), "15m")
+
+        return cls(
+            pv_power=HistorySeries(pv["time"], pv["pv_power"]),
+            load_power=HistorySeries(pv["time"], pv["load_power"]),
+            soc=HistorySeries(pv["time"], pv["soc"]),
+            boiler_temp=HistorySeries(boiler["time"], boiler["boiler_temp"], max_age=timedelta(hours=3)),
+            prices=HistorySeries(epex["time"], epex["price"], max_age=timedelta(hours=24)),
+        )
+
+
+# Simulated boiler: heating from the element, consumption (draws + losses) replayed from the measured temperature drops
+class SimBoiler:
+    def __init__(self, temp, power_kw=2.0, volume_l=200, max_temp=85.0):
+        self.temp = temp
+        self.power_kw = power_kw
+        self.k_per_h = power_kw / (volume_l * WATER_KWH_PER_L_K)
+        self.max_temp = max_temp
+        self.state = False
+        self.switches = 0
+        self.energy_kwh = 0.0
+
+    def get_state(self):
+        return self.state
+
+    def control(self, action):
+        new_state = action == "on"
+        if new_state != self.state:
+            self.switches += 1
+        self.state = new_state
+
+    def load_kw(self):
+        return self.power_kw if self.state and self.temp < self.max_temp else 0.0
+
+    def step(self, dt_h, drop_k):
+        load = self.load_kw()
+        self.energy_kwh += load * dt_h
+        self.temp = min(self.temp + (self.k_per_h * dt_h if load else 0.0), self.max_temp) - drop_k
+
+
+# Simulated go-eCharger: car plugged in between arrive and depart ("HH:MM"), charges with amp × phases
+class SimWallbox:
+    def __init__(self, clock, arrive=None, depart=None, ampere=16, phases=1):
+        self.clock = clock
+        self.arrive = datetime.strptime(arrive, "%H:%M").time() if arrive else None
+        self.depart = datetime.strptime(depart, "%H:%M").time() if depart else None
+        self.allow = False
+        self.ampere = ampere
+        self.phases = phases
+        self.eto_wh = 0.0
+        self.switches = 0
+        self.energy_kwh = 0.0
+
+    def car_connected(self):
+        if self.arrive is None or self.depart is None:
+            return False
+        now = self.clock.now().time()
+        if self.arrive < self.depart:
+            return self.arrive <= now < self.depart
+        return now >= self.arrive or now < self.depart
+
+    def is_online(self):
+        return True
+
+    def fetch_data(self, max_age_s=None):
+        connected = self.car_connected()
+        charging = connected and self.allow
+        return {
+            "car": 2 if charging else (3 if connected else 1),
+            "car_connected": 1 if connected else 0,
+            "alw": 1 if self.allow else 0,
+            "amp": self.ampere,
+            "eto": self.eto_wh,
+            "pha_count": self.phases if charging else 0,
+        }
+
+    def get_allow_state(self):
+        return self.allow
+
+    def set_allow_charging(self, allow):
+        if bool(allow) != self.allow:
+            self.switches += 1
+        self.allow = bool(allow)
+
+    def get_current_ampere(self):
+        return self.ampere
+
+    def set_charging_ampere(self, ampere):
+        self.ampere = ampere
+
+    def set_phase_count(self, phases):
+        self.phases = phases
+
+    def load_kw(self):
+        if self.allow and self.car_connected():
+            return setting_power_kw(self.ampere, self.phases)
+        return 0.0
+
+    def step(self, dt_h):
+        load = self.load_kw()
+        self.energy_kwh += load * dt_h
+        self.eto_wh += load * dt_h * 1000
+
+
+# DB_Bridge replacement: answers the scheduler's queries from the history at the virtual time
+# The measured house load already contains the real boiler -> removed where the measured temperature rose
+class BacktestDB:
+    def __init__(self, data, clock, boiler, wallbox, step):
+        self.data = data
+        self.clock = clock
+        self.boiler = boiler
+        self.wallbox = wallbox
+        self.step = step
+
+    def base_load_kw(self, t):
+        load = self.data.load_power.at(t)
+        if load is None:
+            return None
+        load_kw = abs(load) / 1000
+        if self.real_boiler_heating(t):
+            load_kw = max(load_kw - self.boiler.power_kw, 0.0)
+        return load_kw
+
+    def real_boiler_heating(self, t):
+        now_temp = self.data.boiler_temp.at(t)
+        next_temp = self.data.boiler_temp.at(t + self.step)
+        return now_temp is not None and next_temp is not None and next_temp - now_temp > 0.2
+
+    # Measured temperature drop over one step (draws + standing losses)
+    def temp_drop_k(self, t):
+        now_temp = self.data.boiler_temp.at(t)
+        next_temp = self.data.boiler_temp.at(t + self.step)
+        if now_temp is None or next_temp is None:
+            return 0.0
+        return max(now_temp - next_temp, 0.0)
+
+    def get_latest_pv_data(self):
+        t = self.clock.now()
+        pv = self.data.pv_power.at(t)
+        base_load = self.base_load_kw(t)
+        if pv is None or base_load is None:
+            return None
+        return {
+            "_time": t.isoformat(),
+            "pv_power_kw": pv / 1000,
+            "house_load_kw": base_load + self.boiler.load_kw() + self.wallbox.load_kw(),
+            "battery_power_kw": 0.0,
+            "soc": self.data.soc.at(t) or 0.0,
+        }
+
+    def get_latest_boiler_data(self):
+        return {"_time": self.clock.now().isoformat(), "boiler_temp": round(self.boiler.temp, 1)}
+
+    def get_latest_epex_data(self):
+        price = self.data.prices.at(self.clock.now())
+        return {"price": price} if price is not None else None
+
+    def get_current_epex_price(self):
+        return self.data.prices.at(self.clock.now())
+
+    def query_epex_prices(self, start_time, end_time):
+        return self.data.prices.values_between(start_time, end_time)
+
+    # Day-ahead prices are known in advance -> the optimizer may look into the future
+    def get_epex_price_series(self, start_time, end_time):
+        return self.data.prices.items(start_time, end_time)
+
+
+# Perfect-foresight forecast from the measured PV power
+class BacktestForecast:
+    def __init__(self, data, clock, pv_min_kw=1.5, optimizer_cfg=None):
+        self.data = data
+        self.clock = clock
+        self.pv_min_kw = pv_min_kw
+        cfg = {**DEFAULT_OPTIMIZER_CONFIG, **(optimizer_cfg or {})}
+        self.irradiance_factor = 1000 / (float(cfg["pv_peak_kw"]) * float(cfg["pv_performance_ratio"]))
+
+    def _pv_expected(self, start, end):
+        return any(v / 1000 >= self.pv_min_kw for v in self.data.pv_power.values_between(start, end))
+
+    def get_forecast(self):
+        now = self.clock.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=now.tzinfo)
+        return {
+            "pv_today": self._pv_expected(now, midnight),
+            "pv_tomorrow": self._pv_expected(midnight, midnight + timedelta(days=1)),
+            "source": "backtest"
+        }
+
+    # Hourly mean PV power converted back to irradiance, stamped at hour end like Open-Meteo
+    def get_hourly_irradiance(self):
+        now = self.clock.now()
+        start = datetime.combine(now.date(), datetime.min.time(), tzinfo=now.tzinfo)
+        result = []
+        for h in range(48):
+            hour = start + timedelta(hours=h)
+            values = self.data.pv_power.values_between(hour, hour + timedelta(hours=1))
+            mean_kw = sum(values) / len(values) / 1000 if values else 0.0
+            result.append((hour + timedelta(hours=1), mean_kw * self.irradiance_factor))
+        return result
+
+
+class BacktestLogger:
+    def __init__(self):
+        self.events = 0
+
+    def system_event(self, *a, **k):
+        self.events += 1
+
+    def device_state_change(self, *a, **k):
+        self.events += 1
+
+    def control_decision(self, *a, **k):
+        self.events += 1
+
+    def api_error(self, *a, **k):
+        self.events += 1
+
+
+class StaticConfig:
+    def __init__(self, config):
+        self.config = config
+
+    def get(self):
+        return self.config
+
+    def snapshot(self):
+        return self.config
+
+
+# Replays [start, end) in fixed steps through SchedulerService.run_automatic with simulated devices
+# config: automatic configuration (boiler/wallbox/optimizer), params: overrides from BACKTEST_PARAMS
+# car: (arrive, depart) as "HH:MM" or None for no car
+def run_backtest(data, start, end, config, params=None, step_min=15, car=None,
+                 boiler_power_kw=2.0, boiler_volume_l=200, boiler_start_temp=None, feed_in_price=0.0):
+    started = time.perf_counter()
+    step = timedelta(minutes=step_min)
+    dt_h = step_min / 60
+
+    clock = VirtualClock(start)
+    first_temp = data.boiler_temp.at(start)
+    boiler = SimBoiler(
+        boiler_start_temp if boiler_start_temp is not None else (first_temp if first_temp is not None else 50.0),
+        power_kw=boiler_power_kw, volume_l=boiler_volume_l
+    )
+    wallbox = SimWallbox(clock, *(car or (None, None)))
+    db = BacktestDB(data, clock, boiler, wallbox, step)
+    logger = BacktestLogger()
+
+    scheduler = SchedulerService(
+        mode_store=None,
+        schedule_manager=ScheduleManager(None, clock=clock),
+        boiler=boiler,
+        wallbox=wallbox,
+        db_bridge=db,
+        logger=logger,
+        clock=clock
+    )
+    scheduler.automatic_config = StaticConfig(config)
+    scheduler.pv_forecast = BacktestForecast(data, clock, optimizer_cfg=config.get("optimizer"))
+    scheduler.plan_optimizer.pv_forecast = scheduler.pv_forecast
+
+    for name, value in (params or {}).items():
+        if name not in BACKTEST_PARAMS:
+            raise ValueError(f"Unknown backtest parameter '{name}'. Allowed: {sorted(BACKTEST_PARAMS)}")
+        BACKTEST_PARAMS[name](scheduler, value)
+
+    totals = {"pv_kwh": 0.0, "load_kwh": 0.0, "grid_kwh": 0.0, "feed_in_kwh": 0.0, "cost_ct": 0.0}
+    steps = 0
+    missing_steps = 0
+    boiler_misses = 0
+    checked_deadlines = set()
+
+    t = clock.now()
+    while t < end:
+        scheduler.run_automatic()
+
+        pv = data.pv_power.at(t)
+        base_load = db.base_load_kw(t)
+        if pv is None or base_load is None:
+            missing_steps += 1
+            pv, base_load = pv or 0.0, base_load or 0.0
+        pv_kw = pv / 1000
+        load_kw = base_load + boiler.load_kw() + wallbox.load_kw()
+        grid_kw = max(load_kw - pv_kw, 0.0)
+        feed_in_kw = max(pv_kw - load_kw, 0.0)
+        price = data.prices.at(t) or 0.0
+
+        totals["pv_kwh"] += pv_kw * dt_h
+        totals["load_kwh"] += load_kw * dt_h
+        totals["grid_kwh"] += grid_kw * dt_h
+        totals["feed_in_kwh"] += feed_in_kw * dt_h
+        totals["cost_ct"] += grid_kw * dt_h * price - feed_in_kw * dt_h * feed_in_price
+
+        boiler.step(dt_h, db.temp_drop_k(t))
+        wallbox.step(dt_h)
+
+        # Boiler target check once per day at the target time (after this step's heating)
+        season = scheduler.schedule_manager.determine_season()
+        boiler_cfg = config.get("boiler", {}).get(season, {})
+        if boiler_cfg.get("target_time") and t.date() not in checked_deadlines:
+            deadline = datetime.combine(t.date(), datetime.strptime(boiler_cfg["target_time"], "%H:%M").time(), tzinfo=t.tzinfo)
+            if t <= deadline < t + step:
+                checked_deadlines.add(t.date())
+                # Inside the hysteresis band the scheduler intentionally doesn't reheat
+                if boiler.temp < float(boiler_cfg.get("target_temp_c", 0)) - scheduler.hysteresis:
+                    boiler_misses += 1
+
+        steps += 1
+        clock.advance(step)
+        t = clock.now()
+
+    pv_kwh = totals["pv_kwh"]
+    self_consumed = pv_kwh - totals["feed_in_kwh"]
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "steps": steps,
+        "step_min": step_min,
+        "missing_steps": missing_steps,
+        "params": params or {},
+        "pv_kwh": round(pv_kwh, 2),
+        "load_kwh": round(totals["load_kwh"], 2),
+        "grid_kwh": round(totals["grid_kwh"], 2),
+        "feed_in_kwh": round(totals["feed_in_kwh"], 2),
+        "cost_eur": round(totals["cost_ct"] / 100, 2),
+        "self_consumption": round(self_consumed / pv_kwh, 3) if pv_kwh > 0 else None,
+        "autarky": round(1 - totals["grid_kwh"] / totals["load_kwh"], 3) if totals["load_kwh"] > 0 else None,
+        "boiler": {
+            "energy_kwh": round(boiler.energy_kwh, 2),
+            "switches": boiler.switches,
+            "deadline_checks": len(checked_deadlines),
+            "deadline_misses": boiler_misses,
+            "end_temp": round(boiler.temp, 1),
+        },
+        "wallbox": {
+            "energy_kwh": round(wallbox.energy_kwh, 2),
+            "switches": wallbox.switches,
+        },
+        "log_events": logger.events,
+        "runtime_s": round(time.perf_counter() - started, 2),
+    }
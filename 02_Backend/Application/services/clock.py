@@ -0,0 +1,48 @@
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+VIENNA = ZoneInfo("Europe/Vienna")
+
+
+# Wall clock used in production: local time in Europe/Vienna
+class SystemClock:
+    def __init__(self, tz=VIENNA):
+        self.tz = tz
+
+    def now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    # Seconds for measuring intervals (cache ages, TTLs)
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+# Manually advanced clock for tests and backtests – time only moves with advance()/sleep()/set()
+class VirtualClock:
+    def __init__(self, start: datetime):
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=VIENNA)
+        self.tz = start.tzinfo
+        self._now = start
+
+    def now(self) -> datetime:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now.timestamp()
+
+    def set(self, value: datetime):
+        self._now = value.astimezone(self.tz)
+
+    def advance(self, seconds: float | timedelta):
+        if not isinstance(seconds, timedelta):
+            seconds = timedelta(seconds=seconds)
+        # Arithmetic in UTC, so DST changes don't produce skipped or doubled local times
+        self._now = (self._now.astimezone(timezone.utc) + seconds).astimezone(self.tz)
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
@@ -0,0 +1,148 @@
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+
+# A leader that doesn't answer within this time counts as unavailable (seconds)
+CONTROL_TIMEOUT_S = 10.0
+
+
+class ControlUnavailableError(RuntimeError):
+    pass
+
+
+class ControlCallError(RuntimeError):
+    pass
+
+
+def _authkey():
+    key = os.getenv("CONTROL_AUTHKEY")
+    return key.encode() if key else None
+
+
+# Socket path for a leader lock file: data/scheduler.lock -> data/scheduler.control/control.sock
+# The socket gets a directory of its own, so that directory can be private to the owner
+def control_address(lock_path) -> Path:
+    return Path(lock_path).with_suffix(".control") / "control.sock"
+
+
+# Creates (or takes over) the socket directory with mode 0700; refuses a directory of another user
+def _private_directory(path: Path):
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if path.stat().st_uid != os.getuid():
+        raise PermissionError(f"Control socket directory {path} belongs to another user")
+    os.chmod(path, 0o700)
+
+
+# Local RPC between the gunicorn workers and the leader process (Unix socket next to the lock file)
+# The leader serves a fixed set of handlers (boiler relay, scheduler metrics, plan, shared dashboard caches);
+# the socket is only accessible to the owner and, if CONTROL_AUTHKEY is set, every connection is authenticated
+# Calls are unpickled, so the socket must never be reachable by others: it is bound inside a 0700 directory,
+# which is in place before the listener accepts the first connection (the socket itself is 0600 on top)
+class ControlServer:
+    def __init__(self, address, handlers: dict, authkey=None):
+        self.address = str(address)
+        self.handlers = handlers
+        self.authkey = authkey if authkey is not None else _authkey()
+        self._listener = None
+        self._thread = None
+        self.calls = 0
+        self.errors = 0
+
+    def start(self):
+        _private_directory(Path(self.address).parent)
+        # Socket of a crashed leader – we hold the lock, so nobody else uses it
+        Path(self.address).unlink(missing_ok=True)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        self._thread = threading.Thread(target=self._accept_loop, name="control-server", daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                # Listener closed (stop) -> end
+                return
+            except Exception:
+                # Failed authentication etc. -> ignore this connection
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn:
+            try:
+                name, args, kwargs = conn.recv()
+            except (EOFError, OSError, ValueError):
+                return
+            self.calls += 1
+            handler = self.handlers.get(name)
+            try:
+                if handler is None:
+                    raise KeyError(f"unknown control call '{name}'")
+                reply = ("ok", handler(*args, **kwargs))
+            except Exception as e:
+                self.errors += 1
+                reply = ("error", f"{type(e).__name__}: {e}")
+            try:
+                conn.send(reply)
+            except (OSError, ValueError):
+                pass
+            except Exception as e:
+                # Result not picklable -> the caller gets an error instead of a broken connection
+                self.errors += 1
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            Path(self.address).unlink(missing_ok=True)
+
+
+# Client side for the API workers: one short connection per call, so a leader change needs no reconnect logic
+class ControlClient:
+    def __init__(self, address, authkey=None, timeout_s=CONTROL_TIMEOUT_S):
+        self.address = str(address)
+        self.authkey = authkey if authkey is not None else _authkey()
+        self.timeout_s = timeout_s
+
+    def call(self, name, *args, **kwargs):
+        try:
+            conn = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        except (OSError, EOFError) as e:
+            raise ControlUnavailableError(f"Control process not reachable: {e}") from e
+
+        with conn:
+            try:
+                conn.send((name, args, kwargs))
+                if not conn.poll(self.timeout_s):
+                    raise ControlUnavailableError(f"Control process didn't answer '{name}' within {self.timeout_s} s")
+                status, value = conn.recv()
+            except (OSError, EOFError) as e:
+                raise ControlUnavailableError(f"Control process not reachable: {e}") from e
+
+        if status == "error":
+            raise ControlCallError(value)
+        return value
+
+
+# Boiler as seen by a worker without the relay: state and commands go to the leader process
+class RemoteBoiler:
+    def __init__(self, client: ControlClient):
+        self.client = client
+        self._simulated = True
+
+    def get_state(self) -> bool:
+        state = self.client.call("boiler_state")
+        self._simulated = state["simulated"]
+        return state["heating"]
+
+    def control(self, action: str):
+        return self.client.call("boiler_control", action)
+
+    # Mirrors BoilerController.relay for the "simulated" flag of the endpoints (None = no hardware)
+    @property
+    def relay(self):
+        return None if self._simulated else True
@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from services.clock import SystemClock
+from services.single_flight import SingleFlight
+
+# Upper bound for one dashboard request; sections still loading afterwards are served from their last value
+DASHBOARD_TIMEOUT_S = 5.0
+
+
+# Aggregated home screen data (GET /api/dashboard)
+# - Every section (pv, boiler, wallbox, epex, forecast, mode) sits behind its own short-TTL SingleFlight cache,
+#   shared with the live stream -> parallel requests and the stream cause one device/Influx query per TTL
+# - collect() loads all requested sections concurrently: cold latency = slowest section, not the sum
+# - A failing or slow section doesn't fail the response; it carries its last value, the error and fresh=False
+class DashboardService:
+    def __init__(self, sections, timeout_s=DASHBOARD_TIMEOUT_S, clock=None):
+        self.clock = clock or SystemClock()
+        self.timeout_s = timeout_s
+        self._ttl = {name: ttl_s for name, (_, ttl_s) in sections.items()}
+        self._caches = {
+            name: SingleFlight(loader, ttl_s=ttl_s, clock=self.clock.monotonic, name=f"dashboard_{name}")
+            for name, (loader, ttl_s) in sections.items()
+        }
+        self._executor = ThreadPoolExecutor(max_workers=len(sections) or 1, thread_name_prefix="dashboard")
+
+    @property
+    def sections(self):
+        return list(self._caches)
+
+    # Cached value of one section (loads it if older than its TTL)
+    def load(self, name):
+        return self._caches[name].get()
+
+    # Drops the cached value of a section, e.g. after a command changed the device state
+    def invalidate(self, name):
+        self._caches[name].invalidate()
+
+    # Loads the sections concurrently and returns {"timestamp", "sections": {name: {...}}}
+    def collect(self, names=None) -> dict:
+        names = [name for name in (names or self.sections) if name in self._caches]
+        futures = {name: self._executor.submit(self._caches[name].get) for name in names}
+        wait(futures.values(), timeout=self.timeout_s)
+
+        now = self.clock.now()
+        return {
+            "timestamp": now.isoformat(),
+            "sections": {name: self._section(name, future, now) for name, future in futures.items()}
+        }
+
+    def _section(self, name, future, now):
+        cache = self._caches[name]
+        error = None
+        if not future.done():
+            error = "timeout"
+        elif future.exception() is not None:
+            error = str(future.exception()) or type(future.exception()).__name__
+
+        data = cache.peek() if error else future.result()
+        age = cache.age_s()
+        section = {
+            "data": data,
+            "updated": (now - timedelta(seconds=age)).isoformat() if age is not None else None,
+            "age_s": round(age, 1) if age is not None else None,
+            "ttl_s": self._ttl[name],
+            "fresh": error is None,
+        }
+        if error:
+            section["error"] = error
+        return section
+
+    # Cache counters for monitoring
+    def stats(self) -> dict:
+        return {
+            name: {"hits": cache.hits, "misses": cache.misses, "shared": cache.shared}
+            for name, cache in self._caches.items()
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
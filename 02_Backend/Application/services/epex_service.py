@@ -1,11 +1,16 @@
 import statistics
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
+from datetime import timedelta
+
+from services.clock import SystemClock
 
 class EPEXService:
-    def __init__(self, db_bridge):
+    def __init__(self, db_bridge, clock=None, threshold_factor=0.33, emergency_factor=0.20):
         self.db = db_bridge
+        self.clock = clock or SystemClock()
         self.analysis_days = 14  # 2 weeks
+        # Position of the thresholds inside the 14-day price range (0 = min, 1 = max)
+        self.threshold_factor = threshold_factor
+        self.emergency_factor = emergency_factor
         
         # Cache for price statistics
         self._cached_stats = None
@@ -15,7 +20,7 @@ class EPEXService:
     def get_price_statistics(self):
     
         # Check if cache is valid
-        now = datetime.now(ZoneInfo("Europe/Vienna"))
+        now = self.clock.now()
         
         if self._is_cache_valid(now):
             # Update only current price (changes every hour)
@@ -85,10 +90,10 @@ class EPEXService:
             span = max_price - min_price
             
             # Automatic threshold: lower third of 14-day price range
-            threshold = min_price + (span * 0.33)
+            threshold = min_price + (span * self.threshold_factor)
             
             # Emergency threshold: lower 20% (extremely cheap)
-            emergency_threshold = min_price + (span * 0.20)
+            emergency_threshold = min_price + (span * self.emergency_factor)
             
             is_cheap = current_price <= threshold
             is_emergency_cheap = current_price <= emergency_threshold
@@ -0,0 +1,280 @@
+import asyncio
+import threading
+import time
+
+from stores.system_mode_store import SystemMode
+
+
+# Topics pushed from outside (API): the policies react immediately, without min_interval_s throttling
+URGENT_TOPICS = frozenset({"mode", "config", "schedule", "plan"})
+
+# PV polling interval: a new value only exists after the collector wrote a point, polling faster than its write
+# interval repeats the same Influx query (SCHEDULER_PV_POLL_S sets it to the collector's interval)
+PV_POLL_INTERVAL_S = 30.0
+
+
+# Polled data source: publishes its topic only if the fingerprint of the new value differs from the last one
+# aligned=True polls on wall-clock multiples of interval_s (EPEX: new price exactly at the quarter hour)
+class _Source:
+    def __init__(self, topic, interval_s, loader, fingerprint, aligned=False):
+        self.topic = topic
+        self.interval_s = interval_s
+        self.loader = loader
+        self.fingerprint = fingerprint
+        self.aligned = aligned
+        self.last = None
+        self.polls = 0
+        self.changes = 0
+        self.errors = 0
+
+
+# Control policy: re-evaluated when one of its topics fires (debounced), at the latest after heartbeat_s
+# heartbeat_s may be a callable returning the seconds until the next due evaluation
+# Measurement topics re-evaluate at most every min_interval_s, urgent topics cut the wait short
+class _Policy:
+    def __init__(self, name, topics, evaluate, heartbeat_s, min_interval_s=0.0):
+        self.name = name
+        self.topics = frozenset(topics)
+        self.evaluate = evaluate
+        self.heartbeat_s = heartbeat_s
+        self.min_interval_s = min_interval_s
+        self.dirty = None   # asyncio.Event, created inside the loop
+        self.urgent = None  # asyncio.Event, created inside the loop
+        self.last_run = None
+        self.evaluations = 0
+        self.heartbeats = 0
+        self.errors = 0
+        self.last_reason = None
+
+
+# Event-driven control core (alternative to the threaded 60 s polling of SchedulerService)
+# - Sources poll cheap inputs and publish a topic only on a relevant change
+# - notify(topic) pushes external changes (mode, config, schedule) and new optimizer plans from any thread
+# - Policies (boiler, wallbox, time control) re-run only for their topics; blocking device/DB calls run in the executor
+#   and each device step holds only its own lock in SchedulerService, so one device's latency never blocks another
+#   policy or the event loop
+class EventControlCore:
+    def __init__(self, scheduler, debounce_s=0.5, run_blocking=None,
+                 pv_interval_s=PV_POLL_INTERVAL_S, boiler_interval_s=60.0, wallbox_interval_s=30.0,
+                 epex_interval_s=900.0, forecast_interval_s=900.0, heartbeat_s=300.0):
+        self.scheduler = scheduler
+        self.clock = scheduler.clock
+        self.debounce_s = debounce_s
+        self._run_blocking = run_blocking
+        self.loop = None
+        self._thread = None
+        self._tasks = []
+        self.events = {}
+
+        inputs = scheduler.inputs
+        # Quellen werden nur gepollt, um Änderungen zu erkennen – die Werte liegen danach im TTL-Cache der SharedInputs
+        self.sources = [
+            _Source("pv", pv_interval_s, inputs.pv_state, self._pv_fingerprint),
+            _Source("boiler_temp", boiler_interval_s, self._load_boiler_temp, self._temp_fingerprint),
+            _Source("wallbox", wallbox_interval_s, self._load_wallbox, self._wallbox_fingerprint),
+            _Source("epex", epex_interval_s, self._load_epex, self._epex_fingerprint, aligned=True),
+            _Source("forecast", forecast_interval_s, inputs.forecast, lambda f: (f.get("pv_today"), f.get("pv_tomorrow")) if f else None),
+        ]
+        self.policies = [
+            # Boiler: PV-Rauschen soll das Relais nicht im 10 s-Takt prüfen lassen
+            _Policy("boiler", {"pv", "boiler_temp", "epex", "forecast", "config", "mode", "plan"},
+                    self._evaluate_boiler, heartbeat_s, min_interval_s=30.0),
+            _Policy("wallbox", {"pv", "wallbox", "epex", "forecast", "config", "mode", "plan", "boiler"},
+                    self._evaluate_wallbox, heartbeat_s, min_interval_s=10.0),
+            # Zeitsteuerung schläft bis zur nächsten Schaltzeit
+            _Policy("time_controlled", {"mode", "schedule"}, self._evaluate_time_controlled,
+                    self._time_controlled_heartbeat),
+        ]
+
+    # Starts the core in its own thread with a private event loop
+    def start(self):
+        self._thread = threading.Thread(target=self._thread_main, name="event-control-core", daemon=True)
+        self._thread.start()
+
+    def _thread_main(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.run())
+
+    # Runs all sources and policies until stop()
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        for policy in self.policies:
+            policy.dirty = asyncio.Event()
+            policy.urgent = asyncio.Event()
+            policy.dirty.set()  # first evaluation right after start
+        self._tasks = [self.loop.create_task(self._source_task(s)) for s in self.sources]
+        self._tasks += [self.loop.create_task(self._policy_task(p)) for p in self.policies]
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        if self.loop is None:
+            return
+        for task in self._tasks:
+            self.loop.call_soon_threadsafe(task.cancel)
+
+    # Thread-safe: publish a topic from outside the loop (API handlers, other threads)
+    def notify(self, topic):
+        if self.loop is None or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.publish, topic)
+
+    # Marks every policy subscribed to the topic as dirty (inside the loop)
+    def publish(self, topic):
+        self.events[topic] = self.events.get(topic, 0) + 1
+        for policy in self.policies:
+            if topic in policy.topics and policy.dirty is not None:
+                policy.last_reason = topic
+                policy.dirty.set()
+                if topic in URGENT_TOPICS:
+                    policy.urgent.set()
+
+    async def _call(self, fn):
+        if self._run_blocking is not None:
+            return self._run_blocking(fn)
+        return await self.loop.run_in_executor(None, fn)
+
+    async def _source_task(self, source):
+        while True:
+            try:
+                value = await self._call(source.loader)
+                source.polls += 1
+                fingerprint = source.fingerprint(value)
+                if fingerprint != source.last:
+                    source.last = fingerprint
+                    source.changes += 1
+                    self.publish(source.topic)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                source.errors += 1
+            await asyncio.sleep(self._delay(source))
+
+    # Seconds until the next poll; aligned sources wake shortly after the next wall-clock boundary
+    def _delay(self, source):
+        if not source.aligned:
+            return source.interval_s
+        return source.interval_s - self.clock.now().timestamp() % source.interval_s + 1.0
+
+    async def _policy_task(self, policy):
+        while True:
+            try:
+                heartbeat = policy.heartbeat_s() if callable(policy.heartbeat_s) else policy.heartbeat_s
+                await asyncio.wait_for(policy.dirty.wait(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                policy.heartbeats += 1
+                policy.last_reason = "heartbeat"
+            # Throttle measurement-driven evaluations, unless an urgent topic arrives meanwhile
+            if policy.last_run is not None and not policy.urgent.is_set():
+                wait = policy.last_run + policy.min_interval_s - self.loop.time()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(policy.urgent.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+            # Debounce: several topics firing together cause one evaluation
+            await asyncio.sleep(self.debounce_s)
+            policy.dirty.clear()
+            policy.urgent.clear()
+            policy.last_run = self.loop.time()
+            try:
+                await self._call(policy.evaluate)
+                policy.evaluations += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                policy.errors += 1
+                # SYSTEM EVENT LOG
+                self.scheduler.logger.system_event(
+                    level="error",
+                    source="scheduler",
+                    message=f"Event-Core Fehler in {policy.name}: {e}"
+                )
+
+    def _mode(self):
+        store = self.scheduler.mode_store
+        return store.get() if store else None
+
+    def _evaluate_boiler(self):
+        if self._mode() != SystemMode.AUTOMATIC:
+            return
+        boiler_before = self.scheduler.boiler.get_state()
+        started = time.perf_counter()
+        self.scheduler.run_step("main", self.scheduler.run_automatic_boiler)
+        self.scheduler.metrics.record_tick(time.perf_counter() - started)
+        # Boiler-Last ändert den Überschuss für die Wallbox
+        if self.scheduler.boiler.get_state() != boiler_before and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.publish, "boiler")
+
+    def _evaluate_wallbox(self):
+        if self._mode() != SystemMode.AUTOMATIC or not self.scheduler.wallbox:
+            return
+        started = time.perf_counter()
+        self.scheduler.run_step("wallbox", self.scheduler.run_automatic_wallbox)
+        self.scheduler.wallbox_metrics.record_tick(time.perf_counter() - started)
+
+    def _evaluate_time_controlled(self):
+        if self._mode() == SystemMode.TIME_CONTROLLED:
+            self.scheduler.run_step("main", self.scheduler.time_controlled_tick)
+
+    # Outside TIME_CONTROLLED only mode events matter; a failed run is retried after a minute
+    def _time_controlled_heartbeat(self):
+        if self._mode() != SystemMode.TIME_CONTROLLED:
+            return 3600.0
+        seconds = self.scheduler.seconds_until_time_controlled()
+        return seconds if seconds > 0 else 60.0
+
+    def _load_boiler_temp(self):
+        data = self.scheduler.db_bridge.get_latest_boiler_data()
+        return data.get("boiler_temp") if data else None
+
+    def _load_wallbox(self):
+        if not self.scheduler.wallbox:
+            return None
+        return self.scheduler.wallbox.fetch_data()
+
+    def _load_epex(self):
+        return self.scheduler.inputs.epex_stats(max_age_s=0)
+
+    # Fingerprints: only changes that can alter a decision count (0.2 kW surplus, 1 % SOC, 0.5 K, 0.1 kWh)
+    @staticmethod
+    def _pv_fingerprint(pv_state):
+        if pv_state is None:
+            return None
+        soc = pv_state.get("soc")
+        return round(pv_state.get("surplus_kw", 0.0) * 5) / 5, round(soc) if soc is not None else None
+
+    @staticmethod
+    def _temp_fingerprint(temp):
+        return None if temp is None else round(temp * 2) / 2
+
+    @staticmethod
+    def _epex_fingerprint(stats):
+        if not stats:
+            return None
+        return stats.get("current"), stats.get("is_cheap"), stats.get("is_emergency_cheap")
+
+    @staticmethod
+    def _wallbox_fingerprint(data):
+        if not data:
+            return None
+        eto = data.get("eto")
+        return (data.get("car_connected"), data.get("alw"), data.get("amp"),
+                round(eto / 100) if eto is not None else None)
+
+    def snapshot(self) -> dict:
+        return {
+            "events": dict(self.events),
+            "sources": {
+                s.topic: {"interval_s": s.interval_s, "polls": s.polls, "changes": s.changes, "errors": s.errors}
+                for s in self.sources
+            },
+            "policies": {
+                p.name: {"evaluations": p.evaluations, "heartbeats": p.heartbeats, "errors": p.errors,
+                         "last_reason": p.last_reason}
+                for p in self.policies
+            },
+        }
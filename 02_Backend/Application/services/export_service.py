@@ -0,0 +1,248 @@
+import csv
+import io
+import re
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from bridges.db_bridge import PV_FIELDS
+
+# Short names of the API -> Influx measurements
+EXPORT_MEASUREMENTS = {
+    "pv": "pv_measurements",
+    "boiler": "boiler_measurements",
+    "epex": "epex_prices",
+}
+EXPORT_FORMATS = ("csv", "parquet")
+# Declared fields per measurement: always in the Parquet schema as float64, whatever the first rows contain
+EXPORT_FIELDS = {
+    "pv_measurements": PV_FIELDS,
+    "boiler_measurements": ("boiler_temp",),
+    "epex_prices": ("price",),
+}
+# Exports running at the same time per worker process (each one holds a request thread for its whole duration)
+MAX_CONCURRENT_EXPORTS = 2
+# CSV: bytes collected before a chunk is sent
+CSV_CHUNK_BYTES = 64 * 1024
+# Parquet: rows per row group = rows held in memory at a time
+PARQUET_ROW_GROUP_ROWS = 50_000
+
+TIMEZONE = ZoneInfo("Europe/Vienna")
+_EVERY = re.compile(r"^[1-9][0-9]{0,3}(s|m|h|d)$")
+
+
+class ExportBusyError(RuntimeError):
+    pass
+
+
+class ExportUnavailableError(RuntimeError):
+    pass
+
+
+# Start/stop of an export: YYYY-MM-DD (local midnight) or ISO 8601 datetime (without offset = local time)
+def parse_export_time(value, name) -> datetime:
+    if not value:
+        raise ValueError(f"Missing query parameter: {name}")
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}. Use YYYY-MM-DD or an ISO 8601 timestamp")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=TIMEZONE)
+    return parsed
+
+
+# Validated export request: measurement, [start, stop) as RFC 3339 (UTC), optional aggregation window
+class ExportRequest:
+    def __init__(self, measurement, start, stop, fmt="csv", every=None):
+        if measurement in EXPORT_MEASUREMENTS:
+            measurement = EXPORT_MEASUREMENTS[measurement]
+        if measurement not in EXPORT_MEASUREMENTS.values():
+            raise ValueError(f"measurement must be one of {sorted(EXPORT_MEASUREMENTS)}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of {EXPORT_FORMATS}")
+        if every and not _EVERY.match(every):
+            raise ValueError("every must be a duration like 15m, 1h or 1d")
+
+        start_dt = parse_export_time(start, "start")
+        stop_dt = parse_export_time(stop, "stop") if stop else datetime.now(TIMEZONE)
+        if stop_dt <= start_dt:
+            raise ValueError("stop must be after start")
+
+        self.measurement = measurement
+        self.format = fmt
+        self.every = every or None
+        self.start_dt = start_dt
+        self.stop_dt = stop_dt
+        self.start = start_dt.astimezone(ZoneInfo("UTC")).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.stop = stop_dt.astimezone(ZoneInfo("UTC")).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    @property
+    def filename(self):
+        return f"{self.measurement}_{self.start_dt:%Y%m%d}-{self.stop_dt:%Y%m%d}.{self.format}"
+
+    @property
+    def mimetype(self):
+        return "text/csv" if self.format == "csv" else "application/vnd.apache.parquet"
+
+
+# Sink for pyarrow's ParquetWriter: collects the written bytes until the generator sends them
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# Bulk export of Influx measurements (GET /api/export), streamed to the client
+# - CSV: rows of query_csv are re-written chunk by chunk, nothing is held beyond one chunk
+# - Parquet: records of query_stream are written in row groups of PARQUET_ROW_GROUP_ROWS (needs pyarrow)
+# - At most MAX_CONCURRENT_EXPORTS per process, further requests are rejected instead of queued
+class ExportService:
+    def __init__(self, db_bridge, max_concurrent=MAX_CONCURRENT_EXPORTS, row_group_rows=PARQUET_ROW_GROUP_ROWS):
+        self.db_bridge = db_bridge
+        self.row_group_rows = row_group_rows
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        # running/completed are changed from the request threads
+        self._lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+
+    # Reserves an export slot; release() must follow (the endpoint ties it to the end of the response)
+    def acquire(self):
+        if not self._slots.acquire(blocking=False):
+            raise ExportBusyError("Too many exports running, try again later")
+        with self._lock:
+            self.running += 1
+
+    def release(self):
+        with self._lock:
+            self.running -= 1
+        self._slots.release()
+
+    def _completed(self):
+        with self._lock:
+            self.completed += 1
+
+    # Starts the Influx query (connection errors surface here, before the response is sent) and returns the chunks
+    def open(self, export: ExportRequest):
+        if export.format == "csv":
+            rows = self.db_bridge.export_csv_rows(export.measurement, export.start, export.stop, export.every)
+            return self._csv_chunks(rows)
+
+        pa, pq = _pyarrow()
+        records = self.db_bridge.export_records(export.measurement, export.start, export.stop, export.every)
+        return self._parquet_chunks(records, pa, pq, EXPORT_FIELDS[export.measurement])
+
+    def _csv_chunks(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        header = None
+        for row in rows:
+            # Influx columns "", result, table are dropped; empty lines and repeated headers (new table) skipped
+            values = row[3:]
+            if not values or not any(values):
+                continue
+            if header is None:
+                header = values
+                writer.writerow(["time" if name == "_time" else name for name in values])
+                continue
+            if values == header:
+                continue
+            writer.writerow(values)
+            if buffer.tell() >= CSV_CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        self._completed()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    def _parquet_chunks(self, records, pa, pq, declared):
+        sink = _ChunkSink()
+        writer = None
+        schema = None
+        dropped = set()
+        batch = []
+
+        def flush():
+            nonlocal writer, schema
+            if schema is None:
+                schema = _arrow_schema(pa, declared, batch)
+                writer = pq.ParquetWriter(sink, schema, compression="zstd")
+            if not batch:
+                return
+            # Columns the schema does not know (first seen after the first row group) cannot be added any more
+            for row in batch:
+                for name in row.keys() - _IGNORED_COLUMNS:
+                    if name not in schema.names and name not in dropped:
+                        dropped.add(name)
+                        print(f"[export] Spalte '{name}' erst nach der ersten Row Group gefunden, nicht exportiert")
+            writer.write_table(_arrow_table(pa, schema, batch), row_group_size=len(batch))
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.row_group_rows:
+                flush()
+                yield sink.drain()
+        if batch or writer is None:
+            flush()
+        writer.close()
+        self._completed()
+        yield sink.drain()
+
+
+# ! pyarrow is optional (large); without it only CSV exports are available
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportUnavailableError("Parquet export needs pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+# Influx columns that are not exported (time is written as "time")
+_IGNORED_COLUMNS = {"_time", "result", "table"}
+
+
+# Schema: time + the declared fields (float64) + further columns of the first row group (tags, strings)
+def _arrow_schema(pa, declared, rows):
+    fields = [pa.field("time", pa.timestamp("ms", tz="UTC"))]
+    fields += [pa.field(name, pa.float64()) for name in declared]
+    names = list(declared)
+    for row in rows:
+        for name in row:
+            if name not in names and name not in _IGNORED_COLUMNS:
+                names.append(name)
+                fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+# Row group cast to the schema: declared fields as float (ints of a row group would otherwise not match),
+# everything else as string
+def _arrow_table(pa, schema, rows):
+    columns = {"time": [row.get("_time") for row in rows]}
+    for field in schema:
+        if field.name == "time":
+            continue
+        values = [row.get(field.name) for row in rows]
+        convert = float if field.type == pa.float64() else str
+        columns[field.name] = [None if value is None else convert(value) for value in values]
+    return pa.Table.from_pydict(columns, schema=schema)
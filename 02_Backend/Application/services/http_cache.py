@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# ! brotli is optional: without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Smaller bodies are sent uncompressed (headers + CPU cost more than the saved bytes)
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# Memory budget for compressed bodies of closed periods
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+# Part of every period ETag: bump when the payload format of the history endpoints changes
+HISTORY_FORMAT_VERSION = "1"
+# History charts show 15 min means; the last window of a period is complete once the collector has written it
+AGGREGATION_WINDOW = timedelta(minutes=15)
+COLLECTOR_WRITE_LATENCY = timedelta(minutes=5)
+# A period counts as closed (immutable, cached for a day) this long after its end
+CLOSED_GRACE = AGGREGATION_WINDOW + COLLECTOR_WRITE_LATENCY
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/plain", "text/csv", "text/html", "application/javascript", "text/css")
+TIMEZONE = ZoneInfo("Europe/Vienna")
+
+
+# Content coding for an Accept-Encoding header: "br", "gzip" or None (identity)
+def negotiate(accept_encoding: str | None) -> str | None:
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda enc: accepted.get(enc, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 -> same input gives the same bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Weak ETag of a response body (open periods: the data may still change, so the content is the version)
+def body_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+# Time range of a history request (/api/pv/daily|monthly|yearly); same formats and messages as DB_Bridge
+class HistoryPeriod:
+    def __init__(self, kind, key, start, end):
+        self.kind = kind
+        self.key = key
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def parse(cls, kind, value=None, now=None):
+        now = now or datetime.now(TIMEZONE)
+        if kind == "daily":
+            if value:
+                try:
+                    day = datetime.strptime(value, "%Y-%m-%d").date()
+                except ValueError:
+                    raise ValueError("Invalid date format. Use YYYY-MM-DD")
+            else:
+                day = now.date()
+            start = datetime(day.year, day.month, day.day, tzinfo=TIMEZONE)
+            return cls(kind, day.isoformat(), start, start + timedelta(days=1))
+
+        if kind == "monthly":
+            if value:
+                try:
+                    year, month = map(int, value.split("-"))
+                    start = datetime(year, month, 1, tzinfo=TIMEZONE)
+                except ValueError:
+                    raise ValueError("Invalid month format. Use YYYY-MM")
+            else:
+                start = datetime(now.year, now.month, 1, tzinfo=TIMEZONE)
+            end = (start + timedelta(days=32)).replace(day=1)
+            return cls(kind, f"{start.year:04d}-{start.month:02d}", start, end)
+
+        if kind == "yearly":
+            try:
+                year = int(value) if value else now.year
+                start = datetime(year, 1, 1, tzinfo=TIMEZONE)
+            except ValueError:
+                raise ValueError("Invalid year format. Use YYYY")
+            return cls(kind, str(year), start, datetime(year + 1, 1, 1, tzinfo=TIMEZONE))
+
+        raise ValueError(f"Unknown period kind '{kind}'")
+
+    # A period is closed once its last window and late-written points are in: its data no longer changes
+    def is_closed(self, now=None) -> bool:
+        return (now or datetime.now(TIMEZONE)) >= self.end + CLOSED_GRACE
+
+    # Version of a period's body: a changed payload (late points, new format) gets a new ETag
+    def etag(self, body: bytes) -> str:
+        return f"pv-{self.kind}-{self.key}-v{HISTORY_FORMAT_VERSION}-{body_etag(body)}"
+
+
+# Encoded bodies of one closed period (gzip always, brotli on first request)
+class CachedBody:
+    def __init__(self, etag, last_modified, gzip_body):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.bodies = {"gzip": gzip_body}
+
+    @property
+    def size(self):
+        return sum(len(body) for body in self.bodies.values())
+
+    # Body for a negotiated encoding (None = identity, unpacked from the gzip copy)
+    def body(self, encoding):
+        if encoding is None:
+            return gzip.decompress(self.bodies["gzip"])
+        if encoding not in self.bodies:
+            self.bodies[encoding] = compress(gzip.decompress(self.bodies["gzip"]), encoding)
+        return self.bodies[encoding]
+
+
+# LRU cache of compressed history responses of closed periods, bounded by bytes
+class ResponseCache:
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key) -> CachedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, etag, last_modified, body: bytes) -> CachedBody:
+        entry = CachedBody(etag, last_modified, compress(body, "gzip"))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    # Sizes change when a brotli copy is added -> called after every encoded read as well
+    def _evict(self):
+        total = sum(entry.size for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.size
+
+    def trim(self):
+        with self._lock:
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(entry.size for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,94 @@
+import dataclasses
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from uuid import UUID
+
+from flask.json.provider import DefaultJSONProvider
+
+# ! orjson is optional: without it the same output is produced by the stdlib encoder (slower)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Types the stdlib encoder doesn't know (orjson handles datetimes, dataclasses, enums and UUIDs itself)
+# Datetimes are written as ISO 8601 (not as HTTP date like Flask's default provider), Decimals as numbers
+def default(obj):
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_options(sort_keys=False, indent=None):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if sort_keys:
+        options |= orjson.OPT_SORT_KEYS
+    if indent:
+        options |= orjson.OPT_INDENT_2
+    return options
+
+
+# Compact UTF-8 encoded JSON (response bodies, SSE events, exports)
+def dumps_bytes(obj, sort_keys=False, indent=None) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=_orjson_options(sort_keys, indent))
+    return dumps(obj, sort_keys=sort_keys, indent=indent).encode("utf-8")
+
+
+def dumps(obj, sort_keys=False, indent=None) -> str:
+    if orjson is not None:
+        return dumps_bytes(obj, sort_keys, indent).decode("utf-8")
+    separators = None if indent else (",", ":")
+    return json.dumps(obj, default=default, ensure_ascii=False, sort_keys=sort_keys, indent=indent, separators=separators)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Flask JSON provider (app.json) backed by orjson: jsonify, request.get_json and the test client use it
+# - Response bodies are encoded once straight to bytes, without the str round trip of the default provider
+# - Keys keep their insertion order (sort_keys=False); debug mode still pretty-prints
+class FastJSONProvider(DefaultJSONProvider):
+    sort_keys = False
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            kwargs.setdefault("default", default)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys), indent=kwargs.get("indent"))
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        if orjson is None:
+            separators = None if indent else (",", ":")
+            body = self.dumps(obj, indent=indent, separators=separators)
+        else:
+            body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=indent)
+        return self._app.response_class(body, mimetype=self.mimetype)
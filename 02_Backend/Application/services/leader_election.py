@@ -0,0 +1,75 @@
+import os
+import threading
+from pathlib import Path
+
+# ! fcntl only exists on Unix; without it there is only one process (development on Windows) -> always leader
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Standby workers try to take over this often (seconds)
+LEADER_RETRY_S = 5.0
+
+
+# Leader election between the gunicorn worker processes via an exclusive flock on a lock file
+# - Exactly one process holds the lock and runs the control loop (scheduler, boiler relay)
+# - The kernel releases the lock when that process dies -> a standby worker takes over within retry_s
+# - The lock file contains the PID of the current leader (monitoring only)
+class LeaderElection:
+    def __init__(self, path="data/scheduler.lock", retry_s=LEADER_RETRY_S):
+        self.path = Path(path)
+        self.retry_s = retry_s
+        self.is_leader = False
+        self._fd = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Takes the lock if it is free; returns True if this process is the leader
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+
+    # Standby: retries in the background and calls on_elected() once this process became the leader
+    def wait_for_leadership(self, on_elected):
+        def run():
+            while not self._stop.wait(self.retry_s):
+                if self.try_acquire():
+                    on_elected()
+                    return
+
+        self._thread = threading.Thread(target=run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    # PID of the current leader (None if unknown)
+    def leader_pid(self) -> int | None:
+        if self.is_leader:
+            return os.getpid()
+        try:
+            return int(self.path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def release(self):
+        self._stop.set()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+
+from services.json_provider import dumps
+
+# Keep-alive comment interval of the SSE stream (proxies close idle connections)
+KEEPALIVE_S = 15.0
+# Events buffered per client; a client that falls behind gets a fresh snapshot instead
+SUBSCRIBER_QUEUE_SIZE = 200
+
+
+# Changed keys of a dict value (removed keys -> None); other values are sent whole
+def _delta(old, new):
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = {key: value for key, value in new.items() if old.get(key) != value}
+        changed.update({key: None for key in old.keys() - new.keys()})
+        return changed
+    return new
+
+
+# One connected client: bounded queue, filled by the producer, drained by the SSE generator
+class Subscription:
+    def __init__(self, snapshot):
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.snapshot = snapshot
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+# Polled source of the live stream: loader() is called every interval_s seconds while clients are connected
+class LiveSource:
+    def __init__(self, topic, loader, interval_s):
+        self.topic = topic
+        self.loader = loader
+        self.interval_s = interval_s
+        self.next_due = 0.0
+        self.errors = 0
+
+
+# Live data for the dashboard (GET /api/stream)
+# One producer thread polls the sources (PV, boiler, wallbox, EPEX, forecast, mode) and fans every change out
+# to all connected clients as a typed delta – the backend/Influx load doesn't grow with the number of clients.
+# Events without a source (decisions, mode changes from the API) are pushed with publish().
+class LiveDataService:
+    def __init__(self, sources, monotonic=time.monotonic, autostart=True):
+        self.sources = list(sources)
+        self._monotonic = monotonic
+        # False: no producer thread, poll_once() is driven by the caller (tests)
+        self._autostart = autostart
+        self._lock = threading.Lock()
+        self._state = {}
+        self._subscribers = set()
+        self._seq = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    # Registers a client; the returned subscription carries the full current state as its first snapshot
+    def subscribe(self) -> Subscription:
+        with self._lock:
+            sub = Subscription(dict(self._state))
+            self._subscribers.add(sub)
+        if self._autostart:
+            self._ensure_running()
+            self._wake.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    # Current value of every topic (full, not delta)
+    def current(self) -> dict:
+        with self._lock:
+            return dict(self._state)
+
+    # Stores a new value for the topic and sends the delta to all clients (no-op if unchanged)
+    def update(self, topic, value):
+        with self._lock:
+            old = self._state.get(topic)
+            if old == value:
+                return False
+            self._state[topic] = value
+            self._fan_out(topic, value if old is None else _delta(old, value))
+            return True
+
+    # Pushes an event that is not part of the state (e.g. a control decision)
+    def publish(self, topic, data):
+        with self._lock:
+            self._fan_out(topic, data)
+
+    def _fan_out(self, topic, data):
+        self._seq += 1
+        event = (self._seq, topic, data)
+        for sub in self._subscribers:
+            sub.put(event)
+
+    # Polls all due sources once; returns the seconds until the next source is due
+    def poll_once(self):
+        now = self._monotonic()
+        for source in self.sources:
+            if now < source.next_due:
+                continue
+            source.next_due = now + source.interval_s
+            try:
+                value = source.loader()
+            except Exception:
+                source.errors += 1
+                continue
+            self.polls += 1
+            if value is not None:
+                self.update(source.topic, value)
+        return max(min(s.next_due for s in self.sources) - self._monotonic(), 0.0) if self.sources else KEEPALIVE_S
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-data", daemon=True)
+            self._thread.start()
+
+    # Producer loop: only polls while at least one client is connected
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.subscriber_count():
+                self._wake.wait(KEEPALIVE_S)
+                self._wake.clear()
+                continue
+            delay = self.poll_once()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    # SSE generator for one client: snapshot first, then deltas, keep-alive comments while idle
+    def stream(self, sub, keepalive_s=KEEPALIVE_S):
+        try:
+            yield "retry: 5000\n\n"
+            yield from self._snapshot_events(sub.snapshot)
+            while not self._stop.is_set():
+                event = sub.get(keepalive_s)
+                if sub.overflowed:
+                    # Client too slow: drop the backlog and start over with the full state
+                    with self._lock:
+                        sub.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+                        sub.overflowed = False
+                        snapshot = dict(self._state)
+                    yield from self._snapshot_events(snapshot)
+                    continue
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                seq, topic, data = event
+                yield format_sse(topic, data, seq)
+        finally:
+            self.unsubscribe(sub)
+
+    @staticmethod
+    def _snapshot_events(snapshot):
+        for topic, value in snapshot.items():
+            yield format_sse(topic, value)
+
+
+def format_sse(topic, data, seq=None) -> str:
+    lines = [f"event: {topic}"]
+    if seq is not None:
+        lines.append(f"id: {seq}")
+    lines.append("data: " + dumps(data))
+    return "\n".join(lines) + "\n\n"
+
+
+# Logger wrapper: forwards everything and mirrors control decisions / system events into the live stream
+class LiveLoggerTap:
+    def __init__(self, logger, live_data):
+        self._logger = logger
+        self._live_data = live_data
+
+    def __getattr__(self, name):
+        return getattr(self._logger, name)
+
+    def device_state_change(self, device, old_state, new_state, reason="unbekannt"):
+        self._logger.device_state_change(device, old_state, new_state, reason=reason)
+        if old_state is not None and new_state is not None and old_state != new_state:
+            self._live_data.publish("decision", {
+                "device": device, "old_state": old_state, "new_state": new_state, "reason": reason
+            })
+
+    def system_event(self, level, source, message):
+        self._logger.system_event(level=level, source=source, message=message)
+        self._live_data.publish("system_event", {"level": level, "source": source, "message": message})
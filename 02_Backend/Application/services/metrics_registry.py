@@ -0,0 +1,223 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Default histogram buckets in seconds (same bounds as the scheduler tick histograms in tick_metrics)
+BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    # A single assignment is atomic -> no lock needed
+    def set(self, value):
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    # Hot path: one bisect and one uncontended lock; the total count is derived from the buckets at scrape time
+    def observe(self, value: float):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    # Context manager / decorator-free timing: with hist.time(): ...
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._started)
+        return False
+
+
+# One metric with its label combinations; labels(...) returns the child that is updated on the hot path
+# (callers cache the child if they can, the lookup is one dict access anyway)
+class _Family:
+    def __init__(self, kind, name, help_text, labelnames, factory):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    # Shortcuts for metrics without labels
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self):
+        return list(self._children.items())
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in sorted(self.samples(), key=lambda item: tuple(map(str, item[0]))):
+            if self.kind == "histogram":
+                self._render_histogram(lines, values, child)
+            else:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+
+    def _render_histogram(self, lines, values, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        count = sum(counts)
+        cumulative = 0
+        for bound, n in zip(child.bounds + (float("inf"),), counts):
+            cumulative += n
+            labels = _format_labels(self.labelnames, values, (("le", _format_value(float(bound))),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+
+
+# Counter/gauge whose values are read at scrape time from fn() -> iterable of (label values, value)
+# Used for values that already exist elsewhere (cache hit counters, queue depth): zero cost on the hot path
+class _CallbackFamily(_Family):
+    def __init__(self, kind, name, help_text, labelnames, fn):
+        super().__init__(kind, name, help_text, labelnames, None)
+        self._fn = fn
+
+    def samples(self):
+        result = []
+        for values, value in self._fn():
+            child = _GaugeChild()
+            child.value = value
+            result.append((tuple(values), child))
+        return result
+
+
+# Process-wide metrics registry, rendered in the Prometheus text format (GET /metrics)
+# Metrics are created once (get-or-create by name) and updated lock-cheap: one uncontended lock per observation
+class MetricsRegistry:
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, kind, name, help_text, labelnames, make):
+        family = self._families.get(name)
+        if family is None:
+            with self._lock:
+                family = self._families.get(name)
+                if family is None:
+                    family = self._families[name] = make()
+        if family.kind != kind or family.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered as {family.kind}{family.labelnames}")
+        return family
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create("counter", name, help_text, labelnames,
+                                   lambda: _Family("counter", name, help_text, labelnames, _CounterChild))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create("gauge", name, help_text, labelnames,
+                                   lambda: _Family("gauge", name, help_text, labelnames, _GaugeChild))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=BUCKETS_S):
+        bounds = tuple(sorted(buckets))
+        return self._get_or_create("histogram", name, help_text, labelnames,
+                                   lambda: _Family("histogram", name, help_text, labelnames, lambda: _HistogramChild(bounds)))
+
+    # fn() -> iterable of (label values, value), evaluated on every scrape
+    def callback(self, kind, name, help_text, labelnames, fn):
+        return self._get_or_create(kind, name, help_text, labelnames,
+                                   lambda: _CallbackFamily(kind, name, help_text, labelnames, fn))
+
+    def render(self) -> str:
+        lines = []
+        for name in sorted(self._families):
+            family_lines = []
+            try:
+                self._families[name].render(family_lines)
+            except Exception as e:
+                family_lines = [f"# {name} nicht verfügbar: {_escape(e)}"]
+            lines.extend(family_lines)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_CLIENT_SECONDS = REGISTRY.histogram("pvbackend_http_client_duration_seconds",
+                                         "Outgoing HTTP calls (wallbox, Open-Meteo) by target and outcome (status code or error)",
+                                         ("target", "outcome"))
+
+
+# Records one outgoing HTTP call that started at perf_counter() value 'started'
+def observe_http(target: str, outcome: str, started: float):
+    HTTP_CLIENT_SECONDS.labels(target, outcome).observe(time.perf_counter() - started)
@@ -0,0 +1,291 @@
+import bisect
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from services.wallbox_dynamic_controller import MAX_AMPERE, setting_power_kw
+
+# Defaults for the "optimizer" section of the automatic configuration
+DEFAULT_OPTIMIZER_CONFIG = {
+    "enabled": False,
+    "slot_minutes": 60,          # 60 or 15
+    "replan_interval_min": 15,   # receding horizon: re-solve with the current state
+    "pv_peak_kw": 8.0,           # installed PV peak power
+    "pv_performance_ratio": 0.8, # losses (inverter, temperature, orientation)
+    "base_load_kw": 0.5,         # expected house load without boiler/wallbox
+    "boiler_power_kw": 2.0,      # heating element
+    "boiler_volume_l": 200,
+    "feed_in_price": 0.0,        # ct/kWh lost when PV is used instead of fed in
+}
+
+# Wasser: 1.163 Wh pro Liter und Kelvin
+WATER_KWH_PER_L_K = 0.001163
+
+# Cost of one unfinished slot at the deadline (ct) – soft constraint, a plan is always returned
+MISSED_SLOT_PENALTY = 1e6
+
+# Slot actions in the DP: (boiler on, wallbox on)
+_ACTIONS = ((0, 0), (0, 1), (1, 0), (1, 1))
+
+
+# Receding-horizon dynamic program over equally sized slots
+# State: (boiler slots still needed, wallbox slots still needed), action per slot: each device on/off
+# Cost per slot: grid energy × price (+ PV self-use × feed-in price), unfinished slots at the deadline are penalized
+# Complexity: O(slots × boiler_slots × wallbox_slots × 4) – about 0.1 s for 48 h in 15 min slots on a Pi
+def solve_schedule(prices, surplus_kw, slot_h, boiler_power_kw=0.0, boiler_slots=0, boiler_deadline=0,
+                   wallbox_power_kw=0.0, wallbox_slots=0, wallbox_deadline=0, feed_in_price=0.0):
+    n = len(prices)
+    boiler_deadline = min(max(boiler_deadline, 0), n)
+    wallbox_deadline = min(max(wallbox_deadline, 0), n)
+    B, W = boiler_slots, wallbox_slots
+
+    # Terminal cost: everything not done by the end of the horizon (or the device deadline) is penalized
+    value = [[MISSED_SLOT_PENALTY * (b + w) for w in range(W + 1)] for b in range(B + 1)]
+    choices = [None] * n
+
+    for t in range(n - 1, -1, -1):
+        price = prices[t]
+        surplus = max(surplus_kw[t], 0.0)
+        cost = []
+        for ub, uw in _ACTIONS:
+            load = ub * boiler_power_kw + uw * wallbox_power_kw
+            grid_kwh = max(load - surplus, 0.0) * slot_h
+            pv_kwh = min(load, surplus) * slot_h
+            cost.append(grid_kwh * price + pv_kwh * feed_in_price)
+        c00, c01, c10, c11 = cost
+
+        can_b = t < boiler_deadline
+        can_w = t < wallbox_deadline
+
+        new_value = []
+        choice = []
+        for b in range(B + 1):
+            row_next = value[b]
+            row_next_b = value[b - 1] if b > 0 else None
+            row = []
+            row_choice = []
+            for w in range(W + 1):
+                # Ties prefer switching on -> earlier completion, safer against forecast errors
+                best = c00 + row_next[w]
+                act = 0
+                if can_w and w > 0:
+                    v = c01 + row_next[w - 1]
+                    if v <= best:
+                        best, act = v, 1
+                if can_b and b > 0:
+                    v = c10 + row_next_b[w]
+                    if v <= best:
+                        best, act = v, 2
+                    if can_w and w > 0:
+                        v = c11 + row_next_b[w - 1]
+                        if v <= best:
+                            best, act = v, 3
+                row.append(best)
+                row_choice.append(act)
+            new_value.append(row)
+            choice.append(row_choice)
+
+        value = new_value
+        choices[t] = choice
+
+    # Forward pass: follow the optimal decisions from the start state
+    actions = []
+    b, w = B, W
+    for t in range(n):
+        ub, uw = _ACTIONS[choices[t][b][w]]
+        actions.append((ub, uw))
+        b -= ub
+        w -= uw
+
+    return actions, value[B][W], b, w
+
+
+class PlanOptimizer:
+    def __init__(self, db_bridge, pv_forecast, clock=None):
+        self.db = db_bridge
+        self.pv_forecast = pv_forecast
+        self.tz = ZoneInfo("Europe/Vienna")
+        self._now = clock or (lambda: datetime.now(self.tz))
+
+        self._lock = threading.Lock()
+        self._plan = None
+
+    # Returns the cached plan (or None)
+    def get_plan(self):
+        with self._lock:
+            return self._plan
+
+    def invalidate(self):
+        with self._lock:
+            self._plan = None
+
+    # True if the cached plan is missing, outdated or was built for different targets
+    # targets: JSON-like description of the goals (e.g. target temperature/time, car connected) – not the measured state
+    def needs_replan(self, now, cfg, targets) -> bool:
+        plan = self.get_plan()
+        if plan is None:
+            return True
+        age_s = (now - datetime.fromisoformat(plan["created"])).total_seconds()
+        if age_s >= float(cfg.get("replan_interval_min", 15)) * 60:
+            return True
+        return plan.get("targets") != targets
+
+    # Plan slot covering 'now' (or None if there is no valid plan for this time)
+    def current_slot(self, now=None):
+        plan = self.get_plan()
+        if not plan:
+            return None
+        now = now or self._now()
+        for slot in plan["slots"]:
+            if datetime.fromisoformat(slot["start"]) <= now < datetime.fromisoformat(slot["end"]):
+                return slot
+        return None
+
+    # Builds a new plan from the current state
+    # boiler: {"current_temp", "target_temp", "target_time"} or None, wallbox: {"remaining_kwh", "target_time", "phases"} or None
+    def build_plan(self, cfg, boiler=None, wallbox=None, current_surplus_kw=None, targets=None):
+        cfg = {**DEFAULT_OPTIMIZER_CONFIG, **(cfg or {})}
+        started = time.perf_counter()
+
+        now = self._now()
+        slot_minutes = int(cfg["slot_minutes"])
+        slot_h = slot_minutes / 60
+        start = now.replace(minute=(now.minute // slot_minutes) * slot_minutes, second=0, microsecond=0)
+        # Horizon: rest of today + tomorrow
+        horizon_end = datetime.combine(now.date() + timedelta(days=2), datetime.min.time(), tzinfo=self.tz)
+        n = max(int((horizon_end - start).total_seconds() // (slot_minutes * 60)), 1)
+        slot_starts = [start + timedelta(minutes=slot_minutes * i) for i in range(n)]
+
+        prices = self._slot_prices(slot_starts, horizon_end)
+        surplus = self._slot_surplus(slot_starts, cfg)
+        if current_surplus_kw is not None:
+            # Measured value is better than the forecast for the running slot
+            surplus[0] = current_surplus_kw
+
+        boiler_power = float(cfg["boiler_power_kw"])
+        boiler_kwh, boiler_slots, boiler_deadline, boiler_deadline_dt = 0.0, 0, 0, None
+        if boiler:
+            delta_k = max(float(boiler["target_temp"]) - float(boiler["current_temp"]), 0.0)
+            boiler_kwh = delta_k * float(cfg["boiler_volume_l"]) * WATER_KWH_PER_L_K
+            boiler_slots = math.ceil(boiler_kwh / (boiler_power * slot_h)) if boiler_power > 0 else 0
+            boiler_deadline_dt = self._deadline(now, boiler["target_time"])
+            boiler_deadline = self._slot_index(slot_starts, slot_minutes, boiler_deadline_dt)
+
+        wallbox_power, wallbox_kwh, wallbox_slots, wallbox_deadline, wallbox_deadline_dt = 0.0, 0.0, 0, 0, None
+        if wallbox:
+            phases = 3 if wallbox.get("phases") in (3, "auto") else 1
+            wallbox_power = setting_power_kw(MAX_AMPERE, phases)
+            wallbox_kwh = max(float(wallbox["remaining_kwh"]), 0.0)
+            wallbox_slots = math.ceil(wallbox_kwh / (wallbox_power * slot_h))
+            wallbox_deadline_dt = self._deadline(now, wallbox["target_time"])
+            wallbox_deadline = self._slot_index(slot_starts, slot_minutes, wallbox_deadline_dt)
+
+        actions, total_cost, boiler_missing, wallbox_missing = solve_schedule(
+            prices, surplus, slot_h,
+            boiler_power_kw=boiler_power, boiler_slots=boiler_slots, boiler_deadline=boiler_deadline,
+            wallbox_power_kw=wallbox_power, wallbox_slots=wallbox_slots, wallbox_deadline=wallbox_deadline,
+            feed_in_price=float(cfg["feed_in_price"])
+        )
+
+        slots = []
+        expected_grid_kwh = 0.0
+        expected_cost = 0.0
+        for slot_start, price, pv_kw, (ub, uw) in zip(slot_starts, prices, surplus, actions):
+            load = ub * boiler_power + uw * wallbox_power
+            grid_kwh = max(load - max(pv_kw, 0.0), 0.0) * slot_h
+            expected_grid_kwh += grid_kwh
+            expected_cost += grid_kwh * price
+            slots.append({
+                "start": slot_start.isoformat(),
+                "end": (slot_start + timedelta(minutes=slot_minutes)).isoformat(),
+                "price": round(price, 2),
+                "pv_surplus_kw": round(pv_kw, 2),
+                "boiler": bool(ub),
+                "wallbox": bool(uw),
+                "grid_kwh": round(grid_kwh, 3),
+            })
+
+        plan = {
+            "created": now.isoformat(),
+            "slot_minutes": slot_minutes,
+            "horizon_end": horizon_end.isoformat(),
+            "targets": targets,
+            "boiler": {
+                "energy_kwh": round(boiler_kwh, 2),
+                "slots": boiler_slots,
+                "deadline": boiler_deadline_dt.isoformat() if boiler_deadline_dt else None,
+                "feasible": boiler_missing == 0,
+            },
+            "wallbox": {
+                "energy_kwh": round(wallbox_kwh, 2),
+                "power_kw": wallbox_power,
+                "slots": wallbox_slots,
+                "deadline": wallbox_deadline_dt.isoformat() if wallbox_deadline_dt else None,
+                "feasible": wallbox_missing == 0,
+            },
+            "expected_grid_kwh": round(expected_grid_kwh, 2),
+            "expected_cost_ct": round(expected_cost, 1),
+            "solve_ms": round((time.perf_counter() - started) * 1000, 1),
+            "slots": slots,
+        }
+
+        with self._lock:
+            self._plan = plan
+        return plan
+
+    # Next occurrence of "HH:MM" (today, or tomorrow if already passed)
+    def _deadline(self, now, target_time):
+        deadline = datetime.combine(now.date(), datetime.strptime(target_time, "%H:%M").time(), tzinfo=self.tz)
+        if deadline <= now:
+            deadline += timedelta(days=1)
+        return deadline
+
+    # Number of slots that end before the deadline
+    def _slot_index(self, slot_starts, slot_minutes, deadline):
+        return sum(1 for s in slot_starts if s + timedelta(minutes=slot_minutes) <= deadline)
+
+    # Day-ahead price per slot: last published price at or before the slot start
+    # Slots without a known price (tomorrow before the auction) get the average of the known prices
+    def _slot_prices(self, slot_starts, horizon_end):
+        try:
+            series = self.db.get_epex_price_series(slot_starts[0] - timedelta(hours=1), horizon_end)
+        except Exception:
+            series = []
+
+        if not series:
+            return [0.0] * len(slot_starts)
+
+        times = [t for t, _ in series]
+        values = [p for _, p in series]
+        fallback = sum(values) / len(values)
+        # Price points are valid for one hour at most (hourly or 15 min products)
+        prices = []
+        for s in slot_starts:
+            i = bisect.bisect_right(times, s) - 1
+            prices.append(values[i] if i >= 0 and s - times[i] < timedelta(hours=1) else fallback)
+        return prices
+
+    # Expected PV surplus per slot from the irradiance forecast
+    # Open-Meteo reports the mean of the preceding hour, so slot [t, t+1h) uses the value stamped t+1h
+    def _slot_surplus(self, slot_starts, cfg):
+        try:
+            irradiance = self.pv_forecast.get_hourly_irradiance()
+        except Exception:
+            irradiance = []
+
+        base_load = float(cfg["base_load_kw"])
+        if not irradiance:
+            return [-base_load] * len(slot_starts)
+
+        times = [t for t, _ in irradiance]
+        values = [r for _, r in irradiance]
+        factor = float(cfg["pv_peak_kw"]) * float(cfg["pv_performance_ratio"]) / 1000
+        surplus = []
+        for s in slot_starts:
+            hour_end = s.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+            i = bisect.bisect_left(times, hour_end)
+            radiation = values[i] if i < len(times) and times[i] == hour_end else 0.0
+            surplus.append(radiation * factor - base_load)
+        return surplus
@@ -0,0 +1,306 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+# Upper bound for the number of profiled requests/ticks per session
+MAX_PROFILE_COUNT = 50
+# Default interval of the sampling stack collector (seconds)
+SAMPLE_INTERVAL_S = 0.005
+# Finished profiles kept on disk (oldest are deleted)
+MAX_PROFILES_KEPT = 20
+
+MODES = ("cprofile", "sample")
+TICK_TARGETS = ("tick:main", "tick:wallbox")
+
+# ! cProfile hooks are process-wide since Python 3.12 -> only one cProfile run at a time, other calls run unprofiled
+_CPROFILE_LOCK = threading.Lock()
+# What a cProfile session records: since Python 3.12 the calls of all threads while the profiled call runs
+# (other requests, scheduler, log writer), before only the profiled thread; sample sessions always read one thread
+CPROFILE_SCOPE = "process" if sys.version_info >= (3, 12) else "thread"
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+# Collapsed stack of a frame ("outer;inner;leaf"), stopping below the frame that started the profiled call
+def _collapse(frame, stop):
+    names = []
+    while frame is not None and frame is not stop:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ","))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# Sampling stack collector: reads the stack of one thread every interval_s while the profiled call runs
+class _StackSampler:
+    def __init__(self, thread_id, stop_frame, interval_s, stacks: Counter):
+        self.thread_id = thread_id
+        self.stop_frame = stop_frame
+        self.interval_s = interval_s
+        self.stacks = stacks
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                stack = _collapse(frame, self.stop_frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+
+# One profiling request: the next 'count' calls of a target (route rule or tick loop)
+class ProfileSession:
+    def __init__(self, target, count, mode, interval_s=SAMPLE_INTERVAL_S, on_done=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.count = count
+        self.mode = mode
+        self.interval_s = interval_s
+        self.on_done = on_done
+        self.status = "armed"
+        self.created = time.time()
+        self.captured = 0
+        self.durations_ms = []
+        self.file = None
+        self.stats = None
+        self.stacks = Counter()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    # Reserves one of the remaining slots; False if the session is complete or cancelled
+    def claim(self) -> bool:
+        with self._lock:
+            if self.status != "armed" or self.captured + self._in_flight >= self.count:
+                return False
+            self._in_flight += 1
+            return True
+
+    # Adds one profiled call; returns True if this was the last one
+    def record(self, seconds, profile=None) -> bool:
+        with self._lock:
+            self._in_flight -= 1
+            self.captured += 1
+            self.durations_ms.append(round(seconds * 1000, 1))
+            if profile is not None:
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            return self.captured >= self.count and self.status == "armed"
+
+    # The slot was reserved, but the call couldn't be profiled (another cProfile run active)
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "target": self.target,
+            "mode": self.mode,
+            "status": self.status,
+            "count": self.count,
+            "captured": self.captured,
+            "durations_ms": list(self.durations_ms),
+            "created": self.created,
+            "file": self.file,
+            "pid": os.getpid(),
+            "scope": CPROFILE_SCOPE if self.mode == "cprofile" else "thread",
+        }
+
+
+# On-demand profiler for API routes and scheduler ticks (admin endpoints /api/profiler)
+# - Disabled = nothing to do: routes are only wrapped while a session is armed, ticks check one dict
+# - mode "cprofile": deterministic profile, aggregated over all calls -> .pstats (pstats/snakeviz)
+#   Process-wide on Python >= 3.12 (see CPROFILE_SCOPE): work of other threads during the call shows up as well
+# - mode "sample": sampling stack collector of the profiled thread -> collapsed stacks (.folded, flamegraph.pl/speedscope)
+# - Finished profiles are written to the profile directory, so every worker process can serve the download;
+#   in memory only the newest 'keep' finished sessions are kept (without their profile data)
+class ProfilerService:
+    def __init__(self, directory="data/profiles", keep=MAX_PROFILES_KEPT):
+        self.directory = Path(directory)
+        self.keep = keep
+        self._active = {}
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    # Arms a session for target; raises ValueError for invalid arguments, ProfilerBusyError if one is already armed
+    def arm(self, target, count=1, mode="cprofile", interval_s=SAMPLE_INTERVAL_S, on_done=None) -> ProfileSession:
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if not isinstance(count, int) or not 1 <= count <= MAX_PROFILE_COUNT:
+            raise ValueError(f"count must be between 1 and {MAX_PROFILE_COUNT}")
+        if not 0.001 <= interval_s <= 1.0:
+            raise ValueError("interval_ms must be between 1 and 1000")
+
+        with self._lock:
+            if target in self._active:
+                raise ProfilerBusyError(f"Profiling for {target} already armed ({self._active[target].id})")
+            session = ProfileSession(target, count, mode, interval_s, on_done)
+            self._active[target] = session
+            self._sessions[session.id] = session
+        return session
+
+    def is_armed(self, target) -> bool:
+        return target in self._active
+
+    # Runs fn(*args, **kwargs), profiled if a session is armed for target
+    def call(self, target, fn, *args, **kwargs):
+        session = self._active.get(target)
+        if session is None or not session.claim():
+            return fn(*args, **kwargs)
+        if session.mode == "sample":
+            return self._sampled(session, fn, args, kwargs)
+        return self._profiled(session, fn, args, kwargs)
+
+    # Wraps a view function so that calls go through call(target, ...)
+    def wrap(self, target, fn):
+        def profiled_view(*args, **kwargs):
+            return self.call(target, fn, *args, **kwargs)
+        profiled_view.__name__ = fn.__name__
+        profiled_view.__wrapped__ = fn
+        return profiled_view
+
+    def _profiled(self, session, fn, args, kwargs):
+        if not _CPROFILE_LOCK.acquire(blocking=False):
+            session.release()
+            return fn(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiling tool (debugger, coverage) owns the hook
+            _CPROFILE_LOCK.release()
+            session.release()
+            return fn(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        finally:
+            _CPROFILE_LOCK.release()
+            if session.record(time.perf_counter() - started, profile):
+                self._finish(session, "done")
+
+    def _sampled(self, session, fn, args, kwargs):
+        started = time.perf_counter()
+        try:
+            with _StackSampler(threading.get_ident(), sys._getframe(), session.interval_s, session.stacks):
+                return fn(*args, **kwargs)
+        finally:
+            if session.record(time.perf_counter() - started):
+                self._finish(session, "done")
+
+    # Stops an armed session; profiles captured so far are still written
+    def cancel(self, session_id) -> ProfileSession | None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if session.status == "armed":
+            self._finish(session, "cancelled")
+        return session
+
+    def _finish(self, session, status):
+        with self._lock:
+            if session.status != "armed":
+                return
+            session.status = status
+            self._active.pop(session.target, None)
+        if session.captured:
+            try:
+                self._write(session)
+            except OSError as e:
+                print(f"[profiler] Profil {session.id} konnte nicht gespeichert werden: {e}")
+        # Profile data is on disk now (or lost), the session only keeps its metadata
+        session.stats = None
+        session.stacks = Counter()
+        self._evict()
+        if session.on_done:
+            session.on_done(session)
+
+    # Forgets the oldest finished sessions beyond 'keep' (armed ones stay)
+    def _evict(self):
+        with self._lock:
+            finished = sorted((s for s in self._sessions.values() if s.status != "armed"),
+                              key=lambda s: s.created, reverse=True)
+            for session in finished[self.keep:]:
+                del self._sessions[session.id]
+
+    def _write(self, session):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if session.mode == "sample":
+            path = self.directory / f"{session.id}.folded"
+            lines = [f"{stack} {n}" for stack, n in session.stacks.most_common()]
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        else:
+            path = self.directory / f"{session.id}.pstats"
+            session.stats.dump_stats(path)
+        session.file = path.name
+        # Metadata for the other workers (status/download)
+        (self.directory / f"{session.id}.json").write_text(json.dumps(session.snapshot()), encoding="utf-8")
+        self._prune()
+
+    # Deletes the oldest profiles beyond 'keep'
+    def _prune(self):
+        metas = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for meta in metas[self.keep:]:
+            for path in self.directory.glob(f"{meta.stem}.*"):
+                path.unlink(missing_ok=True)
+
+    # Sessions of this process, newest first
+    def sessions(self) -> list:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [s.snapshot() for s in sorted(sessions, key=lambda s: s.created, reverse=True)]
+
+    # Metadata of a finished profile on disk (written by any worker), None if unknown
+    def stored(self, session_id) -> dict | None:
+        if not session_id.isalnum():
+            return None
+        try:
+            return json.loads((self.directory / f"{session_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    # Path of the result file of a finished profile
+    def result_path(self, session_id) -> Path | None:
+        meta = self.stored(session_id)
+        if not meta or not meta.get("file"):
+            return None
+        path = self.directory / meta["file"]
+        return path if path.exists() else None
+
+    # Human-readable pstats report of a cProfile result (top entries by cumulative time)
+    def report(self, session_id, limit=60) -> str | None:
+        path = self.result_path(session_id)
+        if path is None or path.suffix != ".pstats":
+            return None
+        out = io.StringIO()
+        pstats.Stats(str(path), stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
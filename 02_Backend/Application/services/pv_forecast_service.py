@@ -1,7 +1,10 @@
+import time
 import requests
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
+from services.metrics_registry import observe_http
+
 class PVForecastService:
 
     # Bruck an der Großglocknerstraße
@@ -34,15 +37,33 @@ class PVForecastService:
         params = {
             "latitude": self.LAT,
             "longitude": self.LON,
-            "hourly": "cloudcover",
+            "hourly": "cloudcover,shortwave_radiation",
             "daily": "sunrise,sunset",
             "timezone": "Europe/Vienna"
         }
         
-        r = requests.get(url, params=params, timeout=5)
+        started = time.perf_counter()
+        try:
+            r = requests.get(url, params=params, timeout=5)
+        except Exception:
+            observe_http("open_meteo", "error", started)
+            raise
+        observe_http("open_meteo", str(r.status_code), started)
         r.raise_for_status()
         return r.json()
 
+    # Hourly global irradiance (W/m²) for today and tomorrow as [(datetime, W/m²), ...]
+    # Used by the plan optimizer to estimate the PV yield per slot
+    def get_hourly_irradiance(self) -> list:
+        data = self._fetch()
+        times = data["hourly"]["time"]
+        radiation = data["hourly"].get("shortwave_radiation") or []
+
+        return [
+            (datetime.fromisoformat(t).replace(tzinfo=self.tz), float(r or 0.0))
+            for t, r in zip(times, radiation)
+        ]
+
     # Evaluates whether PV generation is likely based on cloud cover and sunrise/sunset times
     def _evaluate(self, data: dict) -> dict:
         now = datetime.now(self.tz)
@@ -1,7 +1,7 @@
 import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
 
 from stores.system_mode_store import SystemMode
 from stores.automatic_config_store import AutomaticConfigStore
@@ -9,7 +9,13 @@ from stores.automatic_config_store import AutomaticConfigStore
 from services.pv_surplus_service import PVSurplusService
 from services.pv_forecast_service import PVForecastService
 from services.epex_service import EPEXService
-from services.wallbox_dynamic_controller import WallboxDynamicController
+from services.wallbox_dynamic_controller import WallboxDynamicController, MAX_AMPERE
+from services.plan_optimizer import PlanOptimizer
+from services.clock import SystemClock
+from services.tick_metrics import TickMetrics, TimedProxy
+from services.shared_inputs import SharedInputs
+from services.event_control_core import EventControlCore
+from stores.scheduler_state_store import STATE_FIELDS
 
 # Minimaler PV-Überschuss um Boiler zu starten (kW)
 # 1.5 kW = deutlich über Grundverbrauch (~0.8kW), verhindert Nacht-Trigger
@@ -21,9 +27,12 @@ BOILER_SOC_STOP  = 10.0
 # Hysterese für Boiler-Temperaturentscheidung (°C)
 # Zustand beibehalten wenn Temperatur zwischen (target - HYSTERESIS) und target liegt
 HYSTERESIS = 2
+# Zeitsteuerung: Geräte nur zu Schaltzeiten ansteuern, spätestens aber alle 15 min abgleichen
+TIME_CONTROLLED_RESYNC_S = 900
 
 class SchedulerService(threading.Thread):
-    def __init__(self, mode_store, schedule_manager, boiler, wallbox, db_bridge, logger, interval=60):
+    def __init__(self, mode_store, schedule_manager, boiler, wallbox, db_bridge, logger, interval=60, clock=None,
+                 wallbox_interval=None, state_store=None, automatic_config=None, profiler=None):
         super().__init__(daemon=True)
 
         # The SchedulerService is responsible for controlling the boiler and wallbox based on the current system mode (manual, time-controlled, automatic),
@@ -35,26 +44,70 @@ class SchedulerService(threading.Thread):
         self.boiler = boiler
         self.wallbox = wallbox
         self.interval = interval
-        self.logger = logger
+        # Eigene Wallbox-Schleife (z.B. 10 s PV-Nachführung), None = Wallbox läuft im Haupt-Tick mit
+        self.wallbox_interval = wallbox_interval
+        self._wallbox_loop = None
+        # One lock per device: each guards that device's decision state and serialises its commands, so a hanging
+        # charger only stalls the wallbox step and a slow Influx only the boiler step
+        # Steps touching both devices (time control, API mode change) take both, always boiler first
+        self._boiler_lock = threading.RLock()
+        self._wallbox_lock = threading.RLock()
+        # Only for the state snapshot: held while writing the file, never across device traffic
+        self._state_lock = threading.Lock()
+        # Event-driven alternative to run(): EventControlCore (asyncio), started via start_event_core()
+        self.event_core = None
+        # Tick timing (total, per phase, overruns) – exposed via /api/scheduler/metrics
+        self.metrics = TickMetrics(loop="main")
+        self.wallbox_metrics = TickMetrics(loop="wallbox")
+        # Phases recorded inside a step (epex, logging) go to the loop that runs it
+        self._recording_to = threading.local()
+        self.logger = TimedProxy(logger, self.loop_metrics, "logging")
+        # On-demand profiling of the next N ticks (ProfilerService, targets tick:main / tick:wallbox)
+        self.profiler = profiler
+        self._stop_event = threading.Event()
+        self._monotonic = time.monotonic
         self.db_bridge = db_bridge
+        # Zeitquelle: SystemClock im Betrieb, VirtualClock in Tests und im Backtest
+        self.clock = clock or SystemClock()
+
+        # Tunable thresholds (defaults from the module constants, overridden by the backtest)
+        self.boiler_pv_min_kw = BOILER_PV_MIN_KW
+        self.boiler_soc_start = BOILER_SOC_START
+        self.boiler_soc_stop = BOILER_SOC_STOP
+        self.hysteresis = HYSTERESIS
 
         # State variables for time-controlled mode error logging, to avoid spamming logs with repeated errors
         self.last_time_controlled_error_date = None
+        self.time_controlled_due = None  # Nächste Prüfung der Zeitsteuerung (None = sofort)
         self.wallbox_online_last_state = None
         self.boiler_last_reason = None
 
         # Initialize services and configuration store for automatic mode
-        self.automatic_config = AutomaticConfigStore()
+        # Shared with the API (ServiceManager): a PUT /api/automatic-config is visible in the next decision
+        self.automatic_config = automatic_config or AutomaticConfigStore()
+        self.automatic_config.subscribe(self._on_config_change)
         self.pv_service = PVSurplusService(db_bridge)
         self.pv_forecast = PVForecastService()
-        self.epex_service = EPEXService(db_bridge)
+        self.epex_service = EPEXService(db_bridge, clock=self.clock)
+        # Optimizer: plant Boiler/Wallbox über heute + morgen, der Tick führt den Plan nur aus
+        self.plan_optimizer = PlanOptimizer(db_bridge, self.pv_forecast, clock=self.clock.now)
+
+        # Gemeinsame Datenschicht der Geräte-Schleifen: unveränderliche Snapshots, ein Abruf pro Quelle und TTL
+        # Loader greifen erst beim Aufruf auf die Services zu (Tests/Backtest tauschen sie nach dem Konstruktor aus)
+        self.inputs = SharedInputs(
+            pv_loader=lambda: self.pv_service.get_pv_state(),
+            forecast_loader=lambda: self.pv_forecast.get_forecast(),
+            epex_loader=lambda: self.epex_service.get_price_statistics(),
+            clock=self.clock
+        )
 
         # Dynamic charging controller
         self.wallbox_dynamic = WallboxDynamicController(
             hysteresis_kw=0.3,           # Hinders Flapping when surplus fluctuates around the threshold (1.4kW ± 0.3kW)
             min_surplus_kw=1.4,          # Min for 6A
             battery_protection_soc=20,   # Protection of battery (don't discharge below SoC)
-            max_battery_discharge_kw=0.5 # Max allowable discharge from battery to wallbox
+            max_battery_discharge_kw=0.5,# Max allowable discharge from battery to wallbox
+            phase_mode=1                 # 1 / 3 phases fixed or "auto" (overridden by automatic_config wallbox.<season>.phase_mode)
         )
 
         # Wallbox runtime state
@@ -63,6 +116,7 @@ class SchedulerService(threading.Thread):
         self.wallbox_last_set_allow = None
         self.wallbox_failsafe_until = None  # Wenn gesetzt: Wallbox lädt fix bis Zielzeit
         self.wallbox_deadline_missed = False  # Nach Deadline ohne Ziel: nur noch EPEX-Notfall erlaubt
+        self.wallbox_phases_set = None  # Zuletzt kommandierte Phasenanzahl
 
         # Logging throttle state
         self.boiler_session_logged_date = None
@@ -78,15 +132,103 @@ class SchedulerService(threading.Thread):
         self.boiler_failsafe_logged_today = False  # FIX #9: Erstes ⚠-Log pro Tag, Folge-Verlängerungen separat
         self.boiler_failsafe_done_today = False    # Einmalig 2h – danach kein weiterer Failsafe bis 00:00
 
+        # Persistierter Sitzungszustand (SchedulerStateStore): nach Neustart ohne Geräteabfrage wiederherstellen
+        self.state_store = state_store
+        if self.state_store:
+            self.restore_state()
+
     # Main loop of the scheduler thread, which calls tick() every interval seconds
+    # Fixed deadlines on the monotonic clock: the tick duration doesn't shift the period (no drift)
+    # If a tick overruns its slot, missed deadlines are skipped instead of running ticks back to back
     def run(self):
-        while True:
-            self.tick()
-            time.sleep(self.interval)
+        if self.wallbox_interval and self.wallbox:
+            self._wallbox_loop = threading.Thread(
+                target=self._run_loop,
+                args=(self.wallbox_tick, self.wallbox_interval, self.wallbox_metrics),
+                name="wallbox-loop",
+                daemon=True
+            )
+            self._wallbox_loop.start()
+
+        self._run_loop(self.tick, self.interval, self.metrics)
+
+    def _run_loop(self, step, interval, metrics):
+        next_deadline = self._monotonic()
+        while not self._stop_event.is_set():
+            self.run_step(metrics.loop, step)
+            next_deadline = self._next_deadline(next_deadline, interval, metrics)
+            self._stop_event.wait(max(next_deadline - self._monotonic(), 0.0))
+
+    # Runs one tick of a loop ("main"/"wallbox"), profiled if a profiling session is armed for it
+    def run_step(self, loop, step):
+        if self.profiler is None:
+            return step()
+        return self.profiler.call(f"tick:{loop}", step)
+
+    # Next tick deadline after the one that just ran, counting overruns
+    def _next_deadline(self, deadline, interval=None, metrics=None):
+        interval = interval or self.interval
+        metrics = metrics or self.metrics
+        deadline += interval
+        now = self._monotonic()
+        if now > deadline:
+            lag = now - deadline
+            skipped = int(lag // interval) + 1
+            metrics.record_overrun(lag, skipped)
+            deadline += skipped * interval
+        return deadline
+
+    # TickMetrics of the loop running on this thread (main tick unless inside a wallbox step)
+    def loop_metrics(self):
+        return getattr(self._recording_to, "metrics", None) or self.metrics
+
+    @contextmanager
+    def _recording(self, metrics):
+        previous = getattr(self._recording_to, "metrics", None)
+        self._recording_to.metrics = metrics
+        try:
+            yield
+        finally:
+            self._recording_to.metrics = previous
+
+    # Both device locks (time control and API changes touch boiler and wallbox state)
+    @contextmanager
+    def _device_locks(self):
+        with self._boiler_lock, self._wallbox_lock:
+            yield
+
+    # True while the wallbox has its own loop (the main tick then only handles the boiler)
+    def wallbox_loop_active(self):
+        return self._wallbox_loop is not None and self._wallbox_loop.is_alive()
+
+    # Stops the loop after the running tick (or immediately while waiting)
+    def stop(self):
+        self._stop_event.set()
+        if self.event_core:
+            self.event_core.stop()
+
+    # Starts the event-driven core instead of the polling thread (SCHEDULER_CORE=event)
+    def start_event_core(self, **kwargs):
+        self.event_core = EventControlCore(self, **kwargs)
+        self.event_core.start()
+        return self.event_core
+
+    # Subscriber of the shared AutomaticConfigStore
+    def _on_config_change(self, snapshot, version):
+        self.notify("config")
+
+    # Change notification from the API ("mode", "config", "schedule", "plan")
+    # Event core: the affected policies react immediately; polling thread: picked up by the next tick
+    # Mode/schedule changes make the time control run again right away
+    def notify(self, topic):
+        if topic in ("mode", "schedule"):
+            self.time_controlled_due = None
+        if self.event_core:
+            self.event_core.notify(topic)
 
     # Log time-controlled mode errors (throttled to once per day)
     def log_time_controlled_error(self, error):
-        today = datetime.now(ZoneInfo("Europe/Vienna")).date()
+        today = self.clock.now().date()
         if self.last_time_controlled_error_date != today:
             # SYSTEM EVENT LOG
             self.logger.system_event(
@@ -98,6 +240,7 @@ class SchedulerService(threading.Thread):
 
     # Main scheduler tick function, called every interval (60s)
     def tick(self):
+        started = time.perf_counter()
         try:
             if not self.mode_store:
                 return
@@ -107,10 +250,13 @@ class SchedulerService(threading.Thread):
             if mode == SystemMode.MANUAL:
                 return
             if mode == SystemMode.TIME_CONTROLLED:
-                self.run_time_controlled()
+                self.time_controlled_tick()
                 return
             if mode == SystemMode.AUTOMATIC:
-                self.run_automatic()
+                if self.wallbox_loop_active():
+                    self.run_automatic_boiler()
+                else:
+                    self.run_automatic()
                 return
 
         except Exception as e:
@@ -120,8 +266,35 @@ class SchedulerService(threading.Thread):
                  source="scheduler",
                  message=f"Scheduler Fehler im Tick: {e}"
             )
-
-    # TIME CONTROLLED
+        finally:
+            self.metrics.record_tick(time.perf_counter() - started)
+
+    # TIME CONTROLLED – runs the schedule only when a switching time is due (or after a mode/schedule change),
+    # the minutes in between cost no device traffic
+    def time_controlled_tick(self):
+        with self._device_locks():
+            now = self.clock.now()
+            if self.time_controlled_due is not None and now < self.time_controlled_due:
+                return
+            if self.run_time_controlled():
+                self.time_controlled_due = self.next_time_controlled_check(now)
+
+    # Earliest switching time of boiler/wallbox, at the latest TIME_CONTROLLED_RESYNC_S from now
+    def next_time_controlled_check(self, now):
+        due = now + timedelta(seconds=TIME_CONTROLLED_RESYNC_S)
+        for device in ("boiler", "wallbox"):
+            transition = self.schedule_manager.next_transition(device, now)
+            if transition is not None and transition < due:
+                due = transition
+        return due
+
+    # Seconds until the time control has to run again (event core: sleep instead of polling)
+    def seconds_until_time_controlled(self):
+        if self.time_controlled_due is None:
+            return 0.0
+        return max((self.time_controlled_due - self.clock.now()).total_seconds(), 0.0)
+
+    # Returns True if both devices were brought in line with the schedule
     def run_time_controlled(self):
         try:
             # Boiler
@@ -148,7 +321,7 @@ class SchedulerService(threading.Thread):
             should_allow = self.schedule_manager.is_active("wallbox")
 
             if not self.wallbox.is_online() or current is None:
-                return
+                return False
 
             if should_allow and not current:
                 self.wallbox.set_allow_charging(True)
@@ -164,21 +337,45 @@ class SchedulerService(threading.Thread):
                     "wallbox", True, False,
                     reason="Zeitsteuerung: Ladestopp"
                 )
+            return True
 
         except Exception as e:
             self.log_time_controlled_error(e)
+            return False
 
     # AUTOMATIC
     def run_automatic(self):
-        forecast = self.pv_forecast.get_forecast()
-
         # Einmal abrufen – beide Geräte nutzen denselben Snapshot
-        try:
-            pv_state = self.pv_service.get_pv_state()
-        except Exception:
-            pv_state = None
+        snapshot = self.inputs.snapshot(self.metrics)
+        self.run_automatic_boiler(snapshot)
+        self.run_automatic_wallbox(snapshot, self.metrics)
+
+    # AUTOMATIC – Boiler-Schritt (Haupt-Tick): Optimizer-Plan aktualisieren + Boiler regeln
+    def run_automatic_boiler(self, snapshot=None):
+        snapshot = snapshot or self.inputs.snapshot(self.metrics)
+
+        with self._boiler_lock:
+            # Optimizer-Plan aktualisieren (nur wenn aktiviert, veraltet oder Ziele geändert)
+            try:
+                with self.metrics.phase("plan"):
+                    self.update_plan(snapshot.pv_state)
+            except Exception as e:
+                # SYSTEM EVENT LOG
+                self.logger.system_event(
+                    level="error",
+                    source="optimizer",
+                    message=f"[Optimizer] Planung fehlgeschlagen: {e}"
+                )
 
-        self.automatic_boiler(forecast, pv_state)
+            with self.metrics.phase("boiler"):
+                self.automatic_boiler(snapshot.forecast, snapshot.pv_state)
+            self.persist_state()
+
+    # AUTOMATIC – Wallbox-Schritt (Haupt-Tick oder eigene Wallbox-Schleife)
+    def run_automatic_wallbox(self, snapshot=None, metrics=None):
+        metrics = metrics or self.wallbox_metrics
+        snapshot = snapshot or self.inputs.snapshot(metrics)
+        pv_state = snapshot.pv_state
 
         # Wallbox bekommt angepassten Surplus: Boiler-Last abziehen wenn er läuft
         # Boiler zieht ~2 kW → würde sonst Wallbox fälschlicherweise auch starten
@@ -191,11 +388,126 @@ class SchedulerService(threading.Thread):
         else:
             adjusted_pv_state = pv_state
 
-        self.automatic_wallbox(forecast, adjusted_pv_state)
+        with self._recording(metrics), metrics.phase("wallbox"):
+            # Device read outside the lock, decision, commands and state changes under the wallbox lock
+            data = self.read_wallbox()
+            if data is None:
+                return
+            with self._wallbox_lock:
+                self.automatic_wallbox(snapshot.forecast, adjusted_pv_state, data)
+                self.persist_state()
+
+    # Tick der eigenen Wallbox-Schleife – nur im AUTOMATIC-Modus aktiv
+    def wallbox_tick(self):
+        started = time.perf_counter()
+        try:
+            if self.mode_store and self.mode_store.get() == SystemMode.AUTOMATIC:
+                self.run_automatic_wallbox()
+        except Exception as e:
+            # SYSTEM EVENT LOG
+            self.logger.system_event(
+                level="error",
+                source="scheduler",
+                message=f"Scheduler Fehler im Wallbox-Tick: {e}"
+            )
+        finally:
+            self.wallbox_metrics.record_tick(time.perf_counter() - started)
+
+    # Optimizer: Plan für den Rest von heute + morgen (receding horizon)
+    # Neu gerechnet alle replan_interval_min Minuten oder sofort wenn sich Ziele/Konfiguration ändern
+    # force=True rechnet auch bei deaktiviertem Optimizer (Vorschau über die API)
+    def update_plan(self, pv_state=None, force=False):
+        config = self.automatic_config.snapshot()
+        optimizer_cfg = config.get("optimizer", {})
+        if not optimizer_cfg.get("enabled") and not force:
+            return None
+
+        season = self.schedule_manager.determine_season()
+        boiler_cfg = config.get("boiler", {}).get(season, {})
+        wb_cfg = config.get("wallbox", {}).get(season, {})
+        now = self.clock.now()
+
+        car_connected = False
+        eto_now = None
+        if self.wallbox and wb_cfg.get("target_time") and not self.wallbox_finished:
+            # Letzter Stand der Wallbox-Regelung – kein eigener Gerätezugriff, die Wallbox blockiert den Boiler nie
+            data = self.inputs.wallbox_state()
+            if data is not None:
+                car_connected = data.get("car_connected") == 1
+                eto_now = data.get("eto")
+
+        has_boiler_target = bool(boiler_cfg.get("target_time")) and boiler_cfg.get("target_temp_c") is not None
+        has_wallbox_job = car_connected and eto_now is not None
+
+        # Nur Zielvorgaben, keine Messwerte -> Messwerte fließen beim nächsten regulären Replan ein
+        targets = {
+            "season": season,
+            "boiler": [boiler_cfg.get("target_temp_c"), boiler_cfg.get("target_time")] if has_boiler_target else None,
+            "wallbox": [wb_cfg.get("energy_kwh"), wb_cfg.get("target_time"), wb_cfg.get("phase_mode", 1)] if has_wallbox_job else None,
+            "config": dict(optimizer_cfg),
+        }
+        if not force and not self.plan_optimizer.needs_replan(now, optimizer_cfg, targets):
+            return self.plan_optimizer.get_plan()
+
+        boiler_job = None
+        if has_boiler_target:
+            try:
+                boiler_data = self.db_bridge.get_latest_boiler_data()
+                current_temp = boiler_data.get("boiler_temp") if boiler_data else None
+            except Exception:
+                current_temp = None
+            if current_temp is not None:
+                boiler_job = {
+                    "current_temp": current_temp,
+                    "target_temp": boiler_cfg["target_temp_c"],
+                    "target_time": boiler_cfg["target_time"],
+                }
+
+        wallbox_job = None
+        if has_wallbox_job:
+            eto_start = self.wallbox_eto_start if self.wallbox_eto_start is not None else eto_now
+            charged_kwh = max((eto_now - eto_start) / 1000, 0)
+            wallbox_job = {
+                "remaining_kwh": float(wb_cfg.get("energy_kwh", 0)) - charged_kwh,
+                "target_time": wb_cfg["target_time"],
+                "phases": wb_cfg.get("phase_mode", 1),
+            }
+
+        previous = self.plan_optimizer.get_plan()
+        plan = self.plan_optimizer.build_plan(
+            optimizer_cfg,
+            boiler=boiler_job,
+            wallbox=wallbox_job,
+            current_surplus_kw=pv_state.get("surplus_kw") if pv_state else None,
+            targets=targets
+        )
+
+        # Nur bei neuen Zielen loggen – periodische Replans würden sonst alle 15 min ein Event erzeugen
+        if previous is None or previous.get("targets") != targets:
+            # SYSTEM EVENT LOG
+            self.logger.system_event(
+                level="info",
+                source="optimizer",
+                message=f"[Optimizer] Neuer Plan: Boiler {plan['boiler']['slots']} Slots"
+                        f"{'' if plan['boiler']['feasible'] else ' (Ziel nicht erreichbar)'}, "
+                        f"Wallbox {plan['wallbox']['slots']} Slots"
+                        f"{'' if plan['wallbox']['feasible'] else ' (Ziel nicht erreichbar)'} | "
+                        f"Netzbezug {plan['expected_grid_kwh']} kWh, ~{plan['expected_cost_ct']} ct | "
+                        f"berechnet in {plan['solve_ms']} ms"
+            )
+        # New plan -> boiler/wallbox policies of the event core follow it right away
+        self.notify("plan")
+        return plan
+
+    # Aktueller Plan-Slot, None wenn der Optimizer deaktiviert ist oder kein gültiger Plan vorliegt
+    def current_plan_slot(self):
+        if not self.automatic_config.snapshot().get("optimizer", {}).get("enabled"):
+            return None
+        return self.plan_optimizer.current_slot()
 
     # AUTOMATIC – Boiler
     def automatic_boiler(self, forecast, pv_state=None):
-        config = self.automatic_config.get()
+        config = self.automatic_config.snapshot()
         season = self.schedule_manager.determine_season()
         boiler_cfg = config.get("boiler", {}).get(season, {})
 
@@ -216,11 +528,11 @@ class SchedulerService(threading.Thread):
         if current_temp is None:
             return
 
-        now = datetime.now(ZoneInfo("Europe/Vienna"))
+        now = self.clock.now()
         deadline_today = datetime.combine(
             now.date(),
             datetime.strptime(target_time, "%H:%M").time(),
-            tzinfo=ZoneInfo("Europe/Vienna")
+            tzinfo=now.tzinfo
         )
         # deadline_today = heutiges Ziel (z.B. 16:00), auch wenn bereits überschritten
         # deadline = für remaining_min Berechnung: springt auf morgen wenn überschritten
@@ -271,7 +583,7 @@ class SchedulerService(threading.Thread):
             reason = "target_temp_reached"
 
         # Fall 2: Temperatur unter Ziel -> Heizung nötig
-        elif current_temp <= target_temp - HYSTERESIS:
+        elif current_temp <= target_temp - self.hysteresis:
 
             # pv_state wurde von run_automatic() übergeben → kein zweiter DB-Call
             if pv_state is not None:
@@ -295,14 +607,21 @@ class SchedulerService(threading.Thread):
             # Nur starten wenn: Überschuss > 1.5 kW UND Batterie SOC >= 12%
             # (Hysterese: erst stoppen wenn SOC < 10%, also kein Flapping)
             # FIX #6: soc is not None guard verhindert 0.0-Fehlinterpretation
-            soc_ok = (soc is not None) and (soc >= BOILER_SOC_START or (boiler_on and soc >= BOILER_SOC_STOP))
-            if pv_valid and pv_surplus > BOILER_PV_MIN_KW and soc_ok:
+            soc_ok = (soc is not None) and (soc >= self.boiler_soc_start or (boiler_on and soc >= self.boiler_soc_stop))
+            plan_slot = self.current_plan_slot()
+            if pv_valid and pv_surplus > self.boiler_pv_min_kw and soc_ok:
                 decision_on = True
                 reason = "pv_surplus"
 
+            # Optimizer-Plan ersetzt die EPEX-/Prognose-Heuristik (Prio 2-4), Failsafe bleibt aktiv
+            elif plan_slot is not None:
+                decision_on = plan_slot["boiler"]
+                reason = "plan_scheduled" if decision_on else "plan_wait"
+
             else:
                 # EPEX-Analyse nur wenn kein PV-Überschuss
-                epex_stats = self.epex_service.get_price_statistics()
+                with self.metrics.phase("epex"):
+                    epex_stats = self.inputs.epex_stats()
                 is_emergency_cheap = epex_stats.get("is_emergency_cheap", False)
                 emergency_threshold = epex_stats.get("emergency_threshold")
 
@@ -396,6 +715,10 @@ class SchedulerService(threading.Thread):
                 return "Hysterese: Zustand beibehalten"
             elif reason == "wait":
                 return f"Warte (kein PV, kein günstiger Strom, {round(remaining_min)}min bis {target_time})"
+            elif reason == "plan_scheduled":
+                return f"Optimizer-Plan: Slot {plan_slot['start'][11:16]}–{plan_slot['end'][11:16]} ({plan_slot['price']} ct/kWh)"
+            elif reason == "plan_wait":
+                return "Optimizer-Plan: warte auf günstigeren Slot"
             else:
                 # FIX #8: Fallback gibt reason-Code aus statt irreführendem "Kein Einschaltgrund"
                 return f"Grund: {reason}"
@@ -449,18 +772,15 @@ class SchedulerService(threading.Thread):
         self.boiler_last_reason = reason
 
     # AUTOMATIC – Wallbox
-    def automatic_wallbox(self, forecast, pv_state=None):
-        config = self.automatic_config.get()
-        season = self.schedule_manager.determine_season()
-        wb_cfg = config.get("wallbox", {}).get(season, {})
-
+    # Current wallbox reading (published for the other loops), None if the wallbox can't be controlled right now
+    def read_wallbox(self):
         if not self.wallbox:
-            return
+            return None
 
         try:
             # Online-Check – wenn fehlerhaft, lieber nicht steuern als ständig Fehler zu loggen
             if hasattr(self.wallbox, "is_online") and not self.wallbox.is_online():
-                return
+                return None
         except Exception as e:
             # SYSTEM EVENT LOG
             self.logger.system_event(
@@ -468,7 +788,7 @@ class SchedulerService(threading.Thread):
                 source="wallbox_automatik",
                 message=f"[Wallbox] Online-Check fehlgeschlagen: {e}"
             )
-            return
+            return None
 
         try:
             data = self.wallbox.fetch_data()
@@ -479,10 +799,28 @@ class SchedulerService(threading.Thread):
                 source="wallbox_automatik",
                 message=f"[Wallbox] Datenabruf fehlgeschlagen: {e}"
             )
+            return None
+        self.inputs.publish_wallbox_state(data)
+        return data
+
+    # data: reading from read_wallbox() (taken before the wallbox lock), read here if not given
+    def automatic_wallbox(self, forecast, pv_state=None, data=None):
+        config = self.automatic_config.snapshot()
+        season = self.schedule_manager.determine_season()
+        wb_cfg = config.get("wallbox", {}).get(season, {})
+
+        if not self.wallbox:
             return
 
+        if data is None:
+            data = self.read_wallbox()
+            if data is None:
+                return
+
         car_connected = data.get("car_connected") == 1
         eto_now = data.get("eto")
+        # Active phases reported by the charger (0 while idle -> assume single phase)
+        current_phases = 3 if data.get("pha_count", 0) >= 2 else 1
 
         if eto_now is None:
             return
@@ -565,11 +903,11 @@ class SchedulerService(threading.Thread):
         pv_tomorrow = forecast.get("pv_tomorrow", False)
         allow_night = wb_cfg.get("allow_night_grid", False)
 
-        now = datetime.now(ZoneInfo("Europe/Vienna"))
+        now = self.clock.now()
         deadline = datetime.combine(
             now.date(),
             datetime.strptime(target_time, "%H:%M").time(),
-            tzinfo=ZoneInfo("Europe/Vienna")
+            tzinfo=now.tzinfo
         )
         if deadline < now:
             deadline += timedelta(days=1)
@@ -591,6 +929,8 @@ class SchedulerService(threading.Thread):
             self.wallbox_deadline_missed = False  # Ziel erreicht → kein Missed-State
 
         PV_MIN_KW = 1.4
+        plan_slot = self.current_plan_slot()
+        plan_charge = plan_slot is not None and plan_slot["wallbox"]
 
         # Priorität 1: PV-Überschuss -> dynamisches Laden
         if pv_surplus > 0:
@@ -599,18 +939,46 @@ class SchedulerService(threading.Thread):
             except Exception:
                 current_ampere = 0
 
+            try:
+                self.wallbox_dynamic.set_phase_mode(wb_cfg.get("phase_mode", 1))
+            except (ValueError, TypeError):
+                pass  # Ungültige Konfiguration -> bisherigen Phasenmodus beibehalten
+
             charging_decision = self.wallbox_dynamic.get_charging_decision(
                 pv_surplus_kw=pv_surplus,
                 battery_power_kw=battery_power_kw,
                 battery_soc=battery_soc,
-                current_ampere=current_ampere
+                current_ampere=current_ampere,
+                current_phases=current_phases
             )
 
             optimal_ampere = charging_decision["ampere"]
+            optimal_phases = charging_decision["phases"]
             should_charge = charging_decision["allow_charging"]
 
             if should_charge and optimal_ampere > 0:
 
+                # Phasen umschalten wenn nötig (nur bei automatischer Umschaltung oder geänderter Konfiguration)
+                # Idle charger reports 0 phases -> remember the last command instead of re-sending it every tick
+                if (optimal_phases != current_phases and optimal_phases != self.wallbox_phases_set
+                        and hasattr(self.wallbox, "set_phase_count")):
+                    try:
+                        self.wallbox.set_phase_count(optimal_phases)
+                        self.wallbox_phases_set = optimal_phases
+                        # DEVICE STATE CHANGE LOG
+                        self.logger.device_state_change(
+                            "wallbox_phases", current_phases, optimal_phases,
+                            reason=f"[Wallbox] Automatik PV-Dynamik: {pv_surplus:.1f} kW Überschuss → "
+                                   f"{charging_decision['power_kw']:.2f} kW"
+                        )
+                    except Exception as e:
+                        # SYSTEM EVENT LOG
+                        self.logger.system_event(
+                            level="error",
+                            source="wallbox_automatik",
+                            message=f"[Wallbox] Phasenumschaltung fehlgeschlagen ({optimal_phases}-phasig): {e}"
+                        )
+
                 # Ampere anpassen wenn geändert
                 if optimal_ampere != current_ampere:
                     try:
@@ -656,8 +1024,8 @@ class SchedulerService(threading.Thread):
                 self.wallbox_last_set_allow = True
                 return
 
-            # PV vorhanden aber zu wenig für Laden
-            elif not should_charge:
+            # PV vorhanden aber zu wenig für Laden (außer der Optimizer-Plan lädt in diesem Slot ohnehin)
+            elif not should_charge and not plan_charge:
                 if allow:
                     self.wallbox.set_allow_charging(False)
                     # DEVICE STATE CHANGE LOG
@@ -673,9 +1041,56 @@ class SchedulerService(threading.Thread):
                     pass
                 return
 
+        # Optimizer-Plan ersetzt die EPEX-/Prognose-Heuristik (Prio 2-4), Failsafe (Prio 5) bleibt aktiv
+        if plan_slot is not None:
+            slot_info = f"Slot {plan_slot['start'][11:16]}–{plan_slot['end'][11:16]} ({plan_slot['price']} ct/kWh)"
+            if plan_charge:
+                # Plan rechnet mit voller Ladeleistung
+                try:
+                    current_ampere = self.wallbox.get_current_ampere()
+                    if current_ampere != MAX_AMPERE:
+                        self.wallbox.set_charging_ampere(MAX_AMPERE)
+                        # DEVICE STATE CHANGE LOG
+                        self.logger.device_state_change(
+                            "wallbox_ampere", current_ampere, MAX_AMPERE,
+                            reason=f"[Wallbox] Automatik: Optimizer-Plan {slot_info}"
+                        )
+                except Exception as e:
+                    # SYSTEM EVENT LOG
+                    self.logger.system_event(
+                        level="error",
+                        source="wallbox_automatik",
+                        message=f"[Wallbox] Ladestrom setzen fehlgeschlagen ({MAX_AMPERE}A): {e}"
+                    )
+                self.wallbox_dynamic.reset()
+
+                if not allow:
+                    self.wallbox.set_allow_charging(True)
+                    # DEVICE STATE CHANGE LOG
+                    self.logger.device_state_change(
+                        "wallbox", False, True,
+                        reason=f"[Wallbox] Automatik: Optimizer-Plan {slot_info} | {progress_info}"
+                    )
+                self.wallbox_last_set_allow = True
+                return
+
+            failsafe_active = (self.wallbox_failsafe_until is not None and now < self.wallbox_failsafe_until)
+            if allow and not failsafe_active:
+                self.wallbox.set_allow_charging(False)
+                # DEVICE STATE CHANGE LOG
+                self.logger.device_state_change(
+                    "wallbox", True, False,
+                    reason=f"[Wallbox] Automatik: Optimizer-Plan – warte auf günstigeren Slot | {progress_info}"
+                )
+                self.wallbox_last_set_allow = False
+                allow = False
+            self.wallbox_deadline_failsafe(now, allow, allow_night, remaining_hours, deadline, target_time, progress_info)
+            return
+
         # Priorität 2+: EPEX Preisanalyse
         # FIX #4: EPEX-Abruf nur wenn PV-Pfad nicht gegriffen hat (pv_surplus <= 0)
-        epex_stats = self.epex_service.get_price_statistics()
+        with self.loop_metrics().phase("epex"):
+            epex_stats = self.inputs.epex_stats()
         is_emergency_cheap = epex_stats.get("is_emergency_cheap", False)
         emergency_threshold = epex_stats.get("emergency_threshold")
 
@@ -761,6 +1176,10 @@ class SchedulerService(threading.Thread):
                 allow = False  # lokale Variable aktualisieren für Prio-5-Check
             # FIX #1: KEIN return – Priorität 5 darf greifen
 
+        self.wallbox_deadline_failsafe(now, allow, allow_night, remaining_hours, deadline, target_time, progress_info)
+
+    # Priorität 5 + Default-AUS (auch vom Optimizer-Plan genutzt)
+    def wallbox_deadline_failsafe(self, now, allow, allow_night, remaining_hours, deadline, target_time, progress_info):
         # Priorität 5: Nacht-Failsafe (Deadline nähert sich)
         # Einmal getriggert → wallbox_failsafe_until setzen → bleibt stabil AN bis Deadline
         # Verhindert AN/AUS-Flapping durch Prio-4-AUS im nächsten Tick
@@ -797,6 +1216,10 @@ class SchedulerService(threading.Thread):
             self.wallbox_last_set_allow = False
 
     def reset_automatic_state(self):
+        with self._device_locks():
+            self._reset_automatic_state()
+
+    def _reset_automatic_state(self):
         self.wallbox_eto_start = None
         self.wallbox_finished = False
         self.wallbox_last_set_allow = None
@@ -812,4 +1235,36 @@ class SchedulerService(threading.Thread):
         self.boiler_failsafe_logged_today = False  # FIX #9
         self.boiler_failsafe_done_today = False
         self.wallbox_failsafe_until = None
-        self.wallbox_deadline_missed = False
\ No newline at end of file
+        self.wallbox_deadline_missed = False
+        self.wallbox_phases_set = None
+        self.plan_optimizer.invalidate()
+        self.inputs.invalidate()
+        self.persist_state()
+
+    # Loads the last session snapshot (failsafes, kWh baseline, daily flags) – file only, no device traffic
+    def restore_state(self):
+        restored = self.state_store.load(self.clock.now())
+        for name, value in restored.items():
+            setattr(self, name, value)
+        if restored:
+            # SYSTEM EVENT LOG
+            self.logger.system_event(
+                level="info",
+                source="scheduler",
+                message=f"Scheduler-Zustand wiederhergestellt ({len(restored)} Werte)"
+            )
+
+    # Saves the session state if it changed since the last save
+    def persist_state(self):
+        if not self.state_store:
+            return
+        try:
+            with self._state_lock:
+                self.state_store.save({name: getattr(self, name) for name in STATE_FIELDS}, self.clock.now())
+        except OSError as e:
+            # SYSTEM EVENT LOG
+            self.logger.system_event(
+                level="error",
+                source="scheduler",
+                message=f"Scheduler-Zustand konnte nicht gespeichert werden: {e}"
+            )
\ No newline at end of file
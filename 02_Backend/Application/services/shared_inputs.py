@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
+
+from services.single_flight import SingleFlight
+
+
+# Read-only inputs of one control step, shared between the device loops
+@dataclass(frozen=True)
+class InputSnapshot:
+    taken_at: datetime
+    forecast: Mapping
+    pv_state: Mapping | None
+
+
+def _freeze(value):
+    return MappingProxyType(dict(value)) if value is not None else None
+
+
+# Common data layer for the device loops
+# Each source is loaded through a SingleFlight: loops that need the same input at the same time share one query,
+# and a value younger than its TTL is reused instead of being fetched again by every loop
+class SharedInputs:
+    def __init__(self, pv_loader, forecast_loader, epex_loader, clock, pv_ttl_s=5.0, forecast_ttl_s=300.0, epex_ttl_s=60.0):
+        self.clock = clock
+        self._pv = SingleFlight(lambda: _freeze(pv_loader()), ttl_s=pv_ttl_s, clock=clock.monotonic, name="inputs_pv")
+        self._forecast = SingleFlight(lambda: _freeze(forecast_loader()), ttl_s=forecast_ttl_s, clock=clock.monotonic, name="inputs_forecast")
+        self._epex = SingleFlight(lambda: _freeze(epex_loader()), ttl_s=epex_ttl_s, clock=clock.monotonic, name="inputs_epex")
+        self._wallbox_state = None
+
+    # PV state (surplus, SOC, battery) or None if unavailable
+    def pv_state(self):
+        try:
+            return self._pv.get()
+        except Exception:
+            return None
+
+    def forecast(self):
+        return self._forecast.get()
+
+    # max_age_s=0 forces a fresh query (e.g. right after the price changed at the quarter hour)
+    def epex_stats(self, max_age_s=None):
+        return self._epex.get(max_age_s)
+
+    # Forecast + PV state taken together; metrics (optional) records the fetch time per input
+    def snapshot(self, metrics=None) -> InputSnapshot:
+        if metrics is None:
+            return InputSnapshot(self.clock.now(), self.forecast(), self.pv_state())
+
+        with metrics.phase("forecast"):
+            forecast = self.forecast()
+        with metrics.phase("pv_state"):
+            pv_state = self.pv_state()
+        return InputSnapshot(self.clock.now(), forecast, pv_state)
+
+    # Last wallbox reading, published by the wallbox loop (no device I/O for other loops)
+    def publish_wallbox_state(self, data):
+        self._wallbox_state = _freeze(data)
+
+    def wallbox_state(self):
+        return self._wallbox_state
+
+    # Drop all cached values (e.g. after a mode change)
+    def invalidate(self):
+        self._pv.invalidate()
+        self._forecast.invalidate()
+        self._epex.invalidate()
@@ -0,0 +1,117 @@
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from services.metrics_registry import REGISTRY
+
+# Named instances, reported as cache hit/miss counters on /metrics
+_named = weakref.WeakSet()
+
+
+def _cache_samples():
+    totals = defaultdict(int)
+    for flight in list(_named):
+        totals[(flight.name, "hit")] += flight.hits
+        totals[(flight.name, "miss")] += flight.misses
+        totals[(flight.name, "shared")] += flight.shared
+    return sorted(totals.items())
+
+
+REGISTRY.callback("counter", "pvbackend_cache_requests_total",
+                  "Cache lookups by result (hit = served from memory, shared = joined an in-flight load)",
+                  ("cache", "result"), _cache_samples)
+
+
+# Result holder for one in-flight call, shared by the leader and all waiting callers
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# Single-flight call coalescing with a short freshness window
+# - Concurrent callers share one in-flight call of the loader and all receive its result (or its exception)
+# - A successful result is served from memory for ttl_s seconds
+# - invalidate() drops the cached value and detaches a running load, e.g. after a command changed the device
+#   state: later callers start a new load instead of joining one that may return the old state
+class SingleFlight:
+    def __init__(self, loader, ttl_s: float = 0.0, clock=time.monotonic, name=None):
+        self.loader = loader
+        self.name = name
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flight = None
+        self._value = None
+        self._loaded_at = None
+        self._generation = 0
+
+        # Counters for monitoring
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        if name:
+            _named.add(self)
+
+    # Returns a fresh value (age < max_age_s, default ttl_s), loading it at most once for all concurrent callers
+    def get(self, max_age_s: float | None = None):
+        max_age = self.ttl_s if max_age_s is None else max_age_s
+
+        with self._lock:
+            if self._loaded_at is not None and self._clock() - self._loaded_at < max_age:
+                self.hits += 1
+                return self._value
+
+            flight = self._flight
+            leader = flight is None
+            if leader:
+                flight = self._flight = _Flight()
+                generation = self._generation
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                # Don't cache a result that was loaded before an invalidate()
+                if flight.error is None and generation == self._generation:
+                    self._value = flight.result
+                    self._loaded_at = self._clock()
+                # invalidate() may already have detached this flight (and a newer one may be running)
+                if self._flight is flight:
+                    self._flight = None
+            flight.done.set()
+
+        return flight.result
+
+    # Last successfully loaded value (or None) without triggering a load
+    def peek(self):
+        with self._lock:
+            return self._value
+
+    # Age of the cached value in seconds, None if nothing is cached
+    def age_s(self) -> float | None:
+        with self._lock:
+            if self._loaded_at is None:
+                return None
+            return self._clock() - self._loaded_at
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+            # Callers already waiting keep their flight, new callers must not join it
+            self._flight = None
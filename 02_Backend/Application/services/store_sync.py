@@ -0,0 +1,64 @@
+import threading
+
+# How often the store files are checked for changes by other workers (seconds)
+STORE_SYNC_INTERVAL_S = 1.0
+
+
+# Keeps the in-memory stores of one worker process in sync with changes written by the other workers
+# Every store is registered with its reload_if_changed(); on_change(name) runs after a reload
+# (the leader uses it to reset/notify the scheduler after a mode or schedule change)
+# Failures of the background thread go to the system event log (logger.system_event), repeated ones only once
+class StoreSync:
+    def __init__(self, interval_s=STORE_SYNC_INTERVAL_S, logger=None):
+        self.interval_s = interval_s
+        self.logger = logger
+        self._stores = []
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_error = None
+        self.reloads = 0
+
+    def watch(self, name, reload_if_changed, on_change=None):
+        self._stores.append((name, reload_if_changed, on_change))
+
+    # Checks all stores once; returns the names of the reloaded ones
+    def check_once(self):
+        reloaded = []
+        for name, reload_if_changed, on_change in self._stores:
+            try:
+                if not reload_if_changed():
+                    continue
+            except (OSError, ValueError):
+                # Datei gerade unvollständig/ungültig -> nächster Durchlauf
+                continue
+            self.reloads += 1
+            reloaded.append(name)
+            if on_change:
+                on_change(name)
+        return reloaded
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="store-sync", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.check_once()
+                self._last_error = None
+            except Exception as e:
+                self._log_error(e)
+
+    def _log_error(self, error):
+        message = f"[store-sync] Reload fehlgeschlagen: {error}"
+        if message == self._last_error or self.logger is None:
+            return
+        self._last_error = message
+        try:
+            # SYSTEM EVENT LOG
+            self.logger.system_event(level="error", source="store_sync", message=message)
+        except Exception:
+            pass
+
+    def stop(self):
+        self._stop.set()
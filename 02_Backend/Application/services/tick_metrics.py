@@ -0,0 +1,128 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from services.metrics_registry import REGISTRY
+
+# Histogram bucket upper bounds in milliseconds (cumulative, like Prometheus "le")
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+# Duration histogram of one phase
+class Histogram:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+
+    def observe(self, ms: float):
+        i = 0
+        while i < len(self.buckets) and ms > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+
+    def snapshot(self) -> dict:
+        cumulative = {}
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            cumulative[f"le_{bound}"] = total
+        cumulative["le_inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 1),
+            "avg_ms": round(self.sum_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+            "buckets": cumulative,
+        }
+
+
+PHASE_SECONDS = REGISTRY.histogram("pvbackend_scheduler_phase_duration_seconds",
+                                   "Duration of the scheduler tick phases (nested)", ("loop", "phase"))
+TICK_SECONDS = REGISTRY.histogram("pvbackend_scheduler_tick_duration_seconds",
+                                  "Duration of a whole scheduler tick", ("loop",))
+OVERRUNS = REGISTRY.counter("pvbackend_scheduler_overruns_total",
+                            "Ticks that finished after the next deadline", ("loop",))
+
+
+# Timing of the scheduler ticks: total duration, per-phase durations and loop overruns
+# Phases nest (e.g. "boiler" contains its "epex" and "logging" time)
+# Every observation also goes to the process-wide /metrics registry, labelled with the loop name
+class TickMetrics:
+    def __init__(self, clock=time.perf_counter, loop="main"):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._phases = {}
+        self.loop = loop
+        self._tick_metric = TICK_SECONDS.labels(loop)
+        self.ticks = Histogram()
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.max_lag_ms = 0.0
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            hist = self._phases.get(phase)
+            if hist is None:
+                hist = self._phases[phase] = Histogram()
+            hist.observe(seconds * 1000)
+        PHASE_SECONDS.labels(self.loop, phase).observe(seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.observe(name, self._clock() - started)
+
+    def record_tick(self, seconds: float):
+        with self._lock:
+            self.ticks.observe(seconds * 1000)
+        self._tick_metric.observe(seconds)
+
+    # A tick finished after the next deadline: 'skipped' deadlines are dropped instead of being run back to back
+    def record_overrun(self, lag_s: float, skipped: int):
+        with self._lock:
+            self.overruns += 1
+            self.skipped_ticks += skipped
+            self.max_lag_ms = max(self.max_lag_ms, lag_s * 1000)
+        OVERRUNS.labels(self.loop).inc()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "tick": self.ticks.snapshot(),
+                "phases": {name: hist.snapshot() for name, hist in sorted(self._phases.items())},
+                "overruns": self.overruns,
+                "skipped_ticks": self.skipped_ticks,
+                "max_lag_ms": round(self.max_lag_ms, 1),
+            }
+
+
+# Wraps an object so that every method call is timed as one phase (used for the logger)
+# metrics: TickMetrics or a callable returning the TickMetrics to record into (e.g. the loop of the calling thread)
+class TimedProxy:
+    def __init__(self, target, metrics, phase: str):
+        self._target = target
+        self._metrics = metrics
+        self._phase = phase
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            metrics = self._metrics if isinstance(self._metrics, TickMetrics) else self._metrics()
+            with metrics.phase(self._phase):
+                return attr(*args, **kwargs)
+        return timed
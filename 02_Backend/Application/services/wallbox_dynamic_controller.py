@@ -1,88 +1,132 @@
+import bisect
+
+from controllers.wallbox_controller import MIN_AMPERE, MAX_AMPERE
+
+# Netzspannung pro Phase (V)
+GRID_VOLTAGE_V = 230
+
+# Phase modes: fixed single phase, fixed three phase or automatic switching between both
+PHASE_MODE_AUTO = "auto"
+PHASE_MODES = (1, 3, PHASE_MODE_AUTO)
+
+
+# Charging power of one setting in kW: P = U × I × phases
+def setting_power_kw(ampere: int, phases: int) -> float:
+    if ampere <= 0:
+        return 0.0
+    return round(GRID_VOLTAGE_V * ampere * phases / 1000, 2)
+
+
 class WallboxDynamicController:
     # Dynamic charge controller for PV-optimized charging
-    def __init__(self, hysteresis_kw=0.3, min_surplus_kw=1.4, battery_protection_soc=20,max_battery_discharge_kw=0.5):
+    def __init__(self, hysteresis_kw=0.3, min_surplus_kw=1.4, battery_protection_soc=20, max_battery_discharge_kw=0.5,
+                 phase_mode=1, phase_switch_margin_kw=0.5):
         self.hysteresis = hysteresis_kw
         self.min_surplus = min_surplus_kw
         self.battery_protection_soc = battery_protection_soc
         self.max_battery_discharge = max_battery_discharge_kw
-        
+        # Extra surplus required before switching 1 -> 3 phases (contactor switching interrupts the charge)
+        self.phase_switch_margin = phase_switch_margin_kw
+
         #  Current state for hysteresis
         self.current_ampere = 0
-        
-        # Ampere → kW Mapping (230V, 1 Phase)
-        # P = U × I = 230V × I
-        self.ampere_to_kw = {
-            0: 0.0,
-            6: 1.38,   # 230V × 6A
-            10: 2.30,  # 230V × 10A
-            12: 2.76,  # 230V × 12A
-            14: 3.22,  # 230V × 14A
-            16: 3.68   # 230V × 16A
-        }
-        
-        # Sorted ampere values ​​for selection
-        self.allowed_amperes = sorted(self.ampere_to_kw.keys())
-    
+        self.current_phases = 1
+
+        self.phase_mode = None
+        self.set_phase_mode(phase_mode)
+
+    # Rebuilds the power -> setting lookup table for the given phase mode (1, 3 or "auto")
+    # Table: every integer ampere 6..16 for each allowed phase count, sorted by power
+    # 1-phase (1.38-3.68 kW) and 3-phase (4.14-11.04 kW) ranges don't overlap, so the powers are strictly increasing
+    def set_phase_mode(self, phase_mode):
+        if phase_mode != PHASE_MODE_AUTO:
+            phase_mode = int(phase_mode)
+        if phase_mode not in PHASE_MODES:
+            raise ValueError(f"Invalid phase mode. Allowed values: {list(PHASE_MODES)}")
+        if phase_mode == self.phase_mode:
+            return
+
+        phase_counts = (1, 3) if phase_mode == PHASE_MODE_AUTO else (phase_mode,)
+        table = sorted(
+            (setting_power_kw(amp, phases), amp, phases)
+            for phases in phase_counts
+            for amp in range(MIN_AMPERE, MAX_AMPERE + 1)
+        )
+
+        self.phase_mode = phase_mode
+        self._powers = [kw for kw, _, _ in table]
+        self._settings = [(amp, phases) for _, amp, phases in table]
+        self._allowed = set(self._settings)
+
+    # Forget the current setting (charging stopped)
+    def reset(self):
+        self.current_ampere = 0
+
     # Berechnet optimalen Ladestrom
-    def calculate_optimal_ampere(self, pv_surplus_kw, battery_power_kw, battery_soc, current_ampere=None):
+    def calculate_optimal_ampere(self, pv_surplus_kw, battery_power_kw, battery_soc, current_ampere=None, current_phases=None):
+        ampere, _ = self.calculate_optimal_setting(pv_surplus_kw, battery_power_kw, battery_soc, current_ampere, current_phases)
+        return ampere
+
+    # Berechnet optimale Einstellung (Ampere, Phasen)
+    def calculate_optimal_setting(self, pv_surplus_kw, battery_power_kw, battery_soc, current_ampere=None, current_phases=None):
         # Save current hysteresis value
         if current_ampere is not None:
             self.current_ampere = current_ampere
-        
+        if current_phases in (1, 3):
+            self.current_phases = current_phases
+
         # 1. Battery protection: Do not charge if SOC is too low
         if battery_soc < self.battery_protection_soc:
-            return 0
-        
+            return 0, self.current_phases
+
         # 2. Battery protection: If the battery is severely discharged, stop
         if battery_power_kw < -self.max_battery_discharge:
-            return 0
-        
+            return 0, self.current_phases
+
         # 3. Calculate the effective surplus
         # Strategy: Slight battery discharge is OK (buffer utilization)
         effective_surplus = pv_surplus_kw
-        
+
         # Use as a buffer if the battery is slightly discharging (< 500W)
         if -self.max_battery_discharge < battery_power_kw < 0:
             # Consider 50% of the discharge as usable
             effective_surplus += abs(battery_power_kw) * 0.5
-        
-       # 4. Finding the optimal amperage (with hysteresis)
-        optimal = self._find_optimal_ampere_with_hysteresis(effective_surplus)
-        
-        return optimal
-    
-    # Finds optimal amperage with hysteresis Hysteresis / prevents constant fluctuations in voltage with varying PV output
-    def _find_optimal_ampere_with_hysteresis(self, available_kw):
-        
-        optimal_amp = 0
-        
-        # Check for each ampere value
-        for amp in self.allowed_amperes:
-            required_kw = self.ampere_to_kw[amp]
-            
-            # Apply hysteresis
-            if amp > self.current_ampere:
-                # Upshifting: Requires more than required + hysteresis
-                threshold = required_kw + self.hysteresis
-            elif amp < self.current_ampere:
-                # Downshifting: Uses less than required - Hysteresis
-                threshold = required_kw - self.hysteresis
-            else:
-                # Same value: No hysteresis
-                threshold = required_kw
-            
-            # If there is enough surplus for this value
-            if available_kw >= threshold:
-                optimal_amp = amp
-            else:
-                # Not enough for this value
-                break
-        
-        return optimal_amp
-    
+
+        # 4. Finding the optimal setting (with hysteresis)
+        return self._find_optimal_setting_with_hysteresis(effective_surplus)
+
+    # Finds the optimal setting with hysteresis (prevents constant switching with varying PV output)
+    # Upshifting requires required + hysteresis, downshifting only happens below required - hysteresis
+    # Binary search over the precomputed power table -> O(log n)
+    def _find_optimal_setting_with_hysteresis(self, available_kw):
+        current_kw = setting_power_kw(self.current_ampere, self.current_phases)
+
+        # Upshift: highest setting that fits including the hysteresis margin
+        i_up = bisect.bisect_right(self._powers, available_kw - self.hysteresis) - 1
+        if i_up >= 0 and self._powers[i_up] > current_kw:
+            if current_kw > 0 and self._settings[i_up][1] != self.current_phases:
+                # Phase switch while charging needs an additional margin
+                i_up = bisect.bisect_right(self._powers, available_kw - self.hysteresis - self.phase_switch_margin) - 1
+            if i_up >= 0 and self._powers[i_up] > current_kw:
+                return self._settings[i_up]
+
+        # Hold: current setting is covered up to the hysteresis band (and still allowed in the active phase mode)
+        if (current_kw > 0 and available_kw >= current_kw - self.hysteresis
+                and (self.current_ampere, self.current_phases) in self._allowed):
+            return self.current_ampere, self.current_phases
+
+        # Downshift: highest setting below the current one that fits with the hysteresis bonus
+        i_down = bisect.bisect_right(self._powers, available_kw + self.hysteresis) - 1
+        if current_kw > 0:
+            i_down = min(i_down, bisect.bisect_left(self._powers, current_kw) - 1)
+        if i_down >= 0:
+            return self._settings[i_down]
+
+        return 0, self.current_phases
+
     # Complete charging decision with justification
-    def get_charging_decision(self, pv_surplus_kw, battery_power_kw, battery_soc,current_ampere=0):
-    
+    def get_charging_decision(self, pv_surplus_kw, battery_power_kw, battery_soc, current_ampere=0, current_phases=None):
+
         # Battery-state
         if battery_power_kw > 0.1:
             battery_status = "charging"
@@ -90,15 +134,16 @@ class WallboxDynamicController:
             battery_status = "discharging"
         else:
             battery_status = "idle"
-        
-        # Calculate optimal amperage
-        optimal_ampere = self.calculate_optimal_ampere(
+
+        # Calculate optimal setting
+        optimal_ampere, optimal_phases = self.calculate_optimal_setting(
             pv_surplus_kw=pv_surplus_kw,
             battery_power_kw=battery_power_kw,
             battery_soc=battery_soc,
-            current_ampere=current_ampere
+            current_ampere=current_ampere,
+            current_phases=current_phases
         )
-        
+
        # Justification
         if battery_soc < self.battery_protection_soc:
             reason = f"battery_protection (SOC {battery_soc}% < {self.battery_protection_soc}%)"
@@ -107,14 +152,16 @@ class WallboxDynamicController:
         elif optimal_ampere == 0:
             reason = f"insufficient_pv (surplus {pv_surplus_kw:.1f} kW < {self.min_surplus} kW)"
         else:
-            reason = f"pv_surplus_optimal (surplus {pv_surplus_kw:.1f} kW → {optimal_ampere}A)"
-        
+            reason = f"pv_surplus_optimal (surplus {pv_surplus_kw:.1f} kW → {optimal_ampere}A {optimal_phases}-phasig)"
+
         return {
             'ampere': optimal_ampere,
+            'phases': optimal_phases,
+            'power_kw': setting_power_kw(optimal_ampere, optimal_phases),
             'allow_charging': optimal_ampere > 0,
             'reason': reason,
             'surplus_kw': round(pv_surplus_kw, 2),
             'battery_status': battery_status,
             'battery_soc': battery_soc,
             'battery_power_kw': round(battery_power_kw, 2)
-        }
\ No newline at end of file
+        }
@@ -1,34 +1,69 @@
-import json
 import copy
+import threading
 from pathlib import Path
+from types import MappingProxyType
+
+from stores.json_file import JsonFile
+
+# Rapid updates (e.g. slider in the UI) are coalesced into one write
+WRITE_DEBOUNCE_S = 1.0
+
+
+# Read-only view of a config dict (nested dicts -> MappingProxyType, lists -> tuples)
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
 
 #  Handles AUTOMATIC mode configuration
+#  One instance is shared by the API and the scheduler: readers get an immutable snapshot without copying,
+#  every change bumps the version and notifies the subscribers
 class AutomaticConfigStore:
     def __init__(self, path="data/automatic_config.json", default_path="data/automatic_config_default.json"):
         self.path = Path(path)
         self.default_path = Path(default_path)
+        self._file = JsonFile(self.path, indent=2, debounce_s=WRITE_DEBOUNCE_S)
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self.version = 0
+        self._snapshot = None
         self._config = self._load()
+        self._publish(notify=False)
 
     # Loads configuration from file, or resets to default if file does not exist
     def _load(self) -> dict:
-        if not self.path.exists():
+        if not self._file.exists():
             return self.reset_to_default()
 
-        with self.path.open("r") as f:
-            return json.load(f)
+        return self._file.read()
 
     # Returns a deep copy of the current configuration to prevent accidental modifications
     def get(self) -> dict:
-        return copy.deepcopy(self._config)
+        with self._lock:
+            return copy.deepcopy(self._config)
+
+    # Immutable view of the current configuration – copy-free, safe to share between threads
+    def snapshot(self):
+        return self._snapshot
+
+    # callback(snapshot, version) is called after every update/reset
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
 
     # Updates the configuration with a partial update dict, merging it with the existing config and saving to file
     def update(self, partial_update: dict):
         if not isinstance(partial_update, dict):
             raise ValueError("Invalid config format")
 
-        # Deep merge the partial update into the existing config, so that nested dictionaries are properly updated without overwriting the entire section
-        self._deep_merge(self._config, partial_update)
-        self._save()
+        with self._lock:
+            # Deep merge the partial update into the existing config, so that nested dictionaries are properly updated without overwriting the entire section
+            self._deep_merge(self._config, copy.deepcopy(partial_update))
+            self._save()
+            self._publish()
 
     # Recursively merges updates into the base config dictionary
     # This allows for partial updates to nested configuration sections without overwriting the entire section, 
@@ -44,19 +79,37 @@ class AutomaticConfigStore:
             else:
                 base[key] = value
 
+    # Re-reads the configuration if another worker process changed the file; returns True if it was reloaded
+    def reload_if_changed(self) -> bool:
+        with self._lock:
+            if not self._file.changed_on_disk() or not self._file.exists():
+                return False
+            self._config = self._file.read()
+            self._publish()
+            return True
+
     # Resets the configuration to the default values defined in the default JSON file, saves it, and returns the new config
     def reset_to_default(self) -> dict:
         if not self.default_path.exists():
             raise FileNotFoundError("automatic_config_default.json missing")
 
-        with self.default_path.open("r") as f:
-            self._config = json.load(f)
+        with self._lock:
+            self._config = JsonFile(self.default_path).read()
+
+            self._save()
+            if self._snapshot is not None:
+                self._publish()
+            return copy.deepcopy(self._config)
 
-        self._save()
-        return self._config
+    # Builds the new snapshot once per change and informs the subscribers (scheduler, event core)
+    def _publish(self, notify=True):
+        self._snapshot = _freeze(self._config)
+        self.version += 1
+        if not notify:
+            return
+        for callback in list(self._subscribers):
+            callback(self._snapshot, self.version)
 
-    # Saves the current configuration to the JSON file, creating parent directories if necessary
+    # Saves the current configuration to the JSON file (atomic, debounced), creating parent directories if necessary
     def _save(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w") as f:
-            json.dump(self._config, f, indent=2)
\ No newline at end of file
+        self._file.write(self._config)
\ No newline at end of file
@@ -0,0 +1,225 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from bridges.db_bridge import PV_FIELDS
+from bridges.influx_client import INFLUX_CLIENTS
+from services.metrics_registry import REGISTRY
+
+# Mirrored measurements: table, resolution of the stored rows in seconds (0 = raw points), fields
+# pv/boiler are stored as 15 min means (what the history charts show), EPEX prices as published
+REPLICA_TABLES = {
+    "pv_measurements": ("pv_15m", 900, PV_FIELDS),
+    "boiler_measurements": ("boiler_15m", 900, ("boiler_temp",)),
+    "epex_prices": ("epex_prices", 0, ("price",)),
+}
+# How often the leader pulls new rows from Influx (seconds)
+REPLICA_SYNC_INTERVAL_S = 60
+# A replica synced within this time serves open ranges (today, this month) as well
+REPLICA_MAX_AGE_S = 300
+# First sync: everything since Jan 1 of the previous year (yearly chart of last year)
+REPLICA_BACKFILL_YEARS = 1
+# Time range per sync query (bounded memory and request time during the backfill)
+REPLICA_CHUNK = timedelta(days=31)
+# EPEX day-ahead prices are published for tomorrow
+EPEX_LOOKAHEAD = timedelta(days=2)
+
+TIMEZONE = ZoneInfo("Europe/Vienna")
+
+REPLICA_READS = REGISTRY.counter("pvbackend_history_replica_reads_total",
+                                 "History reads served from the local replica by measurement", ("measurement",))
+REPLICA_ROWS = REGISTRY.counter("pvbackend_history_replica_synced_rows_total",
+                                "Rows copied from InfluxDB into the local replica by measurement", ("measurement",))
+
+_replicas = []
+REGISTRY.callback("gauge", "pvbackend_history_replica_age_seconds", "Seconds since the last successful replica sync",
+                  ("measurement",),
+                  lambda: [((m,), age) for replica in list(_replicas) for m, age in replica.ages().items()])
+
+
+def _epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+# Local SQLite copy of the history measurements (pv rollups, boiler, EPEX prices)
+# - One table per measurement, keyed by the UTC epoch second (INTEGER PRIMARY KEY = clustered time index)
+# - sync_once() copies everything after the high-water mark (time up to which the copy is complete) from Influx;
+#   the last 15 min windows are fetched again, they may have been incomplete at the previous sync
+# - Only the leader syncs; every worker reads (WAL mode: readers never block the writer)
+# - serves() decides per request: closed ranges before the last sync always, open ranges while the replica is fresh;
+#   while Influx is unreachable DB_Bridge falls back to anything it has (complete() tells if that is all of it)
+class HistoryReplica:
+    def __init__(self, path, db_bridge, interval_s=REPLICA_SYNC_INTERVAL_S, max_age_s=REPLICA_MAX_AGE_S):
+        self.path = Path(path)
+        self.db_bridge = db_bridge
+        self.interval_s = interval_s
+        self.max_age_s = max_age_s
+        self.influx_health = INFLUX_CLIENTS.health
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        _replicas.append(self)
+
+    # One connection per thread; the schema is created by whoever opens the file first
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for table, _, fields in REPLICA_TABLES.values():
+                columns = ", ".join(f"{field} REAL" for field in fields)
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (time INTEGER PRIMARY KEY, {columns})")
+            conn.execute("CREATE TABLE IF NOT EXISTS sync_state (measurement TEXT PRIMARY KEY, since INTEGER, "
+                         "high_water INTEGER, synced_until INTEGER, synced_at REAL)")
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _state(self, measurement):
+        row = self._db().execute("SELECT since, high_water, synced_until, synced_at FROM sync_state "
+                                 "WHERE measurement = ?", (measurement,)).fetchone()
+        if row is None:
+            return None
+        return {"since": row[0], "high_water": row[1], "synced_until": row[2], "synced_at": row[3]}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="history-replica", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_once()
+            except Exception as e:
+                print(f"[replica] Synchronisierung fehlgeschlagen: {e}")
+            if self._stop.wait(self.interval_s):
+                return
+
+    def stop(self):
+        self._stop.set()
+
+    # Copies new rows of all measurements; returns {measurement: rows written}
+    def sync_once(self, now=None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        written = {}
+        with self._sync_lock:
+            for measurement in REPLICA_TABLES:
+                written[measurement] = self._sync(measurement, now)
+        return written
+
+    def _sync(self, measurement, now):
+        table, resolution, fields = REPLICA_TABLES[measurement]
+        state = self._state(measurement)
+        if state is None:
+            since = datetime(now.astimezone(TIMEZONE).year - REPLICA_BACKFILL_YEARS, 1, 1, tzinfo=TIMEZONE)
+            start = since
+        else:
+            since = datetime.fromtimestamp(state["since"], timezone.utc)
+            # High-water mark = synced_until (the replica is complete up to there)
+            # Rollups: the last two windows are computed again (partial window, points written late)
+            # Raw points: continue after the latest stored point (EPEX prices reach into the future)
+            if resolution:
+                synced = state["synced_until"] - resolution
+                start = synced - synced % resolution
+            else:
+                start = max(state["high_water"], state["synced_until"]) + 1
+            start = datetime.fromtimestamp(start, timezone.utc)
+        stop = now + (EPEX_LOOKAHEAD if measurement == "epex_prices" else timedelta(seconds=1))
+        every = f"{resolution // 60}m" if resolution else None
+
+        placeholders = ", ".join("?" * (len(fields) + 1))
+        insert = f"INSERT OR REPLACE INTO {table} (time, {', '.join(fields)}) VALUES ({placeholders})"
+        conn = self._db()
+        high_water = state["high_water"] if state else _epoch(since)
+        total = 0
+        chunk_start = start
+        while True:
+            chunk_stop = min(chunk_start + REPLICA_CHUNK, stop)
+            rows = []
+            if chunk_start < chunk_stop:
+                # Raises on Influx errors: the state stays at the last complete chunk
+                columns = self.db_bridge.replica_rows(measurement, fields, chunk_start, chunk_stop, every)
+                rows = [(_epoch(t), *values) for t, *values in zip(columns["time"], *(columns[f] for f in fields))]
+            if rows:
+                high_water = max(high_water, max(row[0] for row in rows))
+            with conn:
+                conn.executemany(insert, rows)
+                conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?, ?)",
+                             (measurement, _epoch(since), high_water, _epoch(min(chunk_stop, now)), time.time()))
+            total += len(rows)
+            if chunk_stop >= stop:
+                break
+            chunk_start = chunk_stop
+        REPLICA_ROWS.labels(measurement).inc(total)
+        return total
+
+    # True if [start, stop) can be answered from the replica
+    def serves(self, measurement, start, stop, every=None) -> bool:
+        if not self._servable(measurement, every):
+            return False
+        state = self._state(measurement)
+        if state is None or _epoch(start) < state["since"]:
+            return False
+        if _epoch(stop) <= state["synced_until"]:
+            return True
+        return time.time() - state["synced_at"] <= self.max_age_s
+
+    # True if the replica holds every row before 'stop' (the last sync reached it)
+    def complete(self, measurement, stop) -> bool:
+        state = self._state(measurement)
+        return state is not None and _epoch(stop) <= state["synced_until"]
+
+    # True if the replica has data for the start of the range (fallback while Influx fails)
+    def has(self, measurement, start, every=None) -> bool:
+        if not self._servable(measurement, every):
+            return False
+        state = self._state(measurement)
+        return state is not None and state["since"] <= _epoch(start)
+
+    # Rollup tables can only answer windows that are multiples of their resolution
+    def _servable(self, measurement, every):
+        if measurement not in REPLICA_TABLES or not self.path.exists():
+            return False
+        resolution = REPLICA_TABLES[measurement][1]
+        if every is None or not resolution:
+            return True
+        seconds = int(every.total_seconds())
+        return seconds >= resolution and seconds % resolution == 0
+
+    # Rows in [start, stop) as dicts {"_time": local datetime, field: value}, sorted by time
+    def records(self, measurement, start, stop) -> list:
+        table, _, fields = REPLICA_TABLES[measurement]
+        rows = self._db().execute(f"SELECT time, {', '.join(fields)} FROM {table} WHERE time >= ? AND time < ? "
+                                  "ORDER BY time", (_epoch(start), _epoch(stop))).fetchall()
+        REPLICA_READS.labels(measurement).inc()
+        return [{"_time": datetime.fromtimestamp(row[0], TIMEZONE), **dict(zip(fields, row[1:]))} for row in rows]
+
+    # Column arrays like DB_Bridge.query_history, averaged to 'every' windows (aligned to the epoch like Influx)
+    def columns(self, measurement, fields, start, stop, every: timedelta) -> dict:
+        table, _, stored = REPLICA_TABLES[measurement]
+        step = int(every.total_seconds())
+        selected = [f"AVG({field})" if field in stored else "NULL" for field in fields]
+        rows = self._db().execute(
+            f"SELECT (time / ?) * ? AS window, {', '.join(selected)} FROM {table} "
+            "WHERE time >= ? AND time < ? GROUP BY window ORDER BY window",
+            (step, step, _epoch(start), _epoch(stop))).fetchall()
+        REPLICA_READS.labels(measurement).inc()
+        columns = {"time": [datetime.fromtimestamp(row[0], TIMEZONE) for row in rows]}
+        for i, field in enumerate(fields, start=1):
+            columns[field] = [row[i] for row in rows]
+        return columns
+
+    # Seconds since the last successful sync per measurement (for /metrics)
+    def ages(self) -> dict:
+        if not self.path.exists():
+            return {}
+        rows = self._db().execute("SELECT measurement, synced_at FROM sync_state").fetchall()
+        return {measurement: round(time.time() - synced_at, 1) for measurement, synced_at in rows}
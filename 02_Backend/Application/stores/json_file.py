@@ -0,0 +1,147 @@
+import atexit
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+
+# Shared state per file (resolved path): all JsonFile instances on the same file use one lock
+# and know the content last written, whoever wrote it
+class _FileState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_text = None
+        # (mtime, size, inode) of the file as last read/written by this process
+        self.signature = None
+
+
+_files = {}
+_files_guard = threading.Lock()
+# Files with a pending debounced write, flushed on exit
+_pending = weakref.WeakSet()
+
+
+def _signature(stat_result):
+    return stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino
+
+
+def _state_for(path: Path) -> _FileState:
+    key = str(path.resolve())
+    with _files_guard:
+        state = _files.get(key)
+        if state is None:
+            state = _files[key] = _FileState()
+        return state
+
+
+# Writes text crash-safe: temp file in the same directory, fsync, rename over the target, fsync the directory
+# A power loss leaves either the old or the new file, never a truncated one
+def atomic_write_text(path: Path, text: str, encoding="utf-8"):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with tmp.open("w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    # Rename durable machen (nicht auf allen Plattformen möglich)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# Persistence of one JSON file for the stores
+# - The caller keeps the authoritative copy in memory; read() is only used at startup
+# - write() serializes immediately (consistent snapshot) and writes atomically under the per-file lock
+# - debounce_s > 0 coalesces rapid updates: only the latest state is written, once, after debounce_s
+class JsonFile:
+    def __init__(self, path, indent=2, debounce_s=0.0, encoding="utf-8"):
+        self.path = Path(path)
+        self.indent = indent
+        self.debounce_s = debounce_s
+        self.encoding = encoding
+        self._file = _state_for(self.path)
+        self._state_lock = threading.Lock()
+        self._pending_text = None
+        self._timer = None
+        self.writes = 0
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def read(self, default=None):
+        if not self.path.exists():
+            return default
+        with self._file.lock:
+            with self.path.open("r", encoding=self.encoding) as f:
+                self._file.signature = _signature(os.fstat(f.fileno()))
+                data = json.load(f)
+            self._file.last_text = json.dumps(data, indent=self.indent)
+            return data
+
+    # True if another process replaced the file since this process last read or wrote it
+    def changed_on_disk(self) -> bool:
+        try:
+            current = _signature(self.path.stat())
+        except FileNotFoundError:
+            current = None
+        with self._file.lock:
+            return current != self._file.signature
+
+    def write(self, data):
+        text = json.dumps(data, indent=self.indent)
+        if self.debounce_s <= 0:
+            self._write_text(text)
+            return
+
+        with self._state_lock:
+            self._pending_text = text
+            if self._timer is None:
+                self._timer = threading.Timer(self.debounce_s, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                _pending.add(self)
+
+    # Writes a pending debounced state now
+    def flush(self):
+        with self._state_lock:
+            text = self._pending_text
+            self._pending_text = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            _pending.discard(self)
+        if text is not None:
+            self._write_text(text)
+
+    def _write_text(self, text):
+        with self._file.lock:
+            # Unchanged content -> no SD card write
+            if text == self._file.last_text:
+                return
+            atomic_write_text(self.path, text, self.encoding)
+            self._file.last_text = text
+            self._file.signature = _signature(self.path.stat())
+            self.writes += 1
+
+
+# Writes all pending debounced states (shutdown, tests)
+def flush_all():
+    for json_file in list(_pending):
+        json_file.flush()
+
+
+atexit.register(flush_all)
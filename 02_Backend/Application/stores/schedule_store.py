@@ -1,21 +1,29 @@
-import json
 import copy
 from pathlib import Path
 
+from stores.json_file import JsonFile
+
+# Rapid updates from the UI are coalesced into one write
+WRITE_DEBOUNCE_S = 1.0
+
+
+# A classic {start, end} entry without "windows" replaces earlier windows (they would take precedence otherwise)
+def _replaces_windows(values: dict) -> bool:
+    return "windows" not in values and ("start" in values or "end" in values)
+
+
 class ScheduleStore:
     def __init__(self, path="data/schedule.json", default_path="data/schedule_default.json"):
         self.path = Path(path)
         self.default_path = Path(default_path)
+        self._file = JsonFile(self.path, indent=2, debounce_s=WRITE_DEBOUNCE_S)
 
-        self._default = self._load(self.default_path)
-        self._override = self._load(self.path)
+        self._default = JsonFile(self.default_path).read(default={})
+        self._override = self._file.read(default={})
 
-    # Loads configuration from file, or returns empty dict if file does not exist
-    def _load(self, path: Path):
-        if not path.exists():
-            return {}
-        with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+        # Bumped on every change; ScheduleManager recompiles its index only when the version differs
+        self.version = 1
+        self._subscribers = []
 
     # Returns the override schedule, which contains any user-defined overrides to the default schedule.
     # This is used for displaying the current schedule in the UI and for editing, 
@@ -30,7 +38,13 @@ class ScheduleStore:
         for device, seasons in self._override.items():
             result.setdefault(device, {})
             for season, values in seasons.items():
+                # Lists (e.g. "exceptions") replace the default completely
+                if not isinstance(values, dict):
+                    result[device][season] = copy.deepcopy(values)
+                    continue
                 result[device].setdefault(season, {})
+                if _replaces_windows(values):
+                    result[device][season].pop("windows", None)
                 for field, value in values.items():  # fieldwise merge
                     result[device][season][field] = value
 
@@ -42,18 +56,40 @@ class ScheduleStore:
         for device, seasons in new_config.items():
             self._override.setdefault(device, {})
             for season, values in seasons.items():
+                if not isinstance(values, dict):
+                    self._override[device][season] = values
+                    continue
                 self._override[device].setdefault(season, {})
-                for field, value in values.items():  # start/end merge single
+                if _replaces_windows(values):
+                    self._override[device][season].pop("windows", None)
+                for field, value in values.items():  # start/end/windows merge single
                     self._override[device][season][field] = value
         self.save()
+        self._changed()
 
-    # Saves the current override schedule to the JSON file, creating parent directories if necessary
+    # Saves the current override schedule to the JSON file (atomic, debounced), creating parent directories if necessary
     def save(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w", encoding="utf-8") as f:
-            json.dump(self._override, f, indent=2)
+        self._file.write(self._override)
 
     # Resets the override schedule to the default values defined in the default JSON file, saves it, and returns the new override schedule
     def reset_to_default(self):
         self._override = copy.deepcopy(self._default)
         self.save()
+        self._changed()
+
+    # Re-reads the overrides if another worker process changed the file; returns True if it was reloaded
+    def reload_if_changed(self) -> bool:
+        if not self._file.changed_on_disk():
+            return False
+        self._override = self._file.read(default={})
+        self._changed()
+        return True
+
+    # callback(version) is called after every update/reset
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def _changed(self):
+        self.version += 1
+        for callback in list(self._subscribers):
+            callback(self.version)
@@ -0,0 +1,135 @@
+import json
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from stores.json_file import atomic_write_text
+
+STATE_VERSION = 1
+
+# Persisted AUTOMATIC runtime fields of the SchedulerService and their types
+STATE_FIELDS = {
+    "wallbox_eto_start": float,
+    "wallbox_finished": bool,
+    "wallbox_last_set_allow": bool,
+    "wallbox_session_logged": bool,
+    "wallbox_failsafe_until": datetime,
+    "wallbox_deadline_missed": bool,
+    "wallbox_phases_set": int,
+    "boiler_last_turned_on": datetime,
+    "boiler_session_logged_date": date,
+    "boiler_target_logged_date": date,
+    "boiler_failsafe_until": datetime,
+    "boiler_failsafe_logged_today": bool,
+    "boiler_failsafe_done_today": bool,
+}
+
+# Wallbox session not seen alive for this long is not trusted (car may have been swapped while the backend was down)
+WALLBOX_SESSION_MAX_AGE = timedelta(hours=12)
+# A running session is re-saved at least this often, even if no field changed (last-seen heartbeat)
+WALLBOX_SESSION_HEARTBEAT = timedelta(minutes=30)
+WALLBOX_SESSION_FIELDS = ("wallbox_eto_start", "wallbox_finished", "wallbox_last_set_allow", "wallbox_session_logged",
+                          "wallbox_deadline_missed", "wallbox_phases_set")
+# Boiler on-time is only used for the minimum runtime -> one day is plenty
+BOILER_ON_MAX_AGE = timedelta(days=1)
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode(kind, value):
+    if value is None:
+        return None
+    if kind is datetime:
+        return datetime.fromisoformat(value)
+    if kind is date:
+        return date.fromisoformat(value)
+    if kind is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, kind) and (kind is bool or not isinstance(value, bool)):
+        return value
+    raise ValueError(f"{value!r} is not {kind.__name__}")
+
+
+# Crash-safe snapshot of the scheduler session state (data/scheduler_state.json)
+# - save() writes only if a field changed, atomically via temp file + rename (never a half-written file)
+#   While a wallbox session runs, wallbox_seen_at is refreshed every WALLBOX_SESSION_HEARTBEAT: a long, steady charge
+#   changes no field but must still count as alive after a restart
+# - load() validates the snapshot: unknown/invalid fields, expired failsafes and stale sessions are dropped
+class SchedulerStateStore:
+    def __init__(self, path="data/scheduler_state.json"):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._last = None
+        self._seen_at = None
+        self.writes = 0
+
+    # Returns the validated fields of the last snapshot ({} if missing or unreadable)
+    def load(self, now: datetime) -> dict:
+        try:
+            with self.path.open("r") as f:
+                doc = json.load(f)
+            if doc.get("version") != STATE_VERSION:
+                return {}
+            saved_at = datetime.fromisoformat(doc["saved_at"])
+            # Snapshots written before the heartbeat existed: the last save is the last sign of life
+            seen_at = datetime.fromisoformat(doc["wallbox_seen_at"]) if doc.get("wallbox_seen_at") else saved_at
+            raw = doc["state"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+        state = {}
+        for name, kind in STATE_FIELDS.items():
+            if name not in raw:
+                continue
+            try:
+                state[name] = _decode(kind, raw[name])
+            except (TypeError, ValueError):
+                continue
+
+        self._drop_stale(state, seen_at, now)
+        with self._lock:
+            self._last = {name: _encode(value) for name, value in state.items()}
+            self._seen_at = seen_at if state.get("wallbox_eto_start") is not None else None
+        return state
+
+    @staticmethod
+    def _drop_stale(state, seen_at, now):
+        # Failsafes that ran out while the backend was down
+        for name in ("boiler_failsafe_until", "wallbox_failsafe_until"):
+            until = state.get(name)
+            if until is not None and until <= now:
+                state[name] = None
+                if name == "boiler_failsafe_until" and until.date() == now.date():
+                    state["boiler_failsafe_done_today"] = True
+
+        if now - seen_at > WALLBOX_SESSION_MAX_AGE:
+            for name in WALLBOX_SESSION_FIELDS:
+                state.pop(name, None)
+
+        turned_on = state.get("boiler_last_turned_on")
+        if turned_on is not None and not (now - BOILER_ON_MAX_AGE <= turned_on <= now):
+            state["boiler_last_turned_on"] = None
+
+    # Writes the snapshot if any field differs from the last saved one; returns True if written
+    def save(self, state: dict, now: datetime) -> bool:
+        payload = {name: _encode(state.get(name)) for name in STATE_FIELDS}
+        # Saved while a session runs = the scheduler just handled it
+        session = payload["wallbox_eto_start"] is not None
+        with self._lock:
+            heartbeat_due = session and (self._seen_at is None or now - self._seen_at >= WALLBOX_SESSION_HEARTBEAT)
+            if payload == self._last and not heartbeat_due:
+                return False
+
+            seen_at = now if session else None
+            doc = {"version": STATE_VERSION, "saved_at": now.isoformat(), "state": payload,
+                   "wallbox_seen_at": seen_at.isoformat() if seen_at else None}
+            atomic_write_text(self.path, json.dumps(doc, separators=(",", ":")))
+
+            self._last = payload
+            self._seen_at = seen_at
+            self.writes += 1
+            return True
@@ -1,7 +1,8 @@
-import json
 from pathlib import Path
 from enum import Enum
 
+from stores.json_file import JsonFile
+
 # Defines system modes and handles persistent storage of the current mode
 # The system mode determines how the scheduling and control logic operates, with different modes allowing for automatic control,
 # manual control, or time-based control.
@@ -13,20 +14,20 @@ class SystemMode(str, Enum):
 class SystemModeStore:
     def __init__(self, path="data/system_mode.json"):
         self.path = Path(path)
+        # Mode changes are rare and safety relevant -> written immediately (atomic, no debounce)
+        self._file = JsonFile(self.path, indent=None)
         self._mode = self._load()
 
     # Loads the current system mode from the JSON file, or defaults to AUTOMATIC if the file does not exist.
     def _load(self):
-        if not self.path.exists():
+        data = self._file.read()
+        if data is None:
             return SystemMode.AUTOMATIC
-        with self.path.open("r") as f:
-            return SystemMode(json.load(f)["mode"])
+        return SystemMode(data["mode"])
 
-    # Saves the current system mode to the JSON file, creating parent directories if necessary
+    # Saves the current system mode to the JSON file (atomic write, creates parent directories)
     def _save(self):
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with self.path.open("w") as f:
-            json.dump({"mode": self._mode.value}, f)
+        self._file.write({"mode": self._mode.value})
 
     # Returns the current system mode, which determines how the scheduling and control logic operates, 
     # with different modes allowing for automatic control, manual control, or time-based control
@@ -38,3 +39,10 @@ class SystemModeStore:
     def set(self, mode: SystemMode):
         self._mode = mode
         self._save()
+
+    # Re-reads the mode if another worker process changed the file; returns True if it was reloaded
+    def reload_if_changed(self) -> bool:
+        if not self._file.changed_on_disk():
+            return False
+        self._mode = self._load()
+        return True